@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Recursos estáticos (logos) codificados una sola vez por proceso.
+#
+# Cada imagen se abre, se reduce al ancho mostrado y se codifica en base64 una
+# vez; la clave incluye la ruta y el mtime, así un logo reemplazado en disco se
+# vuelve a codificar sin reiniciar la app. El resultado también se guarda en
+# disco: los logos originales son muy grandes (varios segundos de PIL) y así un
+# proceso nuevo no necesita importar PIL ni volver a reducirlos.
+import base64
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+DIRECTORIO_CACHE = Path(os.environ.get("ACTIVOS_CACHE_DIR") or BASE / "datos" / "activos")
+
+# Factor de densidad para pantallas HiDPI al reducir el logo
+ESCALA_HIDPI = 2
+
+
+@lru_cache(maxsize=32)
+def _data_uri(ruta, mtime, ancho_px):
+    nombre = hashlib.sha256(f"{ruta}|{mtime}|{ancho_px}".encode("utf-8")).hexdigest()[:24]
+    en_disco = DIRECTORIO_CACHE / f"{nombre}.txt"
+    try:
+        return en_disco.read_text(encoding="ascii")
+    except OSError:
+        pass
+    uri = _codificar(ruta, ancho_px)
+    try:
+        DIRECTORIO_CACHE.mkdir(parents=True, exist_ok=True)
+        temporal = en_disco.with_suffix(f".{os.getpid()}.tmp")
+        temporal.write_text(uri, encoding="ascii")
+        os.replace(temporal, en_disco)
+    except OSError:
+        pass  # sin disco escribible sólo queda la caché en memoria
+    return uri
+
+
+def _codificar(ruta, ancho_px):
+    from PIL import Image
+
+    with Image.open(ruta) as img:
+        if ancho_px and img.width > ancho_px:
+            alto_px = max(1, round(img.height * ancho_px / img.width))
+            img = img.resize((ancho_px, alto_px), Image.LANCZOS)
+        buffered = BytesIO()
+        img.save(buffered, format="PNG", optimize=True)
+    return "data:image/png;base64," + base64.b64encode(buffered.getvalue()).decode()
+
+
+def data_uri(ruta, ancho=None):
+    ruta = Path(ruta)
+    ancho_px = ancho * ESCALA_HIDPI if ancho else None
+    return _data_uri(str(ruta), ruta.stat().st_mtime_ns, ancho_px)
+
+
+@lru_cache(maxsize=8)
+def _logo_html(uri_light, uri_dark, width):
+    return f'''
+            <style>
+            .logo-switch-wrapper {{
+                width: {width}px;
+                max-width: 45vw;
+                margin-top: 0.4em;
+                margin-bottom: -1.2em;
+                text-align: right;
+                float: right;
+                background: transparent;
+            }}
+            .logo-light {{ display: block; }}
+            .logo-dark  {{ display: none; }}
+            @media (prefers-color-scheme: dark) {{
+                .logo-light {{ display: none !important; }}
+                .logo-dark  {{ display: block !important; }}
+            }}
+            </style>
+            <div class="logo-switch-wrapper">
+                <img src='{uri_light}' class='logo-light' width='{width}px'/>
+                <img src='{uri_dark}' class='logo-dark' width='{width}px'/>
+            </div>
+            '''
+
+
+def logo_html(ruta_light, ruta_dark, width=180, reducir=True):
+    ancho = width if reducir else None
+    return _logo_html(data_uri(ruta_light, ancho), data_uri(ruta_dark, ancho), width)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# Almacén persistente de evaluaciones en curso (SQLite en modo WAL).
+#
+# Cada "Guardar ítem" es un upsert de una sola fila (evaluación, ítem), de modo
+# que el progreso sobrevive a un refresco del navegador o a un reinicio del
+# servidor. Retomar una evaluación lee sólo los ítems guardados, por clave.
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from validacion import estado_desde_registro
+
+BASE = Path(__file__).resolve().parent
+RUTA_POR_DEFECTO = BASE / "datos" / "evaluaciones.sqlite3"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS evaluaciones (
+    id          INTEGER PRIMARY KEY,
+    organismo   TEXT NOT NULL,
+    anio        INTEGER NOT NULL,
+    mes         TEXT NOT NULL,
+    evaluador   TEXT NOT NULL DEFAULT '',
+    fecha       TEXT,
+    estado      TEXT NOT NULL DEFAULT 'en_curso',
+    catalogo    TEXT NOT NULL DEFAULT '',
+    creada      REAL NOT NULL,
+    actualizada REAL NOT NULL,
+    UNIQUE (organismo, anio, mes)
+);
+CREATE INDEX IF NOT EXISTS idx_evaluaciones_periodo ON evaluaciones (anio, mes);
+CREATE TABLE IF NOT EXISTS items (
+    evaluacion_id INTEGER NOT NULL REFERENCES evaluaciones (id) ON DELETE CASCADE,
+    item_id       INTEGER NOT NULL,
+    orden         INTEGER NOT NULL,
+    escenario     TEXT,
+    ig1           TEXT,
+    ig2           TEXT,
+    ig3           TEXT,
+    ie            TEXT NOT NULL DEFAULT '{}',
+    obs           TEXT NOT NULL DEFAULT '',
+    actualizado   REAL NOT NULL,
+    PRIMARY KEY (evaluacion_id, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_items_item ON items (item_id);
+"""
+
+_UPSERT_ITEM = """
+INSERT INTO items (evaluacion_id, item_id, orden, escenario, ig1, ig2, ig3, ie, obs, actualizado)
+VALUES (?, ?, (SELECT COALESCE(MAX(orden), 0) + 1 FROM items WHERE evaluacion_id = ?), ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (evaluacion_id, item_id) DO UPDATE SET
+    escenario = excluded.escenario,
+    ig1 = excluded.ig1,
+    ig2 = excluded.ig2,
+    ig3 = excluded.ig3,
+    ie = excluded.ie,
+    obs = excluded.obs,
+    actualizado = excluded.actualizado
+"""
+
+
+def _fecha_texto(fecha):
+    if isinstance(fecha, (datetime.date, datetime.datetime)):
+        return fecha.isoformat()
+    return fecha
+
+
+class AlmacenEvaluaciones:
+    def __init__(self, ruta=RUTA_POR_DEFECTO, timeout=30.0):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._conexion() as con:
+            con.executescript(ESQUEMA)
+            # Archivos anteriores a la versión del catálogo por evaluación (ver versiones_catalogo.py)
+            if "catalogo" not in {fila[1] for fila in con.execute("PRAGMA table_info(evaluaciones)")}:
+                con.execute("ALTER TABLE evaluaciones ADD COLUMN catalogo TEXT NOT NULL DEFAULT ''")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_evaluaciones_catalogo ON evaluaciones (catalogo)")
+
+    @classmethod
+    def desde_entorno(cls):
+        return cls(os.environ.get("EVALUACIONES_DB") or RUTA_POR_DEFECTO)
+
+    def _conexion(self):
+        # Una conexión por hilo: Streamlit ejecuta cada sesión en su propio hilo
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+        return con
+
+    def cerrar(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+    def abrir_evaluacion(self, organismo, anio, mes, evaluador="", fecha=None, catalogo=""):
+        # catalogo: versión con la que se guardan los IDs de ítem y códigos de IE;
+        # una evaluación existente conserva la suya hasta migrarla, salvo que no tenga
+        ahora = time.time()
+        con = self._conexion()
+        fila = con.execute(
+            """
+            INSERT INTO evaluaciones (organismo, anio, mes, evaluador, fecha, catalogo, creada, actualizada)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (organismo, anio, mes) DO UPDATE SET
+                evaluador = excluded.evaluador,
+                fecha = excluded.fecha,
+                catalogo = CASE WHEN evaluaciones.catalogo = '' THEN excluded.catalogo ELSE evaluaciones.catalogo END
+            RETURNING id
+            """,
+            (organismo, int(anio), mes, evaluador, _fecha_texto(fecha), catalogo or "", ahora, ahora),
+        ).fetchone()
+        return fila[0]
+
+    def guardar_item(self, evaluacion_id, item_id, registro):
+        self.guardar_items(evaluacion_id, [(item_id, registro)])
+
+    def guardar_items(self, evaluacion_id, items):
+        # Upsert de muchos ítems en una sola transacción (importaciones)
+        ahora = time.time()
+        filas = []
+        for item_id, registro in items:
+            ig = list(registro.get("ig") or [])
+            ig += [None] * (3 - len(ig))
+            ie = {e["codigo"]: e["respuesta"] for e in registro.get("ie") or []}
+            filas.append((evaluacion_id, item_id, evaluacion_id, registro.get("escenario"), ig[0], ig[1], ig[2],
+                          json.dumps(ie, ensure_ascii=False), registro.get("obs") or "", ahora))
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.executemany(_UPSERT_ITEM, filas)
+            con.execute("UPDATE evaluaciones SET actualizada = ? WHERE id = ?", (ahora, evaluacion_id))
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def marcar_estado(self, evaluacion_id, estado):
+        self._conexion().execute(
+            "UPDATE evaluaciones SET estado = ?, actualizada = ? WHERE id = ?", (estado, time.time(), evaluacion_id))
+
+    def buscar(self, organismo=None, anio=None, mes=None, estado=None, id_=None):
+        condiciones, parametros = [], []
+        for columna, valor in (("id", id_), ("organismo", organismo), ("anio", anio), ("mes", mes), ("estado", estado)):
+            if valor is not None:
+                condiciones.append(f"e.{columna} = ?")
+                parametros.append(valor)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        cursor = self._conexion().execute(
+            f"""
+            SELECT e.id, e.organismo, e.anio, e.mes, e.evaluador, e.fecha, e.estado, e.catalogo, e.actualizada,
+                   (SELECT COUNT(*) FROM items i WHERE i.evaluacion_id = e.id)
+            FROM evaluaciones e {where} ORDER BY e.actualizada DESC
+            """,
+            parametros,
+        )
+        columnas = ["id", "organismo", "anio", "mes", "evaluador", "fecha", "estado", "catalogo", "actualizada", "n_items"]
+        return [dict(zip(columnas, fila)) for fila in cursor]
+
+    def obtener(self, evaluacion_id):
+        resultado = self.buscar(id_=evaluacion_id)
+        return resultado[0] if resultado else None
+
+    def cargar_items(self, evaluacion_id):
+        cursor = self._conexion().execute(
+            "SELECT item_id, escenario, ig1, ig2, ig3, ie, obs FROM items WHERE evaluacion_id = ? ORDER BY orden",
+            (evaluacion_id,),
+        )
+        return [(item_id, {"escenario": esc, "ig": [ig1, ig2, ig3], "ie": json.loads(ie), "obs": obs})
+                for item_id, esc, ig1, ig2, ig3, ie, obs in cursor]
+
+    def cargar_evaluacion(self, evaluacion_id, catalogo):
+        # Reconstruye (evaluacion, item_states) con las mismas estructuras que
+        # usa app.py; los textos de los IE se toman del catálogo.
+        evaluacion, item_states = {}, {}
+        for item_id, fila in self.cargar_items(evaluacion_id):
+            registro = catalogo.items.get(item_id)
+            if registro is None:
+                continue
+            evaluacion[registro.clave] = {
+                "escenario": fila["escenario"],
+                "ig": fila["ig"],
+                "ie": [{"codigo": k, "texto": catalogo.ie_texto.get(k, k), "respuesta": v} for k, v in fila["ie"].items()],
+                "obs": fila["obs"],
+            }
+            item_states[registro.clave] = estado_desde_registro(evaluacion[registro.clave])
+        return evaluacion, item_states
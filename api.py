@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+# Servicio HTTP local para puntuar evaluaciones y generar el informe Word.
+#
+# Aplicación WSGI de la biblioteca estándar (wsgiref), sin servicios externos;
+# también se puede montar en cualquier servidor WSGI con crear_aplicacion().
+# Reutiliza el mismo código que app.py: las respuestas se validan con las
+# reglas de validacion.py (como importar_excel), el puntaje sale de
+# MotorCumplimiento (idéntico a calcular_cumplimiento) y los informes pasan por
+# ColaInformes/CacheInformes con la misma clave_informe, así que un informe
+# pedido aquí y en la app se genera una sola vez.
+#
+#   GET  /salud              estado, versión del catálogo y estadísticas
+#   POST /puntuar            {"evaluacion": {...}} o {"evaluaciones": [{...}, ...]}
+#   POST /informe            {"organismo", "fecha", "evaluador", "mes", "anio", "evaluacion",
+#                             "backend"?, "esperar"?} -> docx, o 202 con el trabajo
+#   GET  /informe/<id>       docx si está listo, 202 mientras se genera
+#
+# Una evaluación es {"Materia || Ítem" o ID: {"escenario", "ig": [..], "ie": {código: respuesta}, "obs"}};
+# el escenario puede ser el texto completo o su número.
+#
+# Los pedidos se atienden en un pool acotado de hilos. Las evaluaciones de
+# pedidos concurrentes se agrupan (AgrupadorPuntajes) y se puntúan en una sola
+# llamada vectorizada.
+#
+#   python api.py [--puerto 8600] [--trabajadores 8]
+import argparse
+import datetime
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from cache_compartida import CacheCompartida
+from cache_informes import CacheInformes, clave_informe
+from calculo import ESCENARIOS, MESES_ESP, calcular_cumplimiento
+from catalogo import clave_normalizada
+from cola_informes import ERROR, LISTO, ColaInformes, ColaLlena
+from prioridades import LIMITE_INFORME, priorizar
+from validacion import registro_desde_estado, validar_respuestas
+
+log = logging.getLogger(__name__)
+
+MAX_CUERPO = 16 * 1024 * 1024
+MAX_EVALUACIONES = 10000
+ESPERA_INFORME = 30.0  # segundos que POST /informe espera antes de responder 202
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+RUTA_TRABAJO = re.compile(r"^/informe/([0-9a-f]{64})$")
+
+
+class ErrorPedido(ValueError):
+    def __init__(self, errores, estado="400 Bad Request"):
+        super().__init__("; ".join(errores))
+        self.errores = errores
+        self.estado = estado
+
+
+# ---------- ENTRADA ----------
+def _item(catalogo, clave):
+    registro = catalogo.items_por_clave.get(clave)
+    if registro is None and clave.isdigit():
+        registro = catalogo.items.get(int(clave))
+    if registro is None:
+        registro = catalogo.items_por_clave_normalizada.get(clave_normalizada(clave))
+    return registro
+
+
+def _escenario(valor):
+    if valor is None or valor == "":
+        return None
+    texto = str(valor).strip()
+    numero = texto.split(".")[0].strip()
+    if numero in ("1", "2", "3", "4", "5"):
+        return ESCENARIOS[int(numero) - 1]
+    return texto  # validar_respuestas lo rechaza si no es un escenario
+
+
+def evaluacion_desde_json(catalogo, datos):
+    # Devuelve la evaluación con los registros que guardaría el formulario
+    if not isinstance(datos, dict):
+        raise ErrorPedido(["La evaluación debe ser un objeto {ítem: respuestas}."])
+    evaluacion = {}
+    errores = []
+    for clave, respuestas in datos.items():
+        registro_item = _item(catalogo, str(clave))
+        if registro_item is None:
+            errores.append(f"Ítem desconocido: {clave}")
+            continue
+        if not isinstance(respuestas, dict):
+            errores.append(f"{registro_item.clave}: las respuestas deben ser un objeto.")
+            continue
+        ig = list(respuestas.get("ig") or [])
+        ie = respuestas.get("ie") or {}
+        if isinstance(ie, list):
+            ie = {e.get("codigo"): e.get("respuesta") for e in ie if isinstance(e, dict)}
+        if len(ig) > 3 or not isinstance(ie, dict):
+            errores.append(f"{registro_item.clave}: 'ig' admite hasta 3 respuestas e 'ie' es {{código: respuesta}}.")
+            continue
+        ig += [None] * (3 - len(ig))
+        lista_ie = registro_item.ies
+        state = {
+            "escenario": _escenario(respuestas.get("escenario")),
+            "ig1": ig[0],
+            "ig2": ig[1],
+            "ig3": ig[2],
+            # en el orden del catálogo, como los radios de la app
+            "ie": {x['codigo']: ie[x['codigo']] for x in lista_ie if x['codigo'] in ie},
+            "obs": str(respuestas.get("obs") or ""),
+        }
+        ajenos = [str(c) for c in ie if c not in state["ie"]]
+        if ajenos:
+            errores.append(f"{registro_item.clave}: indicadores que no pertenecen al ítem: {', '.join(ajenos)}")
+            continue
+        errores_item = validar_respuestas(state, lista_ie)
+        if errores_item:
+            errores.append(f"{registro_item.clave}: {' '.join(errores_item)}")
+            continue
+        evaluacion[registro_item.clave] = registro_desde_estado(state, lista_ie)
+    if errores:
+        raise ErrorPedido(errores)
+    return evaluacion
+
+
+def _datos_informe(datos):
+    errores = []
+    organismo = str(datos.get("organismo") or "").strip()
+    evaluador = str(datos.get("evaluador") or "").strip()
+    mes = datos.get("mes")
+    if isinstance(mes, int) and 1 <= mes <= 12:
+        mes = MESES_ESP[mes - 1]
+    if mes not in MESES_ESP:
+        errores.append(f"Mes no reconocido: {mes!r}")
+    anio = datos.get("anio")
+    if not isinstance(anio, int) or isinstance(anio, bool):
+        errores.append(f"Año no reconocido: {anio!r}")
+    try:
+        fecha = datetime.date.fromisoformat(datos["fecha"]) if datos.get("fecha") else datetime.date.today()
+    except (TypeError, ValueError):
+        errores.append(f"Fecha no reconocida: {datos.get('fecha')!r} (AAAA-MM-DD)")
+        fecha = None
+    if not organismo:
+        errores.append("Falta el organismo.")
+    if errores:
+        raise ErrorPedido(errores)
+    return organismo, fecha, evaluador, mes, anio
+
+
+# ---------- PUNTAJE ----------
+class AgrupadorPuntajes:
+    # Junta las evaluaciones de pedidos concurrentes (hasta max_lote, o lo que
+    # llegue en `espera` segundos) y las puntúa en una sola llamada al motor.
+    def __init__(self, motor, max_lote=256, espera=0.002):
+        self.motor = motor
+        self.max_lote = max_lote
+        self.espera = espera
+        self.lotes = 0
+        self.evaluaciones = 0
+        self._cola = queue.Queue()
+        threading.Thread(target=self._ciclo, name="agrupador", daemon=True).start()
+
+    def puntuar(self, evaluaciones):
+        # -> (ResultadoLote, filas de estas evaluaciones dentro del lote)
+        futuro = Future()
+        self._cola.put((evaluaciones, futuro))
+        return futuro.result()
+
+    def _ciclo(self):
+        while True:
+            pedidos = [self._cola.get()]
+            n = len(pedidos[0][0])
+            limite = time.perf_counter() + self.espera
+            while n < self.max_lote:
+                restante = limite - time.perf_counter()
+                try:
+                    pedido = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                n += len(pedido[0])
+            try:
+                lote = self.motor.puntuar([e for evaluaciones, _ in pedidos for e in evaluaciones])
+            except Exception as e:
+                for _, futuro in pedidos:
+                    futuro.set_exception(e)
+                continue
+            self.lotes += 1
+            self.evaluaciones += n
+            inicio = 0
+            for evaluaciones, futuro in pedidos:
+                futuro.set_result((lote, range(inicio, inicio + len(evaluaciones))))
+                inicio += len(evaluaciones)
+
+    def estadisticas(self):
+        return {"lotes": self.lotes, "evaluaciones": self.evaluaciones,
+                "promedio_lote": round(self.evaluaciones / self.lotes, 2) if self.lotes else 0.0}
+
+
+def resultado_json(lote, e):
+    # Misma información y redondeo que calcular_cumplimiento
+    motor = lote.motor
+    porcentaje = lote.porcentaje_materia()[e].tolist()
+    materias = [
+        {"materia": m, "evaluados": int(lote.total[e, k]), "excluidos": int(lote.excluidos[e, k]),
+         "cumplimiento": round(100 * porcentaje[k], 1) if lote.total[e, k] else None}
+        for k, m in enumerate(motor.materias)
+    ]
+    valores = lote.item[e].tolist()
+    hallazgo = lote.hallazgo[e].tolist()
+    items = [
+        {"item": clave, "evaluado": not excluido, "cumplimiento": None if excluido else round(100 * v, 1),
+         "hallazgo": h}
+        for clave, v, excluido, h in zip(motor.claves, valores, lote.excluido[e].tolist(), hallazgo)
+    ]
+    return {"cumplimiento_global": float(lote.cumplimiento_global[e]), "materias": materias, "items": items}
+
+
+# ---------- APLICACIÓN ----------
+class AplicacionAPI:
+    def __init__(self, catalogo, cola, agrupador):
+        self.catalogo = catalogo
+        self.cola = cola
+        self.agrupador = agrupador
+
+    def __call__(self, environ, start_response):
+        metodo = environ["REQUEST_METHOD"]
+        ruta = environ.get("PATH_INFO") or "/"
+        trabajo_id = RUTA_TRABAJO.match(ruta)
+        try:
+            if ruta == "/salud":
+                self._metodo(metodo, "GET")
+                estado, cuerpo = "200 OK", self.salud()
+            elif ruta == "/puntuar":
+                self._metodo(metodo, "POST")
+                estado, cuerpo = "200 OK", self.puntuar(_leer_json(environ))
+            elif ruta == "/informe":
+                self._metodo(metodo, "POST")
+                return self._responder_trabajo(start_response, self.informe(_leer_json(environ)))
+            elif trabajo_id:
+                self._metodo(metodo, "GET")
+                trabajo = self.cola.obtener(trabajo_id.group(1))
+                if trabajo is None:
+                    # Trabajo ya podado de la cola: el informe puede seguir en la caché
+                    datos = self.cola.cache.obtener(trabajo_id.group(1))
+                    if datos is None:
+                        raise ErrorPedido(["Informe desconocido."], "404 Not Found")
+                    return _responder(start_response, "200 OK", datos, MIME_DOCX)
+                return self._responder_trabajo(start_response, trabajo)
+            else:
+                raise ErrorPedido([f"Ruta desconocida: {ruta}"], "404 Not Found")
+        except ErrorPedido as e:
+            estado, cuerpo = e.estado, {"errores": e.errores}
+        except ColaLlena as e:
+            estado, cuerpo = "503 Service Unavailable", {"errores": [str(e)]}
+        except Exception as e:
+            log.exception("Error atendiendo %s %s", metodo, ruta)
+            estado, cuerpo = "500 Internal Server Error", {"errores": [f"{type(e).__name__}: {e}"]}
+        return _responder_json(start_response, estado, cuerpo)
+
+    @staticmethod
+    def _metodo(metodo, permitido):
+        if metodo != permitido:
+            raise ErrorPedido([f"Use {permitido}."], "405 Method Not Allowed")
+
+    def salud(self):
+        return {"estado": "ok", "catalogo": self.catalogo.version, "items": len(self.catalogo.items),
+                "puntaje": self.agrupador.estadisticas(), "informes": self.cola.estadisticas(),
+                "cache": self.cola.cache.estadisticas(),
+                "cache_compartida": self.cola.cache.compartida.estadisticas() if self.cola.cache.compartida else None}
+
+    def puntuar(self, datos):
+        if not isinstance(datos, dict) or ("evaluacion" in datos) == ("evaluaciones" in datos):
+            raise ErrorPedido(["Envíe 'evaluacion' (un objeto) o 'evaluaciones' (una lista)."])
+        if "evaluacion" in datos:
+            lote, filas = self.agrupador.puntuar([evaluacion_desde_json(self.catalogo, datos["evaluacion"])])
+            return {"resultado": resultado_json(lote, filas[0])}
+        lista = datos["evaluaciones"]
+        if not isinstance(lista, list) or len(lista) > MAX_EVALUACIONES:
+            raise ErrorPedido([f"'evaluaciones' debe ser una lista de hasta {MAX_EVALUACIONES} evaluaciones."])
+        evaluaciones, errores = [], []
+        for i, evaluacion in enumerate(lista):
+            try:
+                evaluaciones.append(evaluacion_desde_json(self.catalogo, evaluacion))
+            except ErrorPedido as e:
+                errores += [f"evaluaciones[{i}]: {m}" for m in e.errores]
+        if errores:
+            raise ErrorPedido(errores)
+        lote, filas = self.agrupador.puntuar(evaluaciones)
+        return {"resultados": [resultado_json(lote, e) for e in filas]}
+
+    def informe(self, datos):
+        if not isinstance(datos, dict):
+            raise ErrorPedido(["El cuerpo debe ser un objeto JSON."])
+        from informe import BACKEND_POR_DEFECTO, BACKENDS, exportar_informe
+
+        organismo, fecha, evaluador, mes, anio = _datos_informe(datos)
+        evaluacion = evaluacion_desde_json(self.catalogo, datos.get("evaluacion") or {})
+        backend = datos.get("backend") or BACKEND_POR_DEFECTO
+        if backend not in BACKENDS:
+            raise ErrorPedido([f"Generador de informe desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})"])
+        catalogo = self.catalogo
+
+        # Igual que el bloque EXPORTAR INFORME de app.py
+        def generar_informe(avance):
+            avance(0.2, "Calculando cumplimiento")
+            resultado = calcular_cumplimiento(evaluacion, catalogo.materias_items, catalogo.indicadores_especificos,
+                                              catalogo.materia_peso_map)
+            prioridades = priorizar(evaluacion, catalogo, LIMITE_INFORME)
+            avance(0.4, "Construyendo documento Word")
+            return exportar_informe(organismo, fecha, evaluador, mes, anio, *resultado, evaluacion, backend=backend,
+                                    prioridades=prioridades)
+
+        clave = clave_informe(catalogo.version, organismo, fecha, evaluador, mes, anio, evaluacion, backend)
+        trabajo = self.cola.enviar(clave, generar_informe)
+        espera = datos.get("esperar", ESPERA_INFORME)
+        if isinstance(espera, (int, float)) and espera > 0:
+            trabajo.esperar(min(float(espera), ESPERA_INFORME))
+        return trabajo
+
+    def _responder_trabajo(self, start_response, trabajo):
+        if trabajo.estado == LISTO:
+            return _responder(start_response, "200 OK", trabajo.datos, MIME_DOCX,
+                              [("X-Informe-Id", trabajo.id)])
+        cuerpo = {"id": trabajo.id, "estado": trabajo.estado, "progreso": round(trabajo.progreso, 2),
+                  "mensaje": trabajo.mensaje, "url": f"/informe/{trabajo.id}"}
+        if trabajo.estado == ERROR:
+            return _responder_json(start_response, "500 Internal Server Error", dict(cuerpo, errores=[trabajo.error]))
+        return _responder_json(start_response, "202 Accepted", cuerpo)
+
+
+def _leer_json(environ):
+    try:
+        largo = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        largo = 0
+    if largo > MAX_CUERPO:
+        raise ErrorPedido([f"El cuerpo supera {MAX_CUERPO // (1024 * 1024)} MB."], "413 Payload Too Large")
+    try:
+        return json.loads(environ["wsgi.input"].read(largo) or b"null")
+    except ValueError as e:
+        raise ErrorPedido([f"JSON no válido: {e}"])
+
+
+def _responder(start_response, estado, datos, tipo, encabezados=()):
+    start_response(estado, [("Content-Type", tipo), ("Content-Length", str(len(datos))), *encabezados])
+    return [datos]
+
+
+def _responder_json(start_response, estado, cuerpo):
+    datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+    return _responder(start_response, estado, datos, "application/json; charset=utf-8")
+
+
+def crear_aplicacion(catalogo=None, max_lote=256, espera_lote=0.002):
+    from calculo_lote import MotorCumplimiento
+    from versiones_catalogo import RegistroCatalogos
+
+    # Varios procesos de la API (y de la app) comparten catálogo e informes
+    compartida = CacheCompartida.desde_entorno()
+    catalogo = catalogo or RegistroCatalogos.desde_entorno(compartida).compilar()
+    cola = ColaInformes.desde_entorno(CacheInformes.desde_entorno(compartida))
+    agrupador = AgrupadorPuntajes(MotorCumplimiento(catalogo.materias_items), max_lote, espera_lote)
+    return AplicacionAPI(catalogo, cola, agrupador)
+
+
+# ---------- SERVIDOR ----------
+class ManejadorSilencioso(WSGIRequestHandler):
+    def log_message(self, formato, *args):
+        log.debug("%s " + formato, self.address_string(), *args)
+
+
+class ServidorAPI(WSGIServer):
+    # WSGIServer de wsgiref que atiende cada conexión en un pool acotado de hilos
+    daemon_threads = True
+
+    def __init__(self, direccion, manejador, trabajadores=8):
+        super().__init__(direccion, manejador)
+        self._pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def crear_servidor(host="127.0.0.1", puerto=8600, trabajadores=8, aplicacion=None):
+    servidor = ServidorAPI((host, puerto), ManejadorSilencioso, trabajadores)
+    servidor.set_app(aplicacion or crear_aplicacion())
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de puntaje e informes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--trabajadores", type=int, default=8, help="hilos que atienden pedidos")
+    parser.add_argument("--max-lote", type=int, default=256, help="evaluaciones por llamada al motor")
+    parser.add_argument("--espera-lote-ms", type=float, default=2.0, help="espera para juntar pedidos concurrentes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    aplicacion = crear_aplicacion(max_lote=args.max_lote, espera_lote=args.espera_lote_ms / 1000)
+    servidor = crear_servidor(args.host, args.puerto, args.trabajadores, aplicacion)
+    print(f"Sirviendo en http://{args.host}:{servidor.server_port} "
+          f"(catálogo {aplicacion.catalogo.version}, {args.trabajadores} trabajadores)", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,66 +3,46 @@ BASE = Path(__file__).resolve().parent
 
 # -*- coding: utf-8 -*-
 import streamlit as st
-import json
+import copy
 import datetime
-from pathlib import Path
-from collections import defaultdict
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.section import WD_ORIENT
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+import sqlite3
 from io import BytesIO
-import unicodedata
-from PIL import Image
-import base64
+from pathlib import Path
+from activos import logo_html
+from almacen import AlmacenEvaluaciones
+from bitacora import BitacoraEvaluaciones
+from cache_compartida import CacheCompartida
+from calculo import ESCENARIOS, IE_OPCIONES, IG_OPCIONES, INDICADORES_GENERALES, MESES_ESP, MarcadorIncremental, calcular_cumplimiento
+from cache_informes import CacheInformes, clave_informe
+from cola_informes import ERROR, LISTO, ColaInformes, ColaLlena
+from comparacion import COHORTE_MINIMA, VIGENCIA_COHORTE, CohortePeriodo, comparar_evaluacion
+from exportar_datos import ResultadoExportacion, exportar_bytes
+from grilla import COLUMNAS_IE, COLUMNAS_ITEMS, aplicar_ediciones, filas_grilla, procesar_grilla
+from historico import HistoricoEvaluaciones, periodo
+from importar_excel import escribir_plantilla, guardar_en_almacen, importar_excel
+from informe import BACKEND_POR_DEFECTO, exportar_informe
+from perfilado import AGREGADOS, etapa, iniciar_perfil, perfil_activo, perfil_actual, terminar_perfil
+from prioridades import LIMITE_INFORME, describir, priorizar
+from sesion_compacta import BorradoresItems, EvaluacionCompacta
+from validacion import IG12_OPCIONES, estado_desde_registro, registro_desde_estado, validar_item
+from versiones_catalogo import RegistroCatalogos, migrar_almacen
 
 # ---------- CONFIGURACIÓN GENERAL ----------
 st.set_page_config(page_title="Autoevaluación Transparencia Activa", layout="wide")
 
+# Instrumentación por etapa, sólo con PERFIL_APP=1 o ?perfil=1 (ver perfilado.py)
+PERFIL = perfil_activo(st.query_params)
+perfil = iniciar_perfil("rerun") if PERFIL else None
+
 def show_logo(logo_light="TRIVIA.png", logo_dark="TRIVIA_dark.png", width=180):
     try:
-        img_light = Image.open(BASE / logo_light)
-        buffered_light = BytesIO()
-        img_light.save(buffered_light, format="PNG")
-        img_str_light = base64.b64encode(buffered_light.getvalue()).decode()
-
-        img_dark = Image.open(BASE / logo_dark)
-        buffered_dark = BytesIO()
-        img_dark.save(buffered_dark, format="PNG")
-        img_str_dark = base64.b64encode(buffered_dark.getvalue()).decode()
-
-        st.markdown(
-            f'''
-            <style>
-            .logo-switch-wrapper {{
-                width: {width}px;
-                max-width: 45vw;
-                margin-top: 0.4em;
-                margin-bottom: -1.2em;
-                text-align: right;
-                float: right;
-                background: transparent;
-            }}
-            .logo-light {{ display: block; }}
-            .logo-dark  {{ display: none; }}
-            @media (prefers-color-scheme: dark) {{
-                .logo-light {{ display: none !important; }}
-                .logo-dark  {{ display: block !important; }}
-            }}
-            </style>
-            <div class="logo-switch-wrapper">
-                <img src='data:image/png;base64,{img_str_light}' class='logo-light' width='{width}px'/>
-                <img src='data:image/png;base64,{img_str_dark}' class='logo-dark' width='{width}px'/>
-            </div>
-            ''',
-            unsafe_allow_html=True
-        )
+        st.markdown(logo_html(BASE / logo_light, BASE / logo_dark, width), unsafe_allow_html=True)
     except Exception as e:
         st.warning(f"No se pudo cargar el logo: {e}")
 
 
-show_logo("TRIVIA.png", width=180)
+with etapa("show_logo"):
+    show_logo("TRIVIA.png", width=180)
 
 st.markdown("""
     <style>
@@ -84,58 +64,62 @@ st.markdown("""
 st.title("AUTOEVALUACIÓN DE TRANSPARENCIA ACTIVA")
 
 # ---------- CARGA DE DATOS Y MAPAS ----------
-@st.cache_data
-def load_data():
-    with open("estructura_materias_items.json", encoding="utf-8") as f:
-        materias_items = json.load(f)
-    with open("estructura_indicadores_especificos_REC_FINAL.json", encoding="utf-8") as f:
-        indicadores_especificos = json.load(f)
-    return materias_items, indicadores_especificos
-
-materias_items, indicadores_especificos = load_data()
-
-materias_map = defaultdict(list)
-items_id_map = dict()
-items_peso_map = dict()
-materia_peso_map = dict()
-for mi in materias_items:
-    materia = mi['Materia']
-    item = mi['Ítem']
-    id_ = mi['ID']
-    peso = mi['Peso Materia (%)']
-    materias_map[materia].append(item)
-    items_id_map[(materia, item)] = id_
-    items_peso_map[(materia, item)] = peso
-    try:
-        peso_float = float(peso)
-        materia_peso_map[materia] = peso_float
-    except Exception:
-        continue
-
-ESCENARIOS = [
-    "1. Organismo presenta sección con antecedentes.",
-    "2. Organismo indica no tener antecedentes / no aplica.",
-    "3. No hay sección, pero no hay evidencia de infracción.",
-    "4. No hay sección y sí hay evidencia de información faltante.",
-    "5. Sección/vínculo existe pero no funciona / no muestra datos.",
-]
-
-INDICADORES_GENERALES = [
-    "¿La información está disponible?",
-    "¿La información está actualizada?",
-    "¿La información está completa?"
-]
-
-def normalizar(txt):
-    if not isinstance(txt, str):
-        return ""
-    return "".join(c for c in unicodedata.normalize('NFD', txt) if unicodedata.category(c) != 'Mn').lower().strip()
+# La caché compartida (cache_compartida.py) reparte entre los procesos de la app
+# la compilación del catálogo y los informes, plantillas y exportaciones generados
+@st.cache_resource
+def load_cache_compartida():
+    return CacheCompartida.desde_entorno()
+
+@st.cache_resource
+def load_registro_catalogos():
+    return RegistroCatalogos.desde_entorno(load_cache_compartida())
+
+@st.cache_resource
+def load_catalogo():
+    # Snapshot compilado de la versión vigente (ver versiones_catalogo.py)
+    return load_registro_catalogos().compilar(BASE)
+
+@st.cache_resource
+def load_cache_informes():
+    return CacheInformes.desde_entorno(load_cache_compartida())
+
+@st.cache_resource
+def load_cola_informes():
+    return ColaInformes.desde_entorno(load_cache_informes())
+
+@st.cache_resource
+def load_almacen():
+    return AlmacenEvaluaciones.desde_entorno()
+
+@st.cache_resource
+def load_bitacora():
+    return BitacoraEvaluaciones(load_almacen(), load_catalogo())
+
+@st.cache_resource
+def load_historico():
+    return HistoricoEvaluaciones(load_almacen(), load_catalogo())
+
+@st.cache_resource(ttl=VIGENCIA_COHORTE, max_entries=8)
+def cohorte_periodo(version_catalogo, periodo_eval):
+    # Una cohorte por período para todos los organismos (cada uno se excluye al
+    # comparar); se resincroniza el histórico a lo sumo cada VIGENCIA_COHORTE s
+    historico = load_historico()
+    historico.sincronizar()
+    return CohortePeriodo.desde_historico(historico, load_catalogo(), periodo_eval)
+
+with etapa("catalogo"):
+    catalogo = load_catalogo()
+    materias_items = catalogo.materias_items
+    indicadores_especificos = catalogo.indicadores_especificos
+    materias_map = catalogo.materias_map
+    items_id_map = catalogo.items_id_map
+    items_peso_map = catalogo.items_peso_map
+    materia_peso_map = catalogo.materia_peso_map
 
 # --------------- SESIÓN Y DATOS GENERALES --------------------
+# Respuestas compactadas por ID de ítem; los textos salen del catálogo al leerlas (ver sesion_compacta.py)
 if "evaluacion" not in st.session_state:
-    st.session_state.evaluacion = dict()
-
-MESES_ESP = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+    st.session_state.evaluacion = EvaluacionCompacta(catalogo)
 
 with st.form("datos_generales"):
     col1, col2, col3 = st.columns(3)
@@ -153,493 +137,530 @@ with st.form("datos_generales"):
     submitted = st.form_submit_button("Iniciar evaluación")
 if not (organismo and evaluador and mes_eval and anio_eval):
     st.warning("Por favor, ingrese nombre del organismo, evaluador/a, mes y año evaluado para comenzar.")
+    terminar_perfil(perfil)
     st.stop()
 
+# ---------- AUTOGUARDADO Y REANUDACIÓN ----------
+# Cada organismo/período tiene una evaluación persistente; al volver a ingresar
+# los mismos datos (p. ej. tras refrescar el navegador) se retoma lo guardado.
+# Claves por ítem en st.session_state: los widgets del formulario y las
+# respuestas por defecto aún no anotadas (predeterminados_, ver formulario_item)
+WIDGETS_ITEM = ("escenario_", "ig1_", "ig2_", "ig3_", "ie_", "obs_", "predeterminados_")
+
+almacen = load_almacen()
+bitacora = load_bitacora()
+
+def anotar(metodo, evaluacion_id, *args, **kwargs):
+    # Bitácora de cambios (bitacora.py): un error al anexar no interrumpe la evaluación
+    try:
+        getattr(bitacora, metodo)(evaluacion_id, *args, **kwargs)
+    except sqlite3.Error:
+        pass
+
+clave_periodo = (organismo, int(anio_eval), mes_eval)
+if st.session_state.get("clave_periodo") != clave_periodo:
+    evaluacion_id = almacen.abrir_evaluacion(organismo, anio_eval, mes_eval, evaluador, fecha, catalogo.version)
+    # Una evaluación guardada con otra versión del catálogo se lleva a la vigente antes de leerla
+    if almacen.obtener(evaluacion_id)["catalogo"] != catalogo.version:
+        migracion = migrar_almacen(almacen, load_registro_catalogos(), catalogo, evaluaciones=[evaluacion_id])
+        if migracion.sin_snapshot:
+            st.warning("La evaluación se guardó con una versión del catálogo que ya no está disponible; "
+                       "los ítems que cambiaron no se pueden retomar.")
+        else:
+            st.info(f"La evaluación se migró a la versión vigente del catálogo: {migracion.resumen()}")
+            for _, clave_item, motivo in migracion.revisar:
+                st.warning(f"Revise {clave_item}: {motivo}.")
+    guardada, _ = almacen.cargar_evaluacion(evaluacion_id, catalogo)
+    # Los borradores sin guardar se retoman desde la bitácora
+    try:
+        borradores_bitacora, _ = bitacora.estados(evaluacion_id)
+    except sqlite3.Error:
+        borradores_bitacora = {}
+    borradores_bitacora = {k: s for k, s in borradores_bitacora.items() if k in catalogo.items_por_clave
+                           and (k not in guardada or s != estado_desde_registro(guardada[k]))}
+    if guardada or borradores_bitacora:
+        for k in [k for k in st.session_state if isinstance(k, str) and k.startswith(WIDGETS_ITEM)]:
+            del st.session_state[k]
+        st.session_state.evaluacion = EvaluacionCompacta(catalogo, guardada)
+        st.session_state.item_states = BorradoresItems(catalogo)
+        for key, state in borradores_bitacora.items():
+            st.session_state.item_states.guardar(key, state)
+        st.info(f"Se retomó la evaluación en curso de {organismo} ({mes_eval} {anio_eval}), ítems guardados: {len(guardada)}"
+                + (f", borradores sin guardar: {len(borradores_bitacora)}." if borradores_bitacora else "."))
+    else:
+        for key, registro in st.session_state.evaluacion.items():
+            almacen.guardar_item(evaluacion_id, catalogo.items_por_clave[key].id, registro)
+    st.session_state.clave_periodo = clave_periodo
+    st.session_state.evaluacion_id = evaluacion_id
+    st.session_state.marcador = MarcadorIncremental(materias_items, materia_peso_map)
+    st.session_state.marcador.cargar(st.session_state.evaluacion)
+
+# ---------- PANEL DE AVANCE ----------
+def panel_avance(marcador, evaluacion):
+    with st.sidebar:
+        st.subheader("Avance de la evaluación")
+        st.metric("Cumplimiento global parcial", f"{marcador.cumplimiento_global:.1f} %")
+        st.caption(f"Ítems guardados: {len(evaluacion)} de {len(marcador.valores)}")
+        for materia, data in marcador.totales.items():
+            n_items = data['total'] + data['excluidos']
+            porcentaje = marcador.porcentaje_materia(materia)
+            guardados = sum(1 for key in marcador.claves_materia[materia] if key in evaluacion)
+            if porcentaje is None:
+                st.progress(0, text=f"{materia}: no se evalúa ({guardados}/{n_items})")
+            else:
+                st.progress(porcentaje / 100, text=f"{materia}: {porcentaje:.1f} % ({guardados}/{n_items})")
+
+with etapa("panel_avance"):
+    panel_avance(st.session_state.marcador, st.session_state.evaluacion)
+
+# ---------- IMPORTAR DESDE EXCEL ----------
+# Las filas sin organismo/año/mes se asignan a la evaluación abierta; las de
+# otros períodos se guardan directamente en el almacén.
+@st.cache_data(max_entries=32)
+def plantilla_excel(version_catalogo, organismo, anio, mes):
+    def generar():
+        buffer = BytesIO()
+        escribir_plantilla(buffer, catalogo, organismo, anio, mes)
+        return buffer
+    return load_cache_compartida().obtener_o_generar(
+        "plantilla", "|".join([version_catalogo, organismo, str(anio), mes]), generar)
+
+avisos_importacion = st.session_state.pop("avisos_importacion", [])
+with st.expander("Importar respuestas desde Excel", expanded=bool(avisos_importacion)):
+    for tipo, texto in avisos_importacion:
+        getattr(st, tipo)(texto)
+    st.download_button("Descargar plantilla Excel", data=plantilla_excel(catalogo.version, organismo, int(anio_eval), mes_eval),
+                       file_name="Plantilla_Autoevaluacion_TA.xlsx",
+                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    archivo_excel = st.file_uploader("Planilla de respuestas (.xlsx)", type=["xlsx"])
+    if archivo_excel is not None and st.button("Importar planilla"):
+        avisos = []
+        try:
+            resultado = importar_excel(archivo_excel, catalogo, organismo=organismo, anio=int(anio_eval), mes=mes_eval,
+                                       evaluador=evaluador, fecha=fecha)
+        except Exception as e:
+            resultado = None
+            avisos.append(("error", f"No se pudo leer la planilla: {e}"))
+        if resultado is not None:
+            try:
+                ids_importados = guardar_en_almacen(resultado, almacen)
+            except sqlite3.Error as e:
+                ids_importados = {}
+                avisos.append(("warning", f"No se pudo respaldar la importación: {e}"))
+            for periodo_importado, evaluacion_importada in ids_importados.items():
+                datos_importados = resultado.evaluaciones[periodo_importado]
+                anotar("registrar_lote", evaluacion_importada,
+                       [(datos_importados["ids"][k], estado_desde_registro(r)) for k, r in datos_importados["evaluacion"].items()],
+                       "importacion")
+            actual = resultado.evaluaciones.get(clave_periodo)
+            if actual:
+                for k in [k for k in st.session_state if isinstance(k, str) and k.startswith(WIDGETS_ITEM)]:
+                    del st.session_state[k]
+                borradores = st.session_state.setdefault("item_states", BorradoresItems(catalogo))
+                for key, registro in actual["evaluacion"].items():
+                    st.session_state.evaluacion[key] = registro
+                    borradores.descartar(key)
+                st.session_state.marcador.cargar(st.session_state.evaluacion)
+            avisos.insert(0, ("success", resultado.resumen()))
+            avisos += [("error", f"Fila {fila}: {mensaje}") for fila, mensaje in resultado.errores[:50]]
+            avisos += [("warning", f"Fila {fila}: {mensaje}") for fila, mensaje in resultado.advertencias[:50]]
+        # Rerun completo para refrescar el panel de avance y el formulario
+        st.session_state.avisos_importacion = avisos
+        st.rerun()
+
 # ---------- MATERIAS E ÍTEMS ----------
 st.header("Materias e Ítems de Transparencia Activa")
 materias = list(materias_map.keys())
 materia_sel = st.selectbox("Seleccione materia a evaluar", materias)
 st.markdown(f"<div class='negrita'>{materia_sel}</div>", unsafe_allow_html=True)
-items = materias_map[materia_sel]
-item_sel = st.selectbox("Seleccione ítem a evaluar", items)
-st.markdown(f"<div class='negrita'>{item_sel}</div>", unsafe_allow_html=True)
-id_item = items_id_map.get((materia_sel, item_sel))
-key_evaluacion = f"{materia_sel} || {item_sel}"
-
-# ---------- FORMULARIO REACTIVO, SEGURO Y PERSISTENTE POR ÍTEM ----------
-st.subheader("Evaluación del Ítem Seleccionado")
+MODOS_INGRESO = ["Ítem por ítem", "Grilla por materia"]
+modo_ingreso = st.radio("Modo de ingreso", MODOS_INGRESO, horizontal=True)
+if modo_ingreso == MODOS_INGRESO[0]:
+    items = materias_map[materia_sel]
+    item_sel = st.selectbox("Seleccione ítem a evaluar", items)
+    st.markdown(f"<div class='negrita'>{item_sel}</div>", unsafe_allow_html=True)
+    id_item = items_id_map.get((materia_sel, item_sel))
+    key_evaluacion = f"{materia_sel} || {item_sel}"
 
 if "item_states" not in st.session_state:
-    st.session_state.item_states = {}
-
-if key_evaluacion not in st.session_state.item_states:
-    st.session_state.item_states[key_evaluacion] = {
-        "escenario": None,
-        "ig1": None,
-        "ig2": None,
-        "ig3": None,
-        "ie": {},
-        "obs": "",
-    }
-
-state = st.session_state.item_states[key_evaluacion]
-
-# ESCENARIO
-escenario = st.radio("Escenario", ESCENARIOS, key=f"escenario_{id_item}", index=ESCENARIOS.index(state["escenario"]) if state["escenario"] in ESCENARIOS else 0)
-state["escenario"] = escenario
-
-# Secuencia IG y IE
-ig1_val = ig2_val = ig3_val = None
-mostrar_ig2 = mostrar_ig3 = mostrar_ie = False
-
-if escenario.startswith("1"):
-    ig1_val = st.radio(
-        INDICADORES_GENERALES[0],
-        ["Sí", "No"],
-        key=f"ig1_{id_item}",
-        index=["Sí", "No"].index(state["ig1"]) if state["ig1"] in ["Sí", "No"] else 0,
-    )
-    if ig1_val != state["ig1"]:
-        state["ig2"] = None
-        state["ig3"] = None
-        state["ie"] = {}
-    state["ig1"] = ig1_val
-
-    if ig1_val == "Sí":
-        mostrar_ig2 = True
-        ig2_val = st.radio(
-            INDICADORES_GENERALES[1],
+    st.session_state.item_states = BorradoresItems(catalogo)
+
+# ---------- FORMULARIO REACTIVO, SEGURO Y PERSISTENTE POR ÍTEM ----------
+# El bloque se ejecuta como fragmento: responder un radio sólo vuelve a ejecutar
+# esta función, no el script completo (logo, CSS, datos generales, exportación).
+
+# Un radio sin respuesta previa muestra su primera opción, que queda en el
+# borrador sin que el evaluador la haya elegido. Esas respuestas no se anotan
+# en la bitácora hasta que el evaluador cambia el radio (on_change) o guarda el ítem.
+def radio_respuesta(etiqueta, opciones, valor, key, campo, predeterminados):
+    if valor in opciones:
+        index = opciones.index(valor)
+    else:
+        index = 0
+        if key not in st.session_state:
+            predeterminados.add(campo)
+    return st.radio(etiqueta, opciones, key=key, index=index, on_change=predeterminados.discard, args=(campo,))
+
+def sin_predeterminados(state, predeterminados):
+    # Copia del estado con las respuestas por defecto vacías, como lo conoce la bitácora
+    anotado = copy.deepcopy(state)
+    for campo in predeterminados:
+        if isinstance(campo, tuple):
+            anotado["ie"].pop(campo[1], None)
+        else:
+            anotado[campo] = None
+    return anotado
+
+@st.fragment
+def formulario_item(materia_sel, item_sel, id_item, key_evaluacion):
+    # Un rerun sólo del fragmento se perfila por separado
+    perfil_fragmento = iniciar_perfil("fragmento") if PERFIL and perfil_actual() is None else None
+    st.subheader("Evaluación del Ítem Seleccionado")
+    for tipo, texto in st.session_state.pop("avisos_item", []):
+        getattr(st, tipo)(texto)
+
+    # Dict de trabajo de este rerun; entre reruns el borrador queda compactado
+    state = st.session_state.item_states.estado(key_evaluacion, st.session_state.evaluacion)
+    predeterminados = st.session_state.setdefault(f"predeterminados_{id_item}", set())
+    anterior = sin_predeterminados(state, predeterminados)
+
+    # ESCENARIO
+    escenario = radio_respuesta("Escenario", ESCENARIOS, state["escenario"], f"escenario_{id_item}", "escenario", predeterminados)
+    state["escenario"] = escenario
+
+    # Secuencia IG y IE
+    ig1_val = ig2_val = ig3_val = None
+    mostrar_ig2 = mostrar_ig3 = mostrar_ie = False
+
+    if escenario.startswith("1"):
+        ig1_val = radio_respuesta(
+            INDICADORES_GENERALES[0],
             ["Sí", "No"],
-            key=f"ig2_{id_item}",
-            index=["Sí", "No"].index(state["ig2"]) if state["ig2"] in ["Sí", "No"] else 0,
+            state["ig1"],
+            f"ig1_{id_item}",
+            "ig1",
+            predeterminados,
         )
-        if ig2_val != state["ig2"]:
+        if ig1_val != state["ig1"]:
+            state["ig2"] = None
             state["ig3"] = None
             state["ie"] = {}
-        state["ig2"] = ig2_val
-
-        if ig2_val == "Sí":
-            mostrar_ig3 = True
-            ig3_opciones = ["Sí", "No", "No es posible determinarlo"]
-            ig3_val = st.radio(
-                INDICADORES_GENERALES[2],
-                ig3_opciones,
-                key=f"ig3_{id_item}",
-                index=ig3_opciones.index(state["ig3"]) if state["ig3"] in ig3_opciones else 0,
+        state["ig1"] = ig1_val
+
+        if ig1_val == "Sí":
+            mostrar_ig2 = True
+            ig2_val = radio_respuesta(
+                INDICADORES_GENERALES[1],
+                ["Sí", "No"],
+                state["ig2"],
+                f"ig2_{id_item}",
+                "ig2",
+                predeterminados,
             )
-            if ig3_val != state["ig3"]:
+            if ig2_val != state["ig2"]:
+                state["ig3"] = None
                 state["ie"] = {}
-            state["ig3"] = ig3_val
-
-# IE: asegúrate que todos los ítems tengan al menos una lista vacía
-lista_ie = indicadores_especificos.get(key_evaluacion)
-if lista_ie is None:
-    key_norm = f"{normalizar(materia_sel)} || {normalizar(item_sel)}"
-    for k in indicadores_especificos.keys():
-        if normalizar(k) == key_norm:
-            lista_ie = indicadores_especificos[k]
-            break
-if lista_ie is None:
-    lista_ie = []
-if not lista_ie:
-    st.info("Este ítem aún no tiene indicadores específicos definidos en el sistema.")
-mostrar_ie = mostrar_ig3 and state["ig3"] in ["Sí", "No", "No es posible determinarlo"] and len(lista_ie) > 0
-
-if mostrar_ie:
-    st.markdown("**Indicadores Específicos**")
-    for ie in lista_ie:
-        old_val = state["ie"].get(ie['codigo'])
-        val = st.radio(
-            ie["texto"],
-            ["Sí", "No", "No aplica"],
-            key=f"ie_{id_item}_{ie['codigo']}",
-            index=(["Sí", "No", "No aplica"].index(old_val) if old_val in ["Sí", "No", "No aplica"] else 0),
-        )
-        state["ie"][ie['codigo']] = val
-
-obs_val = st.text_area("Observaciones o comentarios (opcional)", value=state["obs"], key=f"obs_{id_item}")
-state["obs"] = obs_val
-
-# --------------- VALIDACIÓN Y GUARDADO ---------------------
-error = None
-puede_guardar = False
-
-if escenario.startswith("2") or escenario.startswith("3"):
-    puede_guardar = True
-elif escenario.startswith("4") or escenario.startswith("5"):
-    puede_guardar = True
-elif escenario.startswith("1"):
-    if not state["ig1"]:
-        error = "Debe responder IG1."
-    elif state["ig1"] == "No":
-        puede_guardar = True
-    elif state["ig1"] == "Sí" and not state["ig2"]:
-        error = "Debe responder IG2."
-    elif state["ig2"] == "No":
-        puede_guardar = True
-    elif state["ig2"] == "Sí" and not state["ig3"]:
-        error = "Debe responder IG3."
-    elif state["ig3"] in ["Sí", "No", "No es posible determinarlo"]:
-        if mostrar_ie and (len([v for v in state["ie"].values() if v]) < len(lista_ie)):
-            error = "Debe responder todos los indicadores específicos."
-        else:
-            puede_guardar = True
-else:
-    error = "Debe seleccionar un escenario."
+            state["ig2"] = ig2_val
+
+            if ig2_val == "Sí":
+                mostrar_ig3 = True
+                ig3_opciones = ["Sí", "No", "No es posible determinarlo"]
+                ig3_val = radio_respuesta(
+                    INDICADORES_GENERALES[2],
+                    ig3_opciones,
+                    state["ig3"],
+                    f"ig3_{id_item}",
+                    "ig3",
+                    predeterminados,
+                )
+                if ig3_val != state["ig3"]:
+                    state["ie"] = {}
+                state["ig3"] = ig3_val
+
+    # IE: asegúrate que todos los ítems tengan al menos una lista vacía
+    with etapa("lista_ie"):
+        lista_ie = catalogo.lista_ie(materia_sel, item_sel)
+    if not lista_ie:
+        st.info("Este ítem aún no tiene indicadores específicos definidos en el sistema.")
+    mostrar_ie = mostrar_ig3 and state["ig3"] in ["Sí", "No", "No es posible determinarlo"] and len(lista_ie) > 0
+
+    if mostrar_ie:
+        st.markdown("**Indicadores Específicos**")
+        for ie in lista_ie:
+            val = radio_respuesta(
+                ie["texto"],
+                ["Sí", "No", "No aplica"],
+                state["ie"].get(ie['codigo']),
+                f"ie_{id_item}_{ie['codigo']}",
+                ("ie", ie['codigo']),
+                predeterminados,
+            )
+            state["ie"][ie['codigo']] = val
 
-if st.button("Guardar ítem"):
-    if not puede_guardar:
-        st.error(f"No se puede guardar: {error}")
-    else:
-        st.session_state.evaluacion[key_evaluacion] = {
-            "escenario": state["escenario"],
-            "ig": [state["ig1"], state["ig2"], state["ig3"]][:3],
-            "ie": [{"codigo": k, "texto": next((ie['texto'] for ie in lista_ie if ie['codigo']==k), k), "respuesta": v} for k,v in state["ie"].items()] if mostrar_ie else [],
-            "obs": state["obs"]
-        }
-        st.success("Ítem guardado correctamente.")
-
-# -------------------- CÁLCULO Y EXPORTACIÓN ---------------------
-
-def calcular_cumplimiento(evaluacion, materias_items, indicadores_especificos):
-    cumplimiento_materia = defaultdict(list)
-    hallazgos = []
-    totales_materia = defaultdict(lambda: {"cumplidos": 0, "total": 0, "peso": 0.0, "excluidos": 0, "no_eval": 0})
-    materia_excluida = set()
-    items_eval_map = defaultdict(list)
-
-    for mi in materias_items:
-        materia = mi['Materia']
-        item = mi['Ítem']
-        peso = mi['Peso Materia (%)']
-        key = f"{materia} || {item}"
-        ev = evaluacion.get(key, {})
-        esc = ev.get('escenario', "")
-        ig = ev.get('ig', [])
-        ie = ev.get('ie', [])
-
-        excluido = False
-        cumplimiento_item = None
-        evaluado = True
-
-        if esc.startswith("2") or esc.startswith("3"):
-            excluido = True
-            evaluado = False
-        elif esc.startswith("4") or esc.startswith("5"):
-            cumplimiento_item = 0
-        elif esc.startswith("1"):
-            if ig and ig[0] == "No":
-                cumplimiento_item = 0
-            elif len(ig) >= 2 and ig[1] == "No":
-                cumplimiento_item = 0
-            elif len(ig) == 3 and ig[2] in ["Sí", "No", "No es posible determinarlo"]:
-                val_ig = []
-                val_map = {"Sí": 1, "No": 0, "No es posible determinarlo": 1}
-                val_map_ig3 = {"Sí": 1, "No": 0.25, "No es posible determinarlo": 1}
-                val_ig.append(val_map.get(ig[0], 0))
-                val_ig.append(val_map.get(ig[1], 0))
-                val_ig.append(val_map_ig3.get(ig[2], 0))
-                cumplimiento_ig = min(val_ig)
-                if ie:
-                    total_ies = len(ie)
-                    total_ies_validas = sum(1 for e in ie if e['respuesta'] == "Sí")
-                    cumplimiento_ie = total_ies_validas / total_ies if total_ies else 1
-                else:
-                    cumplimiento_ie = 1
-                cumplimiento_item = 0.75 * cumplimiento_ig + 0.25 * cumplimiento_ie
-            else:
-                cumplimiento_item = 0
-        else:
-            evaluado = False
-            excluido = True
+    obs_val = st.text_area("Observaciones o comentarios (opcional)", value=state["obs"], key=f"obs_{id_item}")
+    state["obs"] = obs_val
+    st.session_state.item_states.guardar(key_evaluacion, state)
+    anotar("registrar", st.session_state.evaluacion_id, id_item, anterior, sin_predeterminados(state, predeterminados))
+
+    # --------------- VALIDACIÓN Y GUARDADO ---------------------
+    with etapa("validacion"):
+        error = validar_item(state, lista_ie)
+    puede_guardar = error is None
 
-        if excluido:
-            totales_materia[materia]['excluidos'] += 1
-            items_eval_map[materia].append({"item": item, "cumplimiento": None, "evaluado": False, "obs": ev.get('obs', '')})
+    if st.button("Guardar ítem"):
+        if not puede_guardar:
+            st.error(f"No se puede guardar: {error}")
         else:
-            if cumplimiento_item is not None:
-                totales_materia[materia]['cumplidos'] += cumplimiento_item
-                totales_materia[materia]['total'] += 1
-                totales_materia[materia]['peso'] = float(peso) if isinstance(peso, (float, int, str)) and str(peso).replace('.','',1).isdigit() else 0
-                if cumplimiento_item < 1 or esc.startswith("4") or esc.startswith("5"):
-                    hallazgos.append({"item": item, "obs": ev.get('obs', '')})
-                cumplimiento_materia[materia].append({"item": item, "cumplimiento": round(100 * cumplimiento_item, 1)})
-                items_eval_map[materia].append({"item": item, "cumplimiento": round(100 * cumplimiento_item, 1), "evaluado": True, "obs": ev.get('obs', '')})
-            else:
-                items_eval_map[materia].append({"item": item, "cumplimiento": None, "evaluado": False, "obs": ev.get('obs', '')})
-
-    total_peso_usable = 0.0
-    materias_incluidas = []
-    pesos_ajustados = {}
-    for mat, data in totales_materia.items():
-        n_items = data['total']
-        n_excluidos = data['excluidos']
-        if n_items == 0 and n_excluidos > 0:
-            continue
-        if n_items > 0:
-            materias_incluidas.append(mat)
-            total_peso_usable += materia_peso_map.get(mat, 0)
-    for mat in materias_incluidas:
-        pesos_ajustados[mat] = materia_peso_map.get(mat, 0) / total_peso_usable if total_peso_usable > 0 else 0
-
-    total_cumplimiento = 0.0
-    for mat in materias_incluidas:
-        data = totales_materia[mat]
-        if data['total'] > 0:
-            porcentaje_mat = data['cumplidos'] / data['total']
-            total_cumplimiento += porcentaje_mat * pesos_ajustados[mat]
-    cumplimiento_global = round(100 * total_cumplimiento, 1) if total_peso_usable else 0.0
-    return cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos
-
-# --------- Helpers para formato Word ----------
-
-def set_black_font(cell):
-    for paragraph in cell.paragraphs:
-        for run in paragraph.runs:
-            run.font.color.rgb = RGBColor(0,0,0)
-            run.font.name = 'Aptos'
-
-def set_header_style(cell):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    shd = OxmlElement('w:shd')
-    shd.set(qn('w:fill'), '000000')
-    shd.set(qn('w:color'), 'auto')
-    shd.set(qn('w:val'), 'clear')
-    tcPr.append(shd)
-    for paragraph in cell.paragraphs:
-        for run in paragraph.runs:
-            run.font.color.rgb = RGBColor(255,255,255)
-            run.font.name = 'Aptos'
-            run.bold = True
-            run.font.size = Pt(13)
-        paragraph.alignment = 1
-
-def set_title_style(paragraph):
-    for run in paragraph.runs:
-        run.font.color.rgb = RGBColor(0,0,0)
-        run.font.name = 'Aptos'
-        run.bold = True
-        run.font.size = Pt(13)
-    paragraph.alignment = 1  # Centrado
-
-def set_cell_center(cell):
-    for paragraph in cell.paragraphs:
-        paragraph.alignment = 1
-
-def set_column_widths(table, widths):
-    for row in table.rows:
-        for idx, width in enumerate(widths):
-            row.cells[idx].width = width
-
-def set_table_fit_window(table):
-    tblPr = table._tbl.tblPr
-    tblW = OxmlElement('w:tblW')
-    tblW.set(qn('w:type'), 'pct')
-    tblW.set(qn('w:w'), "5000") # 100%
-    tblPr.append(tblW)
-
-# -------------------- EXPORTAR WORD ---------------------
-
-def exportar_word(organismo, fecha, evaluador, mes_eval, anio_eval, cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos):
-    doc = Document()
-    # --- ORIENTACIÓN HORIZONTAL Y MÁRGENES ---
-    section = doc.sections[-1]
-    section.orientation = WD_ORIENT.LANDSCAPE
-    section.top_margin = Inches(1)
-    section.bottom_margin = Inches(1)
-    section.left_margin = Inches(0.75)
-    section.right_margin = Inches(0.75)
-
-    # --- TÍTULO CENTRADO, PEQUEÑO Y NEGRO ---
-    titulo = doc.add_paragraph()
-    run = titulo.add_run('INFORME DE AUTOEVALUACIÓN DE CUMPLIMIENTO\nEN TRANSPARENCIA ACTIVA')
-    run.bold = True
-    run.font.size = Pt(18)
-    run.font.color.rgb = RGBColor(0,0,0)
-    run.font.name = 'Aptos'
-    titulo.alignment = 1 # Centrado
-
-    # --- ESPACIO ---
-    doc.add_paragraph()
-
-    # --- DATOS GENERALES ---
-    datos = doc.add_paragraph()
-    datos.paragraph_format.space_after = Pt(0)
-    def add_bold(label, value):
-        run1 = datos.add_run(label)
-        run1.bold = True
-        run1.font.name = "Aptos"
-        run2 = datos.add_run(str(value))
-        run2.bold = False
-        run2.font.name = "Aptos"
-    add_bold("Organismo: ", organismo)
-    datos.add_run("\n")
-    add_bold("Mes evaluado: ", f"{mes_eval} {anio_eval}")
-    datos.add_run("\n")
-    add_bold("Fecha: ", fecha.strftime('%d/%m/%Y'))
-    datos.add_run("\n")
-    add_bold("Evaluador(a): ", evaluador)
-    datos.add_run("\n")
-    add_bold("Cumplimiento Global Observado: ", f"{cumplimiento_global:.1f} %")
-
-    # --- ESPACIO ANTES DE TABLAS ---
-    doc.add_paragraph()
-
-    # --- TABLA POR MATERIA ---
-    hmat = doc.add_paragraph("CUMPLIMIENTO POR MATERIA")
-    set_title_style(hmat)
-    tmat = doc.add_table(rows=1, cols=2)
-    tmat.style = 'Table Grid'
-    tmat.allow_autofit = True
-    set_table_fit_window(tmat)
-    widths = [Inches(7), Inches(2.5)]
-    set_column_widths(tmat, widths)
-    tmat.cell(0,0).text = "Materia"
-    tmat.cell(0,1).text = "%"
-    set_header_style(tmat.cell(0,0))
-    set_header_style(tmat.cell(0,1))
-    for mat, items in items_eval_map.items():
-        if not any(i.get("evaluado") for i in items):
-            row = tmat.add_row().cells
-            row[0].text = mat
-            row[1].text = "No se evalúa"
+            registro = registro_desde_estado(state, lista_ie)
+            st.session_state.evaluacion[key_evaluacion] = registro
+            st.session_state.marcador.actualizar(key_evaluacion, registro)
+            avisos = [("success", "Ítem guardado correctamente.")]
+            try:
+                almacen.guardar_item(st.session_state.evaluacion_id, id_item, registro)
+            except sqlite3.Error as e:
+                avisos.append(("warning", f"El ítem quedó guardado en esta sesión, pero no se pudo respaldar: {e}"))
+            # Al guardar, las respuestas por defecto pasan a ser respuestas del evaluador
+            anotar("registrar", st.session_state.evaluacion_id, id_item, sin_predeterminados(state, predeterminados), state)
+            predeterminados.clear()
+            anotar("registrar_guardado", st.session_state.evaluacion_id, id_item)
+            # Rerun completo para refrescar el panel de avance de la barra lateral
+            st.session_state.avisos_item = avisos
+            st.rerun()
+
+    if st.toggle("Ver historial de cambios del ítem", key=f"historial_{id_item}"):
+        with etapa("historial"):
+            cambios = bitacora.historial(st.session_state.evaluacion_id, id_item, limite=50)
+        st.dataframe([{"Instante": c["instante"], "Campo": c["campo"], "Anterior": c["anterior"], "Nuevo": c["nuevo"],
+                       "Origen": c["origen"]} for c in reversed(cambios)], hide_index=True)
+    terminar_perfil(perfil_fragmento)
+
+# ---------- GRILLA POR MATERIA ----------
+# Todos los ítems de la materia en un formulario (ver grilla.py): editar celdas
+# no provoca reruns y la materia se valida y se guarda en un solo envío.
+def guardar_grilla(materia, key_items, key_ie):
+    # Callback del envío: corre antes del rerun, con las ediciones de ambas grillas
+    borradores = st.session_state.item_states
+    filas_items, filas_ie = filas_grilla(catalogo, materia, borradores, st.session_state.evaluacion)
+    registros, errores, estados = procesar_grilla(
+        catalogo, aplicar_ediciones(filas_items, st.session_state.get(key_items)),
+        aplicar_ediciones(filas_ie, st.session_state.get(key_ie)), st.session_state.evaluacion)
+    anotar("registrar_lote", st.session_state.evaluacion_id,
+           [(catalogo.items_por_clave[clave].id, state) for clave, state in estados.items()], "grilla",
+           guardados={catalogo.items_por_clave[clave].id for clave in estados if clave not in errores})
+    # Los radios del formulario por ítem deben partir de lo que quedó en la grilla
+    ids = {str(catalogo.items_por_clave[clave].id) for clave in estados}
+    for k in [k for k in st.session_state if isinstance(k, str) and k.startswith(WIDGETS_ITEM) and k.split("_")[1] in ids]:
+        del st.session_state[k]
+    for clave, state in estados.items():
+        if clave in errores:
+            borradores.guardar(clave, state)
         else:
-            avg = round(sum(i.get("cumplimiento", 0) for i in items if i.get("evaluado")) / max(len([i for i in items if i.get("evaluado")]),1), 1)
-            row = tmat.add_row().cells
-            row[0].text = mat
-            row[1].text = f"{avg:.1f}"
-        set_black_font(row[0])
-        set_black_font(row[1])
-        set_cell_center(row[1])
-    doc.add_paragraph()
-
-    # --- TABLA POR ÍTEM ---
-    hit = doc.add_paragraph("CUMPLIMIENTO POR ÍTEM")
-    set_title_style(hit)
-    titem = doc.add_table(rows=1, cols=2)
-    titem.style = 'Table Grid'
-    titem.allow_autofit = True
-    set_table_fit_window(titem)
-    widths = [Inches(7), Inches(2.5)]
-    set_column_widths(titem, widths)
-    titem.cell(0,0).text = "Ítem"
-    titem.cell(0,1).text = "%"
-    set_header_style(titem.cell(0,0))
-    set_header_style(titem.cell(0,1))
-    for mat, items in items_eval_map.items():
-        for item_data in items:
-            row = titem.add_row().cells
-            row[0].text = item_data['item']
-            if item_data['evaluado']:
-                row[1].text = f"{item_data['cumplimiento']:.1f}"
-            else:
-                row[1].text = "No se evalúa"
-            set_black_font(row[0])
-            set_black_font(row[1])
-            set_cell_center(row[1])
-    doc.add_paragraph()
-
-    # --- HALLAZGOS DE INCUMPLIMIENTO ---
-    hhall = doc.add_paragraph("HALLAZGOS DE INCUMPLIMIENTO POR ÍTEM")
-    set_title_style(hhall)
-    th = doc.add_table(rows=1, cols=2)
-    th.style = 'Table Grid'
-    th.allow_autofit = True
-    set_table_fit_window(th)
-    th.cell(0,0).text = "Ítem"
-    th.cell(0,1).text = "Observaciones"
-    set_header_style(th.cell(0,0))
-    set_header_style(th.cell(0,1))
-    for mat, items in items_eval_map.items():
-        for item_data in items:
-            if item_data['evaluado'] and item_data.get("cumplimiento", 100) < 100:
-                row = th.add_row().cells
-                row[0].text = item_data['item']
-                row[1].text = item_data['obs']
-            elif not item_data['evaluado']:
-                row = th.add_row().cells
-                row[0].text = item_data['item']
-                row[1].text = "No se evalúa"
-            set_black_font(row[0])
-            set_black_font(row[1])
-    doc.add_paragraph()
-
-    # --- DETALLE DE INDICADORES GENERALES Y ESPECÍFICOS EN INCUMPLIMIENTO ---
-    hdet = doc.add_paragraph('DETALLE DE INDICADORES GENERALES Y ESPECÍFICOS EN INCUMPLIMIENTO')
-    set_title_style(hdet)
-    tind = doc.add_table(rows=1, cols=3)
-    tind.style = 'Table Grid'
-    tind.allow_autofit = True
-    set_table_fit_window(tind)
-    # 45% del ancho para el código (ajusta si lo deseas)
-    widths = [Inches(4), Inches(5), Inches(7)]
-    set_column_widths(tind, widths)
-    tind.cell(0,0).text = "Materia/Ítem"
-    tind.cell(0,1).text = "Código"
-    tind.cell(0,2).text = "Texto indicador"
-    for c in range(3):
-        set_header_style(tind.cell(0,c))
-    for key, datos in st.session_state.evaluacion.items():
-        materia, item = key.split(' || ')
-        # IG
-        if "ig" in datos and datos["ig"]:
-            for idx, val in enumerate(datos["ig"]):
-                if val == "No":
-                    row = tind.add_row().cells
-                    row[0].text = f"{materia} / {item}"
-                    row[1].text = f"IG{idx+1}"
-                    row[2].text = INDICADORES_GENERALES[idx]
-                    for c in range(3):
-                        set_black_font(row[c])
-        # IE
-        if "ie" in datos and datos["ie"]:
-            for ie in datos["ie"]:
-                if ie["respuesta"] == "No":
-                    row = tind.add_row().cells
-                    row[0].text = f"{materia} / {item}"
-                    row[1].text = ie["codigo"]
-                    row[2].text = ie["texto"]
-                    for c in range(3):
-                        set_black_font(row[c])
-    doc.add_paragraph()
-
-    # PIE DE PÁGINA
-    section = doc.sections[-1]
-    footer = section.footer
-    paragraph = footer.paragraphs[0]
-    paragraph.text = "La App utilizada para esta Autoevaluación de Cumplimiento es un desarrollo de TRIVIA Capacitaciones"
-    for run in paragraph.runs:
-        run.font.name = 'Aptos'
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(0,0,0)
-    paragraph.alignment = 1 # Centrado
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+            borradores.descartar(clave)
+    avisos = []
+    if registros:
+        for clave, registro in registros.items():
+            st.session_state.evaluacion[clave] = registro
+            st.session_state.marcador.actualizar(clave, registro)
+        avisos.append(("success", f"Ítems guardados correctamente: {len(registros)}."))
+        try:
+            almacen.guardar_items(st.session_state.evaluacion_id,
+                                  [(catalogo.items_por_clave[clave].id, registro) for clave, registro in registros.items()])
+        except sqlite3.Error as e:
+            avisos.append(("warning", f"Los ítems quedaron guardados en esta sesión, pero no se pudieron respaldar: {e}"))
+    elif not errores:
+        avisos.append(("info", "No hay cambios para guardar."))
+    for clave, mensajes in errores.items():
+        avisos.append(("error", f"No se puede guardar {catalogo.items_por_clave[clave].item}: {' '.join(mensajes)}"))
+    st.session_state.avisos_grilla = avisos
+    # Grillas nuevas con lo guardado y los borradores
+    st.session_state.version_grilla = st.session_state.get("version_grilla", 0) + 1
+
+def grilla_materia(materia_sel):
+    st.subheader("Evaluación de la materia en grilla")
+    for tipo, texto in st.session_state.pop("avisos_grilla", []):
+        getattr(st, tipo)(texto)
+    filas_items, filas_ie = filas_grilla(catalogo, materia_sel, st.session_state.item_states, st.session_state.evaluacion)
+    sufijo = f"{materias.index(materia_sel)}_{st.session_state.get('version_grilla', 0)}"
+    key_items, key_ie = f"grilla_items_{sufijo}", f"grilla_ie_{sufijo}"
+    with st.form(f"grilla_{materias.index(materia_sel)}"):
+        st.caption("IG1, IG2 e IG3 se responden sólo con escenario 1, cada uno si el anterior es 'Sí'; "
+                   "los indicadores específicos, con IG1, IG2 e IG3 respondidos. Los ítems sin respuestas no se guardan.")
+        st.data_editor(
+            filas_items, key=key_items, hide_index=True, column_order=COLUMNAS_ITEMS[1:], disabled=["ID", "Ítem"],
+            column_config={
+                "Escenario": st.column_config.SelectboxColumn("Escenario", options=ESCENARIOS, width="large"),
+                "IG1": st.column_config.SelectboxColumn("IG1", options=IG12_OPCIONES, help=INDICADORES_GENERALES[0]),
+                "IG2": st.column_config.SelectboxColumn("IG2", options=IG12_OPCIONES, help=INDICADORES_GENERALES[1]),
+                "IG3": st.column_config.SelectboxColumn("IG3", options=IG_OPCIONES, help=INDICADORES_GENERALES[2]),
+                "Observaciones": st.column_config.TextColumn("Observaciones"),
+            },
+        )
+        st.markdown("**Indicadores Específicos**")
+        st.data_editor(
+            filas_ie, key=key_ie, hide_index=True, column_order=COLUMNAS_IE[1:],
+            disabled=["ID", "Ítem", "Código", "Indicador específico"],
+            column_config={"Respuesta": st.column_config.SelectboxColumn("Respuesta", options=IE_OPCIONES)},
+        )
+        st.form_submit_button("Guardar materia", on_click=guardar_grilla, args=(materia_sel, key_items, key_ie))
+
+with etapa("formulario"):
+    if modo_ingreso == MODOS_INGRESO[0]:
+        formulario_item(materia_sel, item_sel, id_item, key_evaluacion)
+    else:
+        grilla_materia(materia_sel)
+
+# ---------- PRIORIDADES DE MEJORA ----------
+# Correcciones que más suben el cumplimiento global (prioridades.py); se
+# calculan sólo a pedido, así el rerun habitual no carga NumPy.
+st.header("Prioridades de mejora")
+if st.toggle("Mostrar las correcciones que más suben el cumplimiento global"):
+    with etapa("prioridades"):
+        lista_prioridades = priorizar(st.session_state.evaluacion, catalogo, limite=20)
+    if not lista_prioridades:
+        st.info("No hay indicadores en incumplimiento en los ítems guardados.")
+    else:
+        st.dataframe([
+            {"Materia": p["materia"], "Ítem": p["item"], "Corrección": describir(p),
+             "Aumento (pts)": round(p["ganancia"], 2), "Cumplimiento global (%)": p["cumplimiento_nuevo"]}
+            for p in lista_prioridades
+        ], hide_index=True)
+
+# ---------- COMPARACIÓN CON OTROS ORGANISMOS ----------
+# Percentil, mediana y posición frente a las evaluaciones guardadas de los demás
+# organismos en el mismo período (comparacion.py); también sólo a pedido.
+st.header("Comparación con otros organismos")
+comparacion_informe, clave_cohorte = None, None
+if st.toggle(f"Comparar con las evaluaciones de otros organismos de {mes_eval} {anio_eval}"):
+    with etapa("comparacion"):
+        cohorte = cohorte_periodo(catalogo.version, periodo(anio_eval, mes_eval))
+        lista_comparacion = comparar_evaluacion(cohorte, catalogo, st.session_state.evaluacion, excluir=organismo)
+    pares = cohorte.pares_de(organismo)
+    if pares < COHORTE_MINIMA:
+        st.info(f"Se necesitan al menos {COHORTE_MINIMA} evaluaciones guardadas de otros organismos en "
+                f"{mes_eval} {anio_eval} para comparar (hay {pares}).")
+    elif not lista_comparacion:
+        st.info(f"Ninguna dimensión evaluada tiene puntaje de al menos {COHORTE_MINIMA} otros organismos.")
+    else:
+        st.caption(f"Frente a {pares} organismos; se muestran las dimensiones con puntaje de al menos "
+                   f"{COHORTE_MINIMA} de ellos. Percentil: porcentaje de organismos con menor puntaje "
+                   "(los empates cuentan la mitad); posición 1 = mayor puntaje.")
+        tabla_comparacion = [
+            {"Dimensión": f["dimension"], "Puntaje (%)": f["puntaje"], "Percentil": round(f["percentil"]),
+             "Mediana del período (%)": round(f["mediana"], 1), "Posición": f"{f['posicion']} de {f['pares'] + 1}"}
+            for f in lista_comparacion
+        ]
+        st.dataframe([t for t, f in zip(tabla_comparacion, lista_comparacion) if f["tipo"] != "item"],
+                     hide_index=True)
+        with st.expander("Por ítem"):
+            st.dataframe([t for t, f in zip(tabla_comparacion, lista_comparacion) if f["tipo"] == "item"],
+                         hide_index=True)
+        comparacion_informe, clave_cohorte = lista_comparacion, cohorte.clave
 
 # --------------- EXPORTAR INFORME ---------------------
+ESPERA_INFORME = 0.5  # segundos que el rerun espera antes de pasar a sondeo
 
 st.header("Exportar informe")
+# El informe se genera en la cola de segundo plano (cola_informes.py); el
+# trabajo queda en la sesión y un fragmento consulta su estado hasta que termina.
+clave = clave_informe(catalogo.version, organismo, fecha, evaluador, mes_eval, anio_eval,
+                      st.session_state.evaluacion, BACKEND_POR_DEFECTO, comparacion=clave_cohorte)
 if st.button("Generar y descargar informe Word"):
-    cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos = calcular_cumplimiento(
-        st.session_state.evaluacion, materias_items, indicadores_especificos)
-    buffer = exportar_word(
-        organismo,
-        fecha,
-        evaluador,
-        mes_eval,
-        anio_eval,
-        cumplimiento_global,
-        cumplimiento_materia,
-        items_eval_map,
-        hallazgos
-    )
-    st.download_button(
-        label="Descargar informe Word",
-        data=buffer,
-        file_name=f"Informe_Autoevaluacion_TA_{organismo}_{fecha.strftime('%Y%m%d')}.docx",
-        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    )
+    # Copia de los datos: el hilo de la cola no puede leer st.session_state
+    evaluacion_informe = copy.deepcopy(st.session_state.evaluacion)
+    datos_informe = (organismo, fecha, evaluador, mes_eval, anio_eval)
+
+    def generar_informe(avance):
+        # Corre en el hilo de la cola: estas etapas van al perfil "informe" (ver cola_informes.py)
+        avance(0.2, "Calculando cumplimiento")
+        with etapa("calculo"):
+            cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos = calcular_cumplimiento(
+                evaluacion_informe, materias_items, indicadores_especificos, materia_peso_map)
+        with etapa("prioridades"):
+            prioridades_informe = priorizar(evaluacion_informe, catalogo, LIMITE_INFORME)
+        avance(0.4, "Construyendo documento Word")
+        return exportar_informe(
+            *datos_informe,
+            cumplimiento_global,
+            cumplimiento_materia,
+            items_eval_map,
+            hallazgos,
+            evaluacion_informe,
+            prioridades=prioridades_informe,
+            comparacion=comparacion_informe,
+        )
+    with etapa("informe"):
+        try:
+            trabajo = load_cola_informes().enviar(clave, generar_informe)
+            st.session_state.trabajo_informe = trabajo.id
+            # Un informe corto se entrega en este mismo rerun, sin sondeo
+            trabajo.esperar(ESPERA_INFORME)
+        except ColaLlena as e:
+            st.warning(str(e))
+
+@st.fragment(run_every=1.0)
+def seguimiento_informe(trabajo):
+    if trabajo.terminado:
+        st.rerun()
+    st.progress(trabajo.progreso, text=trabajo.mensaje)
+
+# Sólo se muestra el trabajo si corresponde a los datos actuales de la evaluación
+trabajo = load_cola_informes().obtener(st.session_state.get("trabajo_informe"))
+if trabajo is not None and trabajo.id == clave:
+    if trabajo.estado == LISTO:
+        st.download_button(
+            label="Descargar informe Word",
+            data=trabajo.datos,
+            file_name=f"Informe_Autoevaluacion_TA_{organismo}_{fecha.strftime('%Y%m%d')}.docx",
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+    elif trabajo.estado == ERROR:
+        st.error(f"No se pudo generar el informe: {trabajo.error}")
+    else:
+        seguimiento_informe(trabajo)
+
+# Resultados en formatos de datos, puntuados una sola vez para todos los formatos
+# y sólo si alguno no está en la caché compartida
+MIME_DATOS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+if st.button("Generar datos en CSV, JSON y Excel"):
+    puntuados = {}
+
+    def exportar_datos(formato):
+        if "resultado" not in puntuados:
+            puntuados["resultado"] = ResultadoExportacion(catalogo, st.session_state.evaluacion, organismo, int(anio_eval),
+                                                          mes_eval, fecha, evaluador)
+        return exportar_bytes(puntuados["resultado"], formato)
+    columnas_datos = st.columns(len(MIME_DATOS))
+    for columna, (formato, mime) in zip(columnas_datos, MIME_DATOS.items()):
+        clave_datos = clave_informe(catalogo.version, organismo, fecha, evaluador, mes_eval, anio_eval,
+                                    st.session_state.evaluacion, formato)
+        with columna:
+            st.download_button(
+                label=f"Descargar {formato.upper()}",
+                data=load_cache_compartida().obtener_o_generar("datos", clave_datos,
+                                                               lambda formato=formato: exportar_datos(formato)),
+                file_name=f"Resultados_Autoevaluacion_TA_{organismo}_{fecha.strftime('%Y%m%d')}.{formato}",
+                mime=mime,
+            )
+
+# ---------- PERFIL DEL RERUN ----------
+if perfil is not None:
+    tiempos = terminar_perfil(perfil)
+    agregados = AGREGADOS.percentiles()
+    with st.sidebar.expander("Perfil del rerun", expanded=True):
+        st.caption(f"Agregados del proceso, últimas {AGREGADOS.muestras} muestras por etapa.")
+        st.dataframe([
+            {"Etapa": nombre, "Este rerun (ms)": round(tiempos[nombre] * 1000, 2) if nombre in tiempos else None,
+             "p50 (ms)": round(datos["p50_ms"], 2), "p95 (ms)": round(datos["p95_ms"], 2), "n": datos["n"]}
+            for nombre, datos in sorted(agregados.items())
+        ])
+        st.caption("Caché compartida entre procesos, por espacio.")
+        st.dataframe([
+            {"Espacio": espacio, "Entradas": datos["entradas"], "MB": round(datos["bytes"] / 2 ** 20, 2),
+             "Hits": datos["hits"], "Misses": datos["misses"], "Tasa": f"{datos['tasa_acierto']:.0%}",
+             "Expulsiones": datos["expulsiones"], "Esperas": datos["esperas"]}
+            for espacio, datos in sorted(load_cache_compartida().estadisticas().items())
+        ])
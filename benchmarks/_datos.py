@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Datos sintéticos compartidos por los benchmarks y las pruebas (tests/).
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+ESCENARIOS = [
+    "1. Organismo presenta sección con antecedentes.",
+    "2. Organismo indica no tener antecedentes / no aplica.",
+    "3. No hay sección, pero no hay evidencia de infracción.",
+    "4. No hay sección y sí hay evidencia de información faltante.",
+    "5. Sección/vínculo existe pero no funciona / no muestra datos.",
+]
+
+
+def entorno_temporal(directorio=None):
+    # Variables de entorno que llevan a un directorio temporal todo lo que la app
+    # escribe por defecto en datos/: almacén, caché compartida, snapshots del
+    # catálogo, logos y ZIP por lote. Para cada harness que importa o levanta app.py
+    directorio = Path(directorio or tempfile.mkdtemp())
+    return {
+        "EVALUACIONES_DB": str(directorio / "evaluaciones.sqlite3"),
+        "CACHE_COMPARTIDA_DB": str(directorio / "cache_compartida.sqlite3"),
+        "CATALOGOS_DIR": str(directorio / "catalogos"),
+        "ACTIVOS_CACHE_DIR": str(directorio / "activos"),
+        "LOTE_ZIP_DIR": str(directorio / "lotes"),
+    }
+
+
+def cargar_catalogo():
+    with open(BASE / "estructura_materias_items.json", encoding="utf-8") as f:
+        materias_items = json.load(f)
+    with open(BASE / "estructura_indicadores_especificos_REC_FINAL.json", encoding="utf-8") as f:
+        indicadores_especificos = json.load(f)
+    return materias_items, indicadores_especificos
+
+
+def evaluacion_item(rng, lista_ie, obs=""):
+    # Reproduce las combinaciones que puede guardar el formulario de app.py
+    escenario = rng.choice(ESCENARIOS) if rng.random() < 0.3 else ESCENARIOS[0]
+    ig = [None, None, None]
+    ie = []
+    if escenario.startswith("1"):
+        ig[0] = rng.choice(["Sí", "Sí", "Sí", "No"])
+        if ig[0] == "Sí":
+            ig[1] = rng.choice(["Sí", "Sí", "Sí", "No"])
+            if ig[1] == "Sí":
+                ig[2] = rng.choice(["Sí", "No", "No es posible determinarlo"])
+                ie = [{"codigo": x["codigo"], "texto": x["texto"], "respuesta": rng.choice(["Sí", "Sí", "No", "No aplica"])}
+                      for x in lista_ie]
+    return {"escenario": escenario, "ig": ig, "ie": ie, "obs": obs}
+
+
+def evaluacion_aleatoria(rng, materias_items, indicadores_especificos, fraccion=1.0):
+    evaluacion = {}
+    for mi in materias_items:
+        if rng.random() >= fraccion:
+            continue
+        key = f"{mi['Materia']} || {mi['Ítem']}"
+        evaluacion[key] = evaluacion_item(rng, indicadores_especificos.get(key, []))
+    return evaluacion
+
+
+def evaluaciones_aleatorias(n, materias_items, indicadores_especificos, semilla=0):
+    rng = random.Random(semilla)
+    return [evaluacion_aleatoria(rng, materias_items, indicadores_especificos, rng.choice([0.3, 0.7, 1.0]))
+            for _ in range(n)]
+
+
+def evaluacion_peor_caso(materias_items, indicadores_especificos):
+    # Todos los ítems en escenario 1, IG3 = "No" y todos los IE en "No"
+    evaluacion = {}
+    for mi in materias_items:
+        key = f"{mi['Materia']} || {mi['Ítem']}"
+        evaluacion[key] = {
+            "escenario": ESCENARIOS[0],
+            "ig": ["Sí", "Sí", "No"],
+            "ie": [{"codigo": x["codigo"], "texto": x["texto"], "respuesta": "No"} for x in indicadores_especificos.get(key, [])],
+            "obs": "Observación de prueba " * 5,
+        }
+    return evaluacion
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Escrituras concurrentes y tiempos del almacén SQLite de evaluaciones.
+#   python benchmarks/bench_almacen.py [procesos] [hilos_por_proceso]
+import multiprocessing
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from _datos import cargar_catalogo, evaluacion_aleatoria
+
+from almacen import AlmacenEvaluaciones
+from catalogo import Catalogo
+
+N_ORGANISMOS = 20
+
+
+def escritor(ruta, semilla, n_hilos, resultados):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    ids = {f"{mi['Materia']} || {mi['Ítem']}": mi['ID'] for mi in materias_items}
+    almacen = AlmacenEvaluaciones(ruta)
+    tiempos = []
+
+    def trabajo(h):
+        rng = random.Random(semilla * 1000 + h)
+        for o in range(N_ORGANISMOS):
+            evaluacion_id = almacen.abrir_evaluacion(f"Organismo {o}", 2024, "Mayo", f"Evaluador {semilla}-{h}")
+            evaluacion = evaluacion_aleatoria(rng, materias_items, indicadores_especificos, 0.5)
+            for key, registro in evaluacion.items():
+                t0 = time.perf_counter()
+                almacen.guardar_item(evaluacion_id, ids[key], registro)
+                tiempos.append(time.perf_counter() - t0)
+
+    hilos = [threading.Thread(target=trabajo, args=(h,)) for h in range(n_hilos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    resultados.put(tiempos)
+
+
+def main(procesos=8, hilos=4):
+    ruta = Path(tempfile.mkdtemp()) / "evaluaciones.sqlite3"
+    AlmacenEvaluaciones(ruta)
+    cola = multiprocessing.Queue()
+    t0 = time.perf_counter()
+    trabajadores = [multiprocessing.Process(target=escritor, args=(ruta, p, hilos, cola)) for p in range(procesos)]
+    for t in trabajadores:
+        t.start()
+    tiempos = [x for _ in trabajadores for x in cola.get()]
+    for t in trabajadores:
+        t.join()
+        assert t.exitcode == 0, t.exitcode
+    total = time.perf_counter() - t0
+
+    almacen = AlmacenEvaluaciones(ruta)
+    evaluaciones = almacen.buscar()
+    assert len(evaluaciones) == N_ORGANISMOS, len(evaluaciones)
+    catalogo = Catalogo.desde_archivos()
+    t1 = time.perf_counter()
+    for e in evaluaciones:
+        almacen.cargar_evaluacion(e["id"], catalogo)
+    carga = (time.perf_counter() - t1) / len(evaluaciones)
+
+    tiempos.sort()
+    print(f"escritores: {procesos} procesos x {hilos} hilos, {len(tiempos)} upserts en {total:.2f} s ({len(tiempos) / total:,.0f}/s)")
+    print(f"upsert p50: {1000 * tiempos[len(tiempos) // 2]:.2f} ms, p99: {1000 * tiempos[int(len(tiempos) * 0.99)]:.2f} ms")
+    print(f"reanudar evaluación: {1000 * carga:.2f} ms, ítems por evaluación: {max(e['n_items'] for e in evaluaciones)}")
+    print("integridad: OK")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# Throughput del servicio HTTP local (api.py) contra clientes locales.
+#
+# Levanta `python api.py` en un puerto libre y mide, con N clientes en hilos:
+#   - POST /puntuar de a una evaluación, con y sin agrupación de pedidos
+#   - POST /puntuar con listas de evaluaciones
+#   - POST /informe con informes distintos y luego repetidos (caché)
+# Antes verifica que los puntajes de la API coinciden con calcular_cumplimiento.
+#
+#   python benchmarks/bench_api.py [--clientes 8] [--pedidos 400] [--trabajadores 8]
+#   python benchmarks/bench_api.py --url http://127.0.0.1:8600   (servidor ya levantado)
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from _datos import BASE, entorno_temporal, evaluacion_aleatoria
+
+from api import evaluacion_desde_json
+from calculo import calcular_cumplimiento
+from catalogo import Catalogo
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def levantar_servidor(puerto, trabajadores, max_lote, entorno):
+    comando = [sys.executable, str(BASE / "api.py"), "--puerto", str(puerto),
+               "--trabajadores", str(trabajadores), "--max-lote", str(max_lote)]
+    proceso = subprocess.Popen(comando, cwd=BASE, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.time() + 60
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            sys.exit(f"el servidor terminó al iniciar (código {proceso.returncode})")
+        try:
+            pedir(url, "/salud")
+            return proceso, url
+        except OSError:
+            time.sleep(0.2)
+    proceso.kill()
+    sys.exit("el servidor no respondió en 60 s")
+
+
+def pedir(url, ruta, cuerpo=None):
+    datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8") if cuerpo is not None else None
+    pedido = urllib.request.Request(url + ruta, data=datos, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(pedido, timeout=120) as r:
+            return r.status, r.headers.get("Content-Type", ""), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("Content-Type", ""), e.read()
+
+
+def en_paralelo(clientes, cuerpos, url, ruta):
+    # Reparte los cuerpos entre `clientes` hilos; devuelve (segundos, latencias, códigos)
+    latencias, codigos = [], []
+    lock = threading.Lock()
+    indice = iter(range(len(cuerpos)))
+
+    def cliente():
+        while True:
+            with lock:
+                i = next(indice, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            estado, _, _ = pedir(url, ruta, cuerpos[i])
+            dt = time.perf_counter() - t0
+            with lock:
+                latencias.append(dt)
+                codigos.append(estado)
+
+    t0 = time.perf_counter()
+    hilos = [threading.Thread(target=cliente) for _ in range(clientes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return time.perf_counter() - t0, sorted(latencias), codigos
+
+
+def reportar(nombre, segundos, latencias, codigos, unidades=None, unidad="pedidos"):
+    errores = sum(1 for c in codigos if c >= 300)
+    n = unidades if unidades is not None else len(latencias)
+    print(f"{nombre:<38} {n / segundos:>9,.0f} {unidad}/s  "
+          f"p50 {percentil(latencias, 0.5) * 1000:6.1f} ms  p95 {percentil(latencias, 0.95) * 1000:6.1f} ms  "
+          f"p99 {percentil(latencias, 0.99) * 1000:6.1f} ms" + (f"  ({errores} errores)" if errores else ""))
+    return {"pedidos_s": len(latencias) / segundos, "unidades_s": n / segundos, "errores": errores,
+            "p50_ms": percentil(latencias, 0.5) * 1000, "p95_ms": percentil(latencias, 0.95) * 1000,
+            "p99_ms": percentil(latencias, 0.99) * 1000}
+
+
+def verificar(url, catalogo, evaluaciones):
+    estado, _, datos = pedir(url, "/puntuar", {"evaluaciones": evaluaciones})
+    assert estado == 200, datos[:500]
+    resultados = json.loads(datos)["resultados"]
+    for evaluacion, resultado in zip(evaluaciones, resultados):
+        canonica = evaluacion_desde_json(catalogo, evaluacion)
+        cumplimiento_global, _, items_eval_map, hallazgos = calcular_cumplimiento(
+            canonica, catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+        assert resultado["cumplimiento_global"] == cumplimiento_global
+        esperados = [x["cumplimiento"] for lista in items_eval_map.values() for x in lista]
+        assert [x["cumplimiento"] for x in resultado["items"]] == esperados
+        assert sum(x["hallazgo"] for x in resultado["items"]) == len(hallazgos)
+    # Entradas con errores se rechazan con los mismos mensajes que el importador
+    clave = next(iter(evaluaciones[0]))
+    estado, _, datos = pedir(url, "/puntuar", {"evaluacion": {clave: {"escenario": "2", "ig": ["Sí"]}}})
+    assert estado == 400 and "escenario 1" in json.loads(datos)["errores"][0], datos
+    print(f"equivalencia: OK ({len(evaluaciones)} evaluaciones iguales a calcular_cumplimiento)")
+
+
+def medir(url, args, catalogo, rng, etiqueta):
+    materias, indicadores = catalogo.materias_items, catalogo.indicadores_especificos
+    resultados = {}
+    cuerpos = [{"evaluacion": evaluacion_aleatoria(rng, materias, indicadores, rng.choice([0.3, 0.7, 1.0]))}
+               for _ in range(args.pedidos)]
+    pedir(url, "/puntuar", cuerpos[0])
+    antes = json.loads(pedir(url, "/salud")[2])["puntaje"]
+    resultados["individual"] = reportar(f"/puntuar de a 1 ({etiqueta})",
+                                        *en_paralelo(args.clientes, cuerpos, url, "/puntuar"))
+    despues = json.loads(pedir(url, "/salud")[2])["puntaje"]
+    lotes = despues["lotes"] - antes["lotes"]
+    promedio = (despues["evaluaciones"] - antes["evaluaciones"]) / lotes if lotes else 0.0
+    resultados["individual"]["promedio_lote"] = promedio
+    print(f"{'':<38} {lotes} llamadas al motor, {promedio:.1f} evaluaciones por llamada")
+
+    por_pedido = args.por_pedido
+    listas = [{"evaluaciones": [c["evaluacion"] for c in cuerpos[i:i + por_pedido]]}
+              for i in range(0, len(cuerpos), por_pedido)]
+    resultados["lista"] = reportar(f"/puntuar listas de {por_pedido} ({etiqueta})",
+                                   *en_paralelo(args.clientes, listas, url, "/puntuar"),
+                                   unidades=len(cuerpos), unidad="evals")
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput del servicio HTTP local de puntaje e informes.")
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--pedidos", type=int, default=400, help="evaluaciones a puntuar por escenario")
+    parser.add_argument("--por-pedido", type=int, default=50, help="evaluaciones por pedido en modo lista")
+    parser.add_argument("--informes", type=int, default=12)
+    parser.add_argument("--trabajadores", type=int, default=8)
+    parser.add_argument("--semilla", type=int, default=18)
+    parser.add_argument("--url", help="servidor ya levantado (no se compara sin agrupación)")
+    parser.add_argument("--salida", help="guarda los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    catalogo = Catalogo.desde_archivos(BASE)
+    materias, indicadores = catalogo.materias_items, catalogo.indicadores_especificos
+    rng = random.Random(args.semilla)
+    resultados = {}
+    procesos = []
+    temporal = tempfile.TemporaryDirectory()
+    entorno = dict(os.environ, INFORME_CACHE_DIR=temporal.name, **entorno_temporal(temporal.name))
+    try:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            proceso, url = levantar_servidor(puerto_libre(), args.trabajadores, 256, entorno)
+            procesos.append(proceso)
+        verificar(url, catalogo, [evaluacion_aleatoria(rng, materias, indicadores, f) for f in (0.3, 0.7, 1.0) * 10])
+        resultados["agrupado"] = medir(url, args, catalogo, rng, "agrupado")
+
+        if not args.url:
+            proceso, url_sin = levantar_servidor(puerto_libre(), args.trabajadores, 1, entorno)
+            procesos.append(proceso)
+            resultados["sin_agrupar"] = medir(url_sin, args, catalogo, rng, "sin agrupar")
+
+        base_informe = {"organismo": "Organismo de prueba", "fecha": "2024-05-31", "evaluador": "Evaluador(a)",
+                        "mes": "Mayo", "anio": 2024}
+        cuerpos = [dict(base_informe, evaluacion=evaluacion_aleatoria(rng, materias, indicadores, 1.0))
+                   for _ in range(args.informes)]
+        segundos, latencias, codigos = en_paralelo(args.clientes, cuerpos, url, "/informe")
+        resultados["informes"] = reportar("/informe distintos", segundos, latencias, codigos, unidad="informes")
+        segundos, latencias, codigos = en_paralelo(args.clientes, cuerpos, url, "/informe")
+        resultados["informes_cache"] = reportar("/informe repetidos (caché)", segundos, latencias, codigos,
+                                                unidad="informes")
+        estado, tipo, datos = pedir(url, "/informe", cuerpos[0])
+        assert estado == 200 and tipo.startswith("application/vnd.openxml") and datos[:2] == b"PK", (estado, tipo)
+        salud = json.loads(pedir(url, "/salud")[2])
+        print(f"caché de informes: {salud['cache']}")
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+            proceso.wait(10)
+        temporal.cleanup()
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
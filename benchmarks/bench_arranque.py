@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Arranque en frío: tiempo de importación (estilo -X importtime) y primer render.
+#
+# Cada medición corre en un proceso nuevo, como un contenedor recién iniciado.
+# "diferidas" son las dependencias que app.py ya no carga al arrancar; la fila
+# "con diferidas" reproduce el costo de importarlas de entrada, como antes.
+#   python benchmarks/bench_arranque.py [repeticiones]
+import ast
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from _datos import BASE, entorno_temporal
+
+
+def modulos_app():
+    # Módulos que app.py importa al arrancar (imports de primer nivel, no los de funciones)
+    arbol = ast.parse(Path(BASE, "app.py").read_text(encoding="utf-8"))
+    modulos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Import):
+            modulos += [a.name for a in nodo.names]
+        elif isinstance(nodo, ast.ImportFrom) and nodo.level == 0:
+            modulos.append(nodo.module)
+    return list(dict.fromkeys(modulos))
+
+
+MODULOS_APP = modulos_app()
+DIFERIDAS = ["numpy", "pandas", "docx", "docx.oxml", "PIL.Image", "openpyxl", "lxml.etree"]
+LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def importtime(modulos):
+    codigo = "; ".join(f"import {m}" for m in modulos)
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=BASE,
+                             capture_output=True, text=True, check=True)
+    acumulado = {}
+    for linea in proceso.stderr.splitlines():
+        m = LINEA.match(linea)
+        if m and not m.group(3):  # sólo módulos de primer nivel
+            acumulado[m.group(4)] = int(m.group(2)) / 1000
+    return acumulado
+
+
+def cargadas_al_arrancar():
+    codigo = ("import sys; " + "; ".join(f"import {m}" for m in MODULOS_APP) +
+              f"; print(','.join(m for m in {DIFERIDAS!r} if m in sys.modules))")
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=BASE, capture_output=True, text=True, check=True)
+    return [m for m in salida.stdout.strip().split(",") if m]
+
+
+def primer_render(directorio):
+    # Primer AppTest.run() de un proceso nuevo (pantalla de datos generales)
+    codigo = ("import time; from streamlit.testing.v1 import AppTest; t0 = time.perf_counter(); "
+              "at = AppTest.from_file('app.py', default_timeout=120).run(); "
+              "assert not at.exception, at.exception; print(time.perf_counter() - t0)")
+    entorno = dict(os.environ, **entorno_temporal(directorio))
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=BASE, capture_output=True, text=True, check=True, env=entorno)
+    return float(salida.stdout.strip().splitlines()[-1]) * 1000
+
+
+def main(repeticiones=5):
+    cargadas = cargadas_al_arrancar()
+    assert not cargadas, f"dependencias diferidas cargadas al arrancar: {cargadas}"
+    print("ninguna dependencia diferida se carga al importar app.py: OK")
+
+    medidas = {"módulos de app.py": [], "con diferidas": []}
+    detalle = {}
+    for _ in range(repeticiones):
+        app = importtime(MODULOS_APP)
+        medidas["módulos de app.py"].append(sum(app.values()))
+        con = importtime(MODULOS_APP + DIFERIDAS)
+        medidas["con diferidas"].append(sum(con.values()))
+        for m in DIFERIDAS:
+            detalle.setdefault(m, []).append(con.get(m, 0.0))
+    for nombre, valores in medidas.items():
+        print(f"importación, {nombre:18}: {statistics.median(valores):8.1f} ms (mediana de {repeticiones})")
+    for m, valores in detalle.items():
+        print(f"    {m:12} {statistics.median(valores):8.1f} ms adicionales")
+
+    directorio = tempfile.mkdtemp()
+    try:
+        frio = primer_render(directorio)   # reduce y codifica los logos con PIL
+        tibio = primer_render(directorio)  # proceso nuevo, logos ya en disco
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    print(f"primer render, sin caché de logos en disco: {frio:8.1f} ms")
+    print(f"primer render, con caché de logos en disco: {tibio:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
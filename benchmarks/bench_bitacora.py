@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# Bitácora de cambios (bitacora.py): reconstrucción con snapshots frente a
+# reproducir todos los eventos desde el inicio, y compactación.
+#
+# Se anexan del orden de un millón de eventos aleatorios (miles de evaluaciones
+# con unos cientos de eventos y algunas con decenas de miles) y se lleva en
+# paralelo el estado esperado de cada evaluación. Se verifica:
+# 1. estados(evaluacion, hasta) en instantes al azar = estado esperado.
+# 2. Reconstruir el estado actual: snapshot + cola frente a todos los eventos.
+# 3. registrar() desde el formulario: eventos por segundo, una transacción por rerun.
+# 4. compactar(max_eventos): deja a lo sumo max_eventos + SNAPSHOT_CADA eventos,
+#    el estado actual no cambia y los instantes borrados dan BitacoraCompactada.
+#   python benchmarks/bench_bitacora.py [evaluaciones] [eventos por evaluación]
+import copy
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _datos import BASE
+
+from almacen import AlmacenEvaluaciones
+from bitacora import (CAMPO_GUARDADO, CAMPO_IE, CAMPO_OBS, ESCENARIO_CODIGO, SNAPSHOT_CADA, BitacoraCompactada,
+                      BitacoraEvaluaciones, _aplicar)
+from calculo import IE_CODIGO, IG_CODIGO, MESES_ESP
+from catalogo import Catalogo
+from validacion import estado_vacio
+
+GRANDES = 20             # evaluaciones con muchos eventos
+EVENTOS_GRANDES = 25000
+
+
+def evento_aleatorio(rng, items, codigos):
+    # (ítem, campo, valor, texto) con respuestas válidas y, de vez en cuando, vacías o fuera de opciones
+    item = rng.choice(items)
+    tipo = rng.random()
+    if tipo < 0.1:
+        return item.id, CAMPO_GUARDADO, 0, None
+    if tipo < 0.15:
+        return item.id, CAMPO_OBS, 0, rng.choice(["", "Sin enlace", "Revisar en marzo"])
+    if tipo < 0.3:
+        return item.id, 0, *rng.choice([(0, None), (-1, "Escenario antiguo")] + [(v, None) for v in ESCENARIO_CODIGO.values()])
+    if tipo < 0.6 or not item.ies:
+        return item.id, rng.randint(1, 3), rng.choice([0] + list(IG_CODIGO.values())), None
+    codigo = codigos[rng.choice(item.ies)["codigo"]]
+    return item.id, CAMPO_IE + codigo, rng.choice([0] + list(IE_CODIGO.values())), None
+
+
+def poblar(bitacora, catalogo, n, eventos, rng):
+    # -> {evaluación: [(ts, estado esperado)] en algunos instantes}, total de eventos
+    almacen = bitacora.almacen
+    con = almacen._conexion()
+    items = list(catalogo.items.values())
+    codigos = {ie["codigo"]: bitacora._id_codigo(con, ie["codigo"]) for item in items for ie in item.ies}
+    esperados, total = {}, 0
+    for k in range(n + GRANDES):
+        evaluacion_id = almacen.abrir_evaluacion(f"Organismo {k // 24:04d}", 2000 + k // 12, MESES_ESP[k % 12],
+                                                 "Analista", catalogo=catalogo.version)
+        cantidad = EVENTOS_GRANDES if k >= n else rng.randint(eventos // 2, eventos * 3 // 2)
+        marcas = set(rng.sample(range(cantidad), 3)) | {cantidad - 1}
+        estado, filas, puntos = {}, [], []
+        for i in range(cantidad):
+            fila = evento_aleatorio(rng, items, codigos)
+            ts = 1e9 + k * 1e6 + i
+            _aplicar(estado, *fila)
+            filas.append((*fila, 0, ts))
+            if i in marcas:
+                puntos.append((ts, copy.deepcopy(estado)))
+        bitacora._transaccion(con, evaluacion_id, filas)
+        esperados[evaluacion_id] = puntos
+        total += cantidad
+    return esperados, total
+
+
+def reproducir_todo(con, evaluacion_id):
+    # Sin snapshots: todos los eventos desde el primero
+    items = {}
+    for fila in con.execute("SELECT item_id, campo, valor, texto FROM eventos WHERE evaluacion_id = ? ORDER BY id",
+                            (evaluacion_id,)):
+        _aplicar(items, *fila)
+    return items
+
+
+def cronometrar(funcion, argumentos):
+    t0 = time.perf_counter()
+    for a in argumentos:
+        funcion(a)
+    return (time.perf_counter() - t0) / len(argumentos)
+
+
+def main(n=3000, eventos=170):
+    directorio = Path(tempfile.mkdtemp())
+    catalogo = Catalogo.desde_archivos(BASE)
+    almacen = AlmacenEvaluaciones(directorio / "evaluaciones.sqlite3")
+    bitacora = BitacoraEvaluaciones(almacen, catalogo)
+    con = almacen._conexion()
+    rng = random.Random(23)
+
+    t0 = time.perf_counter()
+    esperados, total = poblar(bitacora, catalogo, n, eventos, rng)
+    dt = time.perf_counter() - t0
+    snapshots = con.execute("SELECT COUNT(*) FROM snapshots_eventos").fetchone()[0]
+    print(f"{total:,} eventos en {len(esperados)} evaluaciones anexados en {dt:.1f} s "
+          f"({total / dt:,.0f} eventos/s), {snapshots} snapshots")
+
+    # 1. Instantes al azar
+    verificados = 0
+    for evaluacion_id, puntos in esperados.items():
+        for ts, estado in puntos:
+            items, _, _ = bitacora._reconstruir(con, evaluacion_id, ts)
+            assert items == estado, (evaluacion_id, ts)
+            verificados += 1
+    ultimo = {e: p[-1][1] for e, p in esperados.items()}
+    ejemplo = next(iter(esperados))
+    borradores, guardados = bitacora.estados(ejemplo)
+    assert len(borradores) == len(ultimo[ejemplo]) and all(isinstance(s, dict) for s in borradores.values())
+    print(f"equivalencia: OK ({verificados} instantes reconstruidos = estado esperado)")
+
+    # 2. Estado actual: snapshot + cola frente a reproducir todo
+    grandes = list(esperados)[-GRANDES:]
+    chicas = rng.sample(list(esperados)[:-GRANDES], min(200, len(esperados) - GRANDES))
+    for evaluacion_id in grandes[:3] + chicas[:3]:
+        assert reproducir_todo(con, evaluacion_id) == bitacora._reconstruir(con, evaluacion_id, None)[0] \
+            == ultimo[evaluacion_id]
+    for nombre, ids in ((f"{EVENTOS_GRANDES:,} eventos", grandes), (f"~{eventos} eventos", chicas)):
+        cola = cronometrar(lambda e: bitacora._reconstruir(con, e, None), ids)
+        todo = cronometrar(lambda e: reproducir_todo(con, e), ids)
+        medio = cronometrar(lambda e: bitacora._reconstruir(con, e, esperados[e][1][0]), ids)
+        print(f"reconstrucción ({nombre}): snapshot + cola {cola * 1000:.2f} ms, todos los eventos "
+              f"{todo * 1000:.2f} ms (x{todo / cola:.1f}); instante intermedio {medio * 1000:.2f} ms")
+    estados = cronometrar(lambda e: bitacora.estados(e), grandes)
+    print(f"estados() para retomar borradores: {estados * 1000:.2f} ms")
+
+    # 3. registrar() como en cada rerun del formulario
+    evaluacion_id = almacen.abrir_evaluacion("Organismo registrar", 2030, "Enero", "Analista", catalogo=catalogo.version)
+    items = list(catalogo.items.values())
+    anexados, llamadas = 0, 2000
+    t0 = time.perf_counter()
+    anteriores = {}
+    for _ in range(llamadas):
+        item = rng.choice(items)
+        anterior = anteriores.get(item.id) or estado_vacio()
+        nuevo = copy.deepcopy(anterior)
+        nuevo["ig1"] = rng.choice(["Sí", "No"])
+        nuevo["escenario"] = rng.choice(list(ESCENARIO_CODIGO))
+        for ie in item.ies:
+            nuevo["ie"][ie["codigo"]] = rng.choice(["Sí", "No"])
+        anexados += bitacora.registrar(evaluacion_id, item.id, anterior, nuevo)
+        anteriores[item.id] = nuevo
+    dt = time.perf_counter() - t0
+    borradores, _ = bitacora.estados(evaluacion_id)
+    assert {catalogo.items[i].clave: s for i, s in anteriores.items()} == borradores
+    print(f"registrar(): {llamadas} reruns, {anexados} eventos, {dt / llamadas * 1000:.2f} ms por rerun "
+          f"({anexados / dt:,.0f} eventos/s)")
+
+    # 4. Compactación
+    maximo = 5000
+    antes = con.execute("SELECT COUNT(*) FROM eventos").fetchone()[0]
+    t0 = time.perf_counter()
+    borrados = bitacora.compactar(max_eventos=maximo, evaluaciones=grandes)
+    dt = time.perf_counter() - t0
+    assert antes - borrados == con.execute("SELECT COUNT(*) FROM eventos").fetchone()[0]
+    for evaluacion_id in grandes:
+        quedan = con.execute("SELECT COUNT(*) FROM eventos WHERE evaluacion_id = ?", (evaluacion_id,)).fetchone()[0]
+        assert maximo <= quedan <= maximo + SNAPSHOT_CADA, quedan
+        assert bitacora._reconstruir(con, evaluacion_id, None)[0] == ultimo[evaluacion_id]
+        ts, estado = esperados[evaluacion_id][-1]
+        assert bitacora._reconstruir(con, evaluacion_id, ts)[0] == estado
+        corte = con.execute("SELECT MIN(ts) FROM snapshots_eventos WHERE evaluacion_id = ?", (evaluacion_id,)).fetchone()[0]
+        try:
+            bitacora.estados(evaluacion_id, hasta=corte - 1)
+            raise AssertionError("instante compactado reconstruido")
+        except BitacoraCompactada:
+            pass
+    print(f"compactación: {borrados:,} eventos borrados de {GRANDES} evaluaciones en {dt:.2f} s; "
+          f"quedan entre {maximo} y {maximo + SNAPSHOT_CADA} por evaluación, estado actual sin cambios")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
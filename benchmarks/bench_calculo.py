@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Rendimiento del cálculo por lotes frente a calcular_cumplimiento. La paridad
+# de ambos cálculos la prueban tests/test_calculo.py.
+#   python benchmarks/bench_calculo.py [n_evaluaciones]
+import sys
+import time
+
+from _datos import cargar_catalogo, evaluaciones_aleatorias
+
+from calculo import calcular_cumplimiento, construir_materia_peso_map
+from calculo_lote import MotorCumplimiento
+
+
+def main(n=10_000):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    evaluaciones = evaluaciones_aleatorias(n, materias_items, indicadores_especificos)
+    motor = MotorCumplimiento(materias_items)
+
+    t0 = time.perf_counter()
+    codificadas = motor.codificar(evaluaciones)
+    t1 = time.perf_counter()
+    motor.puntuar(codificadas)
+    t2 = time.perf_counter()
+
+    peso_map = construir_materia_peso_map(materias_items)
+    t3 = time.perf_counter()
+    for evaluacion in evaluaciones:
+        calcular_cumplimiento(evaluacion, materias_items, indicadores_especificos, peso_map)
+    t4 = time.perf_counter()
+
+    print(f"evaluaciones: {n}")
+    print(f"codificar:    {t1 - t0:.3f} s")
+    print(f"puntuar:      {t2 - t1:.3f} s ({n / (t2 - t1):,.0f} eval/s)")
+    print(f"por ítem:     {t4 - t3:.3f} s ({n / (t4 - t3):,.0f} eval/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
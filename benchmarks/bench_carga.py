@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+# Prueba de carga: N evaluadores simultáneos contra un servidor local.
+#
+# Levanta `streamlit run app.py` como en render.yaml y conecta N clientes por
+# websocket que hablan el mismo protocolo que el navegador (BackMsg/ForwardMsg).
+# Cada cliente recorre todos los ítems de estructura_materias_items.json como
+# una persona: elige materia e ítem, responde escenario, IG e IE de a un clic
+# (un rerun por respuesta, de fragmento cuando corresponde), guarda, y al final
+# pide el informe Word, sigue el sondeo del fragmento y descarga el archivo.
+# Mide throughput, latencia p50/p95/p99 por tipo de rerun y el RSS del servidor.
+# Todo corre sin red, en una sola máquina. Los clientes usan websockets (>= 11,
+# cliente síncrono), que no es dependencia de la app: pip install -r requirements-dev.txt
+#
+#   python benchmarks/bench_carga.py --sesiones 4 [--items 46] [--rampa 0.5] [--salida carga.json]
+#   python benchmarks/bench_carga.py --url ws://127.0.0.1:8501 --pid 1234   (servidor ya levantado)
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+from _datos import BASE, cargar_catalogo, entorno_temporal, evaluacion_item
+
+TIEMPO_MAXIMO = 300  # segundos para cualquier rerun o para el informe
+GUARDADO_OK = "Ítem guardado correctamente."
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------- SERVIDOR ----------
+
+def levantar_servidor(puerto, entorno):
+    comando = [sys.executable, "-m", "streamlit", "run", str(BASE / "app.py"),
+               "--server.headless", "true", "--server.port", str(puerto),
+               "--server.address", "127.0.0.1", "--browser.gatherUsageStats", "false"]
+    proceso = subprocess.Popen(comando, cwd=BASE, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.time() + 60
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            sys.exit(f"el servidor terminó al iniciar (código {proceso.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proceso
+        except OSError:
+            time.sleep(0.2)
+    proceso.kill()
+    sys.exit("el servidor no respondió en 60 s")
+
+
+# ---------- CLIENTE ----------
+
+class ClienteStreamlit:
+    # Reproduce lo que hace el navegador: arma el árbol de elementos con los
+    # deltas, envía el estado de los widgets visibles y sigue los auto-reruns.
+    def __init__(self, url_ws, url_http):
+        from websockets.sync.client import connect
+
+        self.url_http = url_http
+        self._conexion = connect(f"{url_ws}/_stcore/stream", subprotocols=["streamlit"], max_size=None,
+                                 open_timeout=TIEMPO_MAXIMO)
+        self.ws = self._conexion.__enter__()
+        self.elementos = {}  # delta_path -> (tipo, proto, fragment_id, corrida)
+        self.valores = {}  # id de widget -> WidgetState puesto por el usuario
+        self.auto_rerun = {}  # fragment_id -> intervalo
+        self.corrida = 0
+        self.fragmentos = ()
+        self.page_script_hash = ""
+
+    def cerrar(self):
+        self._conexion.__exit__(None, None, None)
+
+    # --- árbol de elementos ---
+
+    def widgets(self, tipo=None):
+        for tipo_el, el, fragmento, _ in list(self.elementos.values()):
+            if hasattr(el, "id") and (tipo is None or tipo_el == tipo):
+                yield tipo_el, el, fragmento
+
+    def buscar(self, tipo, label=None, key=None):
+        for _, el, fragmento in self.widgets(tipo):
+            if (label is None or el.label == label) and (key is None or el.id.endswith(f"-{key}")):
+                return el, fragmento
+        raise LookupError(f"no hay {tipo} label={label!r} key={key!r}")
+
+    def existe(self, tipo, label):
+        return any(el.label == label for _, el, _ in self.widgets(tipo))
+
+    def alertas(self):
+        return [el.body for tipo, el, _, _ in self.elementos.values() if tipo == "alert"]
+
+    def valor(self, tipo, label=None, key=None):
+        el, _ = self.buscar(tipo, label, key)
+        if el.id in self.valores:
+            return self.valores[el.id].string_value
+        if el.set_value and el.HasField("raw_value"):
+            return el.raw_value
+        return el.options[el.default] if el.HasField("default") else None
+
+    # --- interacción ---
+
+    def elegir(self, tipo, valor, label=None, key=None):
+        # Un clic sobre la opción ya marcada no provoca rerun en el navegador
+        if self.valor(tipo, label, key) == valor:
+            return False
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        el, fragmento = self.buscar(tipo, label, key)
+        self.valores[el.id] = WidgetState(id=el.id, string_value=valor)
+        self.rerun(fragmento)
+        return True
+
+    def escribir(self, label, texto):
+        # Los text_input del formulario no reenvían el script hasta el submit
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        el, _ = self.buscar("text_input", label)
+        self.valores[el.id] = WidgetState(id=el.id, string_value=texto)
+
+    def clic(self, label):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        el, fragmento = self.buscar("button", label)
+        self.rerun(fragmento, disparador=WidgetState(id=el.id, trigger_value=True))
+
+    def rerun(self, fragment_id="", disparador=None, auto=False):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        estado = msg.rerun_script
+        estado.page_script_hash = self.page_script_hash
+        estado.fragment_id = fragment_id
+        estado.is_auto_rerun = auto
+        visibles = {el.id for _, el, _ in self.widgets()}
+        for id_widget, valor in self.valores.items():
+            if id_widget in visibles:
+                estado.widget_states.widgets.add().CopyFrom(valor)
+        if disparador is not None:
+            estado.widget_states.widgets.add().CopyFrom(disparador)
+        self.ws.send(msg.SerializeToString())
+        self._recibir_hasta_fin()
+
+    def _recibir_hasta_fin(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            m = ForwardMsg()
+            m.ParseFromString(self.ws.recv(timeout=TIEMPO_MAXIMO))
+            tipo = m.WhichOneof("type")
+            if tipo == "new_session":
+                self.corrida += 1
+                self.fragmentos = tuple(m.new_session.fragment_ids_this_run)
+                if not self.fragmentos:
+                    self.auto_rerun = {}  # una corrida completa vuelve a declarar sus run_every
+                self.page_script_hash = m.new_session.page_script_hash
+            elif tipo == "delta":
+                self._aplicar_delta(m)
+            elif tipo == "auto_rerun":
+                self.auto_rerun[m.auto_rerun.fragment_id] = m.auto_rerun.interval
+            elif tipo == "script_finished":
+                if m.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("error de compilación en app.py")
+                if m.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue  # st.rerun(): el servidor ya empezó la corrida siguiente
+                self._limpiar(m.script_finished == ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+                return
+
+    def _aplicar_delta(self, m):
+        delta = m.delta
+        ruta = tuple(m.metadata.delta_path)
+        if delta.WhichOneof("type") != "new_element":
+            self.elementos[ruta] = ("bloque", None, delta.fragment_id, self.corrida)
+            return
+        tipo = delta.new_element.WhichOneof("type")
+        el = getattr(delta.new_element, tipo)
+        if tipo == "exception":
+            raise RuntimeError(f"excepción en app.py: {el.type}: {el.message}")
+        if getattr(el, "set_value", False):
+            self.valores.pop(el.id, None)  # el servidor impuso el valor
+        self.elementos[ruta] = (tipo, el, delta.fragment_id, self.corrida)
+
+    def _limpiar(self, de_fragmento):
+        # Lo que no se volvió a dibujar en esta corrida desaparece de la página
+        for ruta, (_, _, fragmento, corrida) in list(self.elementos.items()):
+            if corrida != self.corrida and (not de_fragmento or fragmento in self.fragmentos):
+                del self.elementos[ruta]
+        visibles = {el.id for _, el, _ in self.widgets()}
+        for id_widget in [i for i in self.valores if i not in visibles]:
+            del self.valores[id_widget]
+
+    def descargar(self, label):
+        el, _ = self.buscar("download_button", label)
+        with urllib.request.urlopen(self.url_http + el.url, timeout=TIEMPO_MAXIMO) as r:
+            return r.read()
+
+
+# ---------- SESIÓN DE UN EVALUADOR ----------
+
+class Sesion:
+    def __init__(self, n, url_ws, catalogo, materias_items, indicadores_especificos, max_items, semilla):
+        self.n = n
+        self.url_ws = url_ws
+        self.ids = catalogo.items_id_map
+        self.materias_items = materias_items[:max_items]
+        self.indicadores_especificos = indicadores_especificos
+        self.rng = random.Random(semilla + n)
+        self.latencias = defaultdict(list)
+        self.error = None
+        self.cliente = None
+        self.items_guardados = 0
+        self.bytes_informe = 0
+        self.segundos = 0.0
+
+    def _medir(self, tipo, accion, *args, **kwargs):
+        t0 = time.perf_counter()
+        if accion(*args, **kwargs) is not False:
+            self.latencias[tipo].append(time.perf_counter() - t0)
+
+    def recorrer(self):
+        t0 = time.perf_counter()
+        try:
+            url_http = self.url_ws.replace("ws", "http", 1)
+            self.cliente = ClienteStreamlit(self.url_ws, url_http)
+            self._medir("inicio", self.cliente.rerun)
+            self.cliente.escribir("Nombre del organismo", f"Organismo de carga {self.n}")
+            self.cliente.escribir("Nombre del evaluador(a)", "Evaluador(a) de carga")
+            self._medir("iniciar", self.cliente.clic, "Iniciar evaluación")
+            for mi in self.materias_items:
+                self._item(mi)
+            self._exportar()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        self.segundos = time.perf_counter() - t0
+
+    def _item(self, mi):
+        materia, item = mi['Materia'], mi['Ítem']
+        id_item = self.ids[(materia, item)]
+        c = self.cliente
+        self._medir("navegar", c.elegir, "selectbox", materia, label="Seleccione materia a evaluar")
+        self._medir("navegar", c.elegir, "selectbox", item, label="Seleccione ítem a evaluar")
+        key = f"{materia} || {item}"
+        respuesta = evaluacion_item(self.rng, self.indicadores_especificos.get(key, []))
+        self._medir("responder", c.elegir, "radio", respuesta["escenario"], key=f"escenario_{id_item}")
+        for i, valor in enumerate(respuesta["ig"]):
+            if valor is not None:
+                self._medir("responder", c.elegir, "radio", valor, key=f"ig{i+1}_{id_item}")
+        for ie in respuesta["ie"]:
+            self._medir("responder", c.elegir, "radio", ie["respuesta"], key=f"ie_{id_item}_{ie['codigo']}")
+        self._medir("guardar", c.clic, "Guardar ítem")
+        if GUARDADO_OK not in c.alertas():
+            raise RuntimeError(f"no se guardó el ítem {id_item}: {c.alertas()}")
+        self.items_guardados += 1
+
+    def _exportar(self):
+        c = self.cliente
+        t0 = time.perf_counter()
+        self._medir("exportar", c.clic, "Generar y descargar informe Word")
+        # Mientras el informe está en la cola, el fragmento de seguimiento se
+        # vuelve a ejecutar cada `intervalo` segundos, como en el navegador
+        while not c.existe("download_button", "Descargar informe Word"):
+            if time.perf_counter() - t0 > TIEMPO_MAXIMO:
+                raise RuntimeError(f"el informe no estuvo listo en {TIEMPO_MAXIMO} s")
+            if not c.auto_rerun:
+                raise RuntimeError(f"el informe no quedó en sondeo ni listo: {c.alertas()}")
+            fragmento, intervalo = next(iter(c.auto_rerun.items()))
+            time.sleep(intervalo)
+            self._medir("sondeo", c.rerun, fragmento, auto=True)
+        self.bytes_informe = len(c.descargar("Descargar informe Word"))
+        self.latencias["informe_listo"].append(time.perf_counter() - t0)
+
+
+# ---------- EJECUCIÓN ----------
+
+def ejecutar(sesiones, rampa, pid):
+    maximo = [0.0]
+    terminado = threading.Event()
+
+    def vigilar():
+        while not terminado.wait(0.5):
+            maximo[0] = max(maximo[0], rss_mb(pid))
+
+    if pid:
+        threading.Thread(target=vigilar, daemon=True).start()
+    hilos = []
+    for s in sesiones:
+        hilo = threading.Thread(target=s.recorrer, name=f"sesion-{s.n}")
+        hilo.start()
+        hilos.append(hilo)
+        time.sleep(rampa)
+    for hilo in hilos:
+        hilo.join()
+    terminado.set()
+    return maximo[0]
+
+
+def resumen(sesiones, total, max_items, rss):
+    errores = [(s.n, s.error) for s in sesiones if s.error]
+    latencias = defaultdict(list)
+    for s in sesiones:
+        for tipo, valores in s.latencias.items():
+            latencias[tipo].extend(valores)
+    latencias["reruns"] = [v for tipo, valores in latencias.items() if tipo != "informe_listo" for v in valores]
+    rss_inicial, rss_final, rss_maximo = rss
+    return {
+        "sesiones": len(sesiones),
+        "items_por_sesion": max_items,
+        "nucleos": os.cpu_count(),
+        "segundos": total,
+        "reruns": len(latencias["reruns"]),
+        "reruns_por_segundo": len(latencias["reruns"]) / total,
+        "evaluaciones_por_minuto": (len(sesiones) - len(errores)) / total * 60,
+        "latencia_ms": {
+            tipo: {
+                "n": len(valores),
+                "p50": percentil(sorted(valores), 0.50) * 1000,
+                "p95": percentil(sorted(valores), 0.95) * 1000,
+                "p99": percentil(sorted(valores), 0.99) * 1000,
+            }
+            for tipo, valores in sorted(latencias.items()) if valores
+        },
+        "rss_inicial_mb": rss_inicial,
+        "rss_final_mb": rss_final,
+        "rss_maximo_mb": max(rss_maximo, rss_final),
+        "rss_por_sesion_mb": (rss_final - rss_inicial) / len(sesiones),
+        "duracion_sesion_s": [round(s.segundos, 2) for s in sesiones],
+        "errores": errores,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con evaluadores simultáneos contra un servidor local.")
+    parser.add_argument("--sesiones", type=int, default=4)
+    parser.add_argument("--items", type=int, default=None, help="ítems por sesión (por defecto, todos)")
+    parser.add_argument("--rampa", type=float, default=0.5, help="segundos entre el inicio de cada sesión")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--url", help="servidor ya levantado, p. ej. ws://127.0.0.1:8501")
+    parser.add_argument("--pid", type=int, help="pid de ese servidor, para medir su RSS")
+    parser.add_argument("--salida", help="archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    from catalogo import Catalogo
+
+    catalogo = Catalogo.desde_archivos(BASE)
+    materias_items, indicadores_especificos = cargar_catalogo()
+    max_items = args.items or len(materias_items)
+
+    servidor = None
+    if args.url:
+        url_ws, pid = args.url.rstrip("/"), args.pid
+    else:
+        # Almacén y cachés temporales: la prueba no toca datos/
+        entorno = dict(os.environ, **entorno_temporal())
+        puerto = puerto_libre()
+        servidor = levantar_servidor(puerto, entorno)
+        url_ws, pid = f"ws://127.0.0.1:{puerto}", servidor.pid
+
+    try:
+        # Calentamiento: compila el script y llena las cachés del proceso. La
+        # segunda sesión hace que el proceso devuelva la memoria transitoria de
+        # la primera (el logo), para que no cuente como crecimiento por sesión.
+        for n in (-1, -2):
+            previa = Sesion(n, url_ws, catalogo, materias_items, indicadores_especificos, 2, args.semilla)
+            previa.recorrer()
+            if previa.error:
+                sys.exit(f"falló la sesión de calentamiento: {previa.error}")
+            previa.cliente.cerrar()
+        time.sleep(1)
+        rss_inicial = rss_mb(pid) if pid else 0.0
+
+        sesiones = [Sesion(n, url_ws, catalogo, materias_items, indicadores_especificos, max_items, args.semilla)
+                    for n in range(args.sesiones)]
+        t0 = time.perf_counter()
+        rss_maximo = ejecutar(sesiones, args.rampa, pid)
+        total = time.perf_counter() - t0
+        # Las sesiones siguen conectadas: su estado cuenta en el RSS
+        rss_final = rss_mb(pid) if pid else 0.0
+        for s in sesiones:
+            if s.cliente is not None:
+                s.cliente.cerrar()
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait(10)
+
+    resultado = resumen(sesiones, total, max_items, (rss_inicial, rss_final, rss_maximo))
+    print(f"{args.sesiones} sesiones x {max_items} ítems en {total:.1f} s ({os.cpu_count()} núcleos)")
+    print(f"  {resultado['reruns']} reruns, {resultado['reruns_por_segundo']:.1f} reruns/s, "
+          f"{resultado['evaluaciones_por_minuto']:.2f} evaluaciones completas/min")
+    for tipo, datos in resultado["latencia_ms"].items():
+        print(f"  {tipo:14} n={datos['n']:5}  p50 {datos['p50']:8.1f} ms  p95 {datos['p95']:8.1f} ms  p99 {datos['p99']:8.1f} ms")
+    if pid:
+        print(f"  RSS del servidor {rss_inicial:.0f} MB -> {rss_final:.0f} MB (máximo {resultado['rss_maximo_mb']:.0f} MB), "
+              f"{resultado['rss_por_sesion_mb']:.2f} MB por sesión")
+    for n, error in resultado["errores"]:
+        print(f"  sesión {n}: {error}")
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 1 if resultado["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Cola de informes: deduplicación de pedidos idénticos y tiempo que bloquea al
+# hilo del script frente a generar el informe en línea.
+#   python benchmarks/bench_cola.py [usuarios]
+import datetime
+import sys
+import threading
+import time
+
+from _datos import cargar_catalogo, evaluacion_peor_caso
+
+from cache_informes import CacheInformes, clave_informe
+from calculo import calcular_cumplimiento
+from cola_informes import LISTO, ColaInformes
+from informe import exportar_informe
+
+META = ("Organismo de prueba", datetime.date(2024, 5, 31), "Evaluador(a)", "Mayo", 2024)
+
+
+def main(usuarios=20, backend="docx"):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    evaluacion = evaluacion_peor_caso(materias_items, indicadores_especificos)
+    construcciones = 0
+
+    def generar(avance):
+        nonlocal construcciones
+        construcciones += 1
+        resultado = calcular_cumplimiento(evaluacion, materias_items, indicadores_especificos)
+        avance(0.4, "Construyendo documento Word")
+        return exportar_informe(*META, *resultado, evaluacion, backend=backend)
+
+    t0 = time.perf_counter()
+    generar(lambda *a: None)
+    en_linea = time.perf_counter() - t0
+    construcciones = 0
+
+    cola = ColaInformes(CacheInformes(), trabajadores=2)
+    clave = clave_informe("bench", *META, evaluacion, backend)
+    bloqueos, trabajos = [], []
+    barrera = threading.Barrier(usuarios)
+
+    def usuario():
+        barrera.wait()
+        t = time.perf_counter()
+        trabajos.append(cola.enviar(clave, generar))
+        bloqueos.append(time.perf_counter() - t)
+
+    hilos = [threading.Thread(target=usuario) for _ in range(usuarios)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert len({id(t) for t in trabajos}) == 1
+    trabajos[0].esperar(60)
+    assert trabajos[0].estado == LISTO and construcciones == 1, (trabajos[0].estado, construcciones)
+    print(f"{usuarios} pedidos idénticos simultáneos -> {construcciones} construcción: OK")
+    print(f"generación en línea ({backend}, peor caso): {en_linea * 1000:.0f} ms bloqueando el script")
+    print(f"enviar() a la cola: máx {max(bloqueos) * 1000:.2f} ms bloqueando el script")
+    t = time.perf_counter()
+    assert cola.enviar(clave, generar).estado == LISTO
+    print(f"pedido repetido ya terminado: {(time.perf_counter() - t) * 1000:.3f} ms, sin construir")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
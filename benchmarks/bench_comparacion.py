@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Comparación con otros organismos del período (comparacion.py): percentiles,
+# medianas y posiciones con la cohorte ordenada una vez frente a recorrer cada
+# dimensión de todas las evaluaciones en cada consulta.
+#
+# 1. Cohorte desde el histórico: algunos cientos de evaluaciones guardadas en un
+#    período; la fila de cada organismo es igual a puntajes() de su evaluación y
+#    la comparación (excluyéndose a sí mismo) coincide con el cálculo directo;
+#    los organismos que sólo abrieron el período no cuentan como pares.
+# 2. Cohorte de decenas de miles de evaluaciones (puntajes al azar con empates y
+#    vacíos): construcción y latencia de comparar() frente al cálculo directo.
+# 3. Informe: sección COMPARACIÓN CON OTROS ORGANISMOS DEL PERÍODO, mismo
+#    word/document.xml en ambos generadores.
+#   python benchmarks/bench_comparacion.py [organismos guardados] [organismos de la cohorte grande]
+import datetime
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from _datos import BASE, evaluacion_aleatoria
+
+from almacen import AlmacenEvaluaciones
+from calculo import calcular_cumplimiento
+from catalogo import Catalogo
+from comparacion import COHORTE_MINIMA, CohortePeriodo, comparar_evaluacion, dimensiones, puntajes
+from historico import HistoricoEvaluaciones, periodo
+from informe import BACKENDS, obtener_exportador
+
+META = ("Organismo 0000", datetime.date(2024, 5, 31), "Evaluador(a)", "Mayo", 2024)
+
+
+def comparar_directo(matriz, valores, fila=None):
+    # Por dimensión: pares sin la fila excluida, con puntaje; conteos y mediana sobre ellos
+    if fila is not None:
+        matriz = np.delete(matriz, fila, axis=0)
+    percentil, posicion, mediana, pares = [], [], [], []
+    for d, v in enumerate(valores):
+        columna = matriz[:, d]
+        columna = columna[~np.isnan(columna)]
+        pares.append(len(columna))
+        mediana.append(np.median(columna) if len(columna) else np.nan)
+        if np.isnan(v) or not len(columna):
+            percentil.append(np.nan)
+            posicion.append(0)
+        else:
+            percentil.append(100 * ((columna < v).sum() + 0.5 * (columna == v).sum()) / len(columna))
+            posicion.append((columna > v).sum() + 1)
+    return {"percentil": np.array(percentil), "posicion": np.array(posicion), "mediana": np.array(mediana),
+            "pares": np.array(pares)}
+
+
+def verificar(cohorte, valores, excluir=None):
+    obtenido = cohorte.comparar(valores, excluir)
+    esperado = comparar_directo(cohorte.matriz, valores, cohorte._fila.get(excluir))
+    for campo in ("percentil", "mediana"):
+        assert np.allclose(obtenido[campo], esperado[campo], equal_nan=True, atol=1e-9), campo
+    for campo in ("posicion", "pares"):
+        assert np.array_equal(obtenido[campo], esperado[campo]), campo
+
+
+def cronometrar(funcion, argumentos):
+    t0 = time.perf_counter()
+    for a in argumentos:
+        funcion(a)
+    return (time.perf_counter() - t0) / len(argumentos)
+
+
+def main(organismos=300, grande=30000):
+    catalogo = Catalogo.desde_archivos(BASE)
+    rng = random.Random(25)
+
+    # 1. Cohorte desde el histórico
+    almacen = AlmacenEvaluaciones(Path(tempfile.mkdtemp()) / "evaluaciones.sqlite3")
+    ids = {r.clave: r.id for r in catalogo.items.values()}
+    evaluaciones = {}
+    for o in range(organismos):
+        evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos,
+                                          rng.choice([0.5, 0.8, 1.0]))
+        evaluacion_id = almacen.abrir_evaluacion(f"Organismo {o:04d}", META[4], META[3], "Analista")
+        almacen.guardar_items(evaluacion_id, [(ids[k], r) for k, r in evaluacion.items()])
+        evaluaciones[f"Organismo {o:04d}"] = evaluacion
+    # Organismos que sólo abrieron el período (sin ítems guardados) no son pares
+    for o in range(4):
+        almacen.abrir_evaluacion(f"Organismo sin ítems {o}", META[4], META[3], "Analista")
+    historico = HistoricoEvaluaciones(almacen, catalogo)
+    historico.sincronizar()
+    t0 = time.perf_counter()
+    cohorte = CohortePeriodo.desde_historico(historico, catalogo, periodo(META[4], META[3]))
+    dt = time.perf_counter() - t0
+    assert len(cohorte) == organismos and cohorte.matriz.shape[1] == len(dimensiones(catalogo))
+    assert not any(o.startswith("Organismo sin ítems") for o in cohorte.organismos)
+    for organismo, evaluacion in evaluaciones.items():
+        valores = puntajes(catalogo, evaluacion)
+        assert np.array_equal(cohorte.matriz[cohorte._fila[organismo]], valores, equal_nan=True), organismo
+        assert valores[0] == calcular_cumplimiento(evaluacion, catalogo.materias_items,
+                                                   catalogo.indicadores_especificos, catalogo.materia_peso_map)[0]
+    for organismo in list(evaluaciones)[:40]:
+        verificar(cohorte, puntajes(catalogo, evaluaciones[organismo]), excluir=organismo)
+    nueva = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, 1.0)
+    verificar(cohorte, puntajes(catalogo, nueva))
+    print(f"histórico: OK ({organismos} evaluaciones del período, filas = puntajes(), comparación = cálculo "
+          f"directo); cohorte construida en {dt * 1000:.0f} ms")
+
+    # 2. Cohorte grande: puntajes con un decimal (empates) y dimensiones sin puntaje
+    n_dim = cohorte.matriz.shape[1]
+    gen = np.random.default_rng(25)
+    matriz = np.round(gen.uniform(0, 100, (grande, n_dim)), 1)
+    matriz[:, 1:] = np.where(gen.random((grande, n_dim - 1)) < 0.3, np.nan, np.round(matriz[:, 1:] / 25) * 25)
+    t0 = time.perf_counter()
+    cohorte = CohortePeriodo(periodo(META[4], META[3]), [f"Organismo {o:05d}" for o in range(grande)], matriz)
+    construccion = time.perf_counter() - t0
+    consultas = [(matriz[k], f"Organismo {k:05d}") for k in gen.choice(grande, 200, replace=False)]
+    consultas += [(matriz[k] + 0.05, None) for k in gen.choice(grande, 20, replace=False)]
+    for valores, organismo in consultas[::10]:
+        verificar(cohorte, valores, organismo)
+    comparar = cronometrar(lambda c: cohorte.comparar(*c), consultas)
+    sin_excluir = cronometrar(lambda c: cohorte.comparar(c[0]), consultas)
+    directo = cronometrar(lambda c: comparar_directo(matriz, *c[:1], cohorte._fila.get(c[1])), consultas[:10])
+    print(f"cohorte de {grande:,} evaluaciones x {n_dim} dimensiones: construcción {construccion * 1000:.0f} ms; "
+          f"comparar {comparar * 1000:.3f} ms (sin excluir {sin_excluir * 1000:.3f} ms), "
+          f"cálculo directo {directo * 1000:.0f} ms (x{directo / comparar:.0f})")
+
+    # 3. Informe con la comparación
+    evaluacion = evaluaciones[META[0]]
+    cohorte = CohortePeriodo.desde_historico(historico, catalogo, periodo(META[4], META[3]))
+    filas = comparar_evaluacion(cohorte, catalogo, evaluacion, excluir=META[0])
+    assert filas[0]["tipo"] == "global" and filas[0]["pares"] == organismos - 1
+    assert cohorte.pares_de(META[0]) == organismos - 1 and cohorte.pares_de("Otro organismo") == organismos
+    # Dimensiones con menos de COHORTE_MINIMA pares con puntaje no se informan
+    escasa = CohortePeriodo(cohorte.periodo, cohorte.organismos[:COHORTE_MINIMA + 1],
+                            cohorte.matriz[:COHORTE_MINIMA + 1].copy())
+    escasa.matriz[1:, 1] = np.nan
+    escasa = CohortePeriodo(escasa.periodo, escasa.organismos, escasa.matriz)
+    filas_escasas = comparar_evaluacion(escasa, catalogo, evaluacion, excluir=META[0])
+    assert all(f["pares"] >= COHORTE_MINIMA for f in filas_escasas)
+    assert dimensiones(catalogo)[1][1] not in {f["dimension"] for f in filas_escasas if f["tipo"] == "materia"}
+    resultado = calcular_cumplimiento(evaluacion, catalogo.materias_items, catalogo.indicadores_especificos,
+                                      catalogo.materia_peso_map)
+    docs = {}
+    for backend in BACKENDS:
+        with zipfile.ZipFile(obtener_exportador(backend)(*META, *resultado, evaluacion, None, filas)) as z:
+            docs[backend] = z.read("word/document.xml")
+    assert len(set(docs.values())) == 1 and "COMPARACIÓN CON OTROS ORGANISMOS".encode() in docs["xml"]
+    print(f"informe: OK ({len(filas)} filas de comparación, mismo word/document.xml en ambos generadores)")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
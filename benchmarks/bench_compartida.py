@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Caché compartida entre procesos (cache_compartida.py): N procesos, como
+# varios servidores de la app detrás de un proxy, con y sin el nivel común.
+#
+# 1. Catálogo: los N procesos arrancan a la vez con una versión nueva (cada
+#    uno con su directorio de snapshots); se cuenta cuántos la compilan.
+# 2. Informes: cada proceso atiende pedidos de informes Word de un mismo
+#    conjunto de evaluaciones (algunas mucho más pedidas que otras) con
+#    CacheInformes; se cuentan las generaciones y el tiempo total, y se
+#    verifica que todos los procesos entregan los mismos bytes por clave.
+# 3. Un hit compartido frente a generar, tope de tamaño con expulsión y
+#    contadores comunes (hits + misses = consultas de todos los procesos).
+#   python benchmarks/bench_compartida.py [procesos] [pedidos por proceso]
+import datetime
+import hashlib
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _datos import BASE, evaluacion_aleatoria
+
+from cache_compartida import MB, CacheCompartida
+from cache_informes import CacheInformes, clave_informe
+
+EVALUACIONES = 24
+META = ("Organismo de prueba", datetime.date(2024, 5, 31), "Evaluador(a)", "Mayo", 2024)
+
+
+def _compilar(args):
+    # Proceso: carga del catálogo con la versión aún sin snapshot
+    directorio, ruta_cache, barrera = args
+    import contextlib
+    import io
+
+    from catalogo import Catalogo
+    from versiones_catalogo import RegistroCatalogos
+
+    compilaciones = 0
+    original = Catalogo.desde_bytes
+
+    def contar(*a, **k):
+        nonlocal compilaciones
+        compilaciones += 1
+        return original(*a, **k)
+    Catalogo.desde_bytes = contar
+    compartida = CacheCompartida(ruta_cache) if ruta_cache else None
+    barrera.wait()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        catalogo = RegistroCatalogos(directorio, compartida).compilar(BASE)
+    return compilaciones, time.perf_counter() - t0, catalogo.version
+
+
+def _atender(args):
+    # Proceso: `pedidos` informes elegidos con pesos de Zipf entre las evaluaciones
+    indice, pedidos, ruta_cache, barrera = args
+    import contextlib
+    import io
+
+    from calculo import calcular_cumplimiento
+    from informe import exportar_informe
+    from versiones_catalogo import RegistroCatalogos
+
+    compartida = CacheCompartida(ruta_cache) if ruta_cache else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        catalogo = RegistroCatalogos(Path(ruta_cache or tempfile.mkdtemp()).parent / "catalogos",
+                                     compartida).compilar(BASE)
+    rng = random.Random(0)
+    evaluaciones = [evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, 1.0)
+                    for _ in range(EVALUACIONES)]
+    cache = CacheInformes(max_bytes=4 * MB, compartida=compartida)  # memoria del proceso: pocos informes
+    rng = random.Random(indice)
+    pesos = [1 / (k + 1) for k in range(EVALUACIONES)]
+    generaciones, huellas = 0, {}
+    # Importaciones diferidas del generador de Word fuera de la medición
+    exportar_informe(*META, *calcular_cumplimiento({}, catalogo.materias_items, catalogo.indicadores_especificos,
+                                                   catalogo.materia_peso_map), {})
+    barrera.wait()
+    t0 = time.perf_counter()
+    for k in rng.choices(range(EVALUACIONES), pesos, k=pedidos):
+        evaluacion = evaluaciones[k]
+
+        def generar():
+            nonlocal generaciones
+            generaciones += 1
+            resultado = calcular_cumplimiento(evaluacion, catalogo.materias_items, catalogo.indicadores_especificos,
+                                              catalogo.materia_peso_map)
+            return exportar_informe(*META, *resultado, evaluacion)
+        clave = clave_informe(catalogo.version, *META, evaluacion, "docx")
+        datos = cache.obtener_o_generar(clave, generar)
+        huellas[clave] = hashlib.sha256(datos).hexdigest()
+    dt = time.perf_counter() - t0
+    if compartida is not None:
+        compartida.cerrar()
+    return generaciones, dt, huellas, cache.hits
+
+
+def en_procesos(funcion, argumentos):
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Manager() as manager:
+        barrera = manager.Barrier(len(argumentos))
+        with contexto.Pool(len(argumentos)) as pool:
+            return pool.map(funcion, [(*a, barrera) for a in argumentos])
+
+
+def main(procesos=4, pedidos=40):
+    directorio = Path(tempfile.mkdtemp())
+
+    # 1. Catálogo
+    for nombre, ruta in (("sin caché compartida", None), ("con caché compartida", directorio / "catalogo.sqlite3")):
+        resultados = en_procesos(_compilar, [(directorio / f"{nombre}-{i}", ruta) for i in range(procesos)])
+        compilaciones = sum(r[0] for r in resultados)
+        assert len({r[2] for r in resultados}) == 1
+        print(f"catálogo nuevo, {procesos} procesos {nombre}: {compilaciones} compilaciones, "
+              f"carga máx {max(r[1] for r in resultados) * 1000:.0f} ms")
+        if ruta:
+            assert compilaciones == 1, compilaciones
+
+    # 2. Informes
+    totales = {}
+    for nombre, ruta in (("sin caché compartida", None), ("con caché compartida", directorio / "informes.sqlite3")):
+        resultados = en_procesos(_atender, [(i, pedidos, ruta) for i in range(procesos)])
+        generaciones = sum(r[0] for r in resultados)
+        dt = max(r[1] for r in resultados)  # desde la barrera hasta que termina el último proceso
+        distintas = set().union(*(r[2] for r in resultados))
+        totales[nombre] = dt
+        print(f"informes, {procesos} procesos x {pedidos} pedidos {nombre}: {generaciones} generaciones "
+              f"({len(distintas)} informes distintos), atención {dt * 1000:.0f} ms")
+        if ruta:
+            assert generaciones == len(distintas), (generaciones, len(distintas))
+            for clave in distintas:
+                assert len({r[2][clave] for r in resultados if clave in r[2]}) == 1
+            cache = CacheCompartida(ruta)
+            informe = cache.estadisticas()["informe"]
+            # Los pedidos que acierta la memoria de cada proceso no llegan a la caché compartida
+            assert informe["hits"] + informe["misses"] == procesos * pedidos - sum(r[3] for r in resultados), informe
+            print(f"  contadores comunes: {informe}")
+    print(f"  tiempo de atención x{totales['sin caché compartida'] / totales['con caché compartida']:.1f} menor")
+
+    # 3. Hit, tope de tamaño y expulsión
+    cache = CacheCompartida(directorio / "tope.sqlite3", max_bytes=8 * MB)
+    datos = random.Random(1).randbytes(60_000)
+    cache.guardar("informe", "ejemplo", datos)
+    t0 = time.perf_counter()
+    for _ in range(2000):
+        assert cache.obtener("informe", "ejemplo") is not None
+    hit = (time.perf_counter() - t0) / 2000
+    for k in range(400):  # 24 MB en entradas de 60 kB
+        cache.guardar("informe", str(k), datos)
+    total = cache._conexion().execute("SELECT SUM(bytes) FROM entradas").fetchone()[0]
+    estadisticas = cache.estadisticas()["informe"]
+    assert total <= 8 * MB and estadisticas["expulsiones"] > 0
+    assert cache.obtener("informe", "399") is not None and cache.obtener("informe", "0") is None
+    print(f"hit compartido de 60 kB: {hit * 1e6:.0f} µs; tope de 8 MB: {total / MB:.1f} MB tras escribir 24 MB, "
+          f"{estadisticas['expulsiones']} expulsiones de las entradas usadas hace más tiempo")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
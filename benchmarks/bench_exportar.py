@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Exportación de un lote a CSV, JSON y XLSX: una sola puntuación por
+# evaluación y memoria plana al crecer el lote.
+#   python benchmarks/bench_exportar.py [evaluaciones]
+import csv
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from _datos import cargar_catalogo, evaluacion_aleatoria
+
+import exportar_datos
+from catalogo import Catalogo
+from exportar_datos import FORMATOS, ResultadoExportacion, abrir_destino, exportar
+
+
+def lote(n, catalogo, semilla=0):
+    # Generador: cada evaluación se crea, se exporta y se descarta
+    rng = random.Random(semilla)
+    for i in range(n):
+        evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, 0.8)
+        yield ResultadoExportacion(catalogo, evaluacion, f"Organismo {i}", 2024, "Mayo", None, "Analista")
+
+
+def exportar_lote(n, catalogo, directorio, formatos=FORMATOS):
+    destinos = {f: abrir_destino(directorio / f"lote.{f}", f) for f in formatos}
+    try:
+        return exportar(lote(n, catalogo), destinos)
+    finally:
+        for archivo in destinos.values():
+            archivo.close()
+
+
+def main(n=1000):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    catalogo = Catalogo(materias_items, indicadores_especificos)
+    directorio = Path(tempfile.mkdtemp())
+
+    # Una llamada a calcular_cumplimiento por evaluación, con tres formatos
+    llamadas = 0
+    original = exportar_datos.calcular_cumplimiento
+
+    def contar(*args, **kwargs):
+        nonlocal llamadas
+        llamadas += 1
+        return original(*args, **kwargs)
+
+    exportar_datos.calcular_cumplimiento = contar
+    try:
+        exportar_lote(50, catalogo, directorio)
+    finally:
+        exportar_datos.calcular_cumplimiento = original
+    assert llamadas == 50, llamadas
+
+    with open(directorio / "lote.csv", encoding="utf-8-sig", newline="") as f:
+        assert sum(1 for _ in csv.reader(f)) == 1 + 50 * len(catalogo.items)
+    with open(directorio / "lote.json", encoding="utf-8") as f:
+        assert len(json.load(f)) == 50
+    print("una puntuación por evaluación y formatos consistentes: OK")
+
+    for formato in FORMATOS + ("csv,json,xlsx",):
+        formatos = tuple(formato.split(","))
+        t0 = time.perf_counter()
+        exportar_lote(n, catalogo, directorio, formatos)
+        segundos = time.perf_counter() - t0
+        tamanos = ", ".join(f"{f} {(directorio / f'lote.{f}').stat().st_size / 1e6:.1f} MB" for f in formatos)
+        print(f"{formato:>13}: {n} evaluaciones en {segundos:.2f} s ({n / segundos:,.0f}/s) -> {tamanos}")
+
+    for m in (n // 4, n):
+        tracemalloc.start()
+        exportar_lote(m, catalogo, directorio)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"memoria máxima con {m} evaluaciones: {pico / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
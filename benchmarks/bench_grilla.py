@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Ingreso en grilla por materia (grilla.py) frente al formulario por ítem.
+#
+# 1. Equivalencia: una evaluación aleatoria escrita como ediciones de la grilla
+#    produce los mismos registros que el formulario por ítem, y los estados no
+#    válidos los mismos errores que validar_respuestas.
+# 2. Reruns para completar una evaluación: en el formulario por ítem, la cuenta
+#    mínima de clics (materia, ítem, cada respuesta distinta de la opción por
+#    defecto, guardar + st.rerun); en la grilla, elegir materia y enviar.
+# 3. La app con AppTest: cada materia se completa con un envío de la grilla y
+#    se verifica la evaluación en sesión y en el almacén.
+#   python benchmarks/bench_grilla.py [evaluaciones]
+import os
+import random
+import sys
+import time
+
+from _datos import BASE, entorno_temporal, evaluacion_aleatoria, evaluacion_item
+
+from catalogo import Catalogo
+from grilla import aplicar_ediciones, filas_grilla, items_materia, procesar_grilla
+from sesion_compacta import BorradoresItems
+from validacion import IG12_OPCIONES, estado_desde_registro, registro_desde_estado, validar_respuestas
+
+
+def cambios_grilla(catalogo, materia, evaluacion):
+    # Cambios de st.data_editor que escriben la evaluación sobre una grilla vacía
+    filas_items, filas_ie = filas_grilla(catalogo, materia, BorradoresItems(catalogo), {})
+    editadas_items, editadas_ie = {}, {}
+    estados = {}
+    for i, fila in enumerate(filas_items):
+        registro = evaluacion.get(catalogo.items[fila["ID"]].clave)
+        if registro is None:
+            continue
+        state = estados[fila["ID"]] = estado_desde_registro(registro)
+        editadas_items[i] = {"Escenario": state["escenario"], "IG1": state["ig1"], "IG2": state["ig2"],
+                             "IG3": state["ig3"], "Observaciones": state["obs"]}
+    for i, fila in enumerate(filas_ie):
+        respuesta = estados.get(fila["ID"], {"ie": {}})["ie"].get(fila["Código"])
+        if respuesta is not None:
+            editadas_ie[str(i)] = {"Respuesta": respuesta}  # el navegador envía índices como texto
+    return (filas_items, {"edited_rows": editadas_items}), (filas_ie, {"edited_rows": editadas_ie})
+
+
+def verificar(catalogo, evaluacion, rng):
+    registros = {}
+    for materia in catalogo.materias_map:
+        (filas_items, c_items), (filas_ie, c_ie) = cambios_grilla(catalogo, materia, evaluacion)
+        nuevos, errores, _ = procesar_grilla(catalogo, aplicar_ediciones(filas_items, c_items),
+                                             aplicar_ediciones(filas_ie, c_ie), {})
+        assert not errores, errores
+        registros.update(nuevos)
+    esperado = {}
+    for clave, registro in evaluacion.items():
+        item = catalogo.items_por_clave[clave]
+        esperado[clave] = registro_desde_estado(estado_desde_registro(registro), item.ies)
+    assert registros == esperado
+
+    # Estados alterados: mismos errores que validar_respuestas, nada se guarda
+    for item in rng.sample(list(catalogo.items.values()), 10):
+        state = estado_desde_registro(evaluacion_item(rng, item.ies))
+        campo = rng.choice(["ig1", "ig2", "ig3", "ie"])
+        if campo == "ie":
+            if not item.ies:
+                continue
+            state["ie"][item.ies[0]["codigo"]] = "Tal vez"
+        else:
+            state[campo] = rng.choice(IG12_OPCIONES)
+            state["escenario"] = rng.choice([state["escenario"], "4. No hay sección y sí hay evidencia de información faltante."])
+        borradores = BorradoresItems(catalogo)
+        borradores._borradores[item.id] = state  # estado sin compactar, tal cual
+        filas_items, filas_ie = filas_grilla(catalogo, item.materia, borradores, {})
+        nuevos, errores, _ = procesar_grilla(catalogo, filas_items, filas_ie, {})
+        mensajes = validar_respuestas(state, item.ies)
+        assert errores.get(item.clave, []) == mensajes, (errores, mensajes)
+        assert (item.clave in nuevos) == (not mensajes)
+
+
+def reruns_por_item(catalogo, evaluacion):
+    # Mínimo de reruns del formulario por ítem (la primera materia e ítem ya vienen elegidos)
+    total = 0
+    for materia in catalogo.materias_map:
+        items = [i for i in items_materia(catalogo, materia) if i.clave in evaluacion]
+        if not items:
+            continue
+        total += 1
+        for n, item in enumerate(items):
+            state = estado_desde_registro(evaluacion[item.clave])
+            total += (n > 0) + (not state["escenario"].startswith("1"))
+            total += (state["ig1"] == "No") + (state["ig2"] == "No") + (state["ig3"] not in (None, "Sí"))
+            total += sum(r != "Sí" for r in state["ie"].values())
+            total += 2  # Guardar ítem + st.rerun() para el panel de avance
+    return total
+
+
+def reruns_grilla(catalogo, evaluacion):
+    # Cambiar de modo una vez; por materia, elegirla y enviar el formulario
+    materias = {catalogo.items_por_clave[clave].materia for clave in evaluacion}
+    return 1 + 2 * len(materias)
+
+
+def recorrer_app(catalogo, evaluacion):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.update(entorno_temporal())
+    at = AppTest.from_file(str(BASE / "app.py"), default_timeout=120).run()
+    at.text_input[0].input("Organismo grilla")
+    at.text_input[1].input("Evaluador(a)")
+    at.button[0].click().run()
+    next(r for r in at.radio if r.label == "Modo de ingreso").set_value("Grilla por materia").run()
+    tiempos = []
+    for materia in catalogo.materias_map:
+        if not any(i.clave in evaluacion for i in items_materia(catalogo, materia)):
+            continue
+        at.selectbox[1].set_value(materia).run()
+        # Las respuestas llegan como borradores: la grilla los muestra y el envío los valida y guarda
+        borradores = at.session_state["item_states"]
+        for item in items_materia(catalogo, materia):
+            if item.clave in evaluacion:
+                borradores.guardar(item.clave, estado_desde_registro(evaluacion[item.clave]))
+        t0 = time.perf_counter()
+        next(b for b in at.button if b.label == "Guardar materia").click().run()
+        tiempos.append(time.perf_counter() - t0)
+        assert not at.exception and not at.error, (at.exception, [e.value for e in at.error])
+    guardada = at.session_state["evaluacion"]
+    assert {k: guardada[k] for k in guardada} == {k: registro_desde_estado(estado_desde_registro(r),
+                                                                            catalogo.items_por_clave[k].ies)
+                                                  for k, r in evaluacion.items()}
+    from almacen import AlmacenEvaluaciones
+
+    almacen = AlmacenEvaluaciones.desde_entorno()
+    en_almacen, _ = almacen.cargar_evaluacion(at.session_state["evaluacion_id"], catalogo)
+    assert en_almacen == {k: guardada[k] for k in guardada}
+    assert at.sidebar.caption[0].value == f"Ítems guardados: {len(evaluacion)} de {len(catalogo.items)}"
+    return tiempos
+
+
+def main(n=30):
+    catalogo = Catalogo.desde_archivos(BASE)
+    rng = random.Random(21)
+    evaluaciones = [evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, f)
+                    for f in (0.5, 1.0) * (n // 2 + 1)][:n]
+    for evaluacion in evaluaciones:
+        verificar(catalogo, evaluacion, rng)
+    print(f"equivalencia: OK ({n} evaluaciones; mismos registros que el formulario por ítem, "
+          f"mismos errores que validar_respuestas)")
+
+    completas = [e for e in evaluaciones if len(e) == len(catalogo.items)]
+    por_item = sum(reruns_por_item(catalogo, e) for e in completas) / len(completas)
+    en_grilla = sum(reruns_grilla(catalogo, e) for e in completas) / len(completas)
+    print(f"reruns por evaluación completa ({len(catalogo.items)} ítems, {len(catalogo.materias_map)} materias): "
+          f"ítem por ítem {por_item:.0f}, grilla {en_grilla:.0f} (x{por_item / en_grilla:.1f} menos)")
+
+    tiempos = recorrer_app(catalogo, completas[0])
+    tiempos.sort()
+    print(f"app: {len(tiempos)} envíos de la grilla, evaluación guardada en sesión y almacén; "
+          f"rerun del envío p50 {tiempos[len(tiempos) // 2] * 1000:.0f} ms, máx {tiempos[-1] * 1000:.0f} ms, "
+          f"total {sum(tiempos):.1f} s")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
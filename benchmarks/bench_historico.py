@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# Histórico de resultados (historico.py): sincronización y latencia de las
+# consultas del tablero con miles de evaluaciones, frente a OBJETIVOS_MS, y
+# verificación contra calcular_cumplimiento y cálculos en Python puro.
+#   python benchmarks/bench_historico.py [organismos] [meses]
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from _datos import BASE, evaluacion_aleatoria
+
+from almacen import AlmacenEvaluaciones
+from calculo import MESES_ESP, calcular_cumplimiento
+from catalogo import IE_MARCADOR, Catalogo
+from historico import (OBJETIVOS_MS, HistoricoEvaluaciones, codigos_recurrentes, fallas_recurrentes, periodo,
+                       tendencias, variaciones_mensuales)
+
+
+def poblar(almacen, catalogo, organismos, meses, semilla=20):
+    rng = random.Random(semilla)
+    ids = {r.clave: r.id for r in catalogo.items.values()}
+    evaluaciones = []
+    for o in range(organismos):
+        for p in range(meses):
+            anio, mes = 2020 + p // 12, MESES_ESP[p % 12]
+            evaluacion_id = almacen.abrir_evaluacion(f"Organismo {o:04d}", anio, mes, "Analista")
+            evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos,
+                                              rng.choice([0.7, 1.0]))
+            almacen.guardar_items(evaluacion_id, [(ids[k], r) for k, r in evaluacion.items()])
+            evaluaciones.append(evaluacion_id)
+    return evaluaciones
+
+
+def cronometrar(funcion, repeticiones=15):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], tiempos[int(0.95 * (len(tiempos) - 1))]
+
+
+def verificar(historico, almacen, catalogo, ids, globales, fallas):
+    args = (catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+    guardados = globales.set_index("evaluacion_id")["cumplimiento_global"]
+    for evaluacion_id in ids[::max(1, len(ids) // 40)]:
+        evaluacion, _ = almacen.cargar_evaluacion(evaluacion_id, catalogo)
+        assert guardados[evaluacion_id] == calcular_cumplimiento(evaluacion, *args)[0], evaluacion_id
+
+    # Pendiente por organismo igual a np.polyfit
+    t = tendencias(globales).set_index("organismo")
+    for organismo, grupo in list(globales.groupby("organismo"))[:10]:
+        pendiente = np.polyfit(grupo["periodo"].astype(float), grupo["cumplimiento_global"], 1)[0]
+        assert abs(t.loc[organismo, "pendiente"] - pendiente) < 1e-6, (organismo, pendiente)
+
+    # Variación mensual igual a recorrer cada organismo en orden
+    v = variaciones_mensuales(globales)
+    esperado = []
+    for organismo, grupo in globales.sort_values(["organismo", "periodo"]).groupby("organismo"):
+        valores = grupo["cumplimiento_global"].tolist()
+        esperado += [None] + [b - a for a, b in zip(valores, valores[1:])]
+    obtenido = v["variacion"].tolist()
+    assert all((a is None and b != b) or abs(a - b) < 1e-9 for a, b in zip(esperado, obtenido))
+
+    # Fallas recurrentes iguales a contar períodos por (organismo, ítem, código)
+    periodos = defaultdict(set)
+    for clave, p in zip(zip(fallas["organismo"], fallas["item_id"], fallas["codigo"]), fallas["periodo"]):
+        periodos[clave].add(p)
+    esperado = {k: len(v) for k, v in periodos.items() if len(v) >= 3}
+    r = fallas_recurrentes(fallas, 3)
+    claves = list(zip(r["organismo"], r["item_id"], r["codigo"]))
+    assert dict(zip(claves, r["periodos"])) == esperado
+    for clave, ultimo, racha in zip(claves, r["ultimo"], r["racha_actual"]):
+        n = 0
+        while ultimo - n in periodos[clave]:
+            n += 1
+        assert racha == n
+
+
+def verificar_marcador(catalogo):
+    # IE0 se repite en varios ítems: fallas de ítems distintos no forman una racha
+    # y dos ítems con IE0 que fallan en el mismo mes siguen siendo dos fallas
+    con_marcador = [r.id for r in catalogo.items.values() if any(ie["codigo"] == IE_MARCADOR for ie in r.ies)]
+    a, b, c = con_marcador[:3]
+    filas = [("A", 100, a), ("A", 101, b), ("A", 102, c),              # tres ítems distintos, un mes cada uno
+             ("B", 100, a), ("B", 100, b), ("B", 101, a), ("B", 101, b), ("B", 102, a), ("B", 102, b)]
+    fallas = pd.DataFrame(filas, columns=["organismo", "periodo", "item_id"]).assign(codigo=IE_MARCADOR)
+    r = fallas_recurrentes(fallas, 3)
+    assert sorted(zip(r["organismo"], r["item_id"], r["periodos"], r["racha_actual"])) == \
+        [("B", a, 3, 3), ("B", b, 3, 3)], r
+    por_codigo = codigos_recurrentes(r)
+    assert sorted(zip(por_codigo["item_id"], por_codigo["organismos"])) == [(a, 1), (b, 1)], por_codigo
+
+
+def main(organismos=100, meses=50):
+    catalogo = Catalogo.desde_archivos(BASE)
+    ruta = Path(tempfile.mkdtemp()) / "evaluaciones.sqlite3"
+    almacen = AlmacenEvaluaciones(ruta)
+    t0 = time.perf_counter()
+    ids = poblar(almacen, catalogo, organismos, meses)
+    # Evaluaciones abiertas sin ítems guardados (datos generales enviados en la app)
+    vacias = [almacen.abrir_evaluacion(f"Organismo vacío {o}", 2020, MESES_ESP[o % 12], "Analista") for o in range(5)]
+    vacias.append(almacen.abrir_evaluacion("Organismo 0000", 2020 + meses // 12, MESES_ESP[meses % 12], "Analista"))
+    print(f"{len(ids)} evaluaciones ({organismos} organismos x {meses} meses) guardadas en "
+          f"{time.perf_counter() - t0:.1f} s")
+
+    historico = HistoricoEvaluaciones(almacen, catalogo)
+    t0 = time.perf_counter()
+    n = historico.sincronizar()
+    dt = time.perf_counter() - t0
+    assert n == len(ids) + len(vacias)
+    print(f"sincronizar inicial: {n} evaluaciones en {dt:.2f} s ({n / dt:,.0f} evaluaciones/s)")
+
+    # Sólo se vuelve a puntuar lo modificado
+    evaluacion, _ = almacen.cargar_evaluacion(ids[0], catalogo)
+    clave, registro = next(iter(evaluacion.items()))
+    almacen.guardar_item(ids[0], catalogo.items_por_clave[clave].id, dict(registro, obs="editado"))
+    assert historico.sincronizar() == 1 and historico.sincronizar() == 0
+
+    globales, materias, fallas = historico.globales(), historico.materias(), historico.fallas()
+    assert not set(vacias) & set(globales["evaluacion_id"]) and (globales["n_items"] > 0).all()
+    assert not any(o.startswith("Organismo vacío") for o in historico.organismos())
+    assert len(globales) == len(ids) and tendencias(globales)["hasta"].max() < periodo(2020 + meses // 12,
+                                                                                      MESES_ESP[meses % 12])
+    verificar(historico, almacen, catalogo, ids, globales, fallas)
+    verificar_marcador(catalogo)
+    print(f"equivalencia: OK (cumplimiento guardado = calcular_cumplimiento; tendencias, variaciones y "
+          f"fallas recurrentes = cálculo en Python, IE0 por ítem)  [{len(materias):,} filas por materia, {len(fallas):,} fallas de IE]")
+
+    consultas = {
+        "sincronizar": historico.sincronizar,
+        "extraer": lambda: (historico.globales(), historico.materias(), historico.fallas()),
+        "tendencias": lambda: (tendencias(globales), tendencias(materias, ("organismo", "materia"), "porcentaje")),
+        "variaciones": lambda: (variaciones_mensuales(globales),
+                                variaciones_mensuales(materias, ("organismo", "materia"), "porcentaje")),
+        "fallas_recurrentes": lambda: fallas_recurrentes(fallas, 3),
+    }
+    fuera = 0
+    for nombre, funcion in consultas.items():
+        p50, p95 = cronometrar(funcion)
+        objetivo = OBJETIVOS_MS[nombre]
+        fuera += p95 > objetivo
+        print(f"{nombre:<20} p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  objetivo {objetivo:5d} ms  "
+              f"{'OK' if p95 <= objetivo else 'FUERA'}")
+    organismo = globales["organismo"].iloc[0]
+    p50, p95 = cronometrar(lambda: (historico.globales(organismo), historico.materias(organismo),
+                                    historico.fallas(organismo)))
+    print(f"{'extraer 1 organismo':<20} p50 {p50:8.1f} ms  p95 {p95:8.1f} ms")
+    return 1 if fuera else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:3]]))
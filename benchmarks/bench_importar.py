@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Importación de una planilla grande: exactitud y filas por segundo.
+#   python benchmarks/bench_importar.py [evaluaciones]
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from _datos import cargar_catalogo, evaluacion_aleatoria
+
+from catalogo import Catalogo
+from importar_excel import COLUMNAS_PLANTILLA, importar_excel
+
+
+def escribir_planilla(ruta, evaluaciones, catalogo):
+    from openpyxl import Workbook
+
+    codigos = list(catalogo.ie_texto)
+    indice = {c: i for i, c in enumerate(codigos)}
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Evaluación")
+    ws.append(COLUMNAS_PLANTILLA + codigos)
+    for (organismo, anio, mes), evaluacion in evaluaciones.items():
+        for key, registro in evaluacion.items():
+            item = catalogo.items_por_clave[key]
+            ig = [v if registro["escenario"].startswith("1") else None for v in registro["ig"]]
+            ies = [None] * len(codigos)
+            for ie in registro["ie"]:
+                ies[indice[ie["codigo"]]] = ie["respuesta"]
+            ws.append([organismo, anio, mes, "Analista", "31/05/2024", item.id, None, None,
+                       registro["escenario"][0], *ig, registro["obs"]] + ies)
+    # Una fila con errores para verificar el reporte
+    ws.append(["Organismo X", 2024, "Mayo", "", "", 9999, None, None, 1, "Sí"])
+    wb.save(ruta)
+
+
+def main(n=500):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    catalogo = Catalogo(materias_items, indicadores_especificos)
+    rng = random.Random(5)
+    evaluaciones = {(f"Organismo {i}", 2024, "Mayo"): evaluacion_aleatoria(rng, materias_items, indicadores_especificos, 0.8)
+                    for i in range(n)}
+    ruta = Path(tempfile.mkdtemp()) / "importacion.xlsx"
+    escribir_planilla(ruta, evaluaciones, catalogo)
+
+    resultado = importar_excel(ruta, catalogo)
+    # Segunda pasada sólo para medir memoria: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    importar_excel(ruta, catalogo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert [f for f, _ in resultado.errores] == [resultado.filas + 1], resultado.errores
+    for periodo, evaluacion in evaluaciones.items():
+        assert resultado.evaluaciones[periodo]["evaluacion"] == evaluacion, periodo
+    print(f"planilla: {ruta.stat().st_size / 1e6:.1f} MB, {resultado.filas} filas")
+    print(resultado.resumen())
+    print(f"memoria máxima (tracemalloc): {pico / 1e6:.1f} MB")
+    print("exactitud: OK")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Costo por actualización de MarcadorIncremental. Su igualdad con
+# calcular_cumplimiento la prueban tests/test_incremental.py.
+#   python benchmarks/bench_incremental.py [secuencias] [pasos]
+import random
+import sys
+import time
+
+from _datos import cargar_catalogo, evaluacion_item
+
+from calculo import MarcadorIncremental, construir_materia_peso_map
+
+
+def main(secuencias=200, pasos=150):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    peso_map = construir_materia_peso_map(materias_items)
+    claves = [f"{mi['Materia']} || {mi['Ítem']}" for mi in materias_items]
+    rng = random.Random(11)
+    tiempo, actualizaciones = 0.0, 0
+    for _ in range(secuencias):
+        marcador = MarcadorIncremental(materias_items, peso_map)
+        for _ in range(pasos):
+            key = rng.choice(claves)  # incluye sobrescrituras de ítems ya guardados
+            registro = evaluacion_item(rng, indicadores_especificos.get(key, []))
+            t0 = time.perf_counter()
+            marcador.actualizar(key, registro)
+            tiempo += time.perf_counter() - t0
+            actualizaciones += 1
+    print(f"actualizaciones: {actualizaciones}")
+    print(f"costo por actualización: {1e6 * tiempo / actualizaciones:.1f} µs")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
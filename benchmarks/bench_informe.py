@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Rendimiento de los generadores de informe Word. La equivalencia de sus
+# documentos la prueban tests/test_informe.py.
+#   python benchmarks/bench_informe.py [repeticiones]
+import datetime
+import sys
+import time
+
+from _datos import cargar_catalogo, evaluacion_peor_caso
+
+from calculo import calcular_cumplimiento
+from informe import BACKENDS, obtener_exportador
+
+META = ("Organismo <de prueba> & Cía.", datetime.date(2024, 5, 31), "Evaluador(a)  ", "Mayo", 2024)
+
+
+def main(repeticiones=10):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    peor = evaluacion_peor_caso(materias_items, indicadores_especificos)
+    resultado = calcular_cumplimiento(peor, materias_items, indicadores_especificos)
+    for backend in BACKENDS:
+        exportador = obtener_exportador(backend)
+        exportador(*META, *resultado, peor)  # calentamiento (plantilla, imports)
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            tamano = len(exportador(*META, *resultado, peor).getvalue())
+        dt = (time.perf_counter() - t0) / repeticiones
+        print(f"{backend:5s} peor caso: {1000 * dt:8.1f} ms/informe, {tamano / 1e3:.0f} kB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
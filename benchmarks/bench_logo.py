@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Tiempo por rerun de show_logo: codificación original frente a activos.logo_html.
+#   python benchmarks/bench_logo.py [reruns]
+import base64
+import os
+import sys
+import time
+from io import BytesIO
+
+from _datos import BASE, entorno_temporal
+
+
+def logo_original(logo_light, logo_dark):
+    # Lo que hacía show_logo() en cada rerun antes de activos.py
+    from PIL import Image
+    partes = []
+    for ruta in (logo_light, logo_dark):
+        img = Image.open(ruta)
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+        partes.append(base64.b64encode(buffered.getvalue()).decode())
+    return partes
+
+
+def medir(funcion, reruns):
+    t0 = time.perf_counter()
+    for _ in range(reruns):
+        resultado = funcion()
+    return (time.perf_counter() - t0) / reruns, resultado
+
+
+def main(reruns=20):
+    # Caché de logos en un directorio temporal (activos la fija al importarse): la
+    # primera llamada es siempre en frío y no se escribe en datos/
+    os.environ.update(entorno_temporal())
+    from activos import logo_html
+
+    light, dark = BASE / "TRIVIA.png", BASE / "TRIVIA_dark.png"
+    t_orig, partes = medir(lambda: logo_original(light, dark), max(1, reruns // 10))
+    t0 = time.perf_counter()
+    logo_html(light, dark, 180)
+    t_primera = time.perf_counter() - t0
+    t_cache, html = medir(lambda: logo_html(light, dark, 180), reruns * 1000)
+    print(f"original:        {1000 * t_orig:9.2f} ms/rerun, {sum(len(p) for p in partes) / 1e6:.2f} MB de HTML")
+    print(f"primera llamada: {1000 * t_primera:9.2f} ms")
+    print(f"con caché:       {1000 * t_cache:9.4f} ms/rerun, {len(html) / 1e3:.1f} kB de HTML")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Informes por lote: escalamiento con 1/2/4/8 procesos y aislamiento de fallas.
+#   python benchmarks/bench_lote.py [informes] [xml|docx]
+# Con el generador xml cada informe toma pocos ms y el costo del pool pesa; con
+# docx (python-docx, ~0.5 s por informe) el lote escala con los núcleos.
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+from _datos import cargar_catalogo, evaluacion_aleatoria
+
+from catalogo import Catalogo
+from lote_informes import TareaInforme, generar_informe, generar_zip
+
+
+def tareas(n, catalogo, semilla=0):
+    rng = random.Random(semilla)
+    for i in range(n):
+        evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos)
+        yield TareaInforme(f"Organismo {i}", 2024, "Mayo", datetime.date(2024, 5, 31), "Analista", evaluacion)
+
+
+def documento(docx):
+    with zipfile.ZipFile(BytesIO(docx)) as z:
+        return z.read("word/document.xml")
+
+
+def main(n=200, backend="xml"):
+    materias_items, indicadores_especificos = cargar_catalogo()
+    catalogo = Catalogo(materias_items, indicadores_especificos)
+    directorio = Path(tempfile.mkdtemp())
+    print(f"núcleos disponibles: {os.cpu_count()}")
+
+    # Un informe que falla no detiene el lote y queda en errores.txt
+    lote = list(tareas(6, catalogo))
+    clave = next(iter(lote[2].evaluacion))
+    lote[2].evaluacion[clave]["obs"] = "control \x00"
+    resultado = generar_zip(lote, directorio / "fallas.zip", catalogo, 2)
+    with zipfile.ZipFile(directorio / "fallas.zip") as z:
+        assert len(resultado.generados) == 5 and len(resultado.errores) == 1, resultado.resumen()
+        assert "errores.txt" in z.namelist() and len(z.namelist()) == 6
+        for tarea in lote[:2] + lote[3:]:
+            # docProps/core.xml lleva la hora de creación de la plantilla de cada proceso
+            assert documento(z.read(tarea.nombre_archivo())) == documento(generar_informe(tarea, catalogo))
+    print("aislamiento de fallas e informes idénticos a la generación en serie: OK")
+
+    t0 = time.perf_counter()
+    for tarea in tareas(n, catalogo):
+        generar_informe(tarea, catalogo, backend)
+    base = time.perf_counter() - t0
+    print(f"generador {backend}, en serie, sin pool: {n} informes en {base:.2f} s ({n / base:.0f}/s)")
+    for trabajadores in (1, 2, 4, 8):
+        resultado = generar_zip(tareas(n, catalogo), directorio / "lote.zip", catalogo, trabajadores,
+                                backend=backend, total=n)
+        assert not resultado.errores
+        print(f"{trabajadores} procesos: {n} informes en {resultado.segundos:.2f} s "
+              f"({n / resultado.segundos:.0f}/s, x{base / resultado.segundos:.2f} respecto de la serie)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, sys.argv[2] if len(sys.argv) > 2 else "xml")
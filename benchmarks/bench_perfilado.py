@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Costo de perfilado.etapa() con la instrumentación desactivada y activada.
+#   python benchmarks/bench_perfilado.py [iteraciones]
+import sys
+import time
+
+import _datos  # noqa: F401  (agrega la raíz del repositorio a sys.path)
+
+from perfilado import etapa, iniciar_perfil, terminar_perfil
+
+
+def por_iteracion(funcion, n):
+    t0 = time.perf_counter()
+    funcion(n)
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def vacio(n):
+    for _ in range(n):
+        pass
+
+
+def con_etapa(n):
+    for _ in range(n):
+        with etapa("x"):
+            pass
+
+
+def main(n=1_000_000):
+    base = por_iteracion(vacio, n)
+    desactivado = por_iteracion(con_etapa, n) - base
+    perfil = iniciar_perfil("bench")
+    activado = por_iteracion(con_etapa, n) - base
+    terminar_perfil(perfil)
+    print(f"etapa() desactivada: {desactivado:.0f} ns por uso")
+    print(f"etapa() activada:    {activado:.0f} ns por uso")
+    # app.py usa unas 10 etapas por rerun completo
+    print(f"sobrecosto desactivado por rerun (~10 etapas): {10 * desactivado / 1000:.1f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
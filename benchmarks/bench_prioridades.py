@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Prioridades de mejora (prioridades.py) frente a volver a puntuar la
+# evaluación con calcular_cumplimiento una vez por corrección candidata.
+#   python benchmarks/bench_prioridades.py [evaluaciones]
+import copy
+import datetime
+import random
+import sys
+import time
+import zipfile
+
+from _datos import BASE, evaluacion_aleatoria, evaluacion_peor_caso
+
+from calculo import ESCENARIOS, calcular_cumplimiento
+from catalogo import Catalogo
+from informe import BACKENDS, obtener_exportador
+from prioridades import LIMITE_INFORME, candidatos, priorizar
+
+META = ("Organismo de prueba", datetime.date(2024, 5, 31), "Evaluador(a)", "Mayo", 2024)
+
+
+def corregir(evaluacion, catalogo, candidato):
+    # La misma corrección que prioridades.priorizar, aplicada sobre el dict
+    clave, indicador = candidato[0], candidato[1]
+    nueva = copy.deepcopy(dict(evaluacion))
+    registro = nueva[clave]
+    if indicador in ("Escenario", "IG1", "IG2"):
+        registro["escenario"] = ESCENARIOS[0]
+        registro["ig"] = ["Sí", "Sí", "Sí"]
+        registro["ie"] = [{"codigo": ie["codigo"], "texto": ie["texto"], "respuesta": "Sí"}
+                          for ie in catalogo.items_por_clave[clave].ies]
+    elif indicador == "IG3":
+        registro["ig"][2] = "Sí"
+    else:
+        # Un solo IE (el primero con ese código en "No")
+        ie = next(e for e in registro["ie"] if e["codigo"] == indicador and e["respuesta"] == "No")
+        ie["respuesta"] = "Sí"
+    return nueva
+
+
+def priorizar_ingenuo(evaluacion, catalogo):
+    args = (catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+    base = calcular_cumplimiento(evaluacion, *args)[0]
+    nuevos = []
+    for candidato in candidatos(evaluacion, catalogo):
+        nuevos.append((candidato, calcular_cumplimiento(corregir(evaluacion, catalogo, candidato), *args)[0]))
+    return base, nuevos
+
+
+def verificar(evaluacion, catalogo):
+    base, nuevos = priorizar_ingenuo(evaluacion, catalogo)
+    prioridades = priorizar(evaluacion, catalogo)
+    assert len(prioridades) == len(nuevos)
+    esperados = {}
+    for candidato, nuevo in nuevos:
+        esperados.setdefault((candidato[0], candidato[1]), []).append(nuevo)
+    for p in prioridades:
+        nuevo = p["cumplimiento_nuevo"]
+        assert nuevo in esperados[(p["clave"], p["indicador"])], (p, esperados[(p["clave"], p["indicador"])])
+        # El aumento sin redondear explica el nuevo global (ambos globales van redondeados)
+        assert abs(base + p["ganancia"] - nuevo) <= 0.1 + 1e-9, (base, p)
+        assert p["ganancia"] >= 0  # 0 en materias con peso 0
+    ganancias = [p["ganancia"] for p in prioridades]
+    assert ganancias == sorted(ganancias, reverse=True)
+    return len(prioridades)
+
+
+def documento(backend, catalogo, evaluacion):
+    resultado = calcular_cumplimiento(evaluacion, catalogo.materias_items, catalogo.indicadores_especificos,
+                                      catalogo.materia_peso_map)
+    prioridades = priorizar(evaluacion, catalogo, LIMITE_INFORME)
+    with zipfile.ZipFile(obtener_exportador(backend)(*META, *resultado, evaluacion, prioridades)) as z:
+        return z.read("word/document.xml")
+
+
+def cronometrar(funcion, evaluaciones):
+    t0 = time.perf_counter()
+    for evaluacion in evaluaciones:
+        funcion(evaluacion)
+    return (time.perf_counter() - t0) / len(evaluaciones)
+
+
+def main(n=50):
+    catalogo = Catalogo.desde_archivos(BASE)
+    rng = random.Random(19)
+    evaluaciones = [evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, f)
+                    for f in (0.3, 0.7, 1.0) * (n // 3 + 1)][:n]
+    peor = evaluacion_peor_caso(catalogo.materias_items, catalogo.indicadores_especificos)
+
+    total = sum(verificar(e, catalogo) for e in evaluaciones) + verificar(peor, catalogo)
+    print(f"equivalencia: OK ({total} correcciones, mismo cumplimiento global que calcular_cumplimiento)")
+    docs = {b: documento(b, catalogo, peor) for b in BACKENDS}
+    assert len(set(docs.values())) == 1 and "PRIORIDADES DE MEJORA".encode() in docs["xml"]
+    print("informe: OK (sección PRIORIDADES DE MEJORA, mismo word/document.xml en ambos generadores)")
+
+    priorizar(peor, catalogo)  # calentamiento (NumPy, motor)
+    for nombre, lista in (("aleatorias", evaluaciones), ("peor caso", [peor] * 5)):
+        por_eval = sum(len(candidatos(e, catalogo)) for e in lista) / len(lista)
+        ingenuo = cronometrar(lambda e: priorizar_ingenuo(e, catalogo), lista)
+        vectorizado = cronometrar(lambda e: priorizar(e, catalogo), lista)
+        print(f"{nombre:<11} {por_eval:6.1f} correcciones/evaluación: "
+              f"re-puntuar {ingenuo * 1000:8.2f} ms, vectorizado {vectorizado * 1000:6.2f} ms "
+              f"(x{ingenuo / vectorizado:.0f})")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Memoria por sesión de la evaluación compacta (sesion_compacta.py) frente a
+# los dicts de texto anteriores, y verificación de que puntaje, clave de caché
+# e informe Word no cambian.
+#   python benchmarks/bench_sesion.py [sesiones]
+import datetime
+import random
+import sys
+import time
+import tracemalloc
+import zipfile
+
+from _datos import BASE, evaluacion_aleatoria
+
+from cache_informes import clave_informe
+from calculo import calcular_cumplimiento
+from catalogo import Catalogo
+from informe import obtener_exportador
+from sesion_compacta import BorradoresItems, EvaluacionCompacta
+from validacion import estado_desde_registro
+
+META = ("Organismo de prueba", datetime.date(2024, 5, 31), "Evaluador(a)", "Mayo", 2024)
+
+
+def sesion_dicts(evaluacion):
+    # Lo que guardaba app.py: registros con textos y un estado por ítem
+    copia = {k: {"escenario": r["escenario"], "ig": list(r["ig"]), "ie": [dict(e) for e in r["ie"]], "obs": r["obs"]}
+             for k, r in evaluacion.items()}
+    return copia, {k: estado_desde_registro(r) for k, r in copia.items()}
+
+
+def sesion_compacta(catalogo, evaluacion):
+    compacta = EvaluacionCompacta(catalogo, evaluacion)
+    borradores = BorradoresItems(catalogo)
+    for k, r in evaluacion.items():
+        borradores.guardar(k, estado_desde_registro(r))
+    return compacta, borradores
+
+
+def bytes_por_sesion(construir, evaluaciones):
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    sesiones = [construir(e) for e in evaluaciones]
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sesiones
+    return (despues - antes) / len(evaluaciones)
+
+
+def documento(evaluacion, catalogo):
+    resultado = calcular_cumplimiento(evaluacion, catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+    with zipfile.ZipFile(obtener_exportador("xml")(*META, *resultado, evaluacion)) as z:
+        return z.read("word/document.xml")
+
+
+def verificar(catalogo, evaluacion):
+    compacta, borradores = sesion_compacta(catalogo, evaluacion)
+    assert list(compacta.items()) == list(evaluacion.items())
+    args = (catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+    assert calcular_cumplimiento(compacta, *args) == calcular_cumplimiento(evaluacion, *args)
+    assert clave_informe(catalogo.version, *META, compacta) == clave_informe(catalogo.version, *META, evaluacion)
+    for k, r in evaluacion.items():
+        assert borradores.estado(k, compacta) == estado_desde_registro(r)
+    return compacta
+
+
+def main(sesiones=200):
+    catalogo = Catalogo.desde_archivos(BASE)
+    rng = random.Random(17)
+    # Textos tomados del catálogo compilado, como los arma validacion.registro_desde_estado
+    evaluaciones = [evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, 1.0)
+                    for _ in range(sesiones)]
+    for evaluacion in evaluaciones[:3]:
+        for registro in list(evaluacion.values())[::7]:
+            registro["obs"] = "Observación de prueba " * 3
+
+    for evaluacion in evaluaciones[:20]:
+        verificar(catalogo, evaluacion)
+    for evaluacion in evaluaciones[:3]:
+        compacta = verificar(catalogo, evaluacion)
+        assert documento(compacta, catalogo) == documento(evaluacion, catalogo)
+
+    # Datos fuera del catálogo se conservan tal cual
+    raro = dict(evaluaciones[0])
+    clave = next(k for k, r in raro.items() if r["ie"])
+    raro[clave] = dict(raro[clave], ie=raro[clave]["ie"][::-1] + [{"codigo": "IE_X", "texto": "?", "respuesta": "Sí"}])
+    verificar(catalogo, raro)
+    print("equivalencia: OK (registros, cumplimiento, clave de caché, estados y word/document.xml)")
+
+    antes = bytes_por_sesion(sesion_dicts, evaluaciones)
+    ahora = bytes_por_sesion(lambda e: sesion_compacta(catalogo, e), evaluaciones)
+    print(f"memoria por sesión con los 46 ítems guardados y con borrador: "
+          f"{antes / 1024:.1f} KiB -> {ahora / 1024:.1f} KiB (x{antes / ahora:.1f} menos)")
+
+    compacta = EvaluacionCompacta(catalogo, evaluaciones[0])
+    for nombre, evaluacion in (("dicts", evaluaciones[0]), ("compacta", compacta)):
+        t0 = time.perf_counter()
+        for _ in range(200):
+            clave_informe(catalogo.version, *META, evaluacion)
+        print(f"clave_informe por rerun ({nombre}): {(time.perf_counter() - t0) / 200 * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    main(*args)
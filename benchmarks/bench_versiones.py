@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Versiones del catálogo (versiones_catalogo.py): carga de snapshots y
+# migración en bloque de miles de evaluaciones guardadas con una versión
+# anterior, frente a migrarlas una por una con cargar_evaluacion/guardar_items.
+#
+# La revisión sintética del catálogo trae cada tipo de cambio: ítem renombrado
+# con el mismo ID, ítem con otra capitalización, ítem renombrado y con otro ID
+# (se reconoce por sus IE), ítem eliminado, ítem agregado, dos ítems que
+# intercambian ID, y en un ítem un IE con nuevo código, uno eliminado y uno
+# agregado. El resultado se compara con la migración esperada, escrita a mano.
+#   python benchmarks/bench_versiones.py [evaluaciones]
+import copy
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _datos import BASE, evaluacion_aleatoria
+
+from almacen import AlmacenEvaluaciones
+from calculo import MESES_ESP
+from catalogo import ARCHIVO_INDICADORES, ARCHIVO_MATERIAS, Catalogo, clave_item
+from versiones_catalogo import RegistroCatalogos, diferencias, migrar_almacen
+
+
+def revisar_catalogo(destino):
+    # Escribe en `destino` una revisión del catálogo; devuelve el mapa esperado
+    # {clave anterior: (clave nueva, {código anterior: código nuevo o None})}
+    materias = json.loads((BASE / ARCHIVO_MATERIAS).read_text(encoding="utf-8"))
+    indicadores = json.loads((BASE / ARCHIVO_INDICADORES).read_text(encoding="utf-8"))
+    por_id = {mi["ID"]: mi for mi in materias}
+    claves = {i: clave_item(mi["Materia"], mi["Ítem"]) for i, mi in por_id.items()}
+    esperado = {c: (c, {}) for c in claves.values()}
+    nuevos_ie = copy.deepcopy(indicadores)
+
+    def renombrar(id_, item, nuevo_id=None):
+        anterior = claves[id_]
+        por_id[id_]["Ítem"] = item
+        if nuevo_id is not None:
+            por_id[id_]["ID"] = nuevo_id
+        nueva = clave_item(por_id[id_]["Materia"], item)
+        nuevos_ie[nueva] = nuevos_ie.pop(anterior)
+        esperado[anterior] = (nueva, {})
+
+    renombrar(2, "Marco normativo vigente")                               # mismo ID
+    renombrar(4, por_id[4]["Ítem"].upper())                               # misma clave normalizada
+    renombrar(22, por_id[22]["Ítem"] + " (actualizado)", nuevo_id=47)     # otro ID, mismos IE
+    por_id[45]["ID"], por_id[46]["ID"] = 46, 45                           # intercambian ID
+    nuevos_ie.pop(claves[13])                                             # ítem eliminado
+    materias.remove(por_id[13])
+    esperado[claves[13]] = (None, {})
+    nuevo = {"ID": 48, "Materia": por_id[1]["Materia"], "Peso Materia (%)": por_id[1]["Peso Materia (%)"],
+             "Ítem": "Normas publicadas en el Diario Oficial en formato abierto"}
+    materias.append(nuevo)                                                # ítem agregado
+    nuevos_ie[clave_item(nuevo["Materia"], nuevo["Ítem"])] = [
+        {"codigo": "IE1_M1_I48", "texto": "Publica las normas en formato abierto."},
+        {"codigo": "IE2_M1_I48", "texto": "Indica la fecha de publicación de cada norma."}]
+    ies = nuevos_ie[claves[1]]                                            # cambios de IE
+    ies[2]["codigo"] = "IE3B_M1_I1"
+    ies.pop()
+    ies.append({"codigo": "IE14_M1_I1", "texto": "Publica un índice de las normas vigentes."})
+    esperado[claves[1]] = (claves[1], {"IE3_M1_I1": "IE3B_M1_I1", "IE13_M1_I1": None})
+
+    destino.mkdir(parents=True, exist_ok=True)
+    (destino / ARCHIVO_MATERIAS).write_text(json.dumps(materias, ensure_ascii=False), encoding="utf-8")
+    (destino / ARCHIVO_INDICADORES).write_text(json.dumps(nuevos_ie, ensure_ascii=False), encoding="utf-8")
+    return esperado
+
+
+def migracion_esperada(evaluacion, esperado, nuevo):
+    resultado, revisar = {}, 0
+    for clave, registro in evaluacion.items():
+        clave_nueva, codigos = esperado[clave]
+        if clave_nueva is None:
+            continue
+        respuestas = {codigos.get(e["codigo"], e["codigo"]): e["respuesta"] for e in registro["ie"]}
+        respuestas.pop(None, None)
+        ies = nuevo.items_por_clave[clave_nueva].ies
+        resultado[clave_nueva] = dict(registro, ie=[
+            {"codigo": ie["codigo"], "texto": ie["texto"], "respuesta": respuestas[ie["codigo"]]}
+            for ie in ies if ie["codigo"] in respuestas])
+        revisar += bool(registro["ie"]) and len(respuestas) < len(ies)
+    return resultado, revisar
+
+
+def poblar(almacen, catalogo, n, semilla=22):
+    rng = random.Random(semilla)
+    ids = {r.clave: r.id for r in catalogo.items.values()}
+    evaluaciones = {}
+    for k in range(n):
+        evaluacion_id = almacen.abrir_evaluacion(f"Organismo {k // 24:04d}", 2020 + (k % 24) // 12,
+                                                 MESES_ESP[k % 12], "Analista", catalogo=catalogo.version)
+        evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos,
+                                          rng.choice([0.5, 1.0]))
+        almacen.guardar_items(evaluacion_id, [(ids[c], r) for c, r in evaluacion.items()])
+        evaluaciones[evaluacion_id] = evaluacion
+    return evaluaciones
+
+
+def migrar_una_por_una(almacen, anterior, nuevo, dif):
+    # Lo directo: leer cada evaluación con el catálogo anterior y volver a guardarla
+    con = almacen._conexion()
+    ids = [e["id"] for e in almacen.buscar() if e["catalogo"] == anterior.version]
+    for evaluacion_id in ids:
+        evaluacion, _ = almacen.cargar_evaluacion(evaluacion_id, anterior)
+        filas = []
+        for clave, registro in evaluacion.items():
+            viejo = anterior.items_por_clave[clave]
+            nuevo_id = dif.items.get(viejo.id)
+            if nuevo_id is None:
+                continue
+            mapa = dif.codigos.get(viejo.id, {})
+            respuestas = {mapa.get(e["codigo"], e["codigo"]): e["respuesta"] for e in registro["ie"]}
+            respuestas.pop(None, None)
+            ie = [{"codigo": x["codigo"], "respuesta": respuestas[x["codigo"]]}
+                  for x in nuevo.items[nuevo_id].ies if x["codigo"] in respuestas]
+            filas.append((nuevo_id, dict(registro, ie=ie)))
+        con.execute("DELETE FROM items WHERE evaluacion_id = ?", (evaluacion_id,))
+        almacen.guardar_items(evaluacion_id, filas)
+        con.execute("UPDATE evaluaciones SET catalogo = ? WHERE id = ?", (nuevo.version, evaluacion_id))
+    return len(ids)
+
+
+def cronometrar(funcion, repeticiones=200):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - t0) / repeticiones
+
+
+def main(n=5000):
+    directorio = Path(tempfile.mkdtemp())
+    registro = RegistroCatalogos(directorio / "catalogos")
+    anterior = registro.compilar(BASE)
+    esperado = revisar_catalogo(directorio / "revision")
+    nuevo = registro.compilar(directorio / "revision")
+    assert anterior.version != nuevo.version and registro.obtener(anterior.version) is anterior
+
+    # Carga: JSON + compilación frente a snapshot (proceso nuevo = registro sin residentes)
+    desde_json = cronometrar(lambda: Catalogo.desde_archivos(directorio / "revision"), 50)
+    desde_snapshot = cronometrar(lambda: RegistroCatalogos(directorio / "catalogos").obtener(nuevo.version))
+    residente = cronometrar(lambda: registro.obtener(nuevo.version), 10000)
+    print(f"carga del catálogo: JSON {desde_json * 1000:.2f} ms, snapshot {desde_snapshot * 1000:.2f} ms "
+          f"(x{desde_json / desde_snapshot:.1f}), residente {residente * 1e6:.1f} µs; "
+          f"versiones en disco: {len(registro.versiones())}")
+
+    dif = diferencias(anterior, nuevo)
+    print("\n".join(dif.resumen()))
+    assert sorted(dif.renombrados) == sorted((a, n) for a, (n, _) in esperado.items() if n and n != a)
+    assert dif.eliminados == [a for a, (n, _) in esperado.items() if n is None]
+    assert len(dif.agregados) == 1
+
+    ruta = directorio / "evaluaciones.sqlite3"
+    almacen = AlmacenEvaluaciones(ruta)
+    t0 = time.perf_counter()
+    evaluaciones = poblar(almacen, anterior, n)
+    print(f"{n} evaluaciones guardadas con el catálogo {anterior.version} en {time.perf_counter() - t0:.1f} s")
+    almacen.cerrar()
+    copia = directorio / "copia.sqlite3"
+    shutil.copy(ruta, copia)
+
+    almacen = AlmacenEvaluaciones(ruta)
+    simulado = migrar_almacen(almacen, registro, nuevo, simular=True)
+    assert all(e["catalogo"] == anterior.version for e in almacen.buscar())
+    informe = migrar_almacen(almacen, registro, nuevo)
+    assert (simulado.items_reescritos, len(simulado.revisar)) == (informe.items_reescritos, len(informe.revisar))
+    print(informe.resumen())
+
+    revisar = 0
+    for evaluacion_id, evaluacion in evaluaciones.items():
+        migrada, _ = almacen.cargar_evaluacion(evaluacion_id, nuevo)
+        esperada, r = migracion_esperada(evaluacion, esperado, nuevo)
+        assert migrada == esperada, evaluacion_id
+        revisar += r
+    assert revisar == len(informe.revisar)
+    descartados = almacen._conexion().execute("SELECT COUNT(*) FROM items_descartados").fetchone()[0]
+    assert descartados == informe.items_descartados == sum(1 for e in evaluaciones.values()
+                                                           if any(esperado[c][0] is None for c in e))
+    assert migrar_almacen(almacen, registro, nuevo).evaluaciones == 0
+    print(f"equivalencia: OK ({n} evaluaciones = migración esperada; {revisar} ítems por revisar, "
+          f"{descartados} ítems eliminados archivados)")
+
+    uno_a_uno = AlmacenEvaluaciones(copia)
+    t0 = time.perf_counter()
+    migrar_una_por_una(uno_a_uno, anterior, nuevo, dif)
+    dt = time.perf_counter() - t0
+    for evaluacion_id in list(evaluaciones)[::97]:
+        assert uno_a_uno.cargar_evaluacion(evaluacion_id, nuevo)[0] == almacen.cargar_evaluacion(evaluacion_id, nuevo)[0]
+    print(f"migración de {n} evaluaciones: en bloque {informe.segundos:.2f} s "
+          f"({n / informe.segundos:,.0f} evaluaciones/s), una por una {dt:.2f} s (x{dt / informe.segundos:.1f})")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
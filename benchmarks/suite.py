@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Suite de benchmarks reproducible con resultados en JSON.
+#
+# Mide el cálculo de cumplimiento (evaluación vacía, parcial y completa), el
+# informe Word en el peor caso (todos los IE en "No") con ambos generadores,
+# la carga del catálogo y la latencia de rerun de app.py con AppTest para las
+# interacciones típicas. Los resultados se guardan por commit para comparar:
+#
+#   python benchmarks/suite.py                          -> benchmarks/resultados/<commit>.json
+#   python benchmarks/suite.py --rapido --salida r.json
+#   python benchmarks/suite.py --comparar benchmarks/resultados/<commit anterior>.json
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from _datos import BASE, cargar_catalogo, entorno_temporal, evaluacion_aleatoria, evaluacion_peor_caso
+
+DIRECTORIO_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+META = ("Organismo de prueba", datetime.date(2024, 5, 31), "Evaluador(a)", "Mayo", 2024)
+# Una diferencia menor que esto se considera ruido al comparar
+UMBRAL_REGRESION = 1.20
+
+
+def estadisticas(tiempos):
+    ordenados = sorted(tiempos)
+    return {
+        "n": len(ordenados),
+        "min_ms": ordenados[0] * 1000,
+        "mediana_ms": statistics.median(ordenados) * 1000,
+        "p95_ms": ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))] * 1000,
+        "media_ms": statistics.fmean(ordenados) * 1000,
+    }
+
+
+def medir(funcion, repeticiones, calentamiento=1):
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return estadisticas(tiempos)
+
+
+# ---------- CASOS ----------
+
+def casos_calculo(repeticiones):
+    from calculo import calcular_cumplimiento, construir_materia_peso_map
+
+    materias_items, indicadores_especificos = cargar_catalogo()
+    peso_map = construir_materia_peso_map(materias_items)
+    rng = random.Random(12)
+    evaluaciones = {
+        "vacia": {},
+        "parcial": evaluacion_aleatoria(rng, materias_items, indicadores_especificos, 0.5),
+        "completa": evaluacion_aleatoria(rng, materias_items, indicadores_especificos, 1.0),
+    }
+    resultados = {}
+    for nombre, evaluacion in evaluaciones.items():
+        resultados[f"calculo.{nombre}"] = medir(
+            lambda: calcular_cumplimiento(evaluacion, materias_items, indicadores_especificos, peso_map), repeticiones * 20)
+    return resultados
+
+
+def casos_informe(repeticiones):
+    from calculo import calcular_cumplimiento
+    from informe import BACKENDS, obtener_exportador
+
+    materias_items, indicadores_especificos = cargar_catalogo()
+    peor = evaluacion_peor_caso(materias_items, indicadores_especificos)
+    resultado = calcular_cumplimiento(peor, materias_items, indicadores_especificos)
+    resultados = {}
+    for backend in BACKENDS:
+        exportador = obtener_exportador(backend)
+        veces = repeticiones if backend == "docx" else repeticiones * 10
+        resultados[f"informe.peor_caso.{backend}"] = medir(lambda: exportador(*META, *resultado, peor), veces)
+    return resultados
+
+
+def casos_catalogo(repeticiones):
+    from catalogo import Catalogo
+
+    return {
+        "catalogo.json": medir(cargar_catalogo, repeticiones * 10),
+        "catalogo.compilado": medir(lambda: Catalogo.desde_archivos(BASE), repeticiones * 10),
+    }
+
+
+def casos_app(repeticiones):
+    # Cada repetición es una sesión nueva (otro organismo) sobre un almacén y
+    # cachés temporales; la caché de informes queda desactivada para medir la exportación.
+    os.environ.update(entorno_temporal())
+    os.environ["INFORME_CACHE_MB"] = "0"
+    from streamlit.testing.v1 import AppTest
+
+    def boton(at, etiqueta):
+        return next(b for b in at.button if b.label == etiqueta)
+
+    def cronometrar(tiempos, nombre, accion):
+        t0 = time.perf_counter()
+        at = accion()
+        tiempos.setdefault(nombre, []).append(time.perf_counter() - t0)
+        assert not at.exception, (nombre, at.exception)
+
+    tiempos = {}
+    for r in range(repeticiones + 1):
+        at = AppTest.from_file(str(BASE / "app.py"), default_timeout=120)
+        cronometrar(tiempos, "app.primer_render", at.run)
+        at.text_input[0].input(f"Organismo {r}")
+        at.text_input[1].input("Evaluador(a)")
+        cronometrar(tiempos, "app.iniciar_evaluacion", boton(at, "Iniciar evaluación").click().run)
+        materia = next(s for s in at.selectbox if s.label == "Seleccione materia a evaluar")
+        cronometrar(tiempos, "app.cambiar_materia", materia.select_index(1).run)
+        radio_ie = next(x for x in at.radio if x.key and x.key.startswith("ie_"))
+        cronometrar(tiempos, "app.responder_ie", radio_ie.set_value("No").run)
+        cronometrar(tiempos, "app.guardar_item", boton(at, "Guardar ítem").click().run)
+        cronometrar(tiempos, "app.exportar_word", boton(at, "Generar y descargar informe Word").click().run)
+    # La primera sesión paga la compilación del script y las cachés de proceso
+    return {nombre: estadisticas(valores[1:]) for nombre, valores in tiempos.items()}
+
+
+GRUPOS = {
+    "calculo": casos_calculo,
+    "informe": casos_informe,
+    "catalogo": casos_catalogo,
+    "app": casos_app,
+}
+
+
+# ---------- RESULTADOS ----------
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-commit"
+
+
+def metadatos():
+    return {
+        "commit": commit_actual(),
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+    }
+
+
+def comparar(actual, anterior):
+    print(f"\ncomparación con {anterior['meta']['commit']} (mediana, ms):")
+    regresiones = 0
+    for nombre, datos in actual["casos"].items():
+        previo = anterior["casos"].get(nombre)
+        if previo is None:
+            print(f"  {nombre:32} {datos['mediana_ms']:10.3f}   (nuevo)")
+            continue
+        razon = datos["mediana_ms"] / previo["mediana_ms"] if previo["mediana_ms"] else float("inf")
+        marca = "  REGRESIÓN" if razon > UMBRAL_REGRESION else ""
+        regresiones += bool(marca)
+        print(f"  {nombre:32} {previo['mediana_ms']:10.3f} -> {datos['mediana_ms']:10.3f}  x{razon:.2f}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de benchmarks con resultados en JSON.")
+    parser.add_argument("--grupos", default=",".join(GRUPOS), help=f"subconjunto de: {', '.join(GRUPOS)}")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--rapido", action="store_true", help="3 repeticiones, para verificar que todo corre")
+    parser.add_argument("--salida", help="archivo JSON (por defecto benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args(argv)
+
+    repeticiones = 3 if args.rapido else args.repeticiones
+    resultado = {"meta": metadatos(), "repeticiones": repeticiones, "casos": {}}
+    for grupo in args.grupos.split(","):
+        casos = GRUPOS[grupo.strip()](repeticiones)
+        for nombre, datos in casos.items():
+            print(f"{nombre:32} mediana {datos['mediana_ms']:10.3f} ms   p95 {datos['p95_ms']:10.3f} ms   (n={datos['n']})")
+        resultado["casos"].update(casos)
+
+    salida = Path(args.salida) if args.salida else DIRECTORIO_RESULTADOS / f"{resultado['meta']['commit']}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"resultados: {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            return 1 if comparar(resultado, json.load(f)) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+# Bitácora de cambios de las respuestas: registro de eventos solo de anexar.
+#
+# Cada cambio de una respuesta en el formulario por ítem, la grilla o una
+# importación (también los reinicios en cascada: cambiar IG1 borra IG2, IG3 y
+# los IE) se anexa como un evento compacto a la tabla eventos, en el mismo
+# archivo SQLite que AlmacenEvaluaciones:
+#   (evaluación, ítem, campo, valor, texto, origen, instante)
+# campo: 0 escenario, 1-3 IG1-IG3, 4 observaciones, 5 "ítem guardado" y
+# CAMPO_IE + id del código de IE (tabla codigos_ie, compartida con historico.py);
+# valor: el código entero de la respuesta (sesion_compacta / calculo), 0 sin
+# respuesta y -1 para un valor fuera de las opciones, que va en texto.
+#
+# Cada SNAPSHOT_CADA eventos de una evaluación se guarda un snapshot del estado
+# de todos sus ítems (borrador y último guardado), así reconstruir cualquier
+# instante lee el snapshot anterior y vuelve a aplicar sólo la cola de eventos.
+# compactar() borra los eventos y snapshots anteriores a un snapshot de corte,
+# por antigüedad o para dejar a lo sumo MAX_EVENTOS_EVALUACION por evaluación
+# (lo que se aplica solo al tomar cada snapshot); los instantes anteriores al
+# corte ya no se pueden reconstruir (BitacoraCompactada).
+#
+# Los IDs de ítem y códigos de IE son los de la versión del catálogo de la
+# evaluación; al migrarla (versiones_catalogo.migrar_almacen) migrar_eventos()
+# reescribe sus eventos y snapshots en la misma transacción.
+#
+#   python bitacora.py historial <evaluación> [--item ID] [--hasta AAAA-MM-DDTHH:MM]
+#   python bitacora.py compactar [--dias 180]
+import argparse
+import datetime
+import json
+import sys
+import threading
+import time
+
+from calculo import ESCENARIOS, IE_CODIGO, IE_OPCIONES, IG_CODIGO, IG_OPCIONES
+from validacion import estado_vacio, registro_desde_estado
+
+SNAPSHOT_CADA = 1000            # eventos por evaluación entre snapshots
+MAX_EVENTOS_EVALUACION = 50000  # tope de eventos por evaluación tras compactar
+
+CAMPO_ESCENARIO, CAMPO_OBS, CAMPO_GUARDADO, CAMPO_IE = 0, 4, 5, 16
+CAMPOS_IG = ("ig1", "ig2", "ig3")
+ORIGENES = ("formulario", "cascada", "grilla", "importacion")
+FUERA_DE_OPCIONES = -1
+
+ESCENARIO_CODIGO = {v: i + 1 for i, v in enumerate(ESCENARIOS)}
+_ESCENARIO = (None, *ESCENARIOS)
+_IG = (None, *IG_OPCIONES)
+_IE = (None, *IE_OPCIONES)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    id            INTEGER PRIMARY KEY,
+    evaluacion_id INTEGER NOT NULL,
+    item_id       INTEGER NOT NULL,
+    campo         INTEGER NOT NULL,
+    valor         INTEGER NOT NULL,
+    texto         TEXT,
+    origen        INTEGER NOT NULL,
+    ts            REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_evaluacion ON eventos (evaluacion_id, id);
+CREATE TABLE IF NOT EXISTS snapshots_eventos (
+    evaluacion_id INTEGER NOT NULL,
+    evento_id     INTEGER NOT NULL,
+    ts            REAL NOT NULL,
+    datos         TEXT NOT NULL,
+    PRIMARY KEY (evaluacion_id, evento_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS codigos_ie (
+    id     INTEGER PRIMARY KEY,
+    codigo TEXT NOT NULL UNIQUE
+);
+"""
+
+
+class BitacoraCompactada(ValueError):
+    pass
+
+
+def _codificar(valor, codigos):
+    # -> (valor, texto) de una respuesta
+    if valor is None:
+        return 0, None
+    codigo = codigos.get(valor)
+    return (codigo, None) if codigo is not None else (FUERA_DE_OPCIONES, str(valor))
+
+
+def _decodificar(valor, texto, opciones):
+    if valor == FUERA_DE_OPCIONES:
+        return texto
+    return opciones[valor] if 0 <= valor < len(opciones) else None
+
+
+def _item_vacio():
+    # [escenario, ig1, ig2, ig3, obs, {id de código IE: (valor, texto)}, guardado (misma forma) o None]
+    return [(0, None), (0, None), (0, None), (0, None), "", {}, None]
+
+
+def _aplicar(items, item_id, campo, valor, texto):
+    item = items.get(item_id)
+    if item is None:
+        item = items[item_id] = _item_vacio()
+    if campo < CAMPO_OBS:
+        item[campo] = (valor, texto)
+    elif campo == CAMPO_OBS:
+        item[4] = texto or ""
+    elif campo == CAMPO_GUARDADO:
+        item[6] = [*item[:5], dict(item[5])]
+    elif valor == 0:
+        item[5].pop(campo - CAMPO_IE, None)
+    else:
+        item[5][campo - CAMPO_IE] = (valor, texto)
+
+
+class BitacoraEvaluaciones:
+    def __init__(self, almacen, catalogo):
+        self.almacen = almacen
+        self.catalogo = catalogo
+        self._codigos = {}   # código IE -> id
+        self._nombres = {}   # id -> código IE
+        self._lock = threading.Lock()
+        with almacen._conexion() as con:
+            con.executescript(ESQUEMA)
+
+    # ---------- CÓDIGOS DE IE ----------
+    def _id_codigo(self, con, codigo):
+        with self._lock:
+            id_ = self._codigos.get(codigo)
+        if id_ is None:
+            con.execute("INSERT OR IGNORE INTO codigos_ie (codigo) VALUES (?)", (codigo,))
+            id_ = con.execute("SELECT id FROM codigos_ie WHERE codigo = ?", (codigo,)).fetchone()[0]
+            with self._lock:
+                self._codigos[codigo] = id_
+                self._nombres[id_] = codigo
+        return id_
+
+    def _codigo(self, id_):
+        with self._lock:
+            codigo = self._nombres.get(id_)
+        if codigo is None:
+            self._nombres.update(self.almacen._conexion().execute("SELECT id, codigo FROM codigos_ie").fetchall())
+            codigo = self._nombres.get(id_, str(id_))
+        return codigo
+
+    # ---------- REGISTRO ----------
+    def _eventos(self, con, item_id, anterior, nuevo, origen, ts):
+        # Un evento por campo que cambió; lo que pasa a vacío junto con otro cambio es un reinicio en cascada
+        anterior = anterior or estado_vacio()
+        cambios = []
+        if anterior["escenario"] != nuevo["escenario"]:
+            cambios.append((CAMPO_ESCENARIO, *_codificar(nuevo["escenario"], ESCENARIO_CODIGO)))
+        for i, campo in enumerate(CAMPOS_IG):
+            if anterior[campo] != nuevo[campo]:
+                cambios.append((1 + i, *_codificar(nuevo[campo], IG_CODIGO)))
+        if (anterior["obs"] or "") != (nuevo["obs"] or ""):
+            cambios.append((CAMPO_OBS, 0, nuevo["obs"] or ""))
+        for codigo in dict.fromkeys([*anterior["ie"], *nuevo["ie"]]):
+            if anterior["ie"].get(codigo) != nuevo["ie"].get(codigo):
+                cambios.append((CAMPO_IE + self._id_codigo(con, codigo), *_codificar(nuevo["ie"].get(codigo), IE_CODIGO)))
+        cascada = ORIGENES.index("cascada")
+        hay_respuesta = any(valor != 0 or campo == CAMPO_OBS for campo, valor, _ in cambios)
+        return [(item_id, campo, valor, texto,
+                 cascada if origen == 0 and hay_respuesta and valor == 0 and campo != CAMPO_OBS else origen, ts)
+                for campo, valor, texto in cambios]
+
+    def registrar(self, evaluacion_id, item_id, anterior, nuevo, origen="formulario", ts=None):
+        # Cambios de un ítem entre dos estados del formulario; devuelve cuántos eventos se anexaron
+        con = self.almacen._conexion()
+        filas = self._eventos(con, item_id, anterior, nuevo, ORIGENES.index(origen), ts or time.time())
+        if filas:
+            self._transaccion(con, evaluacion_id, filas)
+        return len(filas)
+
+    def registrar_guardado(self, evaluacion_id, item_id, origen="formulario", ts=None):
+        # El borrador actual del ítem quedó guardado en la evaluación
+        con = self.almacen._conexion()
+        self._transaccion(con, evaluacion_id, [(item_id, CAMPO_GUARDADO, 0, None, ORIGENES.index(origen), ts or time.time())])
+
+    def registrar_lote(self, evaluacion_id, estados, origen, guardados=None, ts=None):
+        # estados: [(ID de ítem, estado)] que reemplazan el borrador (grilla, importación);
+        # guardados: IDs de los que además quedan guardados (None = todos)
+        con = self.almacen._conexion()
+        ts = ts or time.time()
+        codigo_origen = ORIGENES.index(origen)
+        actuales = self._estados(self._reconstruir(con, evaluacion_id, None)[0], borrador=True)
+        filas = []
+        for item_id, state in estados:
+            filas += self._eventos(con, item_id, actuales.get(item_id), state, codigo_origen, ts)
+            if guardados is None or item_id in guardados:
+                filas.append((item_id, CAMPO_GUARDADO, 0, None, codigo_origen, ts))
+        if filas:
+            self._transaccion(con, evaluacion_id, filas)
+        return len(filas)
+
+    def _transaccion(self, con, evaluacion_id, filas):
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            self._agregar(con, evaluacion_id, filas)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def _agregar(self, con, evaluacion_id, filas):
+        # Anexa filas (ítem, campo, valor, texto, origen, ts) dentro de una transacción
+        # abierta, con un snapshot cada SNAPSHOT_CADA eventos de la evaluación
+        ultimo = con.execute("SELECT MAX(evento_id) FROM snapshots_eventos WHERE evaluacion_id = ?",
+                             (evaluacion_id,)).fetchone()[0]
+        if ultimo is None:
+            # Primer evento: el punto de partida es lo guardado en el almacén (vacío en una evaluación nueva)
+            self._snapshot_inicial(con, evaluacion_id, filas[0][5])
+            ultimo = 0
+        pendientes = con.execute("SELECT COUNT(*) FROM eventos WHERE evaluacion_id = ? AND id > ?",
+                                 (evaluacion_id, ultimo)).fetchone()[0]
+        while filas:
+            tramo, filas = filas[:SNAPSHOT_CADA - pendientes], filas[SNAPSHOT_CADA - pendientes:]
+            con.executemany(
+                "INSERT INTO eventos (evaluacion_id, item_id, campo, valor, texto, origen, ts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(evaluacion_id, *fila) for fila in tramo])
+            pendientes += len(tramo)
+            if pendientes >= SNAPSHOT_CADA:
+                self._snapshot(con, evaluacion_id)
+                pendientes = 0
+
+    def _snapshot_inicial(self, con, evaluacion_id, ts):
+        items = {}
+        for item_id, registro in self.almacen.cargar_items(evaluacion_id):
+            for fila in self._eventos(con, item_id, None, _estado_guardado(registro), 0, ts):
+                _aplicar(items, *fila[:4])
+            _aplicar(items, item_id, CAMPO_GUARDADO, 0, None)
+        con.execute("INSERT INTO snapshots_eventos VALUES (?, 0, ?, ?)", (evaluacion_id, ts, _serializar(items)))
+
+    def _snapshot(self, con, evaluacion_id):
+        items, evento_id, ts = self._reconstruir(con, evaluacion_id, None)
+        con.execute("INSERT OR REPLACE INTO snapshots_eventos VALUES (?, ?, ?, ?)",
+                    (evaluacion_id, evento_id, ts, _serializar(items)))
+        total = con.execute("SELECT COUNT(*) FROM eventos WHERE evaluacion_id = ?", (evaluacion_id,)).fetchone()[0]
+        if total > MAX_EVENTOS_EVALUACION:
+            self._compactar_evaluacion(con, evaluacion_id, None, MAX_EVENTOS_EVALUACION // 2)
+
+    # ---------- RECONSTRUCCIÓN ----------
+    def _reconstruir(self, con, evaluacion_id, hasta):
+        # -> (items, último evento aplicado, su instante) al instante `hasta` (None = ahora)
+        if hasta is None:
+            fila = con.execute("SELECT evento_id, ts, datos FROM snapshots_eventos WHERE evaluacion_id = ? "
+                               "ORDER BY evento_id DESC LIMIT 1", (evaluacion_id,)).fetchone()
+        else:
+            fila = con.execute("SELECT evento_id, ts, datos FROM snapshots_eventos WHERE evaluacion_id = ? AND ts <= ? "
+                               "ORDER BY evento_id DESC LIMIT 1", (evaluacion_id, hasta)).fetchone()
+            if fila is None:
+                # Antes del primer evento rige el snapshot inicial, salvo que se haya compactado
+                fila = con.execute("SELECT evento_id, ts, datos FROM snapshots_eventos WHERE evaluacion_id = ? "
+                                   "ORDER BY evento_id LIMIT 1", (evaluacion_id,)).fetchone()
+                if fila is not None and fila[0] != 0:
+                    raise BitacoraCompactada(f"La bitácora de la evaluación {evaluacion_id} no conserva ese instante.")
+        if fila is None:
+            return {}, 0, 0.0
+        evento_id, ts, datos = fila
+        items = _deserializar(datos)
+        consulta = "SELECT id, item_id, campo, valor, texto, ts FROM eventos WHERE evaluacion_id = ? AND id > ?"
+        parametros = [evaluacion_id, evento_id]
+        if hasta is not None:
+            consulta += " AND ts <= ?"
+            parametros.append(hasta)
+        for evento_id, item_id, campo, valor, texto, ts in con.execute(consulta + " ORDER BY id", parametros):
+            _aplicar(items, item_id, campo, valor, texto)
+        return items, evento_id, ts
+
+    def _estados(self, items, borrador):
+        # {ID de ítem: estado} como los dicts del formulario
+        estados = {}
+        for item_id, item in items.items():
+            datos = item if borrador else item[6]
+            if datos is None:
+                continue
+            state = estado_vacio()
+            state["escenario"] = _decodificar(*datos[0], _ESCENARIO)
+            for i, campo in enumerate(CAMPOS_IG):
+                state[campo] = _decodificar(*datos[1 + i], _IG)
+            state["obs"] = datos[4]
+            respuestas = {self._codigo(c): _decodificar(*v, _IE) for c, v in datos[5].items()}
+            ies = self.catalogo.items[item_id].ies if item_id in self.catalogo.items else []
+            # En el orden del catálogo, como los deja el formulario por ítem
+            state["ie"] = {**{ie['codigo']: respuestas.pop(ie['codigo']) for ie in ies if ie['codigo'] in respuestas},
+                           **respuestas}
+            estados[item_id] = state
+        return estados
+
+    def estados(self, evaluacion_id, hasta=None):
+        # -> (borradores, guardados) {clave: estado} al instante `hasta` (timestamp; None = ahora)
+        items, _, _ = self._reconstruir(self.almacen._conexion(), evaluacion_id, hasta)
+        claves = {i: r.clave for i, r in self.catalogo.items.items()}
+        borradores = {claves.get(i, i): s for i, s in self._estados(items, borrador=True).items()}
+        guardados = {claves.get(i, i): s for i, s in self._estados(items, borrador=False).items()}
+        return borradores, guardados
+
+    def evaluacion(self, evaluacion_id, hasta=None):
+        # Registros guardados al instante `hasta`, como st.session_state.evaluacion
+        _, guardados = self.estados(evaluacion_id, hasta)
+        items = self.catalogo.items_por_clave
+        return {clave: registro_desde_estado(state, items[clave].ies if clave in items else [])
+                for clave, state in guardados.items()}
+
+    # ---------- AUDITORÍA ----------
+    def historial(self, evaluacion_id, item_id=None, hasta=None, limite=200):
+        # Últimos `limite` eventos hasta `hasta`, con el valor anterior y el nuevo de cada campo
+        con = self.almacen._conexion()
+        condiciones, parametros = ["evaluacion_id = ?"], [evaluacion_id]
+        for condicion, valor in (("item_id = ?", item_id), ("ts <= ?", hasta)):
+            if valor is not None:
+                condiciones.append(condicion)
+                parametros.append(valor)
+        where = " AND ".join(condiciones)
+        primero = con.execute(f"SELECT MIN(id) FROM (SELECT id FROM eventos WHERE {where} ORDER BY id DESC LIMIT ?)",
+                              parametros + [limite]).fetchone()[0]
+        if primero is None:
+            return []
+        # Valores anteriores: snapshot previo al primer evento mostrado y la cola hasta él
+        fila = con.execute("SELECT evento_id, datos FROM snapshots_eventos WHERE evaluacion_id = ? AND evento_id < ? "
+                           "ORDER BY evento_id DESC LIMIT 1", (evaluacion_id, primero)).fetchone()
+        desde, items = (fila[0], _deserializar(fila[1])) if fila else (0, {})
+        previos = con.execute(f"SELECT item_id, campo, valor, texto FROM eventos WHERE evaluacion_id = ? AND id > ? "
+                              f"AND id < ?{' AND item_id = ?' if item_id is not None else ''} ORDER BY id",
+                              [evaluacion_id, desde, primero] + ([item_id] if item_id is not None else []))
+        for fila in previos:
+            _aplicar(items, *fila)
+        claves = {i: r.clave for i, r in self.catalogo.items.items()}
+        resultado = []
+        cursor = con.execute(f"SELECT id, item_id, campo, valor, texto, origen, ts FROM eventos WHERE {where} AND id >= ? "
+                             f"ORDER BY id", parametros + [primero])
+        for evento_id, item, campo, valor, texto, origen, ts in cursor:
+            actual = items.get(item) or _item_vacio()
+            resultado.append({
+                "evento": evento_id,
+                "instante": datetime.datetime.fromtimestamp(ts),
+                "item": claves.get(item, item),
+                "campo": self._nombre_campo(campo),
+                "anterior": self._valor_campo(campo, actual),
+                "nuevo": self._valor_campo(campo, None, valor, texto),
+                "origen": ORIGENES[origen],
+            })
+            _aplicar(items, item, campo, valor, texto)
+        return resultado
+
+    def _nombre_campo(self, campo):
+        if campo == CAMPO_ESCENARIO:
+            return "Escenario"
+        if campo < CAMPO_OBS:
+            return CAMPOS_IG[campo - 1].upper()
+        if campo == CAMPO_OBS:
+            return "Observaciones"
+        if campo == CAMPO_GUARDADO:
+            return "Ítem guardado"
+        return self._codigo(campo - CAMPO_IE)
+
+    def _valor_campo(self, campo, item, valor=None, texto=None):
+        if item is not None:
+            if campo == CAMPO_OBS:
+                return item[4]
+            if campo == CAMPO_GUARDADO:
+                return None
+            valor, texto = item[campo] if campo < CAMPO_OBS else item[5].get(campo - CAMPO_IE, (0, None))
+        if campo == CAMPO_OBS:
+            return texto or ""
+        if campo == CAMPO_GUARDADO:
+            return None
+        opciones = _ESCENARIO if campo == CAMPO_ESCENARIO else _IG if campo < CAMPO_OBS else _IE
+        return _decodificar(valor, texto, opciones)
+
+    # ---------- COMPACTACIÓN ----------
+    def compactar(self, antes_de=None, max_eventos=None, evaluaciones=None):
+        # Borra eventos y snapshots anteriores al snapshot de corte de cada evaluación:
+        # el último con instante <= antes_de y/o el que deja a lo sumo max_eventos después
+        con = self.almacen._conexion()
+        if evaluaciones is None:
+            evaluaciones = [e for (e,) in con.execute("SELECT DISTINCT evaluacion_id FROM snapshots_eventos")]
+        borrados = 0
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for evaluacion_id in evaluaciones:
+                borrados += self._compactar_evaluacion(con, evaluacion_id, antes_de, max_eventos)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        return borrados
+
+    def _compactar_evaluacion(self, con, evaluacion_id, antes_de, max_eventos):
+        cortes = []
+        if antes_de is not None:
+            cortes.append(con.execute("SELECT MAX(evento_id) FROM snapshots_eventos WHERE evaluacion_id = ? AND ts <= ?",
+                                      (evaluacion_id, antes_de)).fetchone()[0])
+        if max_eventos is not None:
+            # id del evento que deja max_eventos después de él
+            limite = con.execute("SELECT id FROM eventos WHERE evaluacion_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                 (evaluacion_id, max_eventos)).fetchone()
+            if limite is not None:
+                cortes.append(con.execute("SELECT MIN(evento_id) FROM snapshots_eventos WHERE evaluacion_id = ? "
+                                          "AND evento_id >= ?", (evaluacion_id, limite[0])).fetchone()[0])
+        cortes = [c for c in cortes if c]
+        if not cortes:
+            return 0
+        corte = max(cortes)
+        borrados = con.execute("DELETE FROM eventos WHERE evaluacion_id = ? AND id <= ?", (evaluacion_id, corte)).rowcount
+        con.execute("DELETE FROM snapshots_eventos WHERE evaluacion_id = ? AND evento_id < ?", (evaluacion_id, corte))
+        return borrados
+
+
+def migrar_eventos(con, evaluaciones, items, codigos):
+    # Lleva los eventos y snapshots de `evaluaciones` a los IDs de otra versión del
+    # catálogo, dentro de la transacción abierta de versiones_catalogo.migrar_almacen.
+    # items: {ID anterior: ID nuevo} (los ítems eliminados no están: sus eventos se
+    # borran); codigos: {ID anterior: {código anterior: código nuevo o None}} de los
+    # ítems con cambios de IE. Devuelve los eventos reescritos o borrados.
+    ids_codigo = dict(con.execute("SELECT codigo, id FROM codigos_ie").fetchall())
+    nombres = {id_: codigo for codigo, id_ in ids_codigo.items()}
+
+    def cambia(item_id):
+        return items.get(item_id) != item_id or item_id in codigos
+
+    def campo_nuevo(item_id, campo):
+        # None: respuesta a un IE eliminado
+        if campo < CAMPO_IE or item_id not in codigos:
+            return campo
+        destino = codigos[item_id].get(nombres.get(campo - CAMPO_IE))
+        if destino is None:
+            return None
+        if destino not in ids_codigo:
+            con.execute("INSERT OR IGNORE INTO codigos_ie (codigo) VALUES (?)", (destino,))
+            ids_codigo[destino] = con.execute("SELECT id FROM codigos_ie WHERE codigo = ?", (destino,)).fetchone()[0]
+        return CAMPO_IE + ids_codigo[destino]
+
+    def respuestas_ie(item_id, respuestas):
+        traducidas = {}
+        for campo, respuesta in respuestas.items():
+            campo = campo_nuevo(item_id, CAMPO_IE + campo)
+            if campo is not None:
+                traducidas[campo - CAMPO_IE] = respuesta
+        return traducidas
+
+    actualizar, borrar, snapshots = [], [], []
+    evaluaciones = list(evaluaciones)
+    for inicio in range(0, len(evaluaciones), 500):
+        lote = evaluaciones[inicio:inicio + 500]
+        marcas = ",".join("?" * len(lote))
+        for id_, item_id, campo in con.execute(
+                f"SELECT id, item_id, campo FROM eventos WHERE evaluacion_id IN ({marcas})", lote).fetchall():
+            if not cambia(item_id):
+                continue
+            nuevo_id, campo = items.get(item_id), campo_nuevo(item_id, campo)
+            if nuevo_id is None or campo is None:
+                borrar.append((id_,))
+            else:
+                actualizar.append((nuevo_id, campo, id_))
+        for evaluacion_id, evento_id, datos in con.execute(
+                f"SELECT evaluacion_id, evento_id, datos FROM snapshots_eventos WHERE evaluacion_id IN ({marcas})",
+                lote).fetchall():
+            anteriores = _deserializar(datos)
+            if not any(cambia(item_id) for item_id in anteriores):
+                continue
+            migrados = {}
+            for item_id, item in anteriores.items():
+                if not cambia(item_id):
+                    migrados[item_id] = item
+                elif item_id in items:
+                    item[5] = respuestas_ie(item_id, item[5])
+                    if item[6] is not None:
+                        item[6][5] = respuestas_ie(item_id, item[6][5])
+                    migrados[items[item_id]] = item
+            snapshots.append((_serializar(migrados), evaluacion_id, evento_id))
+    con.executemany("UPDATE eventos SET item_id = ?, campo = ? WHERE id = ?", actualizar)
+    con.executemany("DELETE FROM eventos WHERE id = ?", borrar)
+    con.executemany("UPDATE snapshots_eventos SET datos = ? WHERE evaluacion_id = ? AND evento_id = ?", snapshots)
+    return len(actualizar) + len(borrar)
+
+
+def _estado_guardado(registro):
+    # Estado de un registro del almacén (ie como dict código -> respuesta)
+    ig = list(registro.get("ig") or []) + [None] * 3
+    state = estado_vacio()
+    state.update(escenario=registro.get("escenario"), ig1=ig[0], ig2=ig[1], ig3=ig[2],
+                 ie=dict(registro.get("ie") or {}), obs=registro.get("obs") or "")
+    return state
+
+
+def _serializar(items):
+    return json.dumps({i: [list(x) for x in item[:4]] + [item[4], [[c, *v] for c, v in item[5].items()],
+                                                        _serializar_guardado(item[6])]
+                       for i, item in items.items()}, ensure_ascii=False, separators=(",", ":"))
+
+
+def _serializar_guardado(guardado):
+    if guardado is None:
+        return None
+    return [list(x) for x in guardado[:4]] + [guardado[4], [[c, *v] for c, v in guardado[5].items()]]
+
+
+def _deserializar(datos):
+    items = {}
+    for item_id, item in json.loads(datos).items():
+        guardado = item[6]
+        if guardado is not None:
+            guardado = [tuple(x) for x in guardado[:4]] + [guardado[4], {c: (v, t) for c, v, t in guardado[5]}]
+        items[int(item_id)] = [tuple(x) for x in item[:4]] + [item[4], {c: (v, t) for c, v, t in item[5]}, guardado]
+    return items
+
+
+def main(argv=None):
+    from almacen import AlmacenEvaluaciones
+    from catalogo import Catalogo
+
+    parser = argparse.ArgumentParser(description="Historial de cambios y compactación de la bitácora.")
+    sub = parser.add_subparsers(dest="accion", required=True)
+    p = sub.add_parser("historial", help="últimos cambios de una evaluación")
+    p.add_argument("evaluacion", type=int)
+    p.add_argument("--item", type=int)
+    p.add_argument("--hasta", type=datetime.datetime.fromisoformat)
+    p.add_argument("--limite", type=int, default=200)
+    p = sub.add_parser("compactar", help="borra eventos anteriores a un snapshot")
+    p.add_argument("--dias", type=float, default=180, help="conserva al menos los eventos de los últimos días")
+    p.add_argument("--max-eventos", type=int, default=MAX_EVENTOS_EVALUACION)
+    args = parser.parse_args(argv)
+
+    bitacora = BitacoraEvaluaciones(AlmacenEvaluaciones.desde_entorno(), Catalogo.desde_archivos())
+    if args.accion == "historial":
+        hasta = args.hasta.timestamp() if args.hasta else None
+        for e in bitacora.historial(args.evaluacion, args.item, hasta, args.limite):
+            print(f"{e['instante']:%Y-%m-%d %H:%M:%S}  {e['origen']:<11} {e['item']} | {e['campo']}: "
+                  f"{e['anterior']!r} -> {e['nuevo']!r}")
+    else:
+        t0 = time.perf_counter()
+        n = bitacora.compactar(time.time() - args.dias * 86400, args.max_eventos)
+        print(f"{n} eventos compactados en {time.perf_counter() - t0:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+# Caché compartida entre procesos en un archivo SQLite local (modo WAL).
+#
+# st.cache_data y st.cache_resource son por proceso: con varios procesos de
+# Streamlit (o de api.py) detrás de un proxy, cada uno compilaría el catálogo y
+# generaría los mismos informes. Esta caché guarda esos artefactos por espacio
+# ("catalogo", "informe", "datos", "plantilla") y clave en un archivo común,
+# así lo que construye un proceso lo leen los demás.
+#
+# - Concurrencia: cada escritura es una transacción BEGIN IMMEDIATE; los
+#   lectores no bloquean a los escritores (WAL). generar_una_vez() reserva la
+#   clave en la tabla reservas, de modo que si varios procesos piden a la vez
+#   el mismo artefacto sólo uno lo genera y el resto espera a leerlo; una
+#   reserva de un proceso caído vence tras ESPERA_MAXIMA segundos.
+# - Tamaño acotado: al superar max_bytes se expulsan las entradas usadas hace
+#   más tiempo hasta bajar a LIBRE_TRAS_EXPULSAR de max_bytes. La marca de uso
+#   se actualiza a lo sumo cada REFRESCO_USO segundos por entrada, así un hit
+#   es sólo una lectura.
+# - Contadores de hits, misses, escrituras, expulsiones y esperas por espacio,
+#   comunes a todos los procesos. Cada proceso acumula en memoria los
+#   contadores y las marcas de uso, y los vuelca juntos en una transacción cada
+#   VOLCAR_CONTADORES segundos y al terminar.
+#
+#   python cache_compartida.py estadisticas
+#   python cache_compartida.py limpiar [--espacio informe]
+import argparse
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+RUTA_POR_DEFECTO = BASE / "datos" / "cache_compartida.sqlite3"
+
+MB = 1024 * 1024
+LIBRE_TRAS_EXPULSAR = 0.9
+REFRESCO_USO = 30.0
+VOLCAR_CONTADORES = 1.0
+ESPERA_MAXIMA = 120.0
+SONDEO = 0.01
+CONTADORES = ("hits", "misses", "escrituras", "expulsiones", "esperas")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    id      INTEGER PRIMARY KEY,
+    espacio TEXT NOT NULL,
+    clave   TEXT NOT NULL,
+    datos   BLOB NOT NULL,
+    bytes   INTEGER NOT NULL,
+    creada  REAL NOT NULL,
+    usada   REAL NOT NULL,
+    UNIQUE (espacio, clave)
+);
+CREATE INDEX IF NOT EXISTS idx_entradas_usada ON entradas (usada);
+CREATE TABLE IF NOT EXISTS reservas (
+    espacio TEXT NOT NULL,
+    clave   TEXT NOT NULL,
+    pid     INTEGER NOT NULL,
+    desde   REAL NOT NULL,
+    PRIMARY KEY (espacio, clave)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS contadores (
+    espacio     TEXT PRIMARY KEY,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    misses      INTEGER NOT NULL DEFAULT 0,
+    escrituras  INTEGER NOT NULL DEFAULT 0,
+    expulsiones INTEGER NOT NULL DEFAULT 0,
+    esperas     INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+class CacheCompartida:
+    def __init__(self, ruta=RUTA_POR_DEFECTO, max_bytes=256 * MB, timeout=30.0):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pendientes = Counter()  # (espacio, contador) -> incremento aún no volcado
+        self._usadas = {}             # id de entrada -> instante de uso aún no volcado
+        self._volcado = time.monotonic()
+        self._conexion().executescript(ESQUEMA)
+        atexit.register(self._volcar, forzar=True)
+
+    @classmethod
+    def desde_entorno(cls):
+        return cls(os.environ.get("CACHE_COMPARTIDA_DB") or RUTA_POR_DEFECTO,
+                   max_bytes=int(float(os.environ.get("CACHE_COMPARTIDA_MB", "256")) * MB))
+
+    def _conexion(self):
+        # Una conexión por hilo, como AlmacenEvaluaciones
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _transaccion(self):
+        return _Transaccion(self._conexion())
+
+    def cerrar(self):
+        self._volcar(forzar=True)
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+    # ---------- CONTADORES ----------
+    def _contar(self, espacio, contador, n=1):
+        with self._lock:
+            self._pendientes[espacio, contador] += n
+        self._volcar()
+
+    def _volcar(self, forzar=False):
+        with self._lock:
+            if not (self._pendientes or self._usadas) or (
+                    not forzar and time.monotonic() - self._volcado < VOLCAR_CONTADORES):
+                return
+            pendientes, self._pendientes = self._pendientes, Counter()
+            usadas, self._usadas = self._usadas, {}
+            self._volcado = time.monotonic()
+        try:
+            with self._transaccion() as con:
+                for (espacio, contador), n in pendientes.items():
+                    con.execute("INSERT INTO contadores (espacio) VALUES (?) ON CONFLICT DO NOTHING", (espacio,))
+                    con.execute(f"UPDATE contadores SET {contador} = {contador} + ? WHERE espacio = ?", (n, espacio))
+                con.executemany("UPDATE entradas SET usada = MAX(usada, ?) WHERE id = ?",
+                                [(ts, id_) for id_, ts in usadas.items()])
+        except sqlite3.OperationalError:
+            # Base ocupada: se reintenta en el próximo volcado
+            with self._lock:
+                self._pendientes.update(pendientes)
+                for id_, ts in usadas.items():
+                    self._usadas.setdefault(id_, ts)
+
+    # ---------- LECTURA Y ESCRITURA ----------
+    def _leer(self, espacio, clave):
+        con = self._conexion()
+        fila = con.execute("SELECT id, datos, usada FROM entradas WHERE espacio = ? AND clave = ?",
+                           (espacio, clave)).fetchone()
+        if fila is None:
+            return None
+        id_, datos, usada = fila
+        ahora = time.time()
+        if ahora - usada > REFRESCO_USO:
+            with self._lock:
+                self._usadas[id_] = ahora
+        return datos
+
+    def obtener(self, espacio, clave):
+        datos = self._leer(espacio, clave)
+        self._contar(espacio, "hits" if datos is not None else "misses")
+        return datos
+
+    def guardar(self, espacio, clave, datos):
+        datos = bytes(datos)
+        if len(datos) > self.max_bytes * (1 - LIBRE_TRAS_EXPULSAR):
+            return False  # una entrada así expulsaría buena parte de la caché
+        ahora = time.time()
+        with self._transaccion() as con:
+            con.execute(
+                "INSERT INTO entradas (espacio, clave, datos, bytes, creada, usada) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (espacio, clave) DO UPDATE SET datos = excluded.datos, bytes = excluded.bytes, "
+                "usada = excluded.usada",
+                (espacio, clave, datos, len(datos), ahora, ahora))
+            expulsadas = self._expulsar(con)
+        with self._lock:
+            self._pendientes[espacio, "escrituras"] += 1
+            for espacio_expulsado, n in expulsadas.items():
+                self._pendientes[espacio_expulsado, "expulsiones"] += n
+        self._volcar()
+        return True
+
+    def _expulsar(self, con):
+        # -> {espacio: entradas expulsadas}
+        total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM entradas").fetchone()[0]
+        expulsadas = Counter()
+        if total <= self.max_bytes:
+            return expulsadas
+        objetivo = total - self.max_bytes * LIBRE_TRAS_EXPULSAR
+        ids, liberados = [], 0
+        for id_, espacio, tamano in con.execute("SELECT id, espacio, bytes FROM entradas ORDER BY usada"):
+            ids.append((id_,))
+            expulsadas[espacio] += 1
+            liberados += tamano
+            if liberados >= objetivo:
+                break
+        con.executemany("DELETE FROM entradas WHERE id = ?", ids)
+        return expulsadas
+
+    # ---------- GENERACIÓN UNA SOLA VEZ ----------
+    def _reservar(self, espacio, clave):
+        ahora = time.time()
+        with self._transaccion() as con:
+            con.execute("DELETE FROM reservas WHERE espacio = ? AND clave = ? AND desde < ?",
+                        (espacio, clave, ahora - ESPERA_MAXIMA))
+            return con.execute("INSERT OR IGNORE INTO reservas VALUES (?, ?, ?, ?)",
+                               (espacio, clave, os.getpid(), ahora)).rowcount == 1
+
+    def _liberar(self, espacio, clave):
+        with self._transaccion() as con:
+            con.execute("DELETE FROM reservas WHERE espacio = ? AND clave = ? AND pid = ?", (espacio, clave, os.getpid()))
+
+    def _reservada(self, espacio, clave):
+        return self._conexion().execute("SELECT 1 FROM reservas WHERE espacio = ? AND clave = ?",
+                                        (espacio, clave)).fetchone() is not None
+
+    def _generar(self, espacio, clave, generar):
+        datos = generar()
+        if hasattr(datos, "getvalue"):
+            datos = datos.getvalue()
+        self.guardar(espacio, clave, datos)
+        return datos
+
+    def generar_una_vez(self, espacio, clave, generar):
+        # Genera y guarda el artefacto, salvo que otro proceso ya lo esté generando:
+        # entonces espera a que aparezca. generar() devuelve bytes (o un BytesIO).
+        limite = time.monotonic() + ESPERA_MAXIMA
+        while True:
+            if self._reservar(espacio, clave):
+                try:
+                    datos = self._leer(espacio, clave)  # otro proceso pudo terminarlo recién
+                    return datos if datos is not None else self._generar(espacio, clave, generar)
+                finally:
+                    self._liberar(espacio, clave)
+            self._contar(espacio, "esperas")
+            while self._reservada(espacio, clave) and time.monotonic() < limite:
+                time.sleep(SONDEO)
+            datos = self._leer(espacio, clave)
+            if datos is not None:
+                return datos
+            if time.monotonic() >= limite:
+                # El otro proceso sigue ocupado: no se espera más que ESPERA_MAXIMA
+                return self._generar(espacio, clave, generar)
+            # El otro proceso falló o la entrada no cabía: se intenta reservar de nuevo
+
+    def obtener_o_generar(self, espacio, clave, generar):
+        datos = self.obtener(espacio, clave)
+        return datos if datos is not None else self.generar_una_vez(espacio, clave, generar)
+
+    # ---------- MANTENCIÓN ----------
+    def estadisticas(self):
+        self._volcar(forzar=True)
+        con = self._conexion()
+        resultado = {}
+        for espacio, entradas, total in con.execute(
+                "SELECT espacio, COUNT(*), SUM(bytes) FROM entradas GROUP BY espacio"):
+            resultado[espacio] = {"entradas": entradas, "bytes": total}
+        for espacio, *valores in con.execute(f"SELECT espacio, {', '.join(CONTADORES)} FROM contadores"):
+            resultado.setdefault(espacio, {"entradas": 0, "bytes": 0}).update(zip(CONTADORES, valores))
+        for datos in resultado.values():
+            for contador in CONTADORES:
+                datos.setdefault(contador, 0)
+            consultas = datos["hits"] + datos["misses"]
+            datos["tasa_acierto"] = datos["hits"] / consultas if consultas else 0.0
+        return resultado
+
+    def limpiar(self, espacio=None):
+        with self._transaccion() as con:
+            if espacio is None:
+                return con.execute("DELETE FROM entradas").rowcount
+            return con.execute("DELETE FROM entradas WHERE espacio = ?", (espacio,)).rowcount
+
+
+class _Transaccion:
+    # BEGIN IMMEDIATE ... COMMIT, o ROLLBACK si hay una excepción
+    def __init__(self, con):
+        self.con = con
+
+    def __enter__(self):
+        self.con.execute("BEGIN IMMEDIATE")
+        return self.con
+
+    def __exit__(self, tipo, valor, traza):
+        self.con.execute("ROLLBACK" if tipo else "COMMIT")
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estadísticas y limpieza de la caché compartida entre procesos.")
+    sub = parser.add_subparsers(dest="accion", required=True)
+    sub.add_parser("estadisticas", help="entradas, bytes y contadores por espacio")
+    p = sub.add_parser("limpiar", help="borra las entradas (de un espacio o todas)")
+    p.add_argument("--espacio")
+    args = parser.parse_args(argv)
+
+    cache = CacheCompartida.desde_entorno()
+    if args.accion == "estadisticas":
+        for espacio, datos in sorted(cache.estadisticas().items()):
+            print(f"{espacio:<10} {datos['entradas']:>6} entradas {datos['bytes'] / MB:>8.1f} MB  "
+                  f"hits {datos['hits']}  misses {datos['misses']}  tasa {datos['tasa_acierto']:.0%}  "
+                  f"escrituras {datos['escrituras']}  expulsiones {datos['expulsiones']}  esperas {datos['esperas']}")
+    else:
+        print(f"{cache.limpiar(args.espacio)} entradas borradas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
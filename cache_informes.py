@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Caché de informes generados, direccionada por contenido.
+#
+# La clave es un hash estable de todo lo que influye en el documento (versión
+# del catálogo, datos generales y contenido de la evaluación), así que un mismo
+# informe se genera una sola vez. Nivel en memoria LRU acotado por bytes, nivel
+# opcional compartido entre procesos (cache_compartida.py, espacio "informe")
+# y nivel opcional en disco, también acotado por tamaño. Con el nivel
+# compartido, generar_una_vez() evita que dos procesos construyan a la vez el
+# mismo informe.
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+ESPACIO_COMPARTIDO = "informe"
+
+
+def _json_default(valor):
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    if hasattr(valor, "item"):  # escalares de NumPy
+        return valor.item()
+    if isinstance(valor, Mapping):  # p. ej. sesion_compacta.EvaluacionCompacta
+        return dict(valor)
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def clave_informe(version_catalogo, organismo, fecha, evaluador, mes_eval, anio_eval, evaluacion, backend="",
+                  comparacion=None):
+    # Sin sort_keys en la evaluación: el orden de guardado define el orden del
+    # detalle de indicadores del informe, por lo que forma parte de la clave.
+    # comparacion: clave de la cohorte con la que se compara (comparacion.py);
+    # sin comparación la clave es la de siempre.
+    partes = [version_catalogo, backend, organismo, fecha, evaluador, mes_eval, anio_eval, evaluacion]
+    if comparacion is not None:
+        partes.append(comparacion)
+    contenido = json.dumps(
+        partes,
+        ensure_ascii=False, separators=(",", ":"), default=_json_default,
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheInformes:
+    def __init__(self, max_bytes=64 * MB, directorio=None, max_bytes_disco=512 * MB, compartida=None):
+        self.max_bytes = max_bytes
+        self.compartida = compartida
+        self.max_bytes_disco = max_bytes_disco
+        self.directorio = Path(directorio) if directorio else None
+        if self.directorio:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+        self._memoria = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hits_compartida = 0
+        self.hits_disco = 0
+        self.misses = 0
+
+    @classmethod
+    def desde_entorno(cls, compartida=None):
+        return cls(
+            max_bytes=int(float(os.environ.get("INFORME_CACHE_MB", "64")) * MB),
+            directorio=os.environ.get("INFORME_CACHE_DIR") or None,
+            max_bytes_disco=int(float(os.environ.get("INFORME_CACHE_DISCO_MB", "512")) * MB),
+            compartida=compartida,
+        )
+
+    def __len__(self):
+        return len(self._memoria)
+
+    def _ruta(self, clave):
+        return self.directorio / f"{clave}.docx"
+
+    def _guardar_memoria(self, clave, datos):
+        if len(datos) > self.max_bytes:
+            return
+        anterior = self._memoria.pop(clave, None)
+        if anterior is not None:
+            self._bytes -= len(anterior)
+        self._memoria[clave] = datos
+        self._bytes += len(datos)
+        while self._bytes > self.max_bytes:
+            _, expulsado = self._memoria.popitem(last=False)
+            self._bytes -= len(expulsado)
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            datos = ruta.read_bytes()
+            os.utime(ruta)  # el mtime hace de marca LRU en disco
+            return datos
+        except FileNotFoundError:
+            return None
+
+    def _guardar_disco(self, clave, datos):
+        if not self.directorio or len(datos) > self.max_bytes_disco:
+            return
+        ruta = self._ruta(clave)
+        temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temporal.write_bytes(datos)
+        os.replace(temporal, ruta)
+        self._podar_disco()
+
+    def _podar_disco(self):
+        archivos = []
+        total = 0
+        for ruta in self.directorio.glob("*.docx"):
+            try:
+                info = ruta.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+            total += info.st_size
+        archivos.sort()
+        for _, tamano, ruta in archivos:
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                ruta.unlink()
+            except FileNotFoundError:
+                pass
+            total -= tamano
+
+    def obtener(self, clave):
+        with self._lock:
+            datos = self._memoria.get(clave)
+            if datos is not None:
+                self._memoria.move_to_end(clave)
+                self.hits += 1
+                return datos
+        if self.compartida is not None:
+            datos = self.compartida.obtener(ESPACIO_COMPARTIDO, clave)
+            if datos is not None:
+                with self._lock:
+                    self.hits_compartida += 1
+                    self._guardar_memoria(clave, datos)
+                return datos
+        datos = self._leer_disco(clave)
+        with self._lock:
+            if datos is not None:
+                self.hits_disco += 1
+                self._guardar_memoria(clave, datos)
+            else:
+                self.misses += 1
+        return datos
+
+    def guardar(self, clave, datos):
+        with self._lock:
+            self._guardar_memoria(clave, datos)
+        if self.compartida is not None:
+            self.compartida.guardar(ESPACIO_COMPARTIDO, clave, datos)
+        self._guardar_disco(clave, datos)
+
+    def generar_una_vez(self, clave, generar):
+        # Genera y guarda un informe que no está en la caché; con el nivel compartido,
+        # si otro proceso ya lo está generando se espera su resultado
+        if self.compartida is None:
+            datos = generar()
+            if hasattr(datos, "getvalue"):
+                datos = datos.getvalue()
+            self.guardar(clave, datos)
+            return datos
+        datos = self.compartida.generar_una_vez(ESPACIO_COMPARTIDO, clave, generar)
+        with self._lock:
+            self._guardar_memoria(clave, datos)
+        self._guardar_disco(clave, datos)
+        return datos
+
+    def obtener_o_generar(self, clave, generar):
+        datos = self.obtener(clave)
+        if datos is None:
+            datos = self.generar_una_vez(clave, generar)
+        log.info("Caché de informes: %s", self.estadisticas())
+        return datos
+
+    def estadisticas(self):
+        aciertos = self.hits + self.hits_compartida + self.hits_disco
+        consultas = aciertos + self.misses
+        return {
+            "entradas": len(self._memoria),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "hits_compartida": self.hits_compartida,
+            "hits_disco": self.hits_disco,
+            "misses": self.misses,
+            "tasa_acierto": aciertos / consultas if consultas else 0.0,
+        }
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# Motor de cálculo de cumplimiento, sin dependencia de Streamlit.
+#
+# calcular_cumplimiento() es la fórmula original ítem a ítem (usada por app.py);
+# MotorCumplimiento (calculo_lote.py) aplica exactamente la misma fórmula a
+# muchas evaluaciones a la vez con NumPy. Este módulo no importa NumPy: lo
+# cargan todas las sesiones y el cálculo por lotes sólo lo usan los procesos
+# batch.
+from collections import defaultdict
+
+ESCENARIOS = [
+    "1. Organismo presenta sección con antecedentes.",
+    "2. Organismo indica no tener antecedentes / no aplica.",
+    "3. No hay sección, pero no hay evidencia de infracción.",
+    "4. No hay sección y sí hay evidencia de información faltante.",
+    "5. Sección/vínculo existe pero no funciona / no muestra datos.",
+]
+
+INDICADORES_GENERALES = [
+    "¿La información está disponible?",
+    "¿La información está actualizada?",
+    "¿La información está completa?"
+]
+
+MESES_ESP = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+
+IG_OPCIONES = ["Sí", "No", "No es posible determinarlo"]
+IE_OPCIONES = ["Sí", "No", "No aplica"]
+
+# Códigos: 0 = sin respuesta / desconocido, 1.. = posición en IG_OPCIONES / IE_OPCIONES
+IG_CODIGO = {v: i + 1 for i, v in enumerate(IG_OPCIONES)}
+IE_CODIGO = {v: i + 1 for i, v in enumerate(IE_OPCIONES)}
+
+# Nombres que se importan de calculo_lote al pedirlos por primera vez
+_NOMBRES_LOTE = ("EvaluacionesCodificadas", "ResultadoLote", "MotorCumplimiento", "puntuar_lote", "VALOR_IG", "VALOR_IG3")
+
+
+def peso_materia(peso):
+    try:
+        return float(peso)
+    except Exception:
+        return None
+
+
+def construir_materia_peso_map(materias_items):
+    materia_peso_map = dict()
+    for mi in materias_items:
+        peso_float = peso_materia(mi['Peso Materia (%)'])
+        if peso_float is not None:
+            materia_peso_map[mi['Materia']] = peso_float
+    return materia_peso_map
+
+
+def valor_item(ev):
+    # Cumplimiento (0..1) de un ítem guardado, o None si queda excluido del cálculo
+    esc = ev.get('escenario', "")
+    ig = ev.get('ig', [])
+    ie = ev.get('ie', [])
+    if esc.startswith("2") or esc.startswith("3"):
+        return None
+    elif esc.startswith("4") or esc.startswith("5"):
+        return 0
+    elif esc.startswith("1"):
+        if ig and ig[0] == "No":
+            return 0
+        elif len(ig) >= 2 and ig[1] == "No":
+            return 0
+        elif len(ig) == 3 and ig[2] in IG_OPCIONES:
+            val_ig = []
+            val_map = {"Sí": 1, "No": 0, "No es posible determinarlo": 1}
+            val_map_ig3 = {"Sí": 1, "No": 0.25, "No es posible determinarlo": 1}
+            val_ig.append(val_map.get(ig[0], 0))
+            val_ig.append(val_map.get(ig[1], 0))
+            val_ig.append(val_map_ig3.get(ig[2], 0))
+            cumplimiento_ig = min(val_ig)
+            if ie:
+                total_ies = len(ie)
+                total_ies_validas = sum(1 for e in ie if e['respuesta'] == "Sí")
+                cumplimiento_ie = total_ies_validas / total_ies if total_ies else 1
+            else:
+                cumplimiento_ie = 1
+            return 0.75 * cumplimiento_ig + 0.25 * cumplimiento_ie
+        else:
+            return 0
+    return None
+
+
+def cumplimiento_global_desde_totales(totales_materia, materia_peso_map):
+    # Renormaliza los pesos sobre las materias con al menos un ítem evaluado
+    total_peso_usable = 0.0
+    materias_incluidas = []
+    pesos_ajustados = {}
+    for mat, data in totales_materia.items():
+        n_items = data['total']
+        n_excluidos = data['excluidos']
+        if n_items == 0 and n_excluidos > 0:
+            continue
+        if n_items > 0:
+            materias_incluidas.append(mat)
+            total_peso_usable += materia_peso_map.get(mat, 0)
+    for mat in materias_incluidas:
+        pesos_ajustados[mat] = materia_peso_map.get(mat, 0) / total_peso_usable if total_peso_usable > 0 else 0
+
+    total_cumplimiento = 0.0
+    for mat in materias_incluidas:
+        data = totales_materia[mat]
+        if data['total'] > 0:
+            porcentaje_mat = data['cumplidos'] / data['total']
+            total_cumplimiento += porcentaje_mat * pesos_ajustados[mat]
+    return round(100 * total_cumplimiento, 1) if total_peso_usable else 0.0
+
+
+def calcular_cumplimiento(evaluacion, materias_items, indicadores_especificos, materia_peso_map=None):
+    if materia_peso_map is None:
+        materia_peso_map = construir_materia_peso_map(materias_items)
+    cumplimiento_materia = defaultdict(list)
+    hallazgos = []
+    totales_materia = defaultdict(lambda: {"cumplidos": 0, "total": 0, "peso": 0.0, "excluidos": 0, "no_eval": 0})
+    items_eval_map = defaultdict(list)
+
+    for mi in materias_items:
+        materia = mi['Materia']
+        item = mi['Ítem']
+        peso = mi['Peso Materia (%)']
+        key = f"{materia} || {item}"
+        ev = evaluacion.get(key, {})
+        esc = ev.get('escenario', "")
+        cumplimiento_item = valor_item(ev)
+
+        if cumplimiento_item is None:
+            totales_materia[materia]['excluidos'] += 1
+            items_eval_map[materia].append({"item": item, "cumplimiento": None, "evaluado": False, "obs": ev.get('obs', '')})
+        else:
+            totales_materia[materia]['cumplidos'] += cumplimiento_item
+            totales_materia[materia]['total'] += 1
+            totales_materia[materia]['peso'] = float(peso) if isinstance(peso, (float, int, str)) and str(peso).replace('.','',1).isdigit() else 0
+            if cumplimiento_item < 1 or esc.startswith("4") or esc.startswith("5"):
+                hallazgos.append({"item": item, "obs": ev.get('obs', '')})
+            cumplimiento_materia[materia].append({"item": item, "cumplimiento": round(100 * cumplimiento_item, 1)})
+            items_eval_map[materia].append({"item": item, "cumplimiento": round(100 * cumplimiento_item, 1), "evaluado": True, "obs": ev.get('obs', '')})
+
+    cumplimiento_global = cumplimiento_global_desde_totales(totales_materia, materia_peso_map)
+    return cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos
+
+
+# -------------------- CÁLCULO INCREMENTAL ---------------------
+
+class MarcadorIncremental:
+    # Mantiene los totales por materia y el cumplimiento global mientras se
+    # guardan ítems. Cada actualización vuelve a sumar sólo la materia del ítem
+    # (a lo más unos pocos ítems, en el orden del catálogo) y renormaliza sobre
+    # las materias: el costo no depende del tamaño de la evaluación y el
+    # resultado es idéntico al de calcular_cumplimiento.
+    def __init__(self, materias_items, materia_peso_map=None):
+        self.materia_peso_map = materia_peso_map if materia_peso_map is not None else construir_materia_peso_map(materias_items)
+        self.materia_de = {}
+        self.claves_materia = defaultdict(list)
+        for mi in materias_items:
+            key = f"{mi['Materia']} || {mi['Ítem']}"
+            self.materia_de[key] = mi['Materia']
+            self.claves_materia[mi['Materia']].append(key)
+        self.valores = {key: None for key in self.materia_de}
+        self.totales = {
+            materia: {"cumplidos": 0, "total": 0, "excluidos": len(claves)}
+            for materia, claves in self.claves_materia.items()
+        }
+        self.cumplimiento_global = 0.0
+
+    def _recalcular_materia(self, materia):
+        data = {"cumplidos": 0, "total": 0, "excluidos": 0}
+        for key in self.claves_materia[materia]:
+            valor = self.valores[key]
+            if valor is None:
+                data['excluidos'] += 1
+            else:
+                data['cumplidos'] += valor
+                data['total'] += 1
+        self.totales[materia] = data
+
+    def actualizar(self, key, ev):
+        materia = self.materia_de.get(key)
+        if materia is None:
+            return self.cumplimiento_global
+        self.valores[key] = valor_item(ev)
+        self._recalcular_materia(materia)
+        self.cumplimiento_global = cumplimiento_global_desde_totales(self.totales, self.materia_peso_map)
+        return self.cumplimiento_global
+
+    def cargar(self, evaluacion):
+        for key in self.valores:
+            self.valores[key] = valor_item(evaluacion.get(key, {}))
+        for materia in self.claves_materia:
+            self._recalcular_materia(materia)
+        self.cumplimiento_global = cumplimiento_global_desde_totales(self.totales, self.materia_peso_map)
+        return self.cumplimiento_global
+
+    def porcentaje_materia(self, materia):
+        data = self.totales[materia]
+        return 100 * data['cumplidos'] / data['total'] if data['total'] else None
+
+
+def __getattr__(nombre):
+    if nombre in _NOMBRES_LOTE:
+        import calculo_lote
+        return getattr(calculo_lote, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Cálculo de cumplimiento vectorizado para muchas evaluaciones a la vez.
+#
+# MotorCumplimiento codifica escenario/IG/IE como arreglos enteros de NumPy y
+# aplica exactamente la fórmula de calculo.calcular_cumplimiento; separado de
+# calculo.py para que app.py no cargue NumPy en cada arranque.
+import numpy as np
+
+from calculo import IG_CODIGO, construir_materia_peso_map
+
+# Valor de cumplimiento por código de IG (IG1/IG2) y para IG3 ("No" = 0.25)
+VALOR_IG = np.array([0.0, 1.0, 0.0, 1.0])
+VALOR_IG3 = np.array([0.0, 1.0, 0.25, 1.0])
+
+
+class EvaluacionesCodificadas:
+    # Respuestas de E evaluaciones sobre los N ítems del catálogo
+    def __init__(self, escenario, ig, ie_si, ie_total):
+        self.escenario = escenario  # (E, N) int8: 0 = sin escenario, 1..5
+        self.ig = ig                # (E, N, 3) int8: códigos IG_CODIGO
+        self.ie_si = ie_si          # (E, N) int16: IE respondidos "Sí"
+        self.ie_total = ie_total    # (E, N) int16: IE guardados
+
+    def __len__(self):
+        return self.escenario.shape[0]
+
+
+class ResultadoLote:
+    def __init__(self, motor, item, excluido, hallazgo, cumplidos, total, excluidos, cumplimiento_global):
+        self.motor = motor
+        self.item = item                  # (E, N) fracción 0..1, NaN si no se evalúa
+        self.excluido = excluido          # (E, N)
+        self.hallazgo = hallazgo          # (E, N)
+        self.cumplidos = cumplidos        # (E, M) suma de cumplimiento por materia
+        self.total = total                # (E, M) ítems evaluados por materia
+        self.excluidos = excluidos        # (E, M) ítems excluidos por materia
+        self.cumplimiento_global = cumplimiento_global  # (E,) redondeado a 1 decimal
+
+    def __len__(self):
+        return self.item.shape[0]
+
+    def porcentaje_materia(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.total > 0, self.cumplidos / np.maximum(self.total, 1), np.nan)
+
+    def materias_df(self):
+        import pandas as pd
+        n_eval, n_mat = self.total.shape
+        return pd.DataFrame({
+            "evaluacion": np.repeat(np.arange(n_eval), n_mat),
+            "materia": np.tile(np.array(self.motor.materias, dtype=object), n_eval),
+            "cumplidos": self.cumplidos.ravel(),
+            "total": self.total.ravel(),
+            "excluidos": self.excluidos.ravel(),
+            "porcentaje": self.porcentaje_materia().ravel(),
+        })
+
+
+class MotorCumplimiento:
+    def __init__(self, materias_items):
+        self.claves = []
+        self.materias = []
+        materia_idx = {}
+        item_materia = []
+        for mi in materias_items:
+            materia = mi['Materia']
+            if materia not in materia_idx:
+                materia_idx[materia] = len(self.materias)
+                self.materias.append(materia)
+            item_materia.append(materia_idx[materia])
+            self.claves.append(f"{materia} || {mi['Ítem']}")
+        self.clave_idx = {k: i for i, k in enumerate(self.claves)}
+        self.item_materia = np.array(item_materia, dtype=np.intp)
+        peso_map = construir_materia_peso_map(materias_items)
+        self.pesos = np.array([peso_map.get(m, 0) for m in self.materias], dtype=float)
+
+    def codificar(self, evaluaciones):
+        n_eval, n_items = len(evaluaciones), len(self.claves)
+        escenario = np.zeros((n_eval, n_items), dtype=np.int8)
+        ig = np.zeros((n_eval, n_items, 3), dtype=np.int8)
+        ie_si = np.zeros((n_eval, n_items), dtype=np.int16)
+        ie_total = np.zeros((n_eval, n_items), dtype=np.int16)
+        clave_idx = self.clave_idx
+        for e, evaluacion in enumerate(evaluaciones):
+            for key, ev in evaluacion.items():
+                j = clave_idx.get(key)
+                if j is None:
+                    continue
+                esc = ev.get('escenario', "")
+                if esc[:1] in ("1", "2", "3", "4", "5"):
+                    escenario[e, j] = int(esc[0])
+                resp = ev.get('ig', [])
+                if len(resp) >= 1:
+                    ig[e, j, 0] = IG_CODIGO.get(resp[0], 0)
+                if len(resp) >= 2:
+                    ig[e, j, 1] = IG_CODIGO.get(resp[1], 0)
+                if len(resp) == 3:
+                    ig[e, j, 2] = IG_CODIGO.get(resp[2], 0)
+                ie = ev.get('ie', [])
+                if ie:
+                    ie_total[e, j] = len(ie)
+                    ie_si[e, j] = sum(1 for x in ie if x['respuesta'] == "Sí")
+        return EvaluacionesCodificadas(escenario, ig, ie_si, ie_total)
+
+    def puntuar(self, codificadas):
+        if not isinstance(codificadas, EvaluacionesCodificadas):
+            codificadas = self.codificar(codificadas)
+        esc = codificadas.escenario
+        ig = codificadas.ig
+
+        excluido = (esc == 0) | (esc == 2) | (esc == 3)
+        cumplimiento_ig = np.minimum(np.minimum(VALOR_IG[ig[..., 0]], VALOR_IG[ig[..., 1]]), VALOR_IG3[ig[..., 2]])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cumplimiento_ie = np.where(codificadas.ie_total > 0, codificadas.ie_si / codificadas.ie_total, 1.0)
+        completo = (esc == 1) & (ig[..., 0] != 2) & (ig[..., 1] != 2) & (ig[..., 2] != 0)
+        item = np.where(completo, 0.75 * cumplimiento_ig + 0.25 * cumplimiento_ie, 0.0)
+        item[excluido] = np.nan
+        evaluado = ~excluido
+        hallazgo = evaluado & ((item < 1) | (esc == 4) | (esc == 5))
+
+        # Agregación por materia en el orden del catálogo (mismo orden de suma
+        # que calcular_cumplimiento, para que el resultado sea idéntico)
+        n_eval, n_mat = esc.shape[0], len(self.materias)
+        cumplidos = np.zeros((n_eval, n_mat))
+        total = np.zeros((n_eval, n_mat), dtype=np.int32)
+        excluidos = np.zeros((n_eval, n_mat), dtype=np.int32)
+        item_filled = np.where(evaluado, item, 0.0)
+        for j, m in enumerate(self.item_materia):
+            cumplidos[:, m] += item_filled[:, j]
+            total[:, m] += evaluado[:, j]
+            excluidos[:, m] += excluido[:, j]
+
+        incluida = total > 0
+        total_peso_usable = np.zeros(n_eval)
+        for m in range(n_mat):
+            total_peso_usable += np.where(incluida[:, m], self.pesos[m], 0.0)
+        total_cumplimiento = np.zeros(n_eval)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for m in range(n_mat):
+                peso_ajustado = np.where(total_peso_usable > 0, self.pesos[m] / total_peso_usable, 0.0)
+                aporte = (cumplidos[:, m] / np.maximum(total[:, m], 1)) * peso_ajustado
+                total_cumplimiento += np.where(incluida[:, m], aporte, 0.0)
+        # round() de Python (no np.round) para reproducir el redondeo original
+        cumplimiento_global = np.array(
+            [round(100 * t, 1) if u else 0.0 for t, u in zip(total_cumplimiento.tolist(), total_peso_usable.tolist())],
+            dtype=float,
+        )
+        return ResultadoLote(self, item, excluido, hallazgo, cumplidos, total, excluidos, cumplimiento_global)
+
+
+def puntuar_lote(evaluaciones, materias_items):
+    return MotorCumplimiento(materias_items).puntuar(evaluaciones)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# Catálogo compilado de materias, ítems e indicadores específicos.
+#
+# Se construye una sola vez por proceso (app.py lo guarda con st.cache_resource)
+# y ofrece búsquedas O(1) en lugar de recorrer los JSON en cada rerun.
+import hashlib
+import json
+import logging
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+from calculo import peso_materia
+
+BASE = Path(__file__).resolve().parent
+ARCHIVO_MATERIAS = "estructura_materias_items.json"
+ARCHIVO_INDICADORES = "estructura_indicadores_especificos_REC_FINAL.json"
+# Código usado en el JSON para ítems que aún no tienen indicadores definidos
+IE_MARCADOR = "IE0"
+
+log = logging.getLogger(__name__)
+
+
+def normalizar(txt):
+    if not isinstance(txt, str):
+        return ""
+    return "".join(c for c in unicodedata.normalize('NFD', txt) if unicodedata.category(c) != 'Mn').lower().strip()
+
+
+def clave_item(materia, item):
+    return f"{materia} || {item}"
+
+
+def clave_normalizada(clave):
+    materia, _, item = clave.partition(" || ")
+    return f"{normalizar(materia)} || {normalizar(item)}"
+
+
+def leer_fuentes(base=BASE):
+    base = Path(base)
+    return (base / ARCHIVO_MATERIAS).read_bytes(), (base / ARCHIVO_INDICADORES).read_bytes()
+
+
+def version_fuentes(raw_materias, raw_indicadores):
+    # Hash del contenido de ambos JSON: identifica la versión del catálogo
+    return hashlib.sha256(raw_materias + b"\0" + raw_indicadores).hexdigest()[:12]
+
+
+class ItemCatalogo:
+    __slots__ = ("id", "materia", "item", "clave", "peso", "ies", "ie_indice")
+
+    def __init__(self, id_, materia, item, peso, ies):
+        self.id = id_
+        self.materia = materia
+        self.item = item
+        self.clave = clave_item(materia, item)
+        self.peso = peso
+        self.ies = ies
+        self.ie_indice = {ie['codigo']: i for i, ie in enumerate(ies)}  # código IE -> posición en ies
+
+
+class Catalogo:
+    def __init__(self, materias_items, indicadores_especificos, version=""):
+        self.materias_items = materias_items
+        self.indicadores_especificos = indicadores_especificos
+        self.version = version
+
+        self.materias_map = defaultdict(list)
+        self.items_id_map = dict()
+        self.items_peso_map = dict()
+        self.materia_peso_map = dict()
+        self.items = dict()          # ID -> ItemCatalogo
+        self.items_por_clave = dict()
+        self.items_por_clave_normalizada = dict()
+        self.ie_texto = dict()       # código IE -> texto
+
+        self._ie_normalizado = {}
+        for k, lista in indicadores_especificos.items():
+            self._ie_normalizado.setdefault(clave_normalizada(k), lista)
+            for ie in lista:
+                self.ie_texto[ie['codigo']] = ie['texto']
+
+        for mi in materias_items:
+            materia = mi['Materia']
+            item = mi['Ítem']
+            id_ = mi['ID']
+            peso = mi['Peso Materia (%)']
+            self.materias_map[materia].append(item)
+            self.items_id_map[(materia, item)] = id_
+            self.items_peso_map[(materia, item)] = peso
+            peso_float = peso_materia(peso)
+            if peso_float is not None:
+                self.materia_peso_map[materia] = peso_float
+            registro = ItemCatalogo(id_, materia, item, peso, self._buscar_ies(materia, item))
+            self.items[id_] = registro
+            self.items_por_clave[registro.clave] = registro
+            self.items_por_clave_normalizada[clave_normalizada(registro.clave)] = registro
+
+        # Errores de estructura como advertencia; los ítems aún sin indicadores
+        # definidos (sólo IE0) son esperables y van en una línea informativa
+        self.advertencias = self.validar()
+        self.provisorios = [r.id for r in self.items.values() if r.ies and all(ie['codigo'] == IE_MARCADOR for ie in r.ies)]
+        if self.advertencias:
+            log.warning("Catálogo %s con %d advertencias:\n  %s", version, len(self.advertencias), "\n  ".join(self.advertencias))
+        if self.provisorios:
+            log.info("Catálogo %s: %d ítems sólo tienen el indicador provisorio %s (IDs %s)", version,
+                     len(self.provisorios), IE_MARCADOR, ", ".join(map(str, self.provisorios)))
+
+    @classmethod
+    def desde_bytes(cls, raw_materias, raw_indicadores):
+        return cls(json.loads(raw_materias), json.loads(raw_indicadores), version_fuentes(raw_materias, raw_indicadores))
+
+    @classmethod
+    def desde_archivos(cls, base=BASE):
+        return cls.desde_bytes(*leer_fuentes(base))
+
+    def _buscar_ies(self, materia, item):
+        clave = clave_item(materia, item)
+        lista = self.indicadores_especificos.get(clave)
+        if lista is None:
+            lista = self._ie_normalizado.get(f"{normalizar(materia)} || {normalizar(item)}")
+        return lista if lista is not None else []
+
+    def lista_ie(self, materia, item):
+        registro = self.items_por_clave.get(clave_item(materia, item))
+        if registro is not None:
+            return registro.ies
+        return self._buscar_ies(materia, item)
+
+    def validar(self):
+        advertencias = []
+        claves_normalizadas = {clave_normalizada(r.clave) for r in self.items.values()}
+        for registro in self.items.values():
+            if not registro.ies:
+                advertencias.append(f"Ítem {registro.id} sin indicadores específicos: {registro.clave}")
+        for k in self.indicadores_especificos:
+            if clave_normalizada(k) not in claves_normalizadas:
+                advertencias.append(f"Indicadores específicos sin ítem asociado: {k}")
+
+        pesos_por_materia = defaultdict(set)
+        for mi in self.materias_items:
+            pesos_por_materia[mi['Materia']].add(str(mi['Peso Materia (%)']))
+        for materia, pesos in pesos_por_materia.items():
+            if len(pesos) > 1:
+                advertencias.append(f"Pesos inconsistentes en la materia {materia}: {sorted(pesos)}")
+        suma = sum(self.materia_peso_map.values())
+        if abs(suma - 1) > 1e-6:
+            advertencias.append(f"La suma de pesos de materias es {suma:.4f} (se esperaba 1)")
+
+        vistos = set()
+        for lista in self.indicadores_especificos.values():
+            for ie in lista:
+                if ie['codigo'] == IE_MARCADOR:
+                    continue
+                if ie['codigo'] in vistos:
+                    advertencias.append(f"Código de indicador específico duplicado: {ie['codigo']}")
+                vistos.add(ie['codigo'])
+        return advertencias
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Cola de generación de informes en segundo plano.
+#
+# Un pool acotado de hilos genera los informes fuera del hilo del script. El
+# identificador de cada trabajo es la clave de contenido del informe
+# (cache_informes.clave_informe), así que pedir dos veces el mismo informe —
+# el mismo usuario con doble clic o dos usuarios a la vez — devuelve el mismo
+# trabajo en lugar de construirlo de nuevo. Los informes terminados quedan en
+# la CacheInformes; la cola sólo guarda el estado de los trabajos recientes.
+# Con el nivel compartido de la caché, un informe que otro proceso ya está
+# generando se espera en lugar de construirlo de nuevo.
+# Si el rerun que encola el informe se está perfilando (perfilado.py), el hilo
+# que lo genera abre su propio perfil "informe": sus etapas (calculo, docx,
+# docx.save) se registran en el log y en los agregados del proceso.
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from perfilado import iniciar_perfil, perfil_actual, terminar_perfil
+
+log = logging.getLogger(__name__)
+
+EN_COLA = "en_cola"
+GENERANDO = "generando"
+LISTO = "listo"
+ERROR = "error"
+
+
+class ColaLlena(RuntimeError):
+    pass
+
+
+class Trabajo:
+    def __init__(self, id_):
+        self.id = id_
+        self.estado = EN_COLA
+        self.progreso = 0.0
+        self.mensaje = "En cola"
+        self.datos = None
+        self.error = None
+        self.creado = time.time()
+        self.terminado_en = None
+        self._evento = threading.Event()
+
+    @property
+    def terminado(self):
+        return self.estado in (LISTO, ERROR)
+
+    def avance(self, progreso, mensaje):
+        self.progreso = progreso
+        self.mensaje = mensaje
+
+    def esperar(self, timeout=None):
+        return self._evento.wait(timeout)
+
+    def _terminar(self, estado, datos=None, error=None):
+        self.datos = datos
+        self.error = error
+        self.progreso = 1.0
+        self.mensaje = "Listo" if estado == LISTO else f"Error: {error}"
+        self.terminado_en = time.time()
+        self.estado = estado
+        self._evento.set()
+
+
+class ColaInformes:
+    def __init__(self, cache, trabajadores=2, max_pendientes=16, max_terminados=64):
+        self.cache = cache
+        self.max_pendientes = max_pendientes
+        self.max_terminados = max_terminados
+        self._pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="informe")
+        self._trabajos = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls, cache):
+        return cls(
+            cache,
+            trabajadores=int(os.environ.get("INFORME_TRABAJADORES", "2")),
+            max_pendientes=int(os.environ.get("INFORME_MAX_PENDIENTES", "16")),
+        )
+
+    def pendientes(self):
+        return sum(1 for t in self._trabajos.values() if not t.terminado)
+
+    def _podar(self):
+        terminados = [k for k, t in self._trabajos.items() if t.terminado]
+        for k in terminados[:max(0, len(terminados) - self.max_terminados)]:
+            del self._trabajos[k]
+
+    def enviar(self, clave, generar):
+        # generar(avance) construye el informe; avance(fraccion, mensaje) informa el progreso.
+        # No debe leer st.session_state: corre en un hilo del pool.
+        with self._lock:
+            trabajo = self._trabajos.get(clave)
+            if trabajo is not None and trabajo.estado != ERROR:
+                self._trabajos.move_to_end(clave)
+                return trabajo
+            trabajo = Trabajo(clave)
+            datos = self.cache.obtener(clave)
+            if datos is not None:
+                trabajo._terminar(LISTO, datos)
+            else:
+                if self.pendientes() >= self.max_pendientes:
+                    raise ColaLlena(f"Hay {self.max_pendientes} informes en preparación; intente en unos segundos.")
+                self._pool.submit(self._ejecutar, trabajo, generar, perfil_actual() is not None)
+            self._trabajos[clave] = trabajo
+            self._podar()
+            return trabajo
+
+    def obtener(self, clave):
+        with self._lock:
+            return self._trabajos.get(clave)
+
+    def _ejecutar(self, trabajo, generar, perfilar=False):
+        # El perfil vive en un threading.local: el del rerun no se ve desde este hilo
+        perfil = iniciar_perfil("informe") if perfilar else None
+        trabajo.estado = GENERANDO
+        trabajo.avance(0.05, "Generando informe")
+        try:
+            datos = self.cache.generar_una_vez(trabajo.id, lambda: generar(trabajo.avance))
+        except Exception as e:
+            log.exception("Falló la generación del informe %s", trabajo.id[:12])
+            trabajo._terminar(ERROR, error=f"{type(e).__name__}: {e}")
+        else:
+            trabajo._terminar(LISTO, datos)
+        finally:
+            terminar_perfil(perfil)
+
+    def estadisticas(self):
+        with self._lock:
+            estados = [t.estado for t in self._trabajos.values()]
+        return {estado: estados.count(estado) for estado in (EN_COLA, GENERANDO, LISTO, ERROR)}
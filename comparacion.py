@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Comparación con pares: posición de un organismo frente a las evaluaciones
+# guardadas de los demás organismos en el mismo período.
+#
+# CohortePeriodo lee del histórico (historico.py) los puntajes de todas las
+# evaluaciones de un período — cumplimiento global, por materia y por ítem, en
+# la escala que guarda sincronizar() — en una matriz evaluaciones × dimensiones.
+# Al construirla cada columna se ordena una sola vez y las columnas se
+# concatenan desplazadas (columna * DESPLAZAMIENTO + puntaje; los puntajes van
+# de 0 a 100 y los vacíos quedan al final de su tramo), así ubicar todas las
+# dimensiones de una evaluación es un solo np.searchsorted. Por dimensión:
+#   percentil  100 * (pares por debajo + la mitad de los empates) / pares
+#   posición   1 + pares por encima, de pares + 1
+#   mediana    de los puntajes de los pares
+# El organismo evaluado se descuenta de su propia cohorte al comparar (su fila
+# guardada sale de los conteos y de la mediana), de modo que una misma cohorte
+# sirve a todos los organismos del período. NumPy se importa sólo al comparar.
+from prioridades import motor_para
+
+DESPLAZAMIENTO = 1000.0  # mayor que cualquier puntaje y que el marcador de vacío
+VACIO = 500.0            # puntaje ausente: ordena después de los puntajes de su columna
+COHORTE_MINIMA = 3       # pares necesarios para mostrar percentiles
+VIGENCIA_COHORTE = 300   # segundos que la app reutiliza una cohorte antes de resincronizar
+ENCABEZADOS_COMPARACION = ["Dimensión", "Puntaje", "Percentil", "Mediana del período", "Posición"]
+
+
+def dimensiones(catalogo):
+    # [(tipo, clave)] en el orden de las columnas: global, materias e ítems del catálogo
+    motor = motor_para(catalogo)
+    return [("global", None)] + [("materia", m) for m in motor.materias] + [("item", c) for c in motor.claves]
+
+
+def puntajes(catalogo, evaluacion):
+    # Puntajes de una evaluación en el orden de dimensiones() y con el redondeo del histórico; NaN sin puntaje
+    import numpy as np
+
+    resultado = motor_para(catalogo).puntuar([evaluacion])
+    item = np.where(resultado.excluido[0], np.nan, resultado.item[0])
+    return np.concatenate([resultado.cumplimiento_global[:1].astype(float),
+                           np.round(100 * resultado.porcentaje_materia()[0], 1),
+                           np.round(100 * item, 1)])
+
+
+class CohortePeriodo:
+    def __init__(self, periodo, organismos, matriz, clave=""):
+        import numpy as np
+
+        self.periodo = periodo
+        self.clave = clave            # identifica el contenido (entra en la clave del informe)
+        self.organismos = list(organismos)
+        self._fila = {o: i for i, o in enumerate(self.organismos)}
+        self.matriz = matriz          # (E, D) puntajes, NaN sin puntaje
+        n_eval, n_dim = matriz.shape
+        self.pares = (~np.isnan(matriz)).sum(axis=0)
+        self._desplazamiento = np.arange(n_dim) * DESPLAZAMIENTO
+        ordenada = np.sort(np.where(np.isnan(matriz), VACIO, matriz), axis=0)
+        self._plano = (ordenada + self._desplazamiento).T.ravel()  # tramo d: [d * E, (d + 1) * E)
+        self._inicio = np.arange(n_dim) * n_eval
+        self.mediana = self._mediana(self.pares, None)
+
+    def __len__(self):
+        return len(self.organismos)
+
+    def pares_de(self, organismo):
+        # Evaluaciones del período sin la del propio organismo
+        return len(self) - (organismo in self._fila)
+
+    @classmethod
+    def desde_historico(cls, historico, catalogo, periodo):
+        # Cohorte del período con los resultados ya sincronizados del histórico; sólo
+        # evaluaciones con ítems guardados (globales() deja fuera las sólo abiertas)
+        import numpy as np
+        import pandas as pd
+
+        globales = historico.globales(desde=periodo, hasta=periodo)
+        globales = globales[globales["n_items"] > 0]
+        organismos = pd.Index(globales["organismo"])
+        motor = motor_para(catalogo)
+        columnas_materia = {m: 1 + i for i, m in enumerate(motor.materias)}
+        columnas_item = {catalogo.items_por_clave[c].id: 1 + len(motor.materias) + j for j, c in enumerate(motor.claves)}
+        matriz = np.full((len(organismos), 1 + len(columnas_materia) + len(columnas_item)), np.nan)
+        matriz[:, 0] = globales["cumplimiento_global"].to_numpy(dtype=float)
+        for df, campo, columnas, valor in ((historico.materias(desde=periodo, hasta=periodo), "materia",
+                                            columnas_materia, "porcentaje"),
+                                           (historico.items(desde=periodo, hasta=periodo), "item_id",
+                                            columnas_item, "cumplimiento")):
+            # Materias o ítems de otra versión del catálogo no tienen columna
+            columna = df[campo].map(columnas).to_numpy(dtype=float)
+            conocida = ~np.isnan(columna)
+            matriz[organismos.get_indexer(df["organismo"])[conocida], columna[conocida].astype(np.intp)] = \
+                df[valor].to_numpy(dtype=float)[conocida]
+        return cls(periodo, organismos, matriz, clave=f"{periodo}:{':'.join(map(str, historico.version()))}")
+
+    def _mediana(self, pares, excluida):
+        # Mediana de cada columna; `excluida`: posición en la columna ordenada de un valor que no cuenta
+        import numpy as np
+
+        restantes = pares if excluida is None else pares - (excluida < pares)
+        k = np.stack([(restantes - 1) // 2, restantes // 2])
+        if excluida is not None:
+            k = k + (k >= excluida)
+        k = np.clip(k, 0, max(len(self) - 1, 0))
+        valores = self._plano[self._inicio + k] - self._desplazamiento if len(self) else np.full(k.shape, np.nan)
+        return np.where(restantes > 0, valores.mean(axis=0), np.nan)
+
+    def comparar(self, valores, excluir=None):
+        # valores: puntajes en el orden de dimensiones(); excluir: organismo que no cuenta como par
+        import numpy as np
+
+        valores = np.asarray(valores, dtype=float)
+        con_valor = ~np.isnan(valores)
+        consulta = np.where(con_valor, valores, 0.0) + self._desplazamiento
+        debajo = np.searchsorted(self._plano, consulta, "left") - self._inicio
+        hasta = np.searchsorted(self._plano, consulta, "right") - self._inicio
+        pares = self.pares
+        mediana = self.mediana
+        fila = self._fila.get(excluir)
+        if fila is not None:
+            propio = self.matriz[fila]
+            tiene = ~np.isnan(propio)
+            menor = tiene & (propio < valores)
+            debajo = debajo - menor
+            hasta = hasta - menor - (tiene & (propio == valores))
+            posicion_propia = np.searchsorted(self._plano, np.where(tiene, propio, VACIO) + self._desplazamiento,
+                                              "left") - self._inicio
+            pares = pares - tiene
+            mediana = self._mediana(self.pares, np.where(tiene, posicion_propia, len(self) + 1))
+        validos = con_valor & (pares > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            percentil = np.where(validos, 100 * (debajo + 0.5 * (hasta - debajo)) / pares, np.nan)
+        return {
+            "valor": valores,
+            "percentil": percentil,
+            "posicion": np.where(validos, pares - hasta + 1, 0),
+            "pares": pares,
+            "mediana": mediana,
+        }
+
+
+def comparar_evaluacion(cohorte, catalogo, evaluacion, excluir=None):
+    # Filas {tipo, dimension, puntaje, percentil, mediana, posicion, pares} de las
+    # dimensiones con puntaje propio y al menos COHORTE_MINIMA pares con puntaje
+    resultado = cohorte.comparar(puntajes(catalogo, evaluacion), excluir)
+    items = catalogo.items_por_clave
+    filas = []
+    for d, (tipo, clave) in enumerate(dimensiones(catalogo)):
+        if resultado["posicion"][d] == 0 or resultado["pares"][d] < COHORTE_MINIMA:
+            continue
+        if tipo == "global":
+            nombre = "Cumplimiento global"
+        elif tipo == "materia":
+            nombre = clave
+        else:
+            nombre = f"{items[clave].materia} / {items[clave].item}"
+        filas.append({
+            "tipo": tipo,
+            "dimension": nombre,
+            "puntaje": float(resultado["valor"][d]),
+            "percentil": float(resultado["percentil"][d]),
+            "mediana": float(resultado["mediana"][d]),
+            "posicion": int(resultado["posicion"][d]),
+            "pares": int(resultado["pares"][d]),
+        })
+    return filas
+
+
+def filas_comparacion(comparacion):
+    # Filas de la tabla COMPARACIÓN CON OTROS ORGANISMOS del informe (ambos generadores)
+    for f in comparacion:
+        yield (f["dimension"], f"{f['puntaje']:.1f}", f"{f['percentil']:.0f}", f"{f['mediana']:.1f}",
+               f"{f['posicion']} de {f['pares'] + 1}")
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# Exportación de resultados en formatos de datos: CSV, JSON y XLSX.
+#
+# Cada evaluación se puntúa una sola vez en un ResultadoExportacion (metadatos,
+# resultados por materia y por ítem, indicadores en incumplimiento) y todos los
+# formatos pedidos se escriben desde ese mismo objeto. Los escritores reciben
+# los resultados de a uno, así que un lote grande se exporta fila a fila sin
+# retener las evaluaciones ya escritas:
+#
+#   python exportar_datos.py --formatos csv,json,xlsx --salida exportacion [--organismo ... --anio ... --mes ...]
+import argparse
+import csv
+import datetime
+import json
+import sys
+from pathlib import Path
+
+from calculo import INDICADORES_GENERALES, calcular_cumplimiento
+
+COLUMNAS_ITEMS = ["Organismo", "Año", "Mes", "Fecha", "Evaluador(a)", "Cumplimiento global", "Materia", "ID", "Ítem",
+                  "Escenario", "Evaluado", "Cumplimiento", "IG en incumplimiento", "IE en incumplimiento", "Observaciones"]
+COLUMNAS_MATERIAS = ["Organismo", "Año", "Mes", "Materia", "Peso", "Ítems evaluados", "Cumplimiento"]
+COLUMNAS_INCUMPLIMIENTOS = ["Organismo", "Año", "Mes", "Materia", "ID", "Ítem", "Código", "Texto indicador"]
+FORMATOS = ("csv", "json", "xlsx")
+
+
+def _fecha_texto(fecha):
+    if isinstance(fecha, (datetime.date, datetime.datetime)):
+        return fecha.isoformat()
+    return fecha or ""
+
+
+class ResultadoExportacion:
+    def __init__(self, catalogo, evaluacion, organismo, anio, mes, fecha=None, evaluador=""):
+        self.organismo = organismo
+        self.anio = anio
+        self.mes = mes
+        self.fecha = fecha
+        self.evaluador = evaluador
+        (self.cumplimiento_global, self.cumplimiento_materia,
+         self.items_eval_map, self.hallazgos) = calcular_cumplimiento(
+            evaluacion, catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+
+        # items_eval_map conserva el orden del catálogo dentro de cada materia
+        pendientes = {materia: iter(items) for materia, items in self.items_eval_map.items()}
+        self.items = []
+        self.incumplimientos = []
+        for registro in catalogo.items.values():
+            item_data = next(pendientes[registro.materia])
+            ev = evaluacion.get(registro.clave, {})
+            ig_no = [f"IG{i+1}" for i, v in enumerate(ev.get("ig") or []) if v == "No"]
+            ie_no = [ie["codigo"] for ie in ev.get("ie") or [] if ie["respuesta"] == "No"]
+            self.items.append({
+                "materia": registro.materia,
+                "id": registro.id,
+                "item": registro.item,
+                "escenario": ev.get("escenario") or "",
+                "evaluado": item_data["evaluado"],
+                "cumplimiento": item_data["cumplimiento"],
+                "ig_incumplidos": ig_no,
+                "ie_incumplidos": ie_no,
+                "obs": item_data["obs"],
+            })
+        # Mismo orden y criterio que el detalle del informe Word
+        for key, ev in evaluacion.items():
+            registro = catalogo.items_por_clave.get(key)
+            if registro is None:
+                continue
+            for idx, val in enumerate(ev.get("ig") or []):
+                if val == "No":
+                    self.incumplimientos.append((registro, f"IG{idx+1}", INDICADORES_GENERALES[idx]))
+            for ie in ev.get("ie") or []:
+                if ie["respuesta"] == "No":
+                    self.incumplimientos.append((registro, ie["codigo"], ie["texto"]))
+
+        self.materias = []
+        for materia, items in self.items_eval_map.items():
+            evaluados = [i for i in items if i["evaluado"]]
+            promedio = round(sum(i["cumplimiento"] for i in evaluados) / len(evaluados), 1) if evaluados else None
+            self.materias.append({
+                "materia": materia,
+                "peso": catalogo.materia_peso_map.get(materia),
+                "evaluados": len(evaluados),
+                "cumplimiento": promedio,
+            })
+
+    @classmethod
+    def desde_almacen(cls, almacen, catalogo, evaluacion_id):
+        datos = almacen.obtener(evaluacion_id)
+        evaluacion, _ = almacen.cargar_evaluacion(evaluacion_id, catalogo)
+        return cls(catalogo, evaluacion, datos["organismo"], datos["anio"], datos["mes"], datos["fecha"], datos["evaluador"])
+
+    def metadatos(self):
+        return {
+            "organismo": self.organismo,
+            "anio": self.anio,
+            "mes": self.mes,
+            "fecha": _fecha_texto(self.fecha),
+            "evaluador": self.evaluador,
+            "cumplimiento_global": self.cumplimiento_global,
+        }
+
+    def filas_items(self):
+        for i in self.items:
+            yield [self.organismo, self.anio, self.mes, _fecha_texto(self.fecha), self.evaluador, self.cumplimiento_global,
+                   i["materia"], i["id"], i["item"], i["escenario"], "Sí" if i["evaluado"] else "No", i["cumplimiento"],
+                   ";".join(i["ig_incumplidos"]), ";".join(i["ie_incumplidos"]), i["obs"]]
+
+    def filas_materias(self):
+        for m in self.materias:
+            yield [self.organismo, self.anio, self.mes, m["materia"], m["peso"], m["evaluados"], m["cumplimiento"]]
+
+    def filas_incumplimientos(self):
+        for registro, codigo, texto in self.incumplimientos:
+            yield [self.organismo, self.anio, self.mes, registro.materia, registro.id, registro.item, codigo, texto]
+
+    def como_dict(self):
+        return {
+            **self.metadatos(),
+            "materias": self.materias,
+            "items": self.items,
+            "incumplimientos": [{"id": r.id, "materia": r.materia, "item": r.item, "codigo": c, "texto": t}
+                                for r, c, t in self.incumplimientos],
+        }
+
+
+# ---------- ESCRITORES ----------
+# Todos reciben un archivo ya abierto (o un buffer) y exponen agregar()/cerrar().
+
+class EscritorCSV:
+    # Una fila por ítem, con los metadatos repetidos para poder agregar lotes
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.csv = csv.writer(archivo)
+        self.csv.writerow(COLUMNAS_ITEMS)
+
+    def agregar(self, resultado):
+        self.csv.writerows(resultado.filas_items())
+
+    def cerrar(self):
+        self.archivo.flush()
+
+
+class EscritorJSON:
+    # Arreglo JSON con un objeto por evaluación, escrito a medida que llegan
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.n = 0
+        archivo.write("[")
+
+    def agregar(self, resultado):
+        self.archivo.write(",\n" if self.n else "\n")
+        json.dump(resultado.como_dict(), self.archivo, ensure_ascii=False)
+        self.n += 1
+
+    def cerrar(self):
+        self.archivo.write("\n]\n" if self.n else "]\n")
+        self.archivo.flush()
+
+
+class EscritorXLSX:
+    # Libro en modo write_only: las filas van directo al XML de cada hoja
+    def __init__(self, archivo):
+        from openpyxl import Workbook
+
+        self.archivo = archivo
+        self.libro = Workbook(write_only=True)
+        self.hoja_items = self.libro.create_sheet("Ítems")
+        self.hoja_materias = self.libro.create_sheet("Materias")
+        self.hoja_incumplimientos = self.libro.create_sheet("Incumplimientos")
+        self.hoja_items.append(COLUMNAS_ITEMS)
+        self.hoja_materias.append(COLUMNAS_MATERIAS)
+        self.hoja_incumplimientos.append(COLUMNAS_INCUMPLIMIENTOS)
+
+    def agregar(self, resultado):
+        for fila in resultado.filas_items():
+            self.hoja_items.append(fila)
+        for fila in resultado.filas_materias():
+            self.hoja_materias.append(fila)
+        for fila in resultado.filas_incumplimientos():
+            self.hoja_incumplimientos.append(fila)
+
+    def cerrar(self):
+        self.libro.save(self.archivo)
+
+
+ESCRITORES = {"csv": EscritorCSV, "json": EscritorJSON, "xlsx": EscritorXLSX}
+
+
+def exportar(resultados, destinos):
+    # destinos: {formato: archivo abierto}. Cada resultado se escribe en todos
+    # los formatos antes de pasar al siguiente.
+    escritores = []
+    for formato, archivo in destinos.items():
+        if formato not in ESCRITORES:
+            raise ValueError(f"Formato desconocido: {formato!r} (opciones: {', '.join(FORMATOS)})")
+        escritores.append(ESCRITORES[formato](archivo))
+    n = 0
+    for resultado in resultados:
+        for escritor in escritores:
+            escritor.agregar(resultado)
+        n += 1
+    for escritor in escritores:
+        escritor.cerrar()
+    return n
+
+
+def exportar_bytes(resultado, formato):
+    # Un solo resultado en memoria, para los botones de descarga de la app
+    from io import BytesIO, StringIO
+
+    if formato == "xlsx":
+        buffer = BytesIO()
+        exportar([resultado], {formato: buffer})
+        return buffer.getvalue()
+    texto = StringIO(newline="")
+    exportar([resultado], {formato: texto})
+    return texto.getvalue().encode("utf-8-sig" if formato == "csv" else "utf-8")
+
+
+def abrir_destino(ruta, formato):
+    if formato == "xlsx":
+        return open(ruta, "wb")
+    # utf-8-sig para que Excel reconozca los acentos al abrir el CSV
+    return open(ruta, "w", encoding="utf-8-sig" if formato == "csv" else "utf-8", newline="")
+
+
+def main(argv=None):
+    from almacen import AlmacenEvaluaciones
+    from catalogo import Catalogo
+
+    parser = argparse.ArgumentParser(description="Exporta evaluaciones guardadas a CSV, JSON y/o XLSX.")
+    parser.add_argument("--formatos", default=",".join(FORMATOS))
+    parser.add_argument("--salida", default="exportacion", help="ruta base, sin extensión")
+    parser.add_argument("--organismo")
+    parser.add_argument("--anio", type=int)
+    parser.add_argument("--mes")
+    parser.add_argument("--estado")
+    args = parser.parse_args(argv)
+
+    catalogo = Catalogo.desde_archivos()
+    almacen = AlmacenEvaluaciones.desde_entorno()
+    ids = [e["id"] for e in almacen.buscar(args.organismo, args.anio, args.mes, args.estado)]
+    formatos = [f.strip().lower() for f in args.formatos.split(",") if f.strip()]
+    destinos = {f: abrir_destino(Path(f"{args.salida}.{f}"), f) for f in formatos}
+    try:
+        n = exportar((ResultadoExportacion.desde_almacen(almacen, catalogo, i) for i in ids), destinos)
+    finally:
+        for archivo in destinos.values():
+            archivo.close()
+    print(f"{n} evaluaciones exportadas: {', '.join(f'{args.salida}.{f}' for f in formatos)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Ingreso en grilla: todos los ítems de una materia en una sola pantalla.
+#
+# La materia se muestra como dos grillas editables dentro de un mismo
+# formulario: una fila por ítem (escenario, IG1, IG2, IG3, observaciones) y una
+# fila por indicador específico. Editar una celda no provoca reruns; al enviar
+# el formulario cada ítem se arma como el estado del formulario por ítem, se
+# valida con validar_respuestas (las mismas reglas del bloque "VALIDACIÓN Y
+# GUARDADO" más las de los importadores) y los ítems válidos se guardan juntos
+# con AlmacenEvaluaciones.guardar_items. Los ítems con errores quedan como
+# borrador para corregirlos en la grilla o en el formulario por ítem.
+# El envío se procesa en el callback del botón, antes del rerun: las ediciones
+# llegan como cambios sobre las filas (aplicar_ediciones) y el panel de avance
+# ya se dibuja con la materia guardada, sin un st.rerun() adicional.
+from validacion import estado_vacio, registro_desde_estado, validar_respuestas
+
+COLUMNAS_ITEMS = ["ID", "Ítem", "Escenario", "IG1", "IG2", "IG3", "Observaciones"]
+COLUMNAS_IE = ["ID", "Ítem", "Código", "Indicador específico", "Respuesta"]
+CAMPOS_IG = (("IG1", "ig1"), ("IG2", "ig2"), ("IG3", "ig3"))
+
+
+def items_materia(catalogo, materia):
+    # ItemCatalogo de la materia, en el orden del catálogo
+    return [item for item in catalogo.items.values() if item.materia == materia]
+
+
+def filas_grilla(catalogo, materia, borradores, evaluacion):
+    # -> (filas de ítems, filas de IE) con el borrador o lo guardado de cada ítem
+    filas_items, filas_ie = [], []
+    for item in items_materia(catalogo, materia):
+        state = borradores.estado(item.clave, evaluacion)
+        fila = {"ID": item.id, "Ítem": item.item, "Escenario": state["escenario"]}
+        for columna, campo in CAMPOS_IG:
+            fila[columna] = state[campo]
+        fila["Observaciones"] = state["obs"]
+        filas_items.append(fila)
+        for ie in item.ies:
+            filas_ie.append({"ID": item.id, "Ítem": item.item, "Código": ie["codigo"],
+                             "Indicador específico": ie["texto"], "Respuesta": state["ie"].get(ie["codigo"])})
+    return filas_items, filas_ie
+
+
+def aplicar_ediciones(filas, cambios):
+    # Filas con los cambios de st.data_editor ({"edited_rows": {fila: {columna: valor}}})
+    filas = [dict(f) for f in filas]
+    for indice, columnas in ((cambios or {}).get("edited_rows") or {}).items():
+        filas[int(indice)].update(columnas)
+    return filas
+
+
+def _valor(v):
+    # Celdas vacías de la grilla: None, NaN o texto en blanco
+    if v is None or v != v or (isinstance(v, str) and not v.strip()):
+        return None
+    return v
+
+
+def estados_desde_grilla(catalogo, filas_items, filas_ie):
+    # -> {ID de ítem: estado} sólo para los ítems con alguna respuesta
+    respuestas_ie = {}
+    for fila in filas_ie:
+        respuesta = _valor(fila.get("Respuesta"))
+        if respuesta is not None:
+            respuestas_ie.setdefault(fila["ID"], {})[fila["Código"]] = respuesta
+    estados = {}
+    for fila in filas_items:
+        state = estado_vacio()
+        state["escenario"] = _valor(fila.get("Escenario"))
+        for columna, campo in CAMPOS_IG:
+            state[campo] = _valor(fila.get(columna))
+        state["obs"] = _valor(fila.get("Observaciones")) or ""
+        # Los IE en el orden del catálogo, como los deja el formulario por ítem
+        respuestas = respuestas_ie.get(fila["ID"], {})
+        item = catalogo.items[fila["ID"]]
+        state["ie"] = {ie["codigo"]: respuestas[ie["codigo"]] for ie in item.ies if ie["codigo"] in respuestas}
+        if (state["escenario"] is None and state["obs"] == "" and not state["ie"]
+                and all(state[campo] is None for _, campo in CAMPOS_IG)):
+            continue
+        estados[fila["ID"]] = state
+    return estados
+
+
+def procesar_grilla(catalogo, filas_items, filas_ie, evaluacion):
+    # -> (registros a guardar {clave: registro}, errores {clave: [mensajes]}, estados {clave: estado})
+    # Los ítems sin cambios respecto de lo guardado no se vuelven a guardar.
+    registros, errores, estados = {}, {}, {}
+    for item_id, state in estados_desde_grilla(catalogo, filas_items, filas_ie).items():
+        item = catalogo.items[item_id]
+        estados[item.clave] = state
+        mensajes = validar_respuestas(state, item.ies)
+        if mensajes:
+            errores[item.clave] = mensajes
+            continue
+        registro = registro_desde_estado(state, item.ies)
+        if evaluacion.get(item.clave) != registro:
+            registros[item.clave] = registro
+    return registros, errores, estados
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+# Histórico de resultados y analítica entre períodos.
+#
+# Los resultados puntuados de cada evaluación del almacén (cumplimiento global,
+# por materia, por ítem y los IE en "No") se guardan en tablas indexadas por
+# organismo, período (año*12 + mes), materia, ID de ítem y código de IE, en el
+# mismo archivo SQLite que AlmacenEvaluaciones. sincronizar() puntúa de una vez
+# con MotorCumplimiento sólo las evaluaciones nuevas o modificadas desde el
+# último cálculo (o calculadas con otra versión del catálogo).
+#
+# Materias y códigos de IE se guardan como enteros (tablas nombres_materia y
+# codigos_ie): los extractos leen sólo números de cada tabla, sin JOIN, y
+# organismo/período se agregan en pandas por evaluacion_id. La analítica
+# trabaja sobre esos extractos por columnas (DataFrames) con group-bys, sin
+# recorrer evaluaciones en Python:
+#   tendencias()            pendiente de la recta de mínimos cuadrados por grupo (puntos/mes)
+#   variaciones_mensuales() diferencia con el período anterior de cada grupo
+#   fallas_recurrentes()    IE en "No" en varios períodos de un mismo organismo
+# OBJETIVOS_MS fija la latencia esperada de cada consulta del tablero
+# (pages/2_Tendencias.py); benchmarks/bench_historico.py la mide con miles de
+# evaluaciones.
+#
+#   python historico.py [--minimo 3]   sincroniza y muestra un resumen
+import argparse
+import json
+import sys
+import time
+
+from calculo import MESES_ESP
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    evaluacion_id       INTEGER PRIMARY KEY REFERENCES evaluaciones (id) ON DELETE CASCADE,
+    organismo           TEXT NOT NULL,
+    anio                INTEGER NOT NULL,
+    mes                 TEXT NOT NULL,
+    periodo             INTEGER NOT NULL,
+    cumplimiento_global REAL NOT NULL,
+    n_items             INTEGER NOT NULL,
+    catalogo            TEXT NOT NULL,
+    calculado           REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resultados_organismo ON resultados (organismo, periodo);
+CREATE INDEX IF NOT EXISTS idx_resultados_periodo ON resultados (periodo);
+CREATE TABLE IF NOT EXISTS nombres_materia (
+    id      INTEGER PRIMARY KEY,
+    materia TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS codigos_ie (
+    id     INTEGER PRIMARY KEY,
+    codigo TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS resultados_materia (
+    evaluacion_id INTEGER NOT NULL REFERENCES resultados (evaluacion_id) ON DELETE CASCADE,
+    materia_id    INTEGER NOT NULL REFERENCES nombres_materia (id),
+    evaluados     INTEGER NOT NULL,
+    excluidos     INTEGER NOT NULL,
+    porcentaje    REAL,
+    PRIMARY KEY (evaluacion_id, materia_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_resultados_materia ON resultados_materia (materia_id);
+CREATE TABLE IF NOT EXISTS resultados_item (
+    evaluacion_id INTEGER NOT NULL REFERENCES resultados (evaluacion_id) ON DELETE CASCADE,
+    item_id       INTEGER NOT NULL,
+    cumplimiento  REAL,
+    hallazgo      INTEGER NOT NULL,
+    PRIMARY KEY (evaluacion_id, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_resultados_item ON resultados_item (item_id);
+CREATE TABLE IF NOT EXISTS fallas_ie (
+    evaluacion_id INTEGER NOT NULL REFERENCES resultados (evaluacion_id) ON DELETE CASCADE,
+    item_id       INTEGER NOT NULL,
+    codigo_id     INTEGER NOT NULL REFERENCES codigos_ie (id),
+    PRIMARY KEY (evaluacion_id, item_id, codigo_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fallas_ie_codigo ON fallas_ie (codigo_id);
+"""
+
+# Latencia objetivo (ms) de cada consulta del tablero con ~5.000 evaluaciones
+OBJETIVOS_MS = {
+    "sincronizar": 50,       # sin evaluaciones pendientes
+    "extraer": 400,          # globales, materias y fallas de IE
+    "tendencias": 100,
+    "variaciones": 100,
+    "fallas_recurrentes": 150,
+}
+
+_PENDIENTES = """
+SELECT e.id, e.organismo, e.anio, e.mes
+FROM evaluaciones e LEFT JOIN resultados r ON r.evaluacion_id = e.id
+WHERE r.evaluacion_id IS NULL OR r.calculado < e.actualizada OR r.catalogo != ?
+"""
+
+
+def periodo(anio, mes):
+    # Meses consecutivos difieren en 1, también entre diciembre y enero
+    return int(anio) * 12 + MESES_ESP.index(mes)
+
+
+def etiqueta_periodo(valor):
+    return f"{valor // 12}-{valor % 12 + 1:02d}"
+
+
+class HistoricoEvaluaciones:
+    def __init__(self, almacen, catalogo):
+        self.almacen = almacen
+        self.catalogo = catalogo
+        self._motor = None
+        with self.almacen._conexion() as con:
+            con.executescript(ESQUEMA)
+
+    @property
+    def motor(self):
+        if self._motor is None:
+            from calculo_lote import MotorCumplimiento
+            self._motor = MotorCumplimiento(self.catalogo.materias_items)
+        return self._motor
+
+    # ---------- SINCRONIZACIÓN ----------
+    def sincronizar(self, lote=500):
+        # Puntúa y guarda las evaluaciones pendientes; devuelve cuántas
+        con = self.almacen._conexion()
+        pendientes = con.execute(_PENDIENTES, (self.catalogo.version,)).fetchall()
+        for i in range(0, len(pendientes), lote):
+            self._registrar(con, pendientes[i:i + lote])
+        return len(pendientes)
+
+    def _evaluaciones(self, con, ids):
+        # Registros con la misma forma que st.session_state.evaluacion (sin textos de IE)
+        evaluaciones = {i: {} for i in ids}
+        items = self.catalogo.items
+        marcas = ",".join("?" * len(ids))
+        cursor = con.execute(
+            f"SELECT evaluacion_id, item_id, escenario, ig1, ig2, ig3, ie FROM items "
+            f"WHERE evaluacion_id IN ({marcas}) ORDER BY evaluacion_id, orden", ids)
+        for evaluacion_id, item_id, esc, ig1, ig2, ig3, ie in cursor:
+            registro = items.get(item_id)
+            if registro is None:
+                continue
+            evaluaciones[evaluacion_id][registro.clave] = {
+                "escenario": esc or "",
+                "ig": [ig1, ig2, ig3],
+                "ie": [{"codigo": k, "respuesta": v} for k, v in json.loads(ie).items()],
+            }
+        return evaluaciones
+
+    def _registrar(self, con, pendientes):
+        # Marca tomada antes de leer: un ítem guardado durante el cálculo deja la evaluación pendiente
+        ahora = time.time()
+        ids = [p[0] for p in pendientes]
+        evaluaciones = self._evaluaciones(con, ids)
+        motor = self.motor
+        resultado = motor.puntuar([evaluaciones[i] for i in ids])
+        porcentaje = resultado.porcentaje_materia()
+        item_ids = [self.catalogo.items_por_clave[c].id for c in motor.claves]
+
+        materia_id = self._ids(con, "nombres_materia", "materia", motor.materias)
+        codigo_id = self._ids(con, "codigos_ie", "codigo",
+                              {x["codigo"] for ev in evaluaciones.values() for r in ev.values() for x in r["ie"]})
+
+        filas, filas_materia, filas_item, filas_ie = [], [], [], []
+        for e, (evaluacion_id, organismo, anio, mes) in enumerate(pendientes):
+            evaluacion = evaluaciones[evaluacion_id]
+            filas.append((evaluacion_id, organismo, anio, mes, periodo(anio, mes),
+                          float(resultado.cumplimiento_global[e]), len(evaluacion), self.catalogo.version, ahora))
+            for m, materia in enumerate(motor.materias):
+                if resultado.total[e, m] or resultado.excluidos[e, m]:
+                    filas_materia.append((evaluacion_id, materia_id[materia], int(resultado.total[e, m]),
+                                          int(resultado.excluidos[e, m]),
+                                          round(100 * float(porcentaje[e, m]), 1) if resultado.total[e, m] else None))
+            for clave, ev in evaluacion.items():
+                j = motor.clave_idx[clave]
+                valor = None if resultado.excluido[e, j] else round(100 * float(resultado.item[e, j]), 1)
+                filas_item.append((evaluacion_id, item_ids[j], valor, int(resultado.hallazgo[e, j])))
+                filas_ie.extend((evaluacion_id, item_ids[j], codigo_id[x["codigo"]])
+                                for x in ev["ie"] if x["respuesta"] == "No")
+
+        marcas = ",".join("?" * len(ids))
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for tabla in ("fallas_ie", "resultados_item", "resultados_materia", "resultados"):
+                con.execute(f"DELETE FROM {tabla} WHERE evaluacion_id IN ({marcas})", ids)
+            con.executemany("INSERT INTO resultados VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)
+            con.executemany("INSERT INTO resultados_materia VALUES (?, ?, ?, ?, ?)", filas_materia)
+            con.executemany("INSERT INTO resultados_item VALUES (?, ?, ?, ?)", filas_item)
+            con.executemany("INSERT OR IGNORE INTO fallas_ie VALUES (?, ?, ?)", filas_ie)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def version(self):
+        # Cambia cada vez que sincronizar() registra algo: sirve de clave de caché de los extractos
+        return tuple(self.almacen._conexion().execute("SELECT COUNT(*), MAX(calculado) FROM resultados").fetchone())
+
+    def organismos(self):
+        return [f[0] for f in self.almacen._conexion().execute("SELECT DISTINCT organismo FROM resultados WHERE n_items > 0 ORDER BY 1")]
+
+    @staticmethod
+    def _ids(con, tabla, columna, nombres):
+        con.executemany(f"INSERT OR IGNORE INTO {tabla} ({columna}) VALUES (?)", [(n,) for n in nombres])
+        return dict(con.execute(f"SELECT {columna}, id FROM {tabla}").fetchall())
+
+    def _nombres(self, tabla, columna):
+        return dict(self.almacen._conexion().execute(f"SELECT id, {columna} FROM {tabla}").fetchall())
+
+    # ---------- EXTRACTOS ----------
+    def _filtro(self, organismo, desde, hasta):
+        condiciones, parametros = [], []
+        for condicion, valor in (("organismo = ?", organismo), ("periodo >= ?", desde), ("periodo <= ?", hasta)):
+            if valor is not None:
+                condiciones.append(condicion)
+                parametros.append(valor)
+        return (f"WHERE {' AND '.join(condiciones)}" if condiciones else ""), parametros
+
+    def _extraer(self, tabla, columnas, organismo, desde, hasta):
+        # Columnas numéricas de una tabla de detalle leídas directo a un arreglo
+        # de NumPy, con organismo y período de su evaluación. Los REAL que
+        # admiten NULL viajan como -1 (los porcentajes nunca son negativos).
+        import numpy as np
+        import pandas as pd
+
+        where, parametros = self._filtro(organismo, desde, hasta)
+        if where:
+            where = f"WHERE evaluacion_id IN (SELECT evaluacion_id FROM resultados {where})"
+        select = ", ".join(f"IFNULL({c}, -1)" if t == "f8" else c for c, t in columnas)
+        cursor = self.almacen._conexion().execute(f"SELECT evaluacion_id, {select} FROM {tabla} {where}", parametros)
+        arreglo = np.fromiter(cursor, dtype=[("evaluacion_id", "i8")] + list(columnas))
+        detalle = pd.DataFrame(arreglo)
+        for c, t in columnas:
+            if t == "f8":
+                detalle[c] = detalle[c].where(detalle[c] >= 0)
+        claves = self.globales(organismo, desde, hasta)[["evaluacion_id", "organismo", "periodo"]]
+        return claves.merge(detalle, on="evaluacion_id", how="inner", sort=False).drop(columns="evaluacion_id")
+
+    def globales(self, organismo=None, desde=None, hasta=None):
+        # Una evaluación abierta sin ítems guardados (p. ej. al enviar los datos
+        # generales de la app) se registra para no quedar pendiente, pero no es un
+        # resultado: queda fuera de los extractos (los de detalle se cruzan con éste)
+        import pandas as pd
+
+        where, parametros = self._filtro(organismo, desde, hasta)
+        where = f"{where} AND n_items > 0" if where else "WHERE n_items > 0"
+        filas = self.almacen._conexion().execute(
+            f"SELECT evaluacion_id, organismo, periodo, cumplimiento_global, n_items FROM resultados {where}",
+            parametros).fetchall()
+        return pd.DataFrame.from_records(
+            filas, columns=["evaluacion_id", "organismo", "periodo", "cumplimiento_global", "n_items"])
+
+    def materias(self, organismo=None, desde=None, hasta=None):
+        df = self._extraer("resultados_materia", [("materia_id", "i4"), ("evaluados", "i4"), ("excluidos", "i4"),
+                                                  ("porcentaje", "f8")], organismo, desde, hasta)
+        df.insert(2, "materia", df.pop("materia_id").map(self._nombres("nombres_materia", "materia")))
+        return df
+
+    def items(self, organismo=None, desde=None, hasta=None):
+        return self._extraer("resultados_item", [("item_id", "i4"), ("cumplimiento", "f8"), ("hallazgo", "i1")],
+                             organismo, desde, hasta)
+
+    def fallas(self, organismo=None, desde=None, hasta=None):
+        df = self._extraer("fallas_ie", [("item_id", "i4"), ("codigo_id", "i4")], organismo, desde, hasta)
+        df["codigo"] = df.pop("codigo_id").map(self._nombres("codigos_ie", "codigo"))
+        return df
+
+
+# ---------- ANALÍTICA ----------
+def tendencias(df, por=("organismo",), valor="cumplimiento_global"):
+    # Recta de mínimos cuadrados de `valor` contra el período, por grupo
+    por = list(por)
+    datos = df.loc[df[valor].notna(), por + ["periodo", valor]]
+    x = datos["periodo"].astype(float)
+    y = datos[valor].astype(float)
+    datos = datos.assign(x=x, y=y, xx=x * x, xy=x * y)
+    g = datos.groupby(por, sort=False)
+    resumen = g.agg(n=("x", "size"), sx=("x", "sum"), sy=("y", "sum"), sxx=("xx", "sum"), sxy=("xy", "sum"),
+                    desde=("periodo", "min"), hasta=("periodo", "max"), promedio=("y", "mean"))
+    orden = datos.sort_values("periodo", kind="stable").groupby(por, sort=False)["y"]
+    resumen["inicial"] = orden.first()
+    resumen["final"] = orden.last()
+    denominador = resumen["n"] * resumen["sxx"] - resumen["sx"] ** 2
+    resumen["pendiente"] = ((resumen["n"] * resumen["sxy"] - resumen["sx"] * resumen["sy"])
+                            / denominador.where(denominador > 0))
+    return (resumen.drop(columns=["sx", "sy", "sxx", "sxy"])
+            .rename(columns={"n": "periodos"})
+            .reset_index()
+            .sort_values("pendiente", na_position="last", kind="stable"))
+
+
+def variaciones_mensuales(df, por=("organismo",), valor="cumplimiento_global"):
+    # Diferencia con el período anterior del mismo grupo; `consecutivo` indica
+    # que el anterior es el mes inmediatamente previo
+    por = list(por)
+    datos = df.loc[:, por + ["periodo", valor]].sort_values(por + ["periodo"], kind="stable")
+    g = datos.groupby(por, sort=False)
+    anterior = g[valor].shift()
+    periodo_anterior = g["periodo"].shift()
+    return datos.assign(
+        anterior=anterior,
+        periodo_anterior=periodo_anterior,
+        variacion=datos[valor] - anterior,
+        consecutivo=(datos["periodo"] - periodo_anterior) == 1,
+    ).reset_index(drop=True)
+
+
+def ultimas_variaciones(variaciones, por=("organismo",)):
+    # Última variación disponible de cada grupo
+    return variaciones.dropna(subset=["variacion"]).groupby(list(por), sort=False).tail(1).reset_index(drop=True)
+
+
+def fallas_recurrentes(fallas, minimo=3):
+    # IE en "No" en al menos `minimo` períodos del mismo organismo, con la
+    # racha de meses consecutivos que termina en el último período con falla.
+    # El ítem es parte de la clave: el código provisorio IE0 (catalogo.IE_MARCADOR)
+    # se repite en varios ítems y sus fallas no deben mezclarse.
+    grupo = ["organismo", "item_id", "codigo"]
+    datos = fallas.drop_duplicates(grupo + ["periodo"]).sort_values(grupo + ["periodo"], kind="stable")
+    nuevo_grupo = (datos[grupo] != datos[grupo].shift()).any(axis=1)
+    corte = nuevo_grupo | (datos["periodo"].diff() != 1)
+    datos = datos.assign(racha_id=corte.cumsum())
+    largo_racha = datos.groupby("racha_id")["periodo"].transform("size")
+    datos = datos.assign(racha=largo_racha)
+    resumen = datos.groupby(grupo, sort=False).agg(
+        periodos=("periodo", "size"), primero=("periodo", "min"), ultimo=("periodo", "max"),
+        racha_actual=("racha", "last"))
+    resumen = resumen[resumen["periodos"] >= minimo].reset_index()
+    return resumen.sort_values(["periodos", "racha_actual"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+def codigos_recurrentes(recurrentes):
+    # Por ítem y código: en cuántos organismos falla de forma recurrente
+    return (recurrentes.groupby(["item_id", "codigo"], sort=False)
+            .agg(organismos=("organismo", "nunique"), periodos=("periodos", "sum"))
+            .reset_index()
+            .sort_values(["organismos", "periodos"], ascending=False, kind="stable")
+            .reset_index(drop=True))
+
+
+def main(argv=None):
+    from almacen import AlmacenEvaluaciones
+    from catalogo import Catalogo
+
+    parser = argparse.ArgumentParser(description="Sincroniza el histórico de resultados y resume tendencias.")
+    parser.add_argument("--minimo", type=int, default=3, help="períodos para considerar recurrente una falla de IE")
+    args = parser.parse_args(argv)
+
+    historico = HistoricoEvaluaciones(AlmacenEvaluaciones.desde_entorno(), Catalogo.desde_archivos())
+    t0 = time.perf_counter()
+    n = historico.sincronizar()
+    print(f"{n} evaluaciones puntuadas en {time.perf_counter() - t0:.2f} s")
+    globales = historico.globales()
+    if globales.empty:
+        return 0
+    print(tendencias(globales).head(10).to_string(index=False))
+    print(codigos_recurrentes(fallas_recurrentes(historico.fallas(), args.minimo)).head(10).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
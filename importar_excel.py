@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# Importación masiva de evaluaciones desde planillas Excel.
+#
+# La planilla se lee en modo read_only de openpyxl, fila a fila, sin cargar la
+# hoja completa en memoria. Cada fila es un ítem:
+#
+#   Organismo | Año | Mes | Evaluador | Fecha | ID | Escenario | IG1 | IG2 | IG3 | Observaciones | IE1_M1_I1 | ...
+#
+# El ítem se identifica por "ID" o por "Materia" + "Ítem"; las columnas de IE
+# usan los códigos del catálogo. Organismo, año y mes pueden omitirse si se
+# entregan como valores por defecto (p. ej. la evaluación abierta en la app).
+# Cada fila se valida con las mismas reglas que el bloque de guardado de app.py.
+#
+#   python importar_excel.py planilla.xlsx [--guardar] [--organismo ... --anio ... --mes ...]
+import argparse
+import datetime
+import sys
+import time
+
+from calculo import ESCENARIOS, IE_OPCIONES, IG_OPCIONES, MESES_ESP
+from catalogo import clave_item, normalizar
+from validacion import registro_desde_estado, validar_respuestas
+
+COLUMNAS = {
+    "organismo": "organismo",
+    "ano": "anio", "anio": "anio", "ano evaluado": "anio",
+    "mes": "mes", "mes evaluado": "mes",
+    "evaluador": "evaluador", "evaluador(a)": "evaluador",
+    "fecha": "fecha",
+    "id": "id", "id item": "id",
+    "materia": "materia",
+    "item": "item",
+    "escenario": "escenario",
+    "ig1": "ig1", "ig2": "ig2", "ig3": "ig3",
+    "observaciones": "obs", "obs": "obs",
+}
+COLUMNAS_PLANTILLA = ["Organismo", "Año", "Mes", "Evaluador", "Fecha", "ID", "Materia", "Ítem",
+                      "Escenario", "IG1", "IG2", "IG3", "Observaciones"]
+RESPUESTAS = {clave: v for v in IG_OPCIONES + IE_OPCIONES for clave in (v, normalizar(v))}
+MESES = {normalizar(m): m for m in MESES_ESP}
+CAMPOS_RESPUESTA = {"escenario", "ig1", "ig2", "ig3", "obs"}
+
+
+class ErrorFila(ValueError):
+    pass
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.evaluaciones = {}  # (organismo, anio, mes) -> datos y evaluación
+        self.errores = []       # (fila, mensaje)
+        self.advertencias = []  # (fila, mensaje)
+        self.filas = 0
+        self.filas_importadas = 0
+        self.segundos = 0.0
+        self.catalogo = ""      # versión del catálogo con que se validaron las filas
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    def resumen(self):
+        return (f"{self.filas_importadas} de {self.filas} filas importadas en {len(self.evaluaciones)} evaluaciones, "
+                f"{len(self.errores)} con errores ({self.filas_por_segundo:,.0f} filas/s)")
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor).strip()
+    return texto or None
+
+
+def _respuesta(valor, columna):
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    respuesta = RESPUESTAS.get(texto) or RESPUESTAS.get(normalizar(texto))
+    if respuesta is None:
+        raise ErrorFila(f"{columna}: respuesta no reconocida {texto!r}")
+    return respuesta
+
+
+def _escenario(valor):
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    numero = texto.split(".")[0].strip()
+    if numero in ("1", "2", "3", "4", "5"):
+        return ESCENARIOS[int(numero) - 1]
+    for escenario in ESCENARIOS:
+        if normalizar(escenario) == normalizar(texto):
+            return escenario
+    raise ErrorFila(f"Escenario no reconocido {texto!r}")
+
+
+def _mes(valor):
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    if texto.isdigit() and 1 <= int(texto) <= 12:
+        return MESES_ESP[int(texto) - 1]
+    mes = MESES.get(normalizar(texto))
+    if mes is None:
+        raise ErrorFila(f"Mes no reconocido {texto!r}")
+    return mes
+
+
+def _anio(valor):
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    if not texto.isdigit():
+        raise ErrorFila(f"Año no reconocido {texto!r}")
+    return int(texto)
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ErrorFila(f"Fecha no reconocida {texto!r}")
+
+
+def _mapear_encabezado(encabezado, catalogo):
+    codigos = {normalizar(c): c for c in catalogo.ie_texto}
+    mapa = {}
+    for i, nombre in enumerate(encabezado):
+        clave = normalizar(_texto(nombre) or "")
+        if clave in COLUMNAS:
+            mapa[i] = COLUMNAS[clave]
+        elif clave in codigos:
+            mapa[i] = ("ie", codigos[clave])
+    if "id" not in mapa.values() and not {"materia", "item"} <= set(mapa.values()):
+        raise ValueError("La planilla debe tener una columna 'ID' o las columnas 'Materia' e 'Ítem'.")
+    return mapa
+
+
+def _item(fila, catalogo):
+    if fila.get("id") is not None:
+        texto = _texto(fila["id"])
+        registro = catalogo.items.get(int(texto)) if texto and texto.isdigit() else None
+        if registro is None:
+            raise ErrorFila(f"ID de ítem desconocido {texto!r}")
+        return registro
+    materia, item = _texto(fila.get("materia")), _texto(fila.get("item"))
+    registro = catalogo.items_por_clave.get(clave_item(materia, item))
+    if registro is None:
+        registro = catalogo.items_por_clave_normalizada.get(f"{normalizar(materia)} || {normalizar(item)}")
+    if registro is None:
+        raise ErrorFila(f"Ítem desconocido: {materia} / {item}")
+    return registro
+
+
+def _procesar_fila(valores, catalogo, defaults):
+    fila = {"ie": {}}
+    for columna, valor in valores:
+        if isinstance(columna, tuple):
+            fila["ie"][columna[1]] = _respuesta(valor, columna[1])
+        else:
+            fila[columna] = valor
+    registro_item = _item(fila, catalogo)
+
+    organismo = _texto(fila.get("organismo")) or defaults.get("organismo")
+    anio = _anio(fila.get("anio")) or defaults.get("anio")
+    mes = _mes(fila.get("mes")) or defaults.get("mes")
+    if not (organismo and anio and mes):
+        raise ErrorFila("Faltan organismo, año o mes evaluado.")
+
+    lista_ie = registro_item.ies
+    state = {
+        "escenario": _escenario(fila.get("escenario")),
+        "ig1": _respuesta(fila.get("ig1"), "IG1"),
+        "ig2": _respuesta(fila.get("ig2"), "IG2"),
+        "ig3": _respuesta(fila.get("ig3"), "IG3"),
+        # en el orden del catálogo, como los radios de la app
+        "ie": {ie['codigo']: fila["ie"][ie['codigo']] for ie in lista_ie if ie['codigo'] in fila["ie"]},
+        "obs": _texto(fila.get("obs")) or "",
+    }
+    ajenos = [c for c in fila["ie"] if c not in state["ie"]]
+    if ajenos:
+        raise ErrorFila(f"Indicadores que no pertenecen al ítem {registro_item.id}: {', '.join(ajenos)}")
+    errores = validar_respuestas(state, lista_ie)
+    if errores:
+        raise ErrorFila(" ".join(errores))
+
+    periodo = (organismo, int(anio), mes)
+    datos = {
+        "evaluador": _texto(fila.get("evaluador")) or defaults.get("evaluador", ""),
+        "fecha": _fecha(fila.get("fecha")) or defaults.get("fecha"),
+    }
+    return periodo, datos, registro_item, registro_desde_estado(state, lista_ie)
+
+
+def importar_excel(origen, catalogo, hoja=None, **defaults):
+    from openpyxl import load_workbook
+
+    resultado = ResultadoImportacion()
+    resultado.catalogo = catalogo.version
+    t0 = time.perf_counter()
+    wb = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        ws = wb[hoja] if hoja else wb.worksheets[0]
+        filas = ws.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            raise ValueError("La planilla está vacía.")
+        mapa = _mapear_encabezado(encabezado, catalogo)
+        for n_fila, valores in enumerate(filas, start=2):
+            celdas = [(mapa[i], v) for i, v in enumerate(valores) if i in mapa and _texto(v) is not None]
+            # Las filas de la plantilla que quedaron sin responder no son errores
+            if not any(isinstance(c, tuple) or c in CAMPOS_RESPUESTA for c, _ in celdas):
+                continue
+            resultado.filas += 1
+            try:
+                periodo, datos, registro_item, registro = _procesar_fila(celdas, catalogo, defaults)
+            except ErrorFila as e:
+                resultado.errores.append((n_fila, str(e)))
+                continue
+            destino = resultado.evaluaciones.setdefault(periodo, {
+                "organismo": periodo[0], "anio": periodo[1], "mes": periodo[2],
+                "evaluador": datos["evaluador"], "fecha": datos["fecha"],
+                "evaluacion": {}, "ids": {},
+            })
+            if registro_item.clave in destino["evaluacion"]:
+                resultado.advertencias.append((n_fila, f"El ítem {registro_item.id} se repite; se usa la última fila."))
+            destino["evaluacion"][registro_item.clave] = registro
+            destino["ids"][registro_item.clave] = registro_item.id
+            resultado.filas_importadas += 1
+    finally:
+        wb.close()
+    resultado.segundos = time.perf_counter() - t0
+    return resultado
+
+
+def guardar_en_almacen(resultado, almacen):
+    ids = {}
+    for periodo, datos in resultado.evaluaciones.items():
+        evaluacion_id = almacen.abrir_evaluacion(periodo[0], periodo[1], periodo[2], datos["evaluador"], datos["fecha"],
+                                                 resultado.catalogo)
+        almacen.guardar_items(evaluacion_id, [(datos["ids"][k], r) for k, r in datos["evaluacion"].items()])
+        ids[periodo] = evaluacion_id
+    return ids
+
+
+def escribir_plantilla(destino, catalogo, organismo="", anio="", mes=""):
+    # Planilla vacía con una fila por ítem y una columna por código de IE
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Evaluación")
+    codigos = list(dict.fromkeys(c for r in catalogo.items.values() for c in (ie['codigo'] for ie in r.ies)))
+    ws.append(COLUMNAS_PLANTILLA + codigos)
+    for r in catalogo.items.values():
+        ws.append([organismo, anio, mes, "", "", r.id, r.materia, r.item] + [None] * (5 + len(codigos)))
+    wb.save(destino)
+
+
+def main(argv=None):
+    from almacen import AlmacenEvaluaciones
+    from catalogo import Catalogo
+
+    parser = argparse.ArgumentParser(description="Importa evaluaciones desde una planilla Excel.")
+    parser.add_argument("archivo")
+    parser.add_argument("--hoja")
+    parser.add_argument("--organismo")
+    parser.add_argument("--anio", type=int)
+    parser.add_argument("--mes")
+    parser.add_argument("--evaluador", default="")
+    parser.add_argument("--guardar", action="store_true", help="guarda las evaluaciones en el almacén SQLite")
+    args = parser.parse_args(argv)
+
+    catalogo = Catalogo.desde_archivos()
+    resultado = importar_excel(args.archivo, catalogo, hoja=args.hoja, organismo=args.organismo,
+                               anio=args.anio, mes=args.mes, evaluador=args.evaluador)
+    for fila, mensaje in resultado.errores:
+        print(f"fila {fila}: {mensaje}", file=sys.stderr)
+    for fila, mensaje in resultado.advertencias:
+        print(f"fila {fila}: advertencia: {mensaje}", file=sys.stderr)
+    if args.guardar:
+        guardar_en_almacen(resultado, AlmacenEvaluaciones.desde_entorno())
+    print(resultado.resumen())
+    return 1 if resultado.errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Selección del generador del informe Word.
+#
+#   "xml":  informe_xml.exportar_word_xml, emite el XML del cuerpo en una pasada
+#   "docx": informe_word.exportar_word, construye el documento con python-docx
+#
+# Ambos producen el mismo documento, parte por parte (tests/test_informe.py). El
+# generador por defecto es python-docx; INFORME_BACKEND=xml elige el de una pasada.
+import importlib
+import os
+
+from perfilado import etapa
+
+BACKENDS = {
+    "xml": ("informe_xml", "exportar_word_xml"),
+    "docx": ("informe_word", "exportar_word"),
+}
+BACKEND_POR_DEFECTO = os.environ.get("INFORME_BACKEND", "docx")
+
+
+def obtener_exportador(backend=None):
+    backend = backend or BACKEND_POR_DEFECTO
+    if backend not in BACKENDS:
+        raise ValueError(f"Generador de informe desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+    modulo, funcion = BACKENDS[backend]
+    return getattr(importlib.import_module(modulo), funcion)
+
+
+def exportar_informe(organismo, fecha, evaluador, mes_eval, anio_eval, cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos, evaluacion, backend=None, prioridades=None, comparacion=None):
+    exportador = obtener_exportador(backend)
+    with etapa("docx"):
+        return exportador(organismo, fecha, evaluador, mes_eval, anio_eval, cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos, evaluacion, prioridades, comparacion)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# Informe Word generado con python-docx.
+from io import BytesIO
+
+from docx import Document
+from docx.enum.section import WD_ORIENT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt, RGBColor
+
+from calculo import INDICADORES_GENERALES
+from comparacion import ENCABEZADOS_COMPARACION, filas_comparacion
+from perfilado import etapa
+from prioridades import ENCABEZADOS_PRIORIDADES, filas_prioridades
+
+# --------- Helpers para formato Word ----------
+
+def set_black_font(cell):
+    for paragraph in cell.paragraphs:
+        for run in paragraph.runs:
+            run.font.color.rgb = RGBColor(0,0,0)
+            run.font.name = 'Aptos'
+
+def set_header_style(cell):
+    tc = cell._tc
+    tcPr = tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:fill'), '000000')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:val'), 'clear')
+    tcPr.append(shd)
+    for paragraph in cell.paragraphs:
+        for run in paragraph.runs:
+            run.font.color.rgb = RGBColor(255,255,255)
+            run.font.name = 'Aptos'
+            run.bold = True
+            run.font.size = Pt(13)
+        paragraph.alignment = 1
+
+def set_title_style(paragraph):
+    for run in paragraph.runs:
+        run.font.color.rgb = RGBColor(0,0,0)
+        run.font.name = 'Aptos'
+        run.bold = True
+        run.font.size = Pt(13)
+    paragraph.alignment = 1  # Centrado
+
+def set_cell_center(cell):
+    for paragraph in cell.paragraphs:
+        paragraph.alignment = 1
+
+def set_column_widths(table, widths):
+    for row in table.rows:
+        for idx, width in enumerate(widths):
+            row.cells[idx].width = width
+
+def set_table_fit_window(table):
+    tblPr = table._tbl.tblPr
+    tblW = OxmlElement('w:tblW')
+    tblW.set(qn('w:type'), 'pct')
+    tblW.set(qn('w:w'), "5000") # 100%
+    tblPr.append(tblW)
+
+# -------------------- EXPORTAR WORD ---------------------
+
+def exportar_word(organismo, fecha, evaluador, mes_eval, anio_eval, cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos, evaluacion, prioridades=None, comparacion=None):
+    doc = Document()
+    # --- ORIENTACIÓN HORIZONTAL Y MÁRGENES ---
+    section = doc.sections[-1]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.top_margin = Inches(1)
+    section.bottom_margin = Inches(1)
+    section.left_margin = Inches(0.75)
+    section.right_margin = Inches(0.75)
+
+    # --- TÍTULO CENTRADO, PEQUEÑO Y NEGRO ---
+    titulo = doc.add_paragraph()
+    run = titulo.add_run('INFORME DE AUTOEVALUACIÓN DE CUMPLIMIENTO\nEN TRANSPARENCIA ACTIVA')
+    run.bold = True
+    run.font.size = Pt(18)
+    run.font.color.rgb = RGBColor(0,0,0)
+    run.font.name = 'Aptos'
+    titulo.alignment = 1 # Centrado
+
+    # --- ESPACIO ---
+    doc.add_paragraph()
+
+    # --- DATOS GENERALES ---
+    datos = doc.add_paragraph()
+    datos.paragraph_format.space_after = Pt(0)
+    def add_bold(label, value):
+        run1 = datos.add_run(label)
+        run1.bold = True
+        run1.font.name = "Aptos"
+        run2 = datos.add_run(str(value))
+        run2.bold = False
+        run2.font.name = "Aptos"
+    add_bold("Organismo: ", organismo)
+    datos.add_run("\n")
+    add_bold("Mes evaluado: ", f"{mes_eval} {anio_eval}")
+    datos.add_run("\n")
+    add_bold("Fecha: ", fecha.strftime('%d/%m/%Y'))
+    datos.add_run("\n")
+    add_bold("Evaluador(a): ", evaluador)
+    datos.add_run("\n")
+    add_bold("Cumplimiento Global Observado: ", f"{cumplimiento_global:.1f} %")
+
+    # --- ESPACIO ANTES DE TABLAS ---
+    doc.add_paragraph()
+
+    # --- TABLA POR MATERIA ---
+    hmat = doc.add_paragraph("CUMPLIMIENTO POR MATERIA")
+    set_title_style(hmat)
+    tmat = doc.add_table(rows=1, cols=2)
+    tmat.style = 'Table Grid'
+    tmat.allow_autofit = True
+    set_table_fit_window(tmat)
+    widths = [Inches(7), Inches(2.5)]
+    set_column_widths(tmat, widths)
+    tmat.cell(0,0).text = "Materia"
+    tmat.cell(0,1).text = "%"
+    set_header_style(tmat.cell(0,0))
+    set_header_style(tmat.cell(0,1))
+    for mat, items in items_eval_map.items():
+        if not any(i.get("evaluado") for i in items):
+            row = tmat.add_row().cells
+            row[0].text = mat
+            row[1].text = "No se evalúa"
+        else:
+            avg = round(sum(i.get("cumplimiento", 0) for i in items if i.get("evaluado")) / max(len([i for i in items if i.get("evaluado")]),1), 1)
+            row = tmat.add_row().cells
+            row[0].text = mat
+            row[1].text = f"{avg:.1f}"
+        set_black_font(row[0])
+        set_black_font(row[1])
+        set_cell_center(row[1])
+    doc.add_paragraph()
+
+    # --- TABLA POR ÍTEM ---
+    hit = doc.add_paragraph("CUMPLIMIENTO POR ÍTEM")
+    set_title_style(hit)
+    titem = doc.add_table(rows=1, cols=2)
+    titem.style = 'Table Grid'
+    titem.allow_autofit = True
+    set_table_fit_window(titem)
+    widths = [Inches(7), Inches(2.5)]
+    set_column_widths(titem, widths)
+    titem.cell(0,0).text = "Ítem"
+    titem.cell(0,1).text = "%"
+    set_header_style(titem.cell(0,0))
+    set_header_style(titem.cell(0,1))
+    for mat, items in items_eval_map.items():
+        for item_data in items:
+            row = titem.add_row().cells
+            row[0].text = item_data['item']
+            if item_data['evaluado']:
+                row[1].text = f"{item_data['cumplimiento']:.1f}"
+            else:
+                row[1].text = "No se evalúa"
+            set_black_font(row[0])
+            set_black_font(row[1])
+            set_cell_center(row[1])
+    doc.add_paragraph()
+
+    # --- HALLAZGOS DE INCUMPLIMIENTO ---
+    hhall = doc.add_paragraph("HALLAZGOS DE INCUMPLIMIENTO POR ÍTEM")
+    set_title_style(hhall)
+    th = doc.add_table(rows=1, cols=2)
+    th.style = 'Table Grid'
+    th.allow_autofit = True
+    set_table_fit_window(th)
+    th.cell(0,0).text = "Ítem"
+    th.cell(0,1).text = "Observaciones"
+    set_header_style(th.cell(0,0))
+    set_header_style(th.cell(0,1))
+    for mat, items in items_eval_map.items():
+        for item_data in items:
+            if item_data['evaluado'] and item_data.get("cumplimiento", 100) < 100:
+                row = th.add_row().cells
+                row[0].text = item_data['item']
+                row[1].text = item_data['obs']
+            elif not item_data['evaluado']:
+                row = th.add_row().cells
+                row[0].text = item_data['item']
+                row[1].text = "No se evalúa"
+            set_black_font(row[0])
+            set_black_font(row[1])
+    doc.add_paragraph()
+
+    # --- DETALLE DE INDICADORES GENERALES Y ESPECÍFICOS EN INCUMPLIMIENTO ---
+    hdet = doc.add_paragraph('DETALLE DE INDICADORES GENERALES Y ESPECÍFICOS EN INCUMPLIMIENTO')
+    set_title_style(hdet)
+    tind = doc.add_table(rows=1, cols=3)
+    tind.style = 'Table Grid'
+    tind.allow_autofit = True
+    set_table_fit_window(tind)
+    # 45% del ancho para el código (ajusta si lo deseas)
+    widths = [Inches(4), Inches(5), Inches(7)]
+    set_column_widths(tind, widths)
+    tind.cell(0,0).text = "Materia/Ítem"
+    tind.cell(0,1).text = "Código"
+    tind.cell(0,2).text = "Texto indicador"
+    for c in range(3):
+        set_header_style(tind.cell(0,c))
+    for key, datos in evaluacion.items():
+        materia, item = key.split(' || ')
+        # IG
+        if "ig" in datos and datos["ig"]:
+            for idx, val in enumerate(datos["ig"]):
+                if val == "No":
+                    row = tind.add_row().cells
+                    row[0].text = f"{materia} / {item}"
+                    row[1].text = f"IG{idx+1}"
+                    row[2].text = INDICADORES_GENERALES[idx]
+                    for c in range(3):
+                        set_black_font(row[c])
+        # IE
+        if "ie" in datos and datos["ie"]:
+            for ie in datos["ie"]:
+                if ie["respuesta"] == "No":
+                    row = tind.add_row().cells
+                    row[0].text = f"{materia} / {item}"
+                    row[1].text = ie["codigo"]
+                    row[2].text = ie["texto"]
+                    for c in range(3):
+                        set_black_font(row[c])
+    doc.add_paragraph()
+
+    # --- PRIORIDADES DE MEJORA (ver prioridades.py) ---
+    if prioridades:
+        hpri = doc.add_paragraph("PRIORIDADES DE MEJORA")
+        set_title_style(hpri)
+        tpri = doc.add_table(rows=1, cols=4)
+        tpri.style = 'Table Grid'
+        tpri.allow_autofit = True
+        set_table_fit_window(tpri)
+        widths = [Inches(4), Inches(7), Inches(1.5), Inches(1.5)]
+        set_column_widths(tpri, widths)
+        for c, texto in enumerate(ENCABEZADOS_PRIORIDADES):
+            tpri.cell(0,c).text = texto
+            set_header_style(tpri.cell(0,c))
+        for fila in filas_prioridades(prioridades):
+            row = tpri.add_row().cells
+            for c, texto in enumerate(fila):
+                row[c].text = texto
+                set_black_font(row[c])
+            set_cell_center(row[2])
+            set_cell_center(row[3])
+        doc.add_paragraph()
+
+    # --- COMPARACIÓN CON OTROS ORGANISMOS DEL PERÍODO (ver comparacion.py) ---
+    if comparacion:
+        hcmp = doc.add_paragraph("COMPARACIÓN CON OTROS ORGANISMOS DEL PERÍODO")
+        set_title_style(hcmp)
+        tcmp = doc.add_table(rows=1, cols=5)
+        tcmp.style = 'Table Grid'
+        tcmp.allow_autofit = True
+        set_table_fit_window(tcmp)
+        widths = [Inches(7), Inches(1.5), Inches(1.5), Inches(1.5), Inches(1.5)]
+        set_column_widths(tcmp, widths)
+        for c, texto in enumerate(ENCABEZADOS_COMPARACION):
+            tcmp.cell(0,c).text = texto
+            set_header_style(tcmp.cell(0,c))
+        for fila in filas_comparacion(comparacion):
+            row = tcmp.add_row().cells
+            for c, texto in enumerate(fila):
+                row[c].text = texto
+                set_black_font(row[c])
+            for c in range(1, 5):
+                set_cell_center(row[c])
+        doc.add_paragraph()
+
+    # PIE DE PÁGINA
+    section = doc.sections[-1]
+    footer = section.footer
+    paragraph = footer.paragraphs[0]
+    paragraph.text = "La App utilizada para esta Autoevaluación de Cumplimiento es un desarrollo de TRIVIA Capacitaciones"
+    for run in paragraph.runs:
+        run.font.name = 'Aptos'
+        run.font.size = Pt(9)
+        run.font.color.rgb = RGBColor(0,0,0)
+    paragraph.alignment = 1 # Centrado
+
+    buffer = BytesIO()
+    with etapa("docx.save"):
+        doc.save(buffer)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# Informe Word generado emitiendo directamente el XML del cuerpo.
+#
+# Produce el mismo documento que informe_word.exportar_word (mismas partes y
+# mismo word/document.xml), pero sin construir el árbol de python-docx celda a
+# celda: el cuerpo se escribe en una sola pasada con propiedades de texto ya
+# serializadas y se agrega a una plantilla .docx preparada una vez por proceso.
+import re
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from calculo import INDICADORES_GENERALES
+from comparacion import ENCABEZADOS_COMPARACION, filas_comparacion
+from perfilado import etapa
+from prioridades import ENCABEZADOS_PRIORIDADES, filas_prioridades
+
+TITULO = 'INFORME DE AUTOEVALUACIÓN DE CUMPLIMIENTO\nEN TRANSPARENCIA ACTIVA'
+PIE_DE_PAGINA = "La App utilizada para esta Autoevaluación de Cumplimiento es un desarrollo de TRIVIA Capacitaciones"
+
+_FUENTE = '<w:rFonts w:ascii="Aptos" w:hAnsi="Aptos"/>'
+RPR_TITULO = f'<w:rPr>{_FUENTE}<w:b/><w:color w:val="000000"/><w:sz w:val="36"/></w:rPr>'
+RPR_ETIQUETA = f'<w:rPr>{_FUENTE}<w:b/></w:rPr>'
+RPR_VALOR = f'<w:rPr>{_FUENTE}<w:b w:val="0"/></w:rPr>'
+RPR_SECCION = f'<w:rPr>{_FUENTE}<w:b/><w:color w:val="000000"/><w:sz w:val="26"/></w:rPr>'
+RPR_ENCABEZADO = f'<w:rPr>{_FUENTE}<w:b/><w:color w:val="FFFFFF"/><w:sz w:val="26"/></w:rPr>'
+RPR_CELDA = f'<w:rPr>{_FUENTE}<w:color w:val="000000"/></w:rPr>'
+PPR_CENTRO = '<w:pPr><w:jc w:val="center"/></w:pPr>'
+SHD_NEGRO = '<w:shd w:fill="000000" w:color="auto" w:val="clear"/>'
+TBL_PR = (
+    '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>'
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+    '<w:tblW w:type="pct" w:w="5000"/></w:tblPr>'
+)
+PARRAFO_VACIO = '<w:p/>'
+
+# Anchos en twips (1 pulgada = 1440) de los encabezados, como set_column_widths
+ANCHOS_ITEM = (10080, 3600)          # Inches(7), Inches(2.5)
+ANCHOS_DETALLE = (5760, 7200, 10080)  # Inches(4), Inches(5), Inches(7)
+ANCHOS_PRIORIDADES = (5760, 10080, 2160, 2160)  # Inches(4), Inches(7), Inches(1.5), Inches(1.5)
+ANCHOS_COMPARACION = (10080, 2160, 2160, 2160, 2160)  # Inches(7), Inches(1.5) x 4
+
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_SEPARADORES = re.compile("([\t\r\n])")
+
+
+class _Plantilla:
+    def __init__(self, archivo, inicio_documento, sect_pr, ancho_bloque):
+        self.archivo = archivo                    # .docx sin word/document.xml
+        self.inicio_documento = inicio_documento  # declaración + <w:document ...><w:body>
+        self.sect_pr = sect_pr                    # <w:sectPr>...</w:sectPr></w:body></w:document>
+        self.ancho_bloque = ancho_bloque          # ancho útil de página en EMU
+
+
+@lru_cache(maxsize=1)
+def _plantilla():
+    from docx import Document
+    from docx.enum.section import WD_ORIENT
+    from docx.shared import Inches, Pt, RGBColor
+
+    doc = Document()
+    section = doc.sections[-1]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.top_margin = Inches(1)
+    section.bottom_margin = Inches(1)
+    section.left_margin = Inches(0.75)
+    section.right_margin = Inches(0.75)
+    paragraph = section.footer.paragraphs[0]
+    paragraph.text = PIE_DE_PAGINA
+    for run in paragraph.runs:
+        run.font.name = 'Aptos'
+        run.font.size = Pt(9)
+        run.font.color.rgb = RGBColor(0,0,0)
+    paragraph.alignment = 1
+    ancho_bloque = doc._block_width
+
+    completo = BytesIO()
+    doc.save(completo)
+    archivo = BytesIO()
+    with zipfile.ZipFile(completo) as origen, zipfile.ZipFile(archivo, "w", zipfile.ZIP_DEFLATED) as destino:
+        for info in origen.infolist():
+            if info.filename == "word/document.xml":
+                documento = origen.read(info).decode("utf-8")
+            else:
+                destino.writestr(info, origen.read(info), zipfile.ZIP_DEFLATED)
+    i_body = documento.index("<w:body>") + len("<w:body>")
+    i_sect = documento.index("<w:sectPr")
+    return _Plantilla(archivo.getvalue(), documento[:i_body], documento[i_sect:], ancho_bloque)
+
+
+def _contenido_run(texto):
+    # Misma traducción que python-docx: \t -> <w:tab/>, \r y \n -> <w:br/>
+    if _NO_XML.search(texto):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    partes = []
+    for trozo in _SEPARADORES.split(texto):
+        if not trozo:
+            continue
+        if trozo == "\t":
+            partes.append("<w:tab/>")
+        elif trozo in "\r\n":
+            partes.append("<w:br/>")
+        elif len(trozo.strip()) < len(trozo):
+            partes.append(f'<w:t xml:space="preserve">{escape(trozo)}</w:t>')
+        else:
+            partes.append(f"<w:t>{escape(trozo)}</w:t>")
+    return "".join(partes)
+
+
+def _run(texto, rpr=""):
+    return f"<w:r>{rpr}{_contenido_run(texto)}</w:r>"
+
+
+def _celda(texto, ancho, rpr=RPR_CELDA, centrar=False, encabezado=False):
+    shd = SHD_NEGRO if encabezado else ""
+    ppr = PPR_CENTRO if centrar else ""
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{ancho}"/>{shd}</w:tcPr><w:p>{ppr}{_run(texto, rpr)}</w:p></w:tc>'
+
+
+class _Tabla:
+    def __init__(self, partes, encabezados, ancho_columna, anchos_encabezado=None, centrar=()):
+        self.partes = partes
+        self.ancho_columna = ancho_columna
+        self.centrar = centrar
+        anchos_encabezado = anchos_encabezado or [ancho_columna] * len(encabezados)
+        grid = "".join(f'<w:gridCol w:w="{ancho_columna}"/>' for _ in encabezados)
+        partes.append(f"<w:tbl>{TBL_PR}<w:tblGrid>{grid}</w:tblGrid><w:tr>")
+        for texto, ancho in zip(encabezados, anchos_encabezado):
+            partes.append(_celda(texto, ancho, RPR_ENCABEZADO, centrar=True, encabezado=True))
+        partes.append("</w:tr>")
+
+    def fila(self, *textos):
+        self.partes.append("<w:tr>")
+        for c, texto in enumerate(textos):
+            self.partes.append(_celda(texto, self.ancho_columna, centrar=c in self.centrar))
+        self.partes.append("</w:tr>")
+
+    def cerrar(self):
+        self.partes.append("</w:tbl>")
+
+
+def _titulo_seccion(partes, texto):
+    partes.append(f"<w:p>{PPR_CENTRO}{_run(texto, RPR_SECCION)}</w:p>")
+
+
+def exportar_word_xml(organismo, fecha, evaluador, mes_eval, anio_eval, cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos, evaluacion, prioridades=None, comparacion=None):
+    from docx.shared import Emu
+
+    plantilla = _plantilla()
+    ancho_2 = Emu(plantilla.ancho_bloque // 2).twips
+    ancho_3 = Emu(plantilla.ancho_bloque // 3).twips
+    ancho_4 = Emu(plantilla.ancho_bloque // 4).twips
+    ancho_5 = Emu(plantilla.ancho_bloque // 5).twips
+    partes = [plantilla.inicio_documento]
+
+    # --- TÍTULO Y DATOS GENERALES ---
+    partes.append(f"<w:p>{PPR_CENTRO}{_run(TITULO, RPR_TITULO)}</w:p>")
+    partes.append(PARRAFO_VACIO)
+    datos = [
+        ("Organismo: ", organismo),
+        ("Mes evaluado: ", f"{mes_eval} {anio_eval}"),
+        ("Fecha: ", fecha.strftime('%d/%m/%Y')),
+        ("Evaluador(a): ", evaluador),
+        ("Cumplimiento Global Observado: ", f"{cumplimiento_global:.1f} %"),
+    ]
+    partes.append('<w:p><w:pPr><w:spacing w:after="0"/></w:pPr>')
+    for i, (etiqueta, valor) in enumerate(datos):
+        if i:
+            partes.append("<w:r><w:br/></w:r>")
+        partes.append(_run(etiqueta, RPR_ETIQUETA))
+        partes.append(_run(str(valor), RPR_VALOR))
+    partes.append("</w:p>")
+    partes.append(PARRAFO_VACIO)
+
+    # --- TABLA POR MATERIA ---
+    _titulo_seccion(partes, "CUMPLIMIENTO POR MATERIA")
+    tabla = _Tabla(partes, ["Materia", "%"], ancho_2, ANCHOS_ITEM, centrar=(1,))
+    for mat, items in items_eval_map.items():
+        evaluados = [i for i in items if i.get("evaluado")]
+        if not evaluados:
+            tabla.fila(mat, "No se evalúa")
+        else:
+            avg = round(sum(i.get("cumplimiento", 0) for i in evaluados) / max(len(evaluados), 1), 1)
+            tabla.fila(mat, f"{avg:.1f}")
+    tabla.cerrar()
+    partes.append(PARRAFO_VACIO)
+
+    # --- TABLA POR ÍTEM ---
+    _titulo_seccion(partes, "CUMPLIMIENTO POR ÍTEM")
+    tabla = _Tabla(partes, ["Ítem", "%"], ancho_2, ANCHOS_ITEM, centrar=(1,))
+    for mat, items in items_eval_map.items():
+        for item_data in items:
+            if item_data['evaluado']:
+                tabla.fila(item_data['item'], f"{item_data['cumplimiento']:.1f}")
+            else:
+                tabla.fila(item_data['item'], "No se evalúa")
+    tabla.cerrar()
+    partes.append(PARRAFO_VACIO)
+
+    # --- HALLAZGOS DE INCUMPLIMIENTO ---
+    _titulo_seccion(partes, "HALLAZGOS DE INCUMPLIMIENTO POR ÍTEM")
+    tabla = _Tabla(partes, ["Ítem", "Observaciones"], ancho_2)
+    for mat, items in items_eval_map.items():
+        for item_data in items:
+            if item_data['evaluado'] and item_data.get("cumplimiento", 100) < 100:
+                tabla.fila(item_data['item'], item_data['obs'])
+            elif not item_data['evaluado']:
+                tabla.fila(item_data['item'], "No se evalúa")
+    tabla.cerrar()
+    partes.append(PARRAFO_VACIO)
+
+    # --- DETALLE DE INDICADORES GENERALES Y ESPECÍFICOS EN INCUMPLIMIENTO ---
+    _titulo_seccion(partes, 'DETALLE DE INDICADORES GENERALES Y ESPECÍFICOS EN INCUMPLIMIENTO')
+    tabla = _Tabla(partes, ["Materia/Ítem", "Código", "Texto indicador"], ancho_3, ANCHOS_DETALLE)
+    for key, datos in evaluacion.items():
+        materia, item = key.split(' || ')
+        if "ig" in datos and datos["ig"]:
+            for idx, val in enumerate(datos["ig"]):
+                if val == "No":
+                    tabla.fila(f"{materia} / {item}", f"IG{idx+1}", INDICADORES_GENERALES[idx])
+        if "ie" in datos and datos["ie"]:
+            for ie in datos["ie"]:
+                if ie["respuesta"] == "No":
+                    tabla.fila(f"{materia} / {item}", ie["codigo"], ie["texto"])
+    tabla.cerrar()
+    partes.append(PARRAFO_VACIO)
+
+    # --- PRIORIDADES DE MEJORA (ver prioridades.py) ---
+    if prioridades:
+        _titulo_seccion(partes, "PRIORIDADES DE MEJORA")
+        tabla = _Tabla(partes, ENCABEZADOS_PRIORIDADES, ancho_4, ANCHOS_PRIORIDADES, centrar=(2, 3))
+        for fila in filas_prioridades(prioridades):
+            tabla.fila(*fila)
+        tabla.cerrar()
+        partes.append(PARRAFO_VACIO)
+
+    # --- COMPARACIÓN CON OTROS ORGANISMOS DEL PERÍODO (ver comparacion.py) ---
+    if comparacion:
+        _titulo_seccion(partes, "COMPARACIÓN CON OTROS ORGANISMOS DEL PERÍODO")
+        tabla = _Tabla(partes, ENCABEZADOS_COMPARACION, ancho_5, ANCHOS_COMPARACION, centrar=(1, 2, 3, 4))
+        for fila in filas_comparacion(comparacion):
+            tabla.fila(*fila)
+        tabla.cerrar()
+        partes.append(PARRAFO_VACIO)
+    partes.append(plantilla.sect_pr)
+
+    with etapa("docx.save"):
+        buffer = BytesIO(plantilla.archivo)
+        buffer.seek(0, 2)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("word/document.xml", "".join(partes))
+    buffer.seek(0)
+    return buffer
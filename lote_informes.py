@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Generación de informes Word para muchos organismos, en paralelo, a un ZIP.
+#
+# Cada informe se genera en un proceso del pool (el catálogo se envía una vez
+# a cada proceso) y se escribe en el ZIP apenas termina; sólo hay unos pocos
+# informes en vuelo a la vez, así que la memoria no crece con el lote. Un
+# informe que falla se registra en errores.txt dentro del ZIP y no detiene el
+# resto; si un proceso del pool muere, los informes que quedaban se registran
+# igual, cada uno con su error. Los procesos se crean con "spawn": la app los
+# lanza desde el servidor de Streamlit, que tiene hilos, y un fork copiaría sus
+# locks en cualquier estado.
+#
+#   python lote_informes.py --salida informes.zip [--organismo ... --anio ... --mes ... --estado ...]
+#   python lote_informes.py --excel planilla.xlsx --salida informes.zip [--trabajadores 4]
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from calculo import calcular_cumplimiento
+from informe import exportar_informe
+from prioridades import LIMITE_INFORME, priorizar
+
+BASE = Path(__file__).resolve().parent
+DIRECTORIO_ZIP = Path(os.environ.get("LOTE_ZIP_DIR") or BASE / "datos" / "lotes")
+VIGENCIA_ZIP = 24 * 3600  # segundos que se conserva un ZIP de la página de lotes sin descargar
+
+# Estado de cada proceso del pool, fijado por _iniciar_trabajador
+_catalogo = None
+_backend = None
+
+
+class TareaInforme:
+    __slots__ = ("organismo", "anio", "mes", "fecha", "evaluador", "evaluacion")
+
+    def __init__(self, organismo, anio, mes, fecha, evaluador, evaluacion):
+        self.organismo = organismo
+        self.anio = anio
+        self.mes = mes
+        self.fecha = fecha
+        self.evaluador = evaluador
+        self.evaluacion = evaluacion
+
+    def nombre_archivo(self):
+        organismo = re.sub(r'[\\/:*?"<>|\s]+', "_", self.organismo).strip("_") or "organismo"
+        return f"Informe_Autoevaluacion_TA_{organismo}_{self.anio}_{self.mes}.docx"
+
+
+class ResultadoInformes:
+    def __init__(self, total):
+        self.total = total
+        self.generados = []  # nombres en el ZIP
+        self.errores = []    # (nombre, mensaje)
+        self.segundos = 0.0
+
+    @property
+    def completados(self):
+        return len(self.generados) + len(self.errores)
+
+    def resumen(self):
+        return (f"{len(self.generados)} de {self.total} informes generados en {self.segundos:.1f} s, "
+                f"{len(self.errores)} con errores")
+
+
+def _fecha(valor):
+    import datetime
+
+    if isinstance(valor, str) and valor:
+        return datetime.date.fromisoformat(valor)
+    return valor or datetime.date.today()
+
+
+def tareas_desde_almacen(almacen, catalogo, evaluaciones):
+    # evaluaciones: filas de almacen.buscar(); cada evaluación se lee al pedirla
+    for datos in evaluaciones:
+        evaluacion, _ = almacen.cargar_evaluacion(datos["id"], catalogo)
+        yield TareaInforme(datos["organismo"], datos["anio"], datos["mes"], _fecha(datos["fecha"]),
+                           datos["evaluador"], evaluacion)
+
+
+def tareas_desde_importacion(resultado):
+    for (organismo, anio, mes), datos in resultado.evaluaciones.items():
+        yield TareaInforme(organismo, anio, mes, _fecha(datos["fecha"]), datos["evaluador"], datos["evaluacion"])
+
+
+def _iniciar_trabajador(catalogo, backend):
+    global _catalogo, _backend
+    _catalogo = catalogo
+    _backend = backend
+
+
+def generar_informe(tarea, catalogo=None, backend=None):
+    catalogo = catalogo or _catalogo
+    cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos = calcular_cumplimiento(
+        tarea.evaluacion, catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+    buffer = exportar_informe(tarea.organismo, tarea.fecha, tarea.evaluador, tarea.mes, tarea.anio,
+                              cumplimiento_global, cumplimiento_materia, items_eval_map, hallazgos, tarea.evaluacion,
+                              backend=backend or _backend,
+                              prioridades=priorizar(tarea.evaluacion, catalogo, LIMITE_INFORME))
+    return buffer.getvalue()
+
+
+def nuevo_zip(directorio=None, vigencia=VIGENCIA_ZIP):
+    # Ruta para el ZIP de una sesión de la página de lotes. Antes borra los ZIP con
+    # más de `vigencia` segundos: los de sesiones que se cerraron sin generar otro
+    directorio = Path(directorio or DIRECTORIO_ZIP)
+    directorio.mkdir(parents=True, exist_ok=True)
+    limite = time.time() - vigencia
+    for ruta in directorio.glob("informes_*.zip"):
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+        except FileNotFoundError:
+            pass
+    descriptor, ruta = tempfile.mkstemp(prefix="informes_", suffix=".zip", dir=directorio)
+    os.close(descriptor)
+    return Path(ruta)
+
+
+def _nombre_unico(nombre, usados):
+    base, extension = os.path.splitext(nombre)
+    n = 1
+    while nombre in usados:
+        n += 1
+        nombre = f"{base}_{n}{extension}"
+    usados.add(nombre)
+    return nombre
+
+
+def generar_zip(tareas, destino, catalogo, trabajadores=None, progreso=None, backend=None, total=None):
+    # tareas: iterable (puede ser un generador); destino: ruta o archivo binario.
+    # progreso(resultado, nombre) se llama al terminar cada informe.
+    if total is None and hasattr(tareas, "__len__"):
+        total = len(tareas)
+    tareas = iter(tareas)
+    trabajadores = trabajadores or os.cpu_count() or 1
+    resultado = ResultadoInformes(total)
+    usados = set()
+    t0 = time.perf_counter()
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as z, \
+            ProcessPoolExecutor(max_workers=trabajadores, mp_context=multiprocessing.get_context("spawn"),
+                                initializer=_iniciar_trabajador, initargs=(catalogo, backend)) as pool:
+        en_vuelo = {}
+
+        def fallo(nombre, e):
+            resultado.errores.append((nombre, f"{type(e).__name__}: {e}"))
+            if progreso:
+                progreso(resultado, nombre)
+
+        def enviar():
+            # Mantiene ~2 informes por proceso: suficiente para no dejarlos ociosos
+            while len(en_vuelo) < 2 * trabajadores:
+                tarea = next(tareas, None)
+                if tarea is None:
+                    return
+                nombre = _nombre_unico(tarea.nombre_archivo(), usados)
+                try:
+                    en_vuelo[pool.submit(generar_informe, tarea)] = nombre
+                except BrokenProcessPool as e:
+                    # Un proceso del pool murió: el pool ya no acepta trabajos
+                    fallo(nombre, e)
+
+        enviar()
+        while en_vuelo:
+            listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                nombre = en_vuelo.pop(futuro)
+                try:
+                    datos = futuro.result()
+                except Exception as e:
+                    fallo(nombre, e)
+                    continue
+                # El .docx ya viene comprimido: se guarda sin recomprimir
+                z.writestr(nombre, datos)
+                resultado.generados.append(nombre)
+                if progreso:
+                    progreso(resultado, nombre)
+            enviar()
+        if resultado.errores:
+            z.writestr("errores.txt", "\n".join(f"{n}: {m}" for n, m in resultado.errores) + "\n")
+    if resultado.total is None:
+        resultado.total = resultado.completados
+    resultado.segundos = time.perf_counter() - t0
+    return resultado
+
+
+def main(argv=None):
+    from almacen import AlmacenEvaluaciones
+    from catalogo import Catalogo
+
+    parser = argparse.ArgumentParser(description="Genera los informes Word de muchas evaluaciones en un ZIP.")
+    parser.add_argument("--salida", default="informes.zip")
+    parser.add_argument("--excel", help="planilla de importación en lugar del almacén")
+    parser.add_argument("--organismo")
+    parser.add_argument("--anio", type=int)
+    parser.add_argument("--mes")
+    parser.add_argument("--estado")
+    parser.add_argument("--trabajadores", type=int, default=None, help="procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--backend", help="generador del informe: xml o docx")
+    args = parser.parse_args(argv)
+
+    catalogo = Catalogo.desde_archivos()
+    if args.excel:
+        from importar_excel import importar_excel
+
+        importacion = importar_excel(args.excel, catalogo, organismo=args.organismo, anio=args.anio, mes=args.mes)
+        for fila, mensaje in importacion.errores:
+            print(f"fila {fila}: {mensaje}", file=sys.stderr)
+        tareas, total = tareas_desde_importacion(importacion), len(importacion.evaluaciones)
+    else:
+        almacen = AlmacenEvaluaciones.desde_entorno()
+        evaluaciones = almacen.buscar(args.organismo, args.anio, args.mes, args.estado)
+        tareas, total = tareas_desde_almacen(almacen, catalogo, evaluaciones), len(evaluaciones)
+
+    def progreso(resultado, nombre):
+        print(f"\r{resultado.completados}/{total} {nombre}", end="", file=sys.stderr, flush=True)
+
+    resultado = generar_zip(tareas, args.salida, catalogo, args.trabajadores, progreso, args.backend, total)
+    print(file=sys.stderr)
+    for nombre, mensaje in resultado.errores:
+        print(f"{nombre}: {mensaje}", file=sys.stderr)
+    print(f"{resultado.resumen()} -> {args.salida}")
+    return 1 if resultado.errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+import os
+from pathlib import Path
+from almacen import AlmacenEvaluaciones
+from calculo import MESES_ESP
+from cache_compartida import CacheCompartida
+from importar_excel import importar_excel
+from lote_informes import generar_zip, nuevo_zip, tareas_desde_almacen, tareas_desde_importacion
+from versiones_catalogo import RegistroCatalogos
+
+BASE = Path(__file__).resolve().parent.parent
+
+# ---------- CONFIGURACIÓN GENERAL ----------
+st.set_page_config(page_title="Informes por lote", layout="wide")
+st.title("INFORMES POR LOTE")
+st.caption("Genera el informe Word de muchas evaluaciones a la vez y los descarga en un solo archivo ZIP.")
+
+# ---------- CARGA DE DATOS ----------
+@st.cache_resource
+def load_catalogo():
+    # Mismo snapshot que app.py, compilado una sola vez entre procesos (ver versiones_catalogo.py)
+    return RegistroCatalogos.desde_entorno(CacheCompartida.desde_entorno()).compilar(BASE)
+
+@st.cache_resource
+def load_almacen():
+    return AlmacenEvaluaciones.desde_entorno()
+
+catalogo = load_catalogo()
+
+# ---------- SELECCIÓN DE EVALUACIONES ----------
+origen = st.radio("Origen de las evaluaciones", ["Evaluaciones guardadas", "Planilla Excel"], horizontal=True)
+tareas, total = None, 0
+if origen == "Evaluaciones guardadas":
+    almacen = load_almacen()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        organismo = st.text_input("Organismo (opcional)", "")
+    with col2:
+        anio = st.number_input("Año evaluado (0 = todos)", min_value=0, max_value=2100, value=0, step=1)
+    with col3:
+        mes = st.selectbox("Mes evaluado", ["Todos"] + MESES_ESP)
+    with col4:
+        estado = st.selectbox("Estado", ["Todos"] + sorted({e["estado"] for e in almacen.buscar()}))
+    evaluaciones = almacen.buscar(
+        organismo or None,
+        int(anio) or None,
+        None if mes == "Todos" else mes,
+        None if estado == "Todos" else estado,
+    )
+    st.dataframe(
+        [{"Organismo": e["organismo"], "Año": e["anio"], "Mes": e["mes"], "Evaluador(a)": e["evaluador"],
+          "Ítems guardados": e["n_items"], "Estado": e["estado"]} for e in evaluaciones]
+    )
+    tareas, total = tareas_desde_almacen(almacen, catalogo, evaluaciones), len(evaluaciones)
+else:
+    archivo_excel = st.file_uploader("Planilla de respuestas (.xlsx)", type=["xlsx"])
+    if archivo_excel is not None:
+        # La planilla se procesa una vez por archivo subido, no en cada rerun de la página
+        clave_importacion = (archivo_excel.file_id, catalogo.version)
+        if st.session_state.get("importacion_lote", (None,))[0] != clave_importacion:
+            st.session_state.importacion_lote = (clave_importacion, importar_excel(archivo_excel, catalogo))
+        importacion = st.session_state.importacion_lote[1]
+        st.info(importacion.resumen())
+        for fila, mensaje in importacion.errores[:50]:
+            st.error(f"Fila {fila}: {mensaje}")
+        tareas, total = tareas_desde_importacion(importacion), len(importacion.evaluaciones)
+
+# ---------- GENERACIÓN ----------
+trabajadores = st.number_input("Procesos en paralelo", min_value=1, max_value=64, value=os.cpu_count() or 1, step=1)
+if st.button("Generar informes", disabled=not total):
+    barra = st.progress(0.0, text=f"0 de {total} informes")
+
+    def progreso(resultado, nombre):
+        barra.progress(resultado.completados / total, text=f"{resultado.completados} de {total} informes: {nombre}")
+
+    # El ZIP se escribe en disco a medida que terminan los informes y queda ahí,
+    # uno por sesión, hasta que se genera el siguiente o vence (lote_informes.VIGENCIA_ZIP)
+    anterior = st.session_state.pop("zip_lote", None)
+    if anterior:
+        Path(anterior).unlink(missing_ok=True)
+    ruta_zip = str(nuevo_zip())
+    resultado = generar_zip(tareas, Path(ruta_zip), catalogo, int(trabajadores), progreso, total=total)
+    st.session_state.zip_lote = ruta_zip
+    if resultado.errores:
+        st.warning(resultado.resumen())
+        for nombre, mensaje in resultado.errores:
+            st.error(f"{nombre}: {mensaje}")
+    else:
+        st.success(resultado.resumen())
+
+# El ZIP se lee del disco sólo al hacer clic en la descarga, no en cada rerun
+ruta_zip = st.session_state.get("zip_lote")
+if ruta_zip and Path(ruta_zip).exists():
+    st.download_button(
+        label="Descargar ZIP",
+        data=lambda: Path(ruta_zip).read_bytes(),
+        file_name="Informes_Autoevaluacion_TA.zip",
+        mime="application/zip",
+    )
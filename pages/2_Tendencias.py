@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from almacen import AlmacenEvaluaciones
+from cache_compartida import CacheCompartida
+from historico import (OBJETIVOS_MS, HistoricoEvaluaciones, codigos_recurrentes, etiqueta_periodo,
+                       fallas_recurrentes, tendencias, ultimas_variaciones, variaciones_mensuales)
+from versiones_catalogo import RegistroCatalogos
+
+BASE = Path(__file__).resolve().parent.parent
+
+# ---------- CONFIGURACIÓN GENERAL ----------
+st.set_page_config(page_title="Tendencias", layout="wide")
+st.title("TENDENCIAS ENTRE PERÍODOS")
+st.caption("Cumplimiento de las evaluaciones guardadas a lo largo de los meses evaluados (ver historico.py).")
+
+# ---------- CARGA DE DATOS ----------
+@st.cache_resource
+def load_catalogo():
+    # Mismo snapshot que app.py, compilado una sola vez entre procesos (ver versiones_catalogo.py)
+    return RegistroCatalogos.desde_entorno(CacheCompartida.desde_entorno()).compilar(BASE)
+
+@st.cache_resource
+def load_almacen():
+    return AlmacenEvaluaciones.desde_entorno()
+
+@st.cache_resource
+def load_historico():
+    return HistoricoEvaluaciones(load_almacen(), load_catalogo())
+
+@st.cache_data(max_entries=16)
+def extractos(_historico, version, organismo):
+    # version = historico.version(): los extractos se releen sólo tras sincronizar algo nuevo
+    return _historico.globales(organismo), _historico.materias(organismo), _historico.fallas(organismo)
+
+latencias = {}
+
+@contextmanager
+def medir(nombre):
+    t0 = time.perf_counter()
+    yield
+    latencias[nombre] = (time.perf_counter() - t0) * 1000
+
+historico = load_historico()
+catalogo = load_catalogo()
+with medir("sincronizar"):
+    n_nuevas = historico.sincronizar()
+if n_nuevas:
+    st.caption(f"{n_nuevas} evaluaciones puntuadas desde la última consulta.")
+
+# ---------- FILTROS ----------
+col1, col2 = st.columns(2)
+with col1:
+    organismo = st.selectbox("Organismo", ["Todos"] + historico.organismos())
+with col2:
+    minimo = st.slider("Períodos con el mismo IE en 'No' para considerarlo recurrente", 2, 12, 3)
+organismo = None if organismo == "Todos" else organismo
+
+with medir("extraer"):
+    globales, materias, fallas = extractos(historico, historico.version(), organismo)
+if globales.empty:
+    st.info("No hay evaluaciones guardadas.")
+    st.stop()
+st.caption(f"{len(globales)} evaluaciones, {globales['organismo'].nunique()} organismos, "
+           f"{etiqueta_periodo(int(globales['periodo'].min()))} a {etiqueta_periodo(int(globales['periodo'].max()))}.")
+
+def con_etiqueta(df, columna="periodo"):
+    return df.assign(**{columna: df[columna].map(lambda p: etiqueta_periodo(int(p)) if p == p else None)})
+
+# ---------- TENDENCIAS ----------
+st.header("Tendencia del cumplimiento global")
+serie = globales.groupby("periodo")["cumplimiento_global"].mean().rename("Cumplimiento global (%)")
+serie.index = serie.index.map(etiqueta_periodo)
+st.line_chart(serie)
+with medir("tendencias"):
+    if organismo is None:
+        tabla_tendencias = tendencias(globales)
+    else:
+        tabla_tendencias = tendencias(materias, por=("materia",), valor="porcentaje")
+st.caption("Pendiente: puntos porcentuales por mes de la recta de mínimos cuadrados; primero los que más caen.")
+st.dataframe(con_etiqueta(con_etiqueta(tabla_tendencias, "desde"), "hasta").round(2), hide_index=True)
+
+# ---------- VARIACIONES MENSUALES ----------
+st.header("Variación respecto del período anterior")
+with medir("variaciones"):
+    if organismo is None:
+        variaciones = ultimas_variaciones(variaciones_mensuales(globales))
+    else:
+        variaciones = variaciones_mensuales(materias, por=("materia",), valor="porcentaje")
+st.dataframe(con_etiqueta(con_etiqueta(variaciones, "periodo_anterior")).round(2), hide_index=True)
+
+# ---------- FALLAS RECURRENTES ----------
+st.header("Indicadores específicos con fallas recurrentes")
+with medir("fallas_recurrentes"):
+    recurrentes = fallas_recurrentes(fallas, minimo)
+    tabla_fallas = codigos_recurrentes(recurrentes) if organismo is None else recurrentes
+tabla_fallas = tabla_fallas.assign(
+    item=tabla_fallas["item_id"].map(lambda i: catalogo.items[i].clave if i in catalogo.items else i),
+    texto=tabla_fallas["codigo"].map(lambda c: catalogo.ie_texto.get(c, "")),
+).drop(columns=["item_id"])
+if organismo is not None:
+    tabla_fallas = con_etiqueta(con_etiqueta(tabla_fallas, "primero"), "ultimo")
+st.dataframe(tabla_fallas, hide_index=True)
+
+# ---------- LATENCIA ----------
+with st.expander("Latencia de las consultas"):
+    st.dataframe([
+        {"Consulta": nombre, "ms": round(ms, 1), "Objetivo (ms)": OBJETIVOS_MS.get(nombre),
+         "Dentro del objetivo": ms <= OBJETIVOS_MS.get(nombre, float("inf"))}
+        for nombre, ms in latencias.items()
+    ], hide_index=True)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# Instrumentación opcional de cada rerun de app.py.
+#
+# Se activa con la variable PERFIL_APP=1 o con ?perfil=1 en la URL. Cada rerun
+# (o rerun de fragmento) acumula el tiempo de sus etapas; al terminar se
+# escribe una línea de log en JSON y se actualizan los agregados p50/p95 del
+# proceso. Desactivado, etapa() sólo consulta un threading.local y devuelve un
+# contexto vacío compartido.
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+log = logging.getLogger(__name__)
+
+VALORES_ACTIVO = ("1", "true", "si", "sí")
+MUESTRAS_POR_ETAPA = 1000
+
+
+class _Actual(threading.local):
+    # Atributo de clase: leerlo en un hilo nuevo no lanza AttributeError
+    perfil = None
+
+
+_actual = _Actual()
+
+
+class _EtapaNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+ETAPA_NULA = _EtapaNula()
+
+
+class _Etapa:
+    __slots__ = ("perfil", "nombre", "t0")
+
+    def __init__(self, perfil, nombre):
+        self.perfil = perfil
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.perfil.tiempos[self.nombre] += time.perf_counter() - self.t0
+        return False
+
+
+class Agregados:
+    # Últimas MUESTRAS_POR_ETAPA duraciones de cada etapa, por proceso
+    def __init__(self, muestras=MUESTRAS_POR_ETAPA):
+        self.muestras = muestras
+        self._tiempos = defaultdict(lambda: deque(maxlen=self.muestras))
+        self._lock = threading.Lock()
+
+    def agregar(self, tiempos):
+        with self._lock:
+            for nombre, segundos in tiempos.items():
+                self._tiempos[nombre].append(segundos)
+
+    def percentiles(self):
+        with self._lock:
+            copia = {nombre: sorted(valores) for nombre, valores in self._tiempos.items()}
+        resultado = {}
+        for nombre, valores in copia.items():
+            resultado[nombre] = {
+                "n": len(valores),
+                "p50_ms": valores[(len(valores) - 1) // 2] * 1000,
+                "p95_ms": valores[int(0.95 * (len(valores) - 1))] * 1000,
+            }
+        return resultado
+
+
+AGREGADOS = Agregados()
+
+
+class Perfil:
+    def __init__(self, tipo="rerun"):
+        self.tipo = tipo
+        self.tiempos = defaultdict(float)
+        self.t0 = time.perf_counter()
+
+    def etapa(self, nombre):
+        return _Etapa(self, nombre)
+
+    def total(self):
+        return time.perf_counter() - self.t0
+
+
+def perfil_activo(query_params=None):
+    if os.environ.get("PERFIL_APP", "").lower() in VALORES_ACTIVO:
+        return True
+    valor = query_params.get("perfil") if query_params is not None else None
+    return (valor or "").lower() in VALORES_ACTIVO
+
+
+def perfil_actual():
+    return _actual.perfil
+
+
+def iniciar_perfil(tipo="rerun"):
+    perfil = Perfil(tipo)
+    _actual.perfil = perfil
+    return perfil
+
+
+def terminar_perfil(perfil):
+    if perfil is None or perfil_actual() is not perfil:
+        return None
+    _actual.perfil = None
+    tiempos = dict(perfil.tiempos)
+    tiempos[f"{perfil.tipo}.total"] = perfil.total()
+    AGREGADOS.agregar(tiempos)
+    agregados = AGREGADOS.percentiles()
+    log.info("perfil %s", json.dumps({
+        "tipo": perfil.tipo,
+        "etapas_ms": {n: round(s * 1000, 3) for n, s in tiempos.items()},
+        "p50_ms": {n: round(agregados[n]["p50_ms"], 3) for n in tiempos},
+        "p95_ms": {n: round(agregados[n]["p95_ms"], 3) for n in tiempos},
+    }, ensure_ascii=False))
+    return tiempos
+
+
+def etapa(nombre):
+    perfil = _actual.perfil
+    if perfil is None:
+        return ETAPA_NULA
+    return _Etapa(perfil, nombre)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Prioridades de mejora: qué corrección sube más el cumplimiento global.
+#
+# Para una evaluación puntuada, cada respuesta que resta cumplimiento es un
+# candidato a corregir:
+#   - escenario 4 o 5: presentar la sección (escenario 1 con IG e IE cumplidos)
+#   - IG1 o IG2 en "No": responder "Sí"; los indicadores siguientes, que no se
+#     llegaron a evaluar, se suponen cumplidos (mejor caso)
+#   - IG3 en "No": pasar de 0.25 a 1 en la parte IG (75 % del ítem)
+#   - cada IE en "No": un IE más en "Sí" (25 % del ítem repartido entre sus IE)
+# En lugar de volver a llamar a calcular_cumplimiento por candidato, la
+# evaluación se codifica una vez, se replica en una fila por candidato con su
+# corrección aplicada sobre los arreglos y MotorCumplimiento puntúa todas las
+# filas en una sola llamada; el nuevo cumplimiento global de cada fila es el
+# mismo que daría calcular_cumplimiento. El aumento sin redondear, que sirve
+# para ordenar, es 100 * peso ajustado de la materia * Δ ítem / ítems evaluados
+# de la materia (los pesos se renormalizan sobre las materias evaluadas, que no
+# cambian al corregir un ítem ya evaluado). NumPy se importa sólo al priorizar.
+import weakref
+
+from calculo import ESCENARIOS, IG_CODIGO, INDICADORES_GENERALES
+
+LIMITE_INFORME = 10  # prioridades que se incluyen en el informe Word
+ENCABEZADOS_PRIORIDADES = ["Materia/Ítem", "Corrección", "Aumento (pts)", "Cumplimiento global"]
+SI = IG_CODIGO["Sí"]
+
+_motores = weakref.WeakKeyDictionary()  # Catalogo -> MotorCumplimiento
+
+
+def motor_para(catalogo):
+    from calculo_lote import MotorCumplimiento
+
+    motor = _motores.get(catalogo)
+    if motor is None:
+        motor = _motores[catalogo] = MotorCumplimiento(catalogo.materias_items)
+    return motor
+
+
+def candidatos(evaluacion, catalogo):
+    # -> [(clave, indicador, texto, actual, propuesta)] en el orden del catálogo
+    lista = []
+    for item in catalogo.items.values():
+        ev = evaluacion.get(item.clave)
+        if not ev:
+            continue
+        esc = ev.get("escenario") or ""
+        ig = list(ev.get("ig") or []) + [None] * 3
+        if esc[:1] in ("4", "5"):
+            lista.append((item.clave, "Escenario", "Presentar la sección con antecedentes y los indicadores cumplidos",
+                          esc, ESCENARIOS[0]))
+        elif esc[:1] != "1":
+            continue
+        elif ig[0] == "No":
+            lista.append((item.clave, "IG1", INDICADORES_GENERALES[0], "No", "Sí"))
+        elif ig[0] == "Sí" and ig[1] == "No":
+            lista.append((item.clave, "IG2", INDICADORES_GENERALES[1], "No", "Sí"))
+        else:
+            if ig[2] == "No":
+                lista.append((item.clave, "IG3", INDICADORES_GENERALES[2], "No", "Sí"))
+            for ie in ev.get("ie") or []:
+                if ie["respuesta"] == "No":
+                    lista.append((item.clave, ie["codigo"], ie["texto"], "No", "Sí"))
+    return lista
+
+
+def priorizar(evaluacion, catalogo, limite=None):
+    # Lista de correcciones ordenada por aumento del cumplimiento global
+    lista = candidatos(evaluacion, catalogo)
+    if not lista:
+        return []
+    import numpy as np
+
+    from calculo_lote import EvaluacionesCodificadas
+
+    motor = motor_para(catalogo)
+    base = motor.codificar([evaluacion])
+    n = len(lista)
+
+    # Fila 0: la evaluación tal cual; fila k: con la corrección del candidato k
+    escenario = np.repeat(base.escenario, n + 1, axis=0)
+    ig = np.repeat(base.ig, n + 1, axis=0)
+    ie_si = np.repeat(base.ie_si, n + 1, axis=0)
+    ie_total = np.repeat(base.ie_total, n + 1, axis=0)
+    columna = np.array([motor.clave_idx[c[0]] for c in lista], dtype=np.intp)
+    indicador = np.array([c[1] for c in lista], dtype=object)
+    filas = np.arange(1, n + 1)
+
+    completo = (indicador == "Escenario") | (indicador == "IG1") | (indicador == "IG2")
+    f, j = filas[completo], columna[completo]
+    escenario[f, j] = 1
+    ig[f, j] = SI
+    ie_si[f, j] = ie_total[f, j]
+    f, j = filas[indicador == "IG3"], columna[indicador == "IG3"]
+    ig[f, j, 2] = SI
+    es_ie = ~completo & (indicador != "IG3")
+    np.add.at(ie_si, (filas[es_ie], columna[es_ie]), 1)
+
+    lote = motor.puntuar(EvaluacionesCodificadas(escenario, ig, ie_si, ie_total))
+
+    materia = motor.item_materia[columna]
+    total = lote.total[0, materia]
+    incluida = lote.total[0] > 0
+    peso_usable = motor.pesos[incluida].sum()
+    peso_ajustado = np.where(incluida, motor.pesos, 0.0)[materia] / peso_usable if peso_usable > 0 else 0.0
+    delta = lote.item[filas, columna] - lote.item[0, columna]
+    ganancia = 100 * peso_ajustado * delta / total
+    nuevo = lote.cumplimiento_global[1:]
+
+    orden = sorted(range(n), key=lambda k: (-ganancia[k], columna[k], k))
+    if limite is not None:
+        orden = orden[:limite]
+    items = catalogo.items_por_clave
+    resultado = []
+    for k in orden:
+        clave, codigo, texto, actual, propuesta = lista[k]
+        resultado.append({
+            "clave": clave,
+            "materia": items[clave].materia,
+            "item": items[clave].item,
+            "indicador": codigo,
+            "texto": texto,
+            "actual": actual,
+            "propuesta": propuesta,
+            "ganancia": float(ganancia[k]),
+            "cumplimiento_nuevo": float(nuevo[k]),
+        })
+    return resultado
+
+
+def describir(prioridad):
+    # Texto de la corrección para la app y el informe
+    if prioridad["indicador"] == "Escenario":
+        return prioridad["texto"]
+    if prioridad["indicador"] in ("IG1", "IG2"):
+        return (f"{prioridad['indicador']}: responder '{prioridad['propuesta']}' "
+                f"(con los indicadores siguientes cumplidos) — {prioridad['texto']}")
+    return f"{prioridad['indicador']}: responder '{prioridad['propuesta']}' — {prioridad['texto']}"
+
+
+def filas_prioridades(prioridades):
+    # Filas de la tabla PRIORIDADES DE MEJORA del informe (ambos generadores)
+    for p in prioridades:
+        yield (f"{p['materia']} / {p['item']}", describir(p), f"+{p['ganancia']:.2f}",
+               f"{p['cumplimiento_nuevo']:.1f} %")
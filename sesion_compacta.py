@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Representación compacta de la evaluación en st.session_state.
+#
+# Cada ítem guardado (y cada borrador del formulario) es un RegistroCompacto
+# con __slots__: escenario, IG1-IG3 y los pares (posición del IE en el ítem,
+# respuesta) como códigos enteros pequeños en un solo bytes, más la
+# observación. Se indexan por ID de ítem y los textos (escenario, IE) se toman
+# del catálogo sólo al leer un registro: al dibujar el formulario, puntuar o
+# exportar. Hacia afuera EvaluacionCompacta se comporta como el dict
+# clave -> registro de siempre, así que calculo, informe y exportar_datos no
+# cambian. Un registro que no se puede reconstruir idéntico desde los códigos
+# (datos fuera del catálogo) se guarda tal cual.
+import copy
+from collections.abc import MutableMapping
+
+from calculo import ESCENARIOS, IE_CODIGO, IE_OPCIONES, IG_CODIGO, IG_OPCIONES
+from validacion import estado_desde_registro, estado_vacio
+
+ESCENARIO_CODIGO = {v: i + 1 for i, v in enumerate(ESCENARIOS)}
+_ESCENARIO = (None, *ESCENARIOS)
+_IG = (None, *IG_OPCIONES)
+_IE = (None, *IE_OPCIONES)
+
+
+class RegistroCompacto:
+    __slots__ = ("codigos", "obs")
+
+    def __init__(self, codigos, obs=""):
+        self.codigos = codigos  # bytes: escenario, ig1, ig2, ig3, (posición IE, respuesta)...
+        self.obs = obs
+
+
+def compactar(item, escenario, ig, ie, obs):
+    # ie: pares (código, respuesta). None si algún valor no tiene código.
+    if len(ig) != 3:
+        return None
+    try:
+        codigos = [ESCENARIO_CODIGO[escenario] if escenario is not None else 0]
+        codigos += [IG_CODIGO[v] if v is not None else 0 for v in ig]
+        for codigo, respuesta in ie:
+            codigos += (item.ie_indice[codigo], IE_CODIGO[respuesta] if respuesta is not None else 0)
+        return RegistroCompacto(bytes(codigos), obs)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _respuestas_ie(item, codigos):
+    ies = item.ies
+    return [(ies[codigos[i]], _IE[codigos[i + 1]]) for i in range(4, len(codigos), 2)]
+
+
+def registro_desde_compacto(item, compacto):
+    c = compacto.codigos
+    return {
+        "escenario": _ESCENARIO[c[0]],
+        "ig": [_IG[c[1]], _IG[c[2]], _IG[c[3]]],
+        "ie": [{"codigo": ie['codigo'], "texto": ie['texto'], "respuesta": r} for ie, r in _respuestas_ie(item, c)],
+        "obs": compacto.obs,
+    }
+
+
+def estado_desde_compacto(item, compacto):
+    c = compacto.codigos
+    return {
+        "escenario": _ESCENARIO[c[0]],
+        "ig1": _IG[c[1]],
+        "ig2": _IG[c[2]],
+        "ig3": _IG[c[3]],
+        "ie": {ie['codigo']: r for ie, r in _respuestas_ie(item, c)},
+        "obs": compacto.obs,
+    }
+
+
+class EvaluacionCompacta(MutableMapping):
+    # st.session_state.evaluacion: clave "Materia || Ítem" -> registro, en orden de guardado
+    def __init__(self, catalogo, registros=()):
+        self.catalogo = catalogo
+        self._registros = {}  # ID de ítem -> RegistroCompacto (o el registro original)
+        self.update(registros)
+
+    def _id(self, clave):
+        item = self.catalogo.items_por_clave.get(clave)
+        return (item.id, item) if item is not None else (clave, None)
+
+    def __getitem__(self, clave):
+        id_, item = self._id(clave)
+        registro = self._registros[id_]
+        if isinstance(registro, RegistroCompacto):
+            return registro_desde_compacto(item, registro)
+        return registro
+
+    def __setitem__(self, clave, registro):
+        id_, item = self._id(clave)
+        compacto = None
+        if item is not None:
+            compacto = compactar(item, registro.get("escenario"), registro.get("ig") or [],
+                                 [(e.get("codigo"), e.get("respuesta")) for e in registro.get("ie") or []],
+                                 registro.get("obs"))
+        if compacto is not None and registro_desde_compacto(item, compacto) == registro:
+            self._registros[id_] = compacto
+        else:
+            self._registros[id_] = copy.deepcopy(registro)
+
+    def __delitem__(self, clave):
+        del self._registros[self._id(clave)[0]]
+
+    def __contains__(self, clave):
+        return self._id(clave)[0] in self._registros
+
+    def __iter__(self):
+        items = self.catalogo.items
+        for id_ in self._registros:
+            yield items[id_].clave if id_ in items else id_
+
+    def __len__(self):
+        return len(self._registros)
+
+    def copia(self):
+        nueva = EvaluacionCompacta(self.catalogo)
+        nueva._registros = {k: r if isinstance(r, RegistroCompacto) else copy.deepcopy(r)
+                            for k, r in self._registros.items()}
+        return nueva
+
+    def __deepcopy__(self, memo):
+        # Los RegistroCompacto no se modifican: basta copiar el índice
+        return self.copia()
+
+
+class BorradoresItems:
+    # st.session_state.item_states: estado en edición de cada ítem visitado. El
+    # formulario trabaja con el dict de siempre durante un rerun y lo devuelve
+    # compactado al terminar; un ítem sin borrador parte de lo guardado.
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self._borradores = {}  # ID de ítem -> RegistroCompacto (o el estado original)
+
+    def estado(self, clave, evaluacion):
+        item = self.catalogo.items_por_clave.get(clave)
+        borrador = self._borradores.get(item.id if item is not None else clave)
+        if isinstance(borrador, RegistroCompacto):
+            return estado_desde_compacto(item, borrador)
+        if borrador is not None:
+            return borrador
+        if clave in evaluacion:
+            return estado_desde_registro(evaluacion[clave])
+        return estado_vacio()
+
+    def guardar(self, clave, state):
+        item = self.catalogo.items_por_clave.get(clave)
+        compacto = None
+        if item is not None:
+            compacto = compactar(item, state["escenario"], [state["ig1"], state["ig2"], state["ig3"]],
+                                 state["ie"].items(), state["obs"])
+        self._borradores[item.id if item is not None else clave] = compacto if compacto is not None else state
+
+    def descartar(self, clave):
+        item = self.catalogo.items_por_clave.get(clave)
+        self._borradores.pop(item.id if item is not None else clave, None)
+
+    def __contains__(self, clave):
+        item = self.catalogo.items_por_clave.get(clave)
+        return (item.id if item is not None else clave) in self._borradores
+
+    def __len__(self):
+        return len(self._borradores)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Configuración común de las pruebas:  python -m pytest  (desde la raíz del repo;
+# pytest está en requirements-dev.txt)
+#
+# Los módulos de la app están en la raíz y los datos sintéticos son los de los
+# benchmarks (benchmarks/_datos.py); ambos quedan en sys.path.
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE = Path(__file__).resolve().parent.parent
+for ruta in (BASE, BASE / "benchmarks"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+
+@pytest.fixture(scope="session")
+def catalogo():
+    from catalogo import Catalogo
+    return Catalogo.desde_archivos(BASE)
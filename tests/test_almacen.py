@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Upserts concurrentes en el almacén de evaluaciones (almacen.py): varios
+# procesos y varios hilos por proceso guardan ítems superpuestos de una misma
+# evaluación. Al final cada ítem tiene una sola fila, completa y de la última
+# ronda de algún escritor; `orden` es único y contiguo, y los ítems guardados
+# antes de la concurrencia conservan el suyo.
+import multiprocessing
+import random
+import threading
+import zlib
+
+from almacen import AlmacenEvaluaciones
+
+ESCENARIOS = ["1", "2", "3", "4", "5"]
+ITEMS = list(range(1, 41))
+PREVIOS = ITEMS[:10]      # guardados en orden antes de los escritores concurrentes
+RONDAS = 3
+PROCESOS = 3
+HILOS = 3
+
+
+def registro(escritor, item_id, ronda):
+    # Todos los campos dependen de (escritor, ítem, ronda): una fila mezclada se detecta
+    semilla = zlib.crc32(f"{escritor}:{item_id}:{ronda}".encode()) % 997
+    return {
+        "escenario": ESCENARIOS[semilla % 5],
+        "ig": ["Sí", "No", "No es posible determinarlo"][semilla % 3:] + [None] * (semilla % 3),
+        "ie": [{"codigo": f"IE{item_id}.{k}", "respuesta": ["Sí", "No", "No aplica"][(semilla + k) % 3]}
+               for k in range(semilla % 4)],
+        "obs": f"{escritor}:{item_id}:{ronda}",
+    }
+
+
+def escribir(ruta, evaluacion_id, escritor):
+    almacen = AlmacenEvaluaciones(ruta)
+    rng = random.Random(escritor)
+    for ronda in range(RONDAS):
+        items = ITEMS[:]
+        rng.shuffle(items)
+        for i in range(0, len(items), 4):
+            lote = items[i:i + 4]
+            if len(lote) == 1:
+                almacen.guardar_item(evaluacion_id, lote[0], registro(escritor, lote[0], ronda))
+            else:
+                almacen.guardar_items(evaluacion_id, [(k, registro(escritor, k, ronda)) for k in lote])
+    almacen.cerrar()
+
+
+def escribir_con_hilos(ruta, evaluacion_id, proceso):
+    hilos = [threading.Thread(target=escribir, args=(ruta, evaluacion_id, f"p{proceso}h{h}")) for h in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+def preparar(tmp_path):
+    ruta = tmp_path / "evaluaciones.sqlite3"
+    almacen = AlmacenEvaluaciones(ruta)
+    evaluacion_id = almacen.abrir_evaluacion("Organismo", 2024, "Mayo", "Analista")
+    for item_id in PREVIOS:
+        almacen.guardar_item(evaluacion_id, item_id, registro("previo", item_id, 0))
+    return ruta, almacen, evaluacion_id
+
+
+def verificar(almacen, evaluacion_id):
+    con = almacen._conexion()
+    filas = con.execute("SELECT item_id, orden FROM items WHERE evaluacion_id = ?", (evaluacion_id,)).fetchall()
+    assert sorted(item_id for item_id, _ in filas) == ITEMS
+    ordenes = dict(filas)
+    assert sorted(ordenes.values()) == list(range(1, len(ITEMS) + 1))
+    assert [ordenes[item_id] for item_id in PREVIOS] == list(range(1, len(PREVIOS) + 1))
+
+    cargados = almacen.cargar_items(evaluacion_id)
+    assert [item_id for item_id, _ in cargados[:len(PREVIOS)]] == PREVIOS
+    for item_id, fila in cargados:
+        escritor, item_obs, ronda = fila["obs"].split(":")
+        assert int(item_obs) == item_id and int(ronda) == RONDAS - 1
+        esperado = registro(escritor, item_id, int(ronda))
+        assert fila["escenario"] == esperado["escenario"] and fila["ig"] == esperado["ig"]
+        assert fila["ie"] == {e["codigo"]: e["respuesta"] for e in esperado["ie"]}
+    assert almacen.obtener(evaluacion_id)["n_items"] == len(ITEMS)
+
+
+def test_upserts_concurrentes_en_hilos(tmp_path):
+    ruta, almacen, evaluacion_id = preparar(tmp_path)
+    escribir_con_hilos(ruta, evaluacion_id, 0)
+    verificar(almacen, evaluacion_id)
+
+
+def test_upserts_concurrentes_en_procesos(tmp_path):
+    ruta, almacen, evaluacion_id = preparar(tmp_path)
+    contexto = multiprocessing.get_context("spawn")
+    procesos = [contexto.Process(target=escribir_con_hilos, args=(ruta, evaluacion_id, p)) for p in range(PROCESOS)]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join(120)
+        assert proceso.exitcode == 0
+    verificar(almacen, evaluacion_id)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Paridad de MotorCumplimiento (calculo_lote.py) con calcular_cumplimiento:
+# cumplimiento global, cumplimiento y exclusión por ítem y hallazgos, sobre
+# evaluaciones al azar y casos límite. El rendimiento se mide aparte en
+# benchmarks/bench_calculo.py.
+import random
+
+import pytest
+
+from _datos import ESCENARIOS, evaluacion_aleatoria, evaluacion_peor_caso, evaluaciones_aleatorias
+
+from calculo import calcular_cumplimiento
+from calculo_lote import MotorCumplimiento
+
+
+def todos_los_items(catalogo, escenario, ig, respuesta_ie):
+    # Misma respuesta en todos los ítems del catálogo
+    return {
+        f"{mi['Materia']} || {mi['Ítem']}": {
+            "escenario": escenario,
+            "ig": list(ig),
+            "ie": [{"codigo": x["codigo"], "texto": x["texto"], "respuesta": respuesta_ie}
+                   for x in catalogo.indicadores_especificos.get(f"{mi['Materia']} || {mi['Ítem']}", [])]
+                  if respuesta_ie else [],
+            "obs": "",
+        }
+        for mi in catalogo.materias_items
+    }
+
+
+def casos_limite(catalogo):
+    materias_items, indicadores = catalogo.materias_items, catalogo.indicadores_especificos
+    casos = {
+        "vacía": {},
+        "peor caso": evaluacion_peor_caso(materias_items, indicadores),
+        "todo cumplido": todos_los_items(catalogo, ESCENARIOS[0], ["Sí", "Sí", "Sí"], "Sí"),
+        "IE no aplica": todos_los_items(catalogo, ESCENARIOS[0], ["Sí", "Sí", "Sí"], "No aplica"),
+        "IG3 indeterminado": todos_los_items(catalogo, ESCENARIOS[0], ["Sí", "Sí", "No es posible determinarlo"], "No"),
+        "IG1 no": todos_los_items(catalogo, ESCENARIOS[0], ["No", None, None], None),
+        "IG2 no": todos_los_items(catalogo, ESCENARIOS[0], ["Sí", "No", None], None),
+        "sin escenario": todos_los_items(catalogo, "", [None, None, None], None),
+        "ítem fuera del catálogo": {"Materia inexistente || Ítem": {"escenario": ESCENARIOS[0], "ig": ["Sí", "Sí", "Sí"],
+                                                                     "ie": [], "obs": ""}},
+    }
+    for i, escenario in enumerate(ESCENARIOS[1:], start=2):
+        casos[f"escenario {i}"] = todos_los_items(catalogo, escenario, [None, None, None], None)
+    # Una sola materia evaluada
+    primera = materias_items[0]["Materia"]
+    casos["una materia"] = {k: v for k, v in casos["peor caso"].items() if k.startswith(f"{primera} || ")}
+    return casos
+
+
+def verificar_paridad(catalogo, evaluaciones):
+    motor = MotorCumplimiento(catalogo.materias_items)
+    resultado = motor.puntuar(motor.codificar(evaluaciones))
+    for e, evaluacion in enumerate(evaluaciones):
+        glob, _, items_eval_map, hallazgos = calcular_cumplimiento(
+            evaluacion, catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+        assert resultado.cumplimiento_global[e] == glob
+        esperados = [d for m in motor.materias for d in items_eval_map[m]]
+        assert len(esperados) == len(motor.claves)
+        for j, esperado in enumerate(esperados):
+            valor = resultado.item[e, j]
+            assert bool(resultado.excluido[e, j]) == (not esperado["evaluado"])
+            assert (None if valor != valor else round(100 * float(valor), 1)) == esperado["cumplimiento"]
+        assert int(resultado.hallazgo[e].sum()) == len(hallazgos)
+
+
+def test_paridad_casos_limite(catalogo):
+    casos = casos_limite(catalogo)
+    verificar_paridad(catalogo, list(casos.values()))
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_paridad_evaluaciones_al_azar(catalogo, semilla):
+    evaluaciones = evaluaciones_aleatorias(200, catalogo.materias_items, catalogo.indicadores_especificos, semilla)
+    verificar_paridad(catalogo, evaluaciones)
+
+
+def test_paridad_evaluacion_por_evaluacion(catalogo):
+    # Un lote de una evaluación da lo mismo que la misma evaluación dentro de un lote mayor
+    rng = random.Random(3)
+    evaluaciones = [evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, f)
+                    for f in (0.2, 0.6, 1.0)]
+    motor = MotorCumplimiento(catalogo.materias_items)
+    lote = motor.puntuar(motor.codificar(evaluaciones))
+    for e, evaluacion in enumerate(evaluaciones):
+        sola = motor.puntuar(motor.codificar([evaluacion]))
+        assert sola.cumplimiento_global[0] == lote.cumplimiento_global[e]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Validación del catálogo (catalogo.py): los ítems que sólo tienen el indicador
+# provisorio IE0 se resumen en una línea informativa; las advertencias quedan
+# para los errores de estructura.
+import json
+import logging
+
+from catalogo import ARCHIVO_INDICADORES, ARCHIVO_MATERIAS, BASE, IE_MARCADOR, Catalogo
+
+
+def fuentes():
+    materias = json.loads((BASE / ARCHIVO_MATERIAS).read_text(encoding="utf-8"))
+    indicadores = json.loads((BASE / ARCHIVO_INDICADORES).read_text(encoding="utf-8"))
+    return materias, indicadores
+
+
+def test_indicadores_provisorios_en_una_linea_informativa(caplog):
+    caplog.set_level(logging.DEBUG, logger="catalogo")
+    catalogo = Catalogo(*fuentes(), "prueba")
+    assert catalogo.advertencias == []
+    assert catalogo.provisorios == [r.id for r in catalogo.items.values()
+                                    if r.ies and all(ie["codigo"] == IE_MARCADOR for ie in r.ies)]
+    assert not [r for r in caplog.records if r.levelno >= logging.WARNING]
+    resumen = [r for r in caplog.records if IE_MARCADOR in r.getMessage()]
+    assert len(resumen) == 1 and resumen[0].levelno == logging.INFO
+
+
+def test_errores_de_estructura_como_advertencia(caplog):
+    materias, indicadores = fuentes()
+    materias[1]["Peso Materia (%)"] = 0.5  # otro peso en la misma materia que el ítem 0
+    materias[1]["Materia"] = materias[0]["Materia"]
+    indicadores["Materia inexistente || Ítem"] = [{"codigo": "IE1_X", "texto": "Sin ítem"}]
+    catalogo = Catalogo(materias, indicadores, "prueba")
+    assert any(a.startswith("Pesos inconsistentes") for a in catalogo.advertencias)
+    assert any(a.startswith("Indicadores específicos sin ítem asociado") for a in catalogo.advertencias)
+    advertencias = [r for r in caplog.records if r.levelno == logging.WARNING]
+    assert len(advertencias) == 1 and IE_MARCADOR not in advertencias[0].getMessage()
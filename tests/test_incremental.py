@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Propiedades de MarcadorIncremental (calculo.py): tras cualquier secuencia de
+# guardados y sobrescrituras, actualizar() y cargar() dan el mismo cumplimiento
+# global y los mismos totales por materia que calcular_cumplimiento sobre la
+# evaluación acumulada. El costo por actualización se mide aparte en
+# benchmarks/bench_incremental.py.
+import random
+
+import pytest
+
+from _datos import ESCENARIOS, evaluacion_item
+
+from calculo import MarcadorIncremental, calcular_cumplimiento
+
+
+def registro_al_azar(rng, catalogo, key):
+    # Además de lo que guarda el formulario: ítems excluidos y respuestas incompletas
+    registro = evaluacion_item(rng, catalogo.indicadores_especificos.get(key, []))
+    sorteo = rng.random()
+    if sorteo < 0.1:
+        registro["escenario"] = rng.choice(ESCENARIOS[1:3])
+    elif sorteo < 0.15:
+        registro = {"escenario": "", "ig": [], "ie": [], "obs": ""}
+    elif sorteo < 0.2:
+        registro["ig"] = registro["ig"][:rng.randint(0, 2)]
+    return registro
+
+
+def verificar(catalogo, marcador, evaluacion):
+    esperado, _, items_eval_map, _ = calcular_cumplimiento(
+        evaluacion, catalogo.materias_items, catalogo.indicadores_especificos, catalogo.materia_peso_map)
+    assert marcador.cumplimiento_global == esperado
+    for materia, items in items_eval_map.items():
+        evaluados = [d["cumplimiento"] for d in items if d["evaluado"]]
+        assert marcador.totales[materia]["total"] == len(evaluados)
+        assert marcador.totales[materia]["excluidos"] == len(items) - len(evaluados)
+        porcentaje = marcador.porcentaje_materia(materia)
+        if evaluados:
+            # calcular_cumplimiento entrega cada ítem redondeado a un decimal
+            assert porcentaje == pytest.approx(sum(evaluados) / len(evaluados), abs=0.05 + 1e-9)
+        else:
+            assert porcentaje is None
+
+
+@pytest.mark.parametrize("semilla", range(8))
+def test_actualizar_igual_a_calcular(catalogo, semilla):
+    rng = random.Random(semilla)
+    claves = [f"{mi['Materia']} || {mi['Ítem']}" for mi in catalogo.materias_items]
+    # Pocas claves para que haya muchas sobrescrituras del mismo ítem
+    frecuentes = rng.sample(claves, 8)
+    marcador = MarcadorIncremental(catalogo.materias_items, catalogo.materia_peso_map)
+    evaluacion = {}
+    verificar(catalogo, marcador, evaluacion)
+    for _ in range(120):
+        key = rng.choice(frecuentes) if rng.random() < 0.5 else rng.choice(claves)
+        evaluacion[key] = registro_al_azar(rng, catalogo, key)
+        assert marcador.actualizar(key, evaluacion[key]) == marcador.cumplimiento_global
+        verificar(catalogo, marcador, evaluacion)
+
+    recargado = MarcadorIncremental(catalogo.materias_items, catalogo.materia_peso_map)
+    assert recargado.cargar(evaluacion) == marcador.cumplimiento_global
+    verificar(catalogo, recargado, evaluacion)
+
+
+@pytest.mark.parametrize("semilla", range(4))
+def test_cargar_y_seguir_actualizando(catalogo, semilla):
+    # Retomar una evaluación: cargar() lo guardado y seguir con actualizar()
+    rng = random.Random(100 + semilla)
+    claves = [f"{mi['Materia']} || {mi['Ítem']}" for mi in catalogo.materias_items]
+    evaluacion = {key: registro_al_azar(rng, catalogo, key) for key in rng.sample(claves, len(claves) // 2)}
+    marcador = MarcadorIncremental(catalogo.materias_items, catalogo.materia_peso_map)
+    marcador.cargar(evaluacion)
+    verificar(catalogo, marcador, evaluacion)
+    for _ in range(40):
+        key = rng.choice(claves)
+        evaluacion[key] = registro_al_azar(rng, catalogo, key)
+        marcador.actualizar(key, evaluacion[key])
+        verificar(catalogo, marcador, evaluacion)
+    # cargar() reemplaza todo el estado anterior, también con una evaluación vacía
+    marcador.cargar({})
+    verificar(catalogo, marcador, {})
+
+
+def test_clave_fuera_del_catalogo(catalogo):
+    marcador = MarcadorIncremental(catalogo.materias_items, catalogo.materia_peso_map)
+    key = f"{catalogo.materias_items[0]['Materia']} || {catalogo.materias_items[0]['Ítem']}"
+    registro = {"escenario": ESCENARIOS[0], "ig": ["Sí", "Sí", "Sí"], "ie": [], "obs": ""}
+    antes = marcador.actualizar(key, registro)
+    totales = {m: dict(d) for m, d in marcador.totales.items()}
+    assert marcador.actualizar("Materia inexistente || Ítem", registro) == antes
+    assert marcador.totales == totales
+    verificar(catalogo, marcador, {key: registro})
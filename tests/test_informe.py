@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Equivalencia de los generadores de informe Word (informe.BACKENDS): mismas
+# partes del .docx y mismo contenido byte a byte que python-docx ("docx"), con
+# y sin las secciones de prioridades y de comparación. El rendimiento se mide
+# aparte en benchmarks/bench_informe.py.
+import datetime
+import random
+import zipfile
+
+import pytest
+
+from _datos import evaluacion_aleatoria, evaluacion_peor_caso
+
+from calculo import calcular_cumplimiento
+from informe import BACKEND_POR_DEFECTO, BACKENDS, obtener_exportador
+from prioridades import priorizar
+
+META = ("Organismo <de prueba> & Cía.", datetime.date(2024, 5, 31), "Evaluador(a)  ", "Mayo", 2024)
+COMPARACION = [
+    {"tipo": "global", "dimension": "Cumplimiento global", "puntaje": 61.5, "percentil": 48.0,
+     "mediana": 63.2, "posicion": 12, "pares": 22},
+    {"tipo": "materia", "dimension": "Materia <con> & signos", "puntaje": 0.0, "percentil": 2.5,
+     "mediana": 50.0, "posicion": 22, "pares": 22},
+]
+
+
+def partes_docx(buffer):
+    with zipfile.ZipFile(buffer) as z:
+        return {n: z.read(n) for n in z.namelist()}
+
+
+def verificar_equivalencia(catalogo, evaluacion, prioridades=None, comparacion=None):
+    resultado = calcular_cumplimiento(evaluacion, catalogo.materias_items, catalogo.indicadores_especificos,
+                                      catalogo.materia_peso_map)
+    generados = {b: partes_docx(obtener_exportador(b)(*META, *resultado, evaluacion, prioridades, comparacion))
+                 for b in BACKENDS}
+    referencia = generados.pop("docx")
+    for backend, partes in generados.items():
+        assert partes.keys() == referencia.keys(), backend
+        for nombre, contenido in referencia.items():
+            assert partes[nombre] == contenido, (backend, nombre)
+
+
+@pytest.mark.parametrize("fraccion", [0.0, 0.4, 1.0])
+def test_equivalencia_evaluaciones_al_azar(catalogo, fraccion):
+    rng = random.Random(7)
+    evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, fraccion)
+    verificar_equivalencia(catalogo, evaluacion)
+
+
+def test_equivalencia_peor_caso(catalogo):
+    verificar_equivalencia(catalogo, evaluacion_peor_caso(catalogo.materias_items, catalogo.indicadores_especificos))
+
+
+def test_equivalencia_con_prioridades_y_comparacion(catalogo):
+    rng = random.Random(11)
+    evaluacion = evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, 0.8)
+    prioridades = priorizar(evaluacion, catalogo)
+    assert prioridades
+    verificar_equivalencia(catalogo, evaluacion, prioridades, COMPARACION)
+
+
+def test_generador_por_defecto():
+    assert BACKEND_POR_DEFECTO in BACKENDS
+    assert obtener_exportador() is obtener_exportador(BACKEND_POR_DEFECTO)
+    with pytest.raises(ValueError):
+        obtener_exportador("pdf")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Generación de informes por lote (lote_informes.py): ZIP con un informe por
+# tarea, registro por informe cuando un proceso del pool muere, y limpieza de
+# los ZIP vencidos de la página de lotes.
+import datetime
+import os
+import random
+import time
+import zipfile
+
+from _datos import evaluacion_aleatoria
+
+from lote_informes import TareaInforme, generar_zip, nuevo_zip
+
+
+class Caida:
+    # Al deserializarse en el proceso del pool lo termina sin aviso
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+def tareas(catalogo, n, semilla=0):
+    rng = random.Random(semilla)
+    return [TareaInforme(f"Organismo {k:03d}", 2024, "Mayo", datetime.date(2024, 5, 31), "Analista",
+                         evaluacion_aleatoria(rng, catalogo.materias_items, catalogo.indicadores_especificos, 0.3))
+            for k in range(n)]
+
+
+def test_zip_con_un_informe_por_tarea(catalogo, tmp_path):
+    lote = tareas(catalogo, 6)
+    lote.append(TareaInforme("Organismo 000", 2024, "Mayo", datetime.date(2024, 5, 31), "Analista", {}))
+    resultado = generar_zip(lote, tmp_path / "lote.zip", catalogo, 2, backend="xml")
+    assert not resultado.errores and resultado.completados == resultado.total == len(lote)
+    with zipfile.ZipFile(tmp_path / "lote.zip") as z:
+        nombres = z.namelist()
+    assert sorted(nombres) == sorted(resultado.generados) and len(set(nombres)) == len(lote)
+
+
+def test_proceso_caido_se_informa_por_informe(catalogo, tmp_path):
+    lote = tareas(catalogo, 8)
+    lote.insert(2, TareaInforme("Organismo caído", 2024, "Mayo", datetime.date(2024, 5, 31), "Analista", Caida()))
+    avisos = []
+    resultado = generar_zip(lote, tmp_path / "lote.zip", catalogo, 2, lambda r, nombre: avisos.append(nombre),
+                            backend="xml")
+    assert resultado.completados == resultado.total == len(lote) == len(avisos)
+    errores = dict(resultado.errores)
+    assert lote[2].nombre_archivo() in errores
+    assert set(errores) | set(resultado.generados) == {t.nombre_archivo() for t in lote}
+    with zipfile.ZipFile(tmp_path / "lote.zip") as z:
+        assert sorted(n for n in z.namelist() if n != "errores.txt") == sorted(resultado.generados)
+        registrados = z.read("errores.txt").decode()
+    assert all(nombre in registrados for nombre in errores)
+
+
+def test_nuevo_zip_borra_los_vencidos(tmp_path):
+    vencido = tmp_path / "informes_vencido.zip"
+    vigente = tmp_path / "informes_vigente.zip"
+    otro = tmp_path / "otro.zip"
+    for ruta in (vencido, vigente, otro):
+        ruta.write_bytes(b"")
+    hace_dos_horas = time.time() - 7200
+    os.utime(vencido, (hace_dos_horas, hace_dos_horas))
+    os.utime(otro, (hace_dos_horas, hace_dos_horas))
+    ruta = nuevo_zip(tmp_path, vigencia=3600)
+    assert ruta.exists() and ruta.parent == tmp_path and ruta.name.startswith("informes_")
+    assert not vencido.exists() and vigente.exists() and otro.exists()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Migración de una evaluación a otra versión del catálogo (versiones_catalogo.py)
+# junto con su bitácora (bitacora.py): después de migrar, los borradores sin
+# guardar y el último guardado de cada ítem se reconstruyen con los IDs de ítem
+# y códigos de IE de la versión nueva. La revisión del catálogo es la de
+# benchmarks/bench_versiones.py (renombres, intercambio de IDs, ítem eliminado,
+# IE con nuevo código y eliminados).
+import random
+
+import pytest
+
+import bitacora
+from _datos import BASE, ESCENARIOS, evaluacion_item
+from bench_versiones import revisar_catalogo
+
+from almacen import AlmacenEvaluaciones
+from bitacora import BitacoraEvaluaciones
+from validacion import estado_desde_registro
+from versiones_catalogo import RegistroCatalogos, migrar_almacen
+
+ITEMS = (1, 2, 3, 13, 22, 45, 46)  # IDs en el catálogo anterior, uno por tipo de cambio
+
+
+def migrar_estado(state, codigos):
+    ie = {codigos.get(c, c): r for c, r in state["ie"].items()}
+    ie.pop(None, None)
+    return dict(state, ie=ie)
+
+
+@pytest.mark.parametrize("snapshot_cada", [1000, 3])
+def test_migracion_lleva_la_bitacora(tmp_path, monkeypatch, snapshot_cada):
+    # Con snapshot_cada = 3 casi todo el estado queda en snapshots_eventos
+    monkeypatch.setattr(bitacora, "SNAPSHOT_CADA", snapshot_cada)
+    registro = RegistroCatalogos(tmp_path / "catalogos")
+    anterior = registro.compilar(BASE)
+    esperado = revisar_catalogo(tmp_path / "revision")
+    nuevo = registro.compilar(tmp_path / "revision")
+    almacen = AlmacenEvaluaciones(tmp_path / "evaluaciones.sqlite3")
+    evaluacion_id = almacen.abrir_evaluacion("Organismo", 2024, "Mayo", "Analista", catalogo=anterior.version)
+    anterior_bitacora = BitacoraEvaluaciones(almacen, anterior)
+
+    rng = random.Random(23)
+    borradores, guardados = {}, {}
+    for item_id in ITEMS:
+        item = anterior.items[item_id]
+        guardado = evaluacion_item(rng, item.ies, obs=f"guardado {item_id}")
+        if item_id == 1:
+            # Todos los IE respondidos: uno cambia de código y otro se elimina
+            guardado = {"escenario": ESCENARIOS[0], "ig": ["Sí", "Sí", "Sí"], "obs": "",
+                        "ie": [{"codigo": x["codigo"], "texto": x["texto"], "respuesta": "No"} for x in item.ies]}
+        almacen.guardar_item(evaluacion_id, item_id, guardado)
+        guardados[item.clave] = estado_desde_registro(guardado)
+        anterior_bitacora.registrar(evaluacion_id, item_id, None, guardados[item.clave])
+        anterior_bitacora.registrar_guardado(evaluacion_id, item_id)
+        borrador = dict(guardados[item.clave], obs=f"borrador {item_id}",
+                        ie={c: "Sí" for c in guardados[item.clave]["ie"]})
+        anterior_bitacora.registrar(evaluacion_id, item_id, guardados[item.clave], borrador)
+        borradores[item.clave] = borrador
+    assert anterior_bitacora.estados(evaluacion_id) == (borradores, guardados)
+
+    informe = migrar_almacen(almacen, registro, nuevo)
+    assert informe.evaluaciones == 1 and informe.eventos_reescritos > 0
+
+    nueva_bitacora = BitacoraEvaluaciones(almacen, nuevo)
+    borradores_migrados, guardados_migrados = nueva_bitacora.estados(evaluacion_id)
+    for estados, migrados in ((borradores, borradores_migrados), (guardados, guardados_migrados)):
+        assert migrados == {esperado[clave][0]: migrar_estado(state, esperado[clave][1])
+                            for clave, state in estados.items() if esperado[clave][0] is not None}
+    # El último guardado de la bitácora coincide con lo que quedó en el almacén
+    guardada, _ = almacen.cargar_evaluacion(evaluacion_id, nuevo)
+    assert guardados_migrados == {clave: estado_desde_registro(r) for clave, r in guardada.items()}
+    # El historial se muestra con los nombres de la versión nueva
+    historial = nueva_bitacora.historial(evaluacion_id)
+    assert {e["item"] for e in historial} <= {r.clave for r in nuevo.items.values()}
+
+
+def test_simulacion_no_toca_la_bitacora(tmp_path):
+    registro = RegistroCatalogos(tmp_path / "catalogos")
+    anterior = registro.compilar(BASE)
+    revisar_catalogo(tmp_path / "revision")
+    nuevo = registro.compilar(tmp_path / "revision")
+    almacen = AlmacenEvaluaciones(tmp_path / "evaluaciones.sqlite3")
+    evaluacion_id = almacen.abrir_evaluacion("Organismo", 2024, "Mayo", "Analista", catalogo=anterior.version)
+    anterior_bitacora = BitacoraEvaluaciones(almacen, anterior)
+    state = estado_desde_registro({"escenario": ESCENARIOS[3], "ig": [], "ie": [], "obs": "borrador"})
+    anterior_bitacora.registrar(evaluacion_id, 22, None, state)
+    antes = anterior_bitacora.estados(evaluacion_id)
+    migrar_almacen(almacen, registro, nuevo, simular=True)
+    assert anterior_bitacora.estados(evaluacion_id) == antes
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Reglas de validación y guardado de un ítem (bloque "VALIDACIÓN Y GUARDADO").
+#
+# Las usan el formulario de app.py y los importadores, de modo que un ítem
+# cargado desde otra fuente cumple exactamente las mismas condiciones que uno
+# respondido en pantalla.
+from calculo import ESCENARIOS, IE_OPCIONES, IG_OPCIONES
+
+IG12_OPCIONES = ["Sí", "No"]
+
+
+def estado_vacio():
+    return {
+        "escenario": None,
+        "ig1": None,
+        "ig2": None,
+        "ig3": None,
+        "ie": {},
+        "obs": "",
+    }
+
+
+def mostrar_ie(state, lista_ie):
+    escenario = state["escenario"] or ""
+    return (escenario.startswith("1") and state["ig1"] == "Sí" and state["ig2"] == "Sí"
+            and state["ig3"] in IG_OPCIONES and len(lista_ie) > 0)
+
+
+def validar_item(state, lista_ie):
+    # Devuelve None si el ítem se puede guardar, o el mensaje de error
+    escenario = state["escenario"] or ""
+    if escenario.startswith("2") or escenario.startswith("3"):
+        return None
+    elif escenario.startswith("4") or escenario.startswith("5"):
+        return None
+    elif escenario.startswith("1"):
+        if not state["ig1"]:
+            return "Debe responder IG1."
+        elif state["ig1"] == "No":
+            return None
+        elif state["ig1"] == "Sí" and not state["ig2"]:
+            return "Debe responder IG2."
+        elif state["ig2"] == "No":
+            return None
+        elif state["ig2"] == "Sí" and not state["ig3"]:
+            return "Debe responder IG3."
+        elif state["ig3"] in IG_OPCIONES:
+            if mostrar_ie(state, lista_ie) and (len([v for v in state["ie"].values() if v]) < len(lista_ie)):
+                return "Debe responder todos los indicadores específicos."
+            return None
+        return "Respuestas de indicadores generales no válidas."
+    return "Debe seleccionar un escenario."
+
+
+def registro_desde_estado(state, lista_ie):
+    # Entrada de st.session_state.evaluacion para un estado válido
+    return {
+        "escenario": state["escenario"],
+        "ig": [state["ig1"], state["ig2"], state["ig3"]][:3],
+        "ie": [{"codigo": k, "texto": next((ie['texto'] for ie in lista_ie if ie['codigo']==k), k), "respuesta": v} for k,v in state["ie"].items()] if mostrar_ie(state, lista_ie) else [],
+        "obs": state["obs"]
+    }
+
+
+def estado_desde_registro(registro):
+    ig = list(registro.get("ig") or [])
+    ig += [None] * (3 - len(ig))
+    return {
+        "escenario": registro.get("escenario"),
+        "ig1": ig[0],
+        "ig2": ig[1],
+        "ig3": ig[2],
+        "ie": {e["codigo"]: e["respuesta"] for e in registro.get("ie") or []},
+        "obs": registro.get("obs") or "",
+    }
+
+
+def validar_respuestas(state, lista_ie):
+    # Validación adicional para datos que no vienen de los radios de la app:
+    # opciones permitidas, secuencia IG y códigos de IE del ítem.
+    errores = []
+    if state["escenario"] is not None and state["escenario"] not in ESCENARIOS:
+        errores.append(f"Escenario no válido: {state['escenario']!r}")
+    for campo, opciones in (("ig1", IG12_OPCIONES), ("ig2", IG12_OPCIONES), ("ig3", IG_OPCIONES)):
+        if state[campo] is not None and state[campo] not in opciones:
+            errores.append(f"{campo.upper()} no válido: {state[campo]!r}")
+    if not (state["escenario"] or "").startswith("1") and any(state[c] is not None for c in ("ig1", "ig2", "ig3")):
+        errores.append("Los indicadores generales sólo se responden con escenario 1.")
+    if state["ig2"] is not None and state["ig1"] != "Sí":
+        errores.append("IG2 sólo se responde si IG1 es 'Sí'.")
+    if state["ig3"] is not None and state["ig2"] != "Sí":
+        errores.append("IG3 sólo se responde si IG2 es 'Sí'.")
+    codigos = {ie['codigo'] for ie in lista_ie}
+    for codigo, respuesta in state["ie"].items():
+        if codigo not in codigos:
+            errores.append(f"El indicador {codigo} no pertenece al ítem.")
+        elif respuesta not in IE_OPCIONES:
+            errores.append(f"Respuesta no válida para {codigo}: {respuesta!r}")
+    if state["ie"] and not mostrar_ie(state, lista_ie):
+        errores.append("Los indicadores específicos sólo se responden con escenario 1 e IG1, IG2 e IG3 respondidos.")
+    if not errores:
+        error = validar_item(state, lista_ie)
+        if error:
+            errores.append(error)
+    return errores
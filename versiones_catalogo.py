@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+# Versiones del catálogo: snapshots compilados y migración de evaluaciones.
+#
+# Cada versión de estructura_materias_items.json y
+# estructura_indicadores_especificos_REC_FINAL.json (identificada por el hash
+# de su contenido, Catalogo.version) se guarda en datos/catalogos/<versión>.catalogo
+# con los JSON originales y el Catalogo ya compilado: cargarla es una sola
+# lectura y un unpickle, y una versión anterior sigue disponible después de
+# reemplazar los JSON. RegistroCatalogos mantiene residentes las versiones
+# cargadas, así varias conviven en el mismo proceso. Con una caché compartida
+# (cache_compartida.py, espacio "catalogo") una versión nueva la compila un solo
+# proceso y los demás leen su snapshot de ahí; los archivos siguen siendo el
+# registro durable, porque la caché puede expulsar versiones.
+#
+# El almacén guarda cada evaluación con la versión del catálogo de sus IDs de
+# ítem y códigos de IE. diferencias() compara dos versiones: ítems iguales,
+# renombrados (misma clave normalizada, mismo ID en la misma materia o mismos
+# IE), eliminados y agregados, y por ítem los códigos de IE que se mantienen,
+# cambian de código (mismo texto), se eliminan o se agregan. migrar_almacen()
+# aplica esas diferencias a todas las evaluaciones de una versión en una sola
+# transacción: sólo se reescriben las filas de ítems con cambios, las de ítems
+# eliminados se archivan en items_descartados y cada migración queda en la
+# tabla migraciones con su resumen. En la misma transacción los eventos y
+# snapshots de la bitácora (bitacora.migrar_eventos) pasan a los IDs nuevos, así
+# los borradores sin guardar se retoman con la versión vigente.
+#
+# Los snapshots son pickles escritos por este mismo módulo en un directorio
+# local; no se deben cargar archivos de otro origen. Al cambiar la clase
+# Catalogo se sube FORMATO_SNAPSHOT y los snapshots se recompilan desde los
+# JSON guardados en ellos.
+#
+#   python versiones_catalogo.py compilar
+#   python versiones_catalogo.py versiones
+#   python versiones_catalogo.py diferencias <versión anterior> [<versión nueva>]
+#   python versiones_catalogo.py migrar [--simular] [--asumir VERSIÓN]
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+from bitacora import ESQUEMA as ESQUEMA_BITACORA, migrar_eventos
+from catalogo import BASE, Catalogo, leer_fuentes, normalizar, version_fuentes
+
+DIRECTORIO_SNAPSHOTS = BASE / "datos" / "catalogos"
+FORMATO_SNAPSHOT = 2
+ESPACIO_COMPARTIDO = "catalogo"
+SIMILITUD_MINIMA = 0.5  # fracción de IE en común para emparejar un ítem renombrado
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS migraciones (
+    id           INTEGER PRIMARY KEY,
+    desde        TEXT NOT NULL,
+    hacia        TEXT NOT NULL,
+    fecha        REAL NOT NULL,
+    evaluaciones INTEGER NOT NULL,
+    resumen      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items_descartados (
+    migracion_id  INTEGER NOT NULL REFERENCES migraciones (id),
+    evaluacion_id INTEGER NOT NULL,
+    catalogo      TEXT NOT NULL,
+    clave         TEXT NOT NULL,
+    registro      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_descartados_evaluacion ON items_descartados (evaluacion_id);
+"""
+
+
+# ---------- SNAPSHOTS ----------
+
+class RegistroCatalogos:
+    def __init__(self, directorio=DIRECTORIO_SNAPSHOTS, compartida=None):
+        self.directorio = Path(directorio)
+        self.compartida = compartida
+        self._residentes = {}  # versión -> Catalogo
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls, compartida=None):
+        return cls(os.environ.get("CATALOGOS_DIR") or DIRECTORIO_SNAPSHOTS, compartida)
+
+    def _ruta(self, version):
+        return self.directorio / f"{version}.catalogo"
+
+    def compilar(self, base=BASE):
+        # Catálogo de los JSON actuales; se compila y se guarda sólo si es una versión nueva
+        raw_materias, raw_indicadores = leer_fuentes(base)
+        version = version_fuentes(raw_materias, raw_indicadores)
+        catalogo = self.obtener(version)
+        if catalogo is None:
+            if self.compartida is None:
+                snapshot = self._snapshot(Catalogo.desde_bytes(raw_materias, raw_indicadores), raw_materias, raw_indicadores)
+            else:
+                # Un solo proceso compila la versión nueva; el resto lee su snapshot
+                snapshot = self.compartida.generar_una_vez(ESPACIO_COMPARTIDO, version, lambda: self._snapshot(
+                    Catalogo.desde_bytes(raw_materias, raw_indicadores), raw_materias, raw_indicadores))
+            catalogo = self._desde_snapshot(snapshot, version) or Catalogo.desde_bytes(raw_materias, raw_indicadores)
+            self._escribir(version, snapshot)
+            with self._lock:
+                catalogo = self._residentes.setdefault(version, catalogo)
+        return catalogo
+
+    def obtener(self, version):
+        # Catalogo de esa versión (residente o desde su snapshot), o None si no hay snapshot
+        with self._lock:
+            catalogo = self._residentes.get(version)
+        if catalogo is not None:
+            return catalogo
+        catalogo = self._leer(version)
+        if catalogo is None:
+            return None
+        with self._lock:
+            return self._residentes.setdefault(version, catalogo)
+
+    def _leer(self, version):
+        try:
+            snapshot = self._ruta(version).read_bytes()
+        except OSError:
+            snapshot = self.compartida.obtener(ESPACIO_COMPARTIDO, version) if self.compartida is not None else None
+            if snapshot is None:
+                return None
+            self._escribir(version, snapshot)
+        return self._desde_snapshot(snapshot, version)
+
+    def _desde_snapshot(self, snapshot, version):
+        try:
+            datos = pickle.loads(snapshot)
+        except (pickle.UnpicklingError, EOFError):
+            return None
+        raw_materias, raw_indicadores = datos["materias"], datos["indicadores"]
+        if version_fuentes(raw_materias, raw_indicadores) != version:
+            return None
+        catalogo = None
+        if datos.get("formato") == FORMATO_SNAPSHOT:
+            try:
+                catalogo = pickle.loads(datos["compilado"])
+            except Exception:
+                catalogo = None
+        if catalogo is None or catalogo.version != version:
+            # Snapshot de otro formato: se recompila desde los JSON guardados
+            catalogo = Catalogo.desde_bytes(raw_materias, raw_indicadores)
+            self._escribir(version, self._snapshot(catalogo, raw_materias, raw_indicadores))
+        return catalogo
+
+    def _snapshot(self, catalogo, raw_materias, raw_indicadores):
+        return pickle.dumps({
+            "formato": FORMATO_SNAPSHOT,
+            "version": catalogo.version,
+            "creado": time.time(),
+            "materias": raw_materias,
+            "indicadores": raw_indicadores,
+            "compilado": pickle.dumps(catalogo, protocol=pickle.HIGHEST_PROTOCOL),
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _escribir(self, version, snapshot):
+        ruta = self._ruta(version)
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+            temporal.write_bytes(snapshot)
+            os.replace(temporal, ruta)
+        except OSError:
+            pass  # sin disco escribible la versión sólo queda residente
+
+    def versiones(self):
+        # [(versión, fecha de compilación)] de los snapshots en disco, la más nueva primero
+        if not self.directorio.is_dir():
+            return []
+        rutas = sorted(self.directorio.glob("*.catalogo"), key=lambda r: r.stat().st_mtime, reverse=True)
+        return [(r.stem, r.stat().st_mtime) for r in rutas]
+
+
+# ---------- DIFERENCIAS ----------
+
+class DiferenciasCatalogo:
+    def __init__(self, anterior, nuevo):
+        self.anterior = anterior.version
+        self.nuevo = nuevo.version
+        self.items = {}           # ID anterior -> ID nuevo
+        self.renombrados = []     # (clave anterior, clave nueva)
+        self.eliminados = []      # claves anteriores sin ítem nuevo
+        self.agregados = []       # claves nuevas sin ítem anterior
+        self.codigos = {}         # ID anterior -> {código anterior: código nuevo o None}, sólo con cambios de IE
+        self.ie_renombrados = {}  # clave nueva -> [(código anterior, código nuevo)]
+        self.ie_eliminados = {}   # clave nueva -> [códigos]
+        self.ie_agregados = {}    # clave nueva -> [códigos]
+
+    def cambia(self, item_id):
+        # True si las filas de ese ítem se reescriben al migrar
+        return self.items.get(item_id) != item_id or item_id in self.codigos
+
+    def resumen(self):
+        lineas = [f"Catálogo {self.anterior} -> {self.nuevo}: {len(self.items)} ítems en común, "
+                  f"{len(self.renombrados)} renombrados, {len(self.eliminados)} eliminados, {len(self.agregados)} agregados; "
+                  f"IE: {sum(map(len, self.ie_renombrados.values()))} con nuevo código, "
+                  f"{sum(map(len, self.ie_eliminados.values()))} eliminados, "
+                  f"{sum(map(len, self.ie_agregados.values()))} agregados."]
+        lineas += [f"Ítem renombrado: {a} -> {n}" for a, n in self.renombrados]
+        lineas += [f"Ítem eliminado: {c}" for c in self.eliminados]
+        lineas += [f"Ítem agregado: {c}" for c in self.agregados]
+        for clave, pares in self.ie_renombrados.items():
+            lineas.append(f"IE con nuevo código en {clave}: {', '.join(f'{a} -> {n}' for a, n in pares)}")
+        for titulo, detalle in (("IE eliminados", self.ie_eliminados), ("IE agregados", self.ie_agregados)):
+            for clave, codigos in detalle.items():
+                lineas.append(f"{titulo} en {clave}: {', '.join(codigos)}")
+        return lineas
+
+    def como_dict(self):
+        return {
+            "anterior": self.anterior,
+            "nuevo": self.nuevo,
+            "renombrados": self.renombrados,
+            "eliminados": self.eliminados,
+            "agregados": self.agregados,
+            "ie_renombrados": self.ie_renombrados,
+            "ie_eliminados": self.ie_eliminados,
+            "ie_agregados": self.ie_agregados,
+        }
+
+
+def _similitud(a, b):
+    # Fracción de IE en común (por código o por texto normalizado)
+    similitud = 0.0
+    for clave in (lambda ie: ie['codigo'], lambda ie: normalizar(ie['texto'])):
+        x, y = {clave(ie) for ie in a.ies}, {clave(ie) for ie in b.ies}
+        if x and y:
+            similitud = max(similitud, len(x & y) / len(x | y))
+    return similitud
+
+
+def _emparejar_items(anterior, nuevo, renombres):
+    # -> {ID anterior: ID nuevo}, de la coincidencia más segura a la menos
+    pares = {}
+    libres = dict(nuevo.items)  # ID nuevo -> ItemCatalogo sin pareja
+
+    def unir(viejo, item_nuevo):
+        pares[viejo.id] = item_nuevo.id
+        del libres[item_nuevo.id]
+
+    pendientes = list(anterior.items.values())
+    for clave_anterior, clave_nueva in (renombres or {}).items():
+        viejo, item_nuevo = anterior.items_por_clave.get(clave_anterior), nuevo.items_por_clave.get(clave_nueva)
+        if viejo is not None and item_nuevo is not None and item_nuevo.id in libres:
+            unir(viejo, item_nuevo)
+    criterios = (
+        lambda viejo: nuevo.items_por_clave.get(viejo.clave),
+        lambda viejo: nuevo.items_por_clave_normalizada.get(
+            f"{normalizar(viejo.materia)} || {normalizar(viejo.item)}"),
+        lambda viejo: (nuevo.items.get(viejo.id)
+                       if viejo.id in nuevo.items and normalizar(nuevo.items[viejo.id].materia) == normalizar(viejo.materia)
+                       else None),
+    )
+    for criterio in criterios:
+        for viejo in pendientes:
+            if viejo.id in pares:
+                continue
+            item_nuevo = criterio(viejo)
+            if item_nuevo is not None and item_nuevo.id in libres:
+                unir(viejo, item_nuevo)
+
+    # Los que quedan, por IE en común (mejor par primero)
+    candidatos = []
+    for viejo in pendientes:
+        if viejo.id in pares:
+            continue
+        for item_nuevo in libres.values():
+            similitud = _similitud(viejo, item_nuevo)
+            if similitud >= SIMILITUD_MINIMA:
+                candidatos.append((-similitud, viejo.id, item_nuevo.id))
+    for _, viejo_id, nuevo_id in sorted(candidatos):
+        if viejo_id not in pares and nuevo_id in libres:
+            unir(anterior.items[viejo_id], nuevo.items[nuevo_id])
+    return pares
+
+
+def diferencias(anterior, nuevo, renombres=None):
+    # renombres: {clave anterior: clave nueva} para forzar emparejamientos
+    dif = DiferenciasCatalogo(anterior, nuevo)
+    dif.items = _emparejar_items(anterior, nuevo, renombres)
+    emparejados = set(dif.items.values())
+    dif.eliminados = [i.clave for i in anterior.items.values() if i.id not in dif.items]
+    dif.agregados = [i.clave for i in nuevo.items.values() if i.id not in emparejados]
+    for viejo_id, nuevo_id in dif.items.items():
+        viejo, item_nuevo = anterior.items[viejo_id], nuevo.items[nuevo_id]
+        if viejo.clave != item_nuevo.clave:
+            dif.renombrados.append((viejo.clave, item_nuevo.clave))
+        codigos_nuevos = set(item_nuevo.ie_indice)
+        por_texto = {normalizar(ie['texto']): ie['codigo'] for ie in item_nuevo.ies
+                     if ie['codigo'] not in viejo.ie_indice}
+        mapa, usados = {}, set()
+        for ie in viejo.ies:
+            codigo = ie['codigo']
+            if codigo in codigos_nuevos:
+                mapa[codigo] = codigo
+                continue
+            otro = por_texto.get(normalizar(ie['texto']))
+            mapa[codigo] = otro if otro not in usados else None
+            if mapa[codigo] is not None:
+                usados.add(otro)
+                dif.ie_renombrados.setdefault(item_nuevo.clave, []).append((codigo, otro))
+            else:
+                dif.ie_eliminados.setdefault(item_nuevo.clave, []).append(codigo)
+        agregados = [c for c in item_nuevo.ie_indice if c not in set(mapa.values())]
+        if agregados:
+            dif.ie_agregados[item_nuevo.clave] = agregados
+        if any(a != n for a, n in mapa.items()) or agregados or list(viejo.ie_indice) != list(item_nuevo.ie_indice):
+            dif.codigos[viejo_id] = mapa
+    return dif
+
+
+# ---------- MIGRACIÓN ----------
+
+class InformeMigracion:
+    def __init__(self):
+        self.diferencias = []       # DiferenciasCatalogo aplicadas
+        self.evaluaciones = 0
+        self.items_reescritos = 0
+        self.eventos_reescritos = 0
+        self.items_descartados = 0  # filas de ítems eliminados del catálogo (archivadas)
+        self.ie_descartados = 0     # respuestas a IE eliminados
+        self.revisar = []           # (evaluacion_id, clave nueva, motivo)
+        self.sin_snapshot = {}      # versión sin snapshot -> evaluaciones que quedan sin migrar
+        self.simulada = False
+        self.segundos = 0.0
+
+    def resumen(self):
+        texto = (f"{self.evaluaciones} evaluaciones migradas{' (simulación)' if self.simulada else ''}: "
+                 f"{self.items_reescritos} ítems reescritos, {self.items_descartados} respuestas de ítems eliminados "
+                 f"archivadas, {self.ie_descartados} respuestas de IE eliminados, {len(self.revisar)} ítems por revisar, "
+                 f"{self.eventos_reescritos} eventos de la bitácora reescritos ({self.segundos:.2f} s)")
+        if self.sin_snapshot:
+            texto += "; sin snapshot: " + ", ".join(f"{v or 'sin versión'} ({n})" for v, n in self.sin_snapshot.items())
+        return texto
+
+
+def _migrar_fila(dif, nuevo, fila):
+    # -> (fila migrada o None si el ítem ya no existe, respuestas de IE descartadas, motivo de revisión o None)
+    evaluacion_id, item_id, orden, esc, ig1, ig2, ig3, ie, obs, actualizado = fila
+    nuevo_id = dif.items.get(item_id)
+    if nuevo_id is None:
+        return None, 0, None
+    mapa = dif.codigos.get(item_id)
+    motivo = None
+    descartados = 0
+    if mapa is not None:
+        respuestas = json.loads(ie)
+        traducidas = {}
+        for codigo, respuesta in respuestas.items():
+            destino = mapa.get(codigo)
+            if destino is None:
+                descartados += 1
+            else:
+                traducidas[destino] = respuesta
+        # En el orden del catálogo nuevo, como las deja el formulario por ítem
+        ies = nuevo.items[nuevo_id].ies
+        traducidas = {x['codigo']: traducidas[x['codigo']] for x in ies if x['codigo'] in traducidas}
+        if respuestas and len(traducidas) < len(ies):
+            motivo = "IE nuevos sin responder"
+        elif respuestas and not traducidas:
+            motivo = "Sin respuestas de IE vigentes"
+        ie = json.dumps(traducidas, ensure_ascii=False)
+    return (evaluacion_id, nuevo_id, orden, esc, ig1, ig2, ig3, ie, obs, actualizado), descartados, motivo
+
+
+def migrar_almacen(almacen, registro, nuevo, evaluaciones=None, renombres=None, simular=False, asumir=None):
+    # Lleva a la versión de `nuevo` las evaluaciones guardadas con otra versión.
+    # evaluaciones: IDs a migrar (todas por defecto); asumir: versión de las
+    # evaluaciones guardadas antes de registrar la versión del catálogo.
+    t0 = time.perf_counter()
+    informe = InformeMigracion()
+    informe.simulada = simular
+    con = almacen._conexion()
+    con.executescript(ESQUEMA)
+    con.executescript(ESQUEMA_BITACORA)
+    filtro, parametros = "", []
+    if evaluaciones is not None:
+        filtro = f" AND e.id IN ({','.join('?' * len(evaluaciones))})"
+        parametros = list(evaluaciones)
+    versiones = con.execute(
+        f"SELECT e.catalogo, COUNT(*) FROM evaluaciones e WHERE e.catalogo != ?{filtro} GROUP BY e.catalogo",
+        [nuevo.version] + parametros).fetchall()
+    for guardada, n in versiones:
+        origen = guardada or asumir
+        anterior = registro.obtener(origen) if origen else None
+        if anterior is None:
+            informe.sin_snapshot[guardada] = n
+            continue
+        dif = diferencias(anterior, nuevo, renombres)
+        informe.diferencias.append(dif)
+        informe.evaluaciones += n
+        _migrar_version(con, dif, anterior, nuevo, guardada, filtro, parametros, informe, simular)
+    informe.segundos = time.perf_counter() - t0
+    return informe
+
+
+def _migrar_version(con, dif, anterior, nuevo, version, filtro, parametros, informe, simular):
+    ahora = time.time()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        filas = con.execute(
+            f"""
+            SELECT i.evaluacion_id, i.item_id, i.orden, i.escenario, i.ig1, i.ig2, i.ig3, i.ie, i.obs, i.actualizado
+            FROM items i JOIN evaluaciones e ON e.id = i.evaluacion_id
+            WHERE e.catalogo = ?{filtro}
+            """,
+            [version] + parametros).fetchall()
+        borrar, insertar, descartados = [], [], []
+        for fila in filas:
+            if not dif.cambia(fila[1]):
+                continue
+            borrar.append((fila[0], fila[1]))
+            migrada, ie_descartados, motivo = _migrar_fila(dif, nuevo, fila)
+            informe.ie_descartados += ie_descartados
+            if migrada is None:
+                registro = {"escenario": fila[3], "ig": list(fila[4:7]), "ie": json.loads(fila[7]), "obs": fila[8]}
+                descartados.append((fila[0], anterior.items[fila[1]].clave, json.dumps(registro, ensure_ascii=False)))
+                continue
+            insertar.append(migrada)
+            if motivo:
+                informe.revisar.append((fila[0], nuevo.items[migrada[1]].clave, motivo))
+        informe.items_reescritos += len(insertar)
+        informe.items_descartados += len(descartados)
+        if simular:
+            con.execute("ROLLBACK")
+            return
+        resumen = {"diferencias": dif.como_dict(), "items_reescritos": len(insertar),
+                   "items_descartados": len(descartados)}
+        migracion_id = con.execute(
+            f"""
+            INSERT INTO migraciones (desde, hacia, fecha, evaluaciones, resumen)
+            VALUES (?, ?, ?, (SELECT COUNT(*) FROM evaluaciones e WHERE e.catalogo = ?{filtro}), ?)
+            """,
+            [version, nuevo.version, ahora, version] + parametros + [json.dumps(resumen, ensure_ascii=False)],
+        ).lastrowid
+        con.executemany("INSERT INTO items_descartados VALUES (?, ?, ?, ?, ?)",
+                        [(migracion_id, e, version, clave, registro) for e, clave, registro in descartados])
+        con.executemany("DELETE FROM items WHERE evaluacion_id = ? AND item_id = ?", borrar)
+        con.executemany("INSERT INTO items (evaluacion_id, item_id, orden, escenario, ig1, ig2, ig3, ie, obs, actualizado) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", insertar)
+        evaluaciones = [e for (e,) in con.execute(f"SELECT e.id FROM evaluaciones e WHERE e.catalogo = ?{filtro}",
+                                                   [version] + parametros)]
+        informe.eventos_reescritos += migrar_eventos(con, evaluaciones, dif.items, dif.codigos)
+        # actualizada: el histórico vuelve a puntuar las evaluaciones migradas
+        con.execute(f"UPDATE evaluaciones AS e SET catalogo = ?, actualizada = ? WHERE e.catalogo = ?{filtro}",
+                    [nuevo.version, ahora, version] + parametros)
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+
+
+def main(argv=None):
+    from almacen import AlmacenEvaluaciones
+
+    parser = argparse.ArgumentParser(description="Snapshots del catálogo y migración de evaluaciones guardadas.")
+    sub = parser.add_subparsers(dest="accion", required=True)
+    sub.add_parser("compilar", help="compila y guarda el snapshot de los JSON actuales")
+    sub.add_parser("versiones", help="lista los snapshots guardados")
+    p = sub.add_parser("diferencias", help="compara dos versiones (por defecto, con la actual)")
+    p.add_argument("anterior")
+    p.add_argument("nueva", nargs="?")
+    p = sub.add_parser("migrar", help="migra las evaluaciones guardadas a la versión actual")
+    p.add_argument("--simular", action="store_true", help="informa los cambios sin escribirlos")
+    p.add_argument("--asumir", help="versión de las evaluaciones guardadas sin versión de catálogo")
+    p.add_argument("--renombres", help='JSON {"clave anterior": "clave nueva"} para forzar emparejamientos')
+    args = parser.parse_args(argv)
+
+    registro = RegistroCatalogos.desde_entorno()
+    actual = registro.compilar()
+    if args.accion == "compilar":
+        print(f"catálogo {actual.version}: {len(actual.items)} ítems")
+    elif args.accion == "versiones":
+        for version, fecha in registro.versiones():
+            marca = " (actual)" if version == actual.version else ""
+            print(f"{version}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(fecha))}{marca}")
+    elif args.accion == "diferencias":
+        anterior = registro.obtener(args.anterior)
+        nueva = registro.obtener(args.nueva) if args.nueva else actual
+        if anterior is None or nueva is None:
+            print("No hay snapshot de esa versión.", file=sys.stderr)
+            return 1
+        print("\n".join(diferencias(anterior, nueva).resumen()))
+    else:
+        renombres = json.loads(Path(args.renombres).read_text(encoding="utf-8")) if args.renombres else None
+        informe = migrar_almacen(AlmacenEvaluaciones.desde_entorno(), registro, actual, renombres=renombres,
+                                 simular=args.simular, asumir=args.asumir)
+        for dif in informe.diferencias:
+            print("\n".join(dif.resumen()))
+        for evaluacion_id, clave, motivo in informe.revisar[:50]:
+            print(f"evaluación {evaluacion_id}: {clave}: {motivo}", file=sys.stderr)
+        print(informe.resumen())
+        return 1 if informe.sin_snapshot else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())